@@ -30,7 +30,7 @@ The main function, and entry point into this file, is `start()`.
 
 import sys
 import bcfplugin.util as util
-from bcfplugin import FREECAD, GUI
+from bcfplugin import FREECAD, GUI, printInfo
 
 
 def setup_gui():
@@ -43,38 +43,21 @@ def setup_gui():
 
 
 def setup_nonGui():
+
+    """ Prints how the plugin can be used without its GUI. """
+
     help_str = """
 This module lets you to operate on BCF files. Therefore multiple modules
 can be imported:
-    - bcf.reader: lets you read in the desired BCF file. Most important function
-      here is: bcf.reader.readBcfFile(absolutePathToFile: str) -> Project
-      The returned object is of greatest importance since you want to operate on
-      it.
-    - bcf.writer: lets you write out the contents of an object of type `Project`
-      to the desired path. Most important function is:
-      bcf.writer.addUpdate(project: Project, element, prevVal)
-
+    - bcfplugin.programmaticInterface: opens one BCF file and lets you read
+      and modify its contents. It is imported into `bcfplugin` itself, so
+      `bcfplugin.openProject(path)` opens the file at `path`.
+    - bcfplugin.aio: awaitable versions of the programmaticInterface
+      functions for asyncio applications.
+    - bcfplugin.cli: processes many BCF files at once from the command line,
+      run `python -m bcfplugin.cli --help` for its commands.
 """
-    if not check_dependencies():
-        return
-
-    import frontend.programmaticInterface as plugin
-
-    project = plugin.openProject("./bcf/test_data/Issues_BIMcollab_Example.bcf.original")
-    topics = plugin.getTopics()
-    a = lambda x: x[1].index
-    util.printInfo([ a(topic) for topic in topics ])
-
-    viewpoints = plugin.getViewpoints(topics[0][1])
-    util.printInfo(viewpoints)
-
-    comments = plugin.getComments(topics[0][1], viewpoints[0][1])
-    util.printInfo(comments)
-
-    files = list()
-    for (topicUUID, topic) in topics:
-        files.append(plugin.getRelevantIfcFiles(topic))
-    util.printInfo(files)
+    printInfo(help_str)
 
 
 def start():
@@ -90,9 +73,9 @@ def start():
 
 
 """
-If run in the command line a little help shall be printed on what the user is
-able to do and how.
+If run in the command line the batch interface of `bcfplugin.cli` is started.
 """
 if __name__ == "__main__":
-    setup()
+    import bcfplugin.cli as cli
+    sys.exit(cli.main())
 
@@ -205,9 +205,9 @@ frontend = None
 if not check_dependencies():
     raise ImportError
 
-# delete temporary artifacts
+# delete temporary artifacts of sessions that ended without cleaning up
 import util
-util.deleteTmp()
+util.deleteStaleSessions()
 
 # create working directory
 path = util.getSystemTmp()
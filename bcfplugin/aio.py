@@ -0,0 +1,256 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file provides awaitable versions of the functions of
+`programmaticInterface`, for using the plugin from asyncio applications
+without blocking their event loop:
+
+    async with AsyncSession() as s:
+        await s.openProject("a.bcf")
+        topics = await s.getTopics()
+        await s.addComment(topics[0][1], "text", "a@b.c")
+
+Every `AsyncSession` owns a `session.Session`, so any number of projects can
+be open at the same time. The functions are run in an executor, in the
+session of their `AsyncSession`. Functions that only read the project
+(`readOperations`) of one session run concurrently, functions that change it
+(`writeOperations`) run one at a time and never together with a read.
+
+The executor is a thread pool, as the data model lives in the memory of this
+process. Reading and writing XML thereby happen outside of the event loop,
+but still share the interpreter with it.
+"""
+
+import asyncio
+import functools
+from collections import deque
+
+import bcfplugin
+import bcfplugin.rdwr.snapshot as snapshot
+import bcfplugin.programmaticInterface as pI
+from bcfplugin.session import Session, activate, deactivate
+
+logger = bcfplugin.createLogger(__name__)
+
+readOperations = ("isProjectOpen", "getProjectName", "getTopics",
+        "queryTopics", "getTopicsPage", "getTopicCount", "search",
+        "getComments", "getCommentCount", "getViewpoints",
+        "getViewpointGeometry", "getSnapshots", "getRelevantIfcFiles",
+        "getAdditionalDocumentReferences", "getTopic", "getTopicFromUUID",
+        "getRelatedTopics", "getReferencingTopics", "getTopicCycles",
+        "getTopicClusters", "exportBcfApi")
+""" Functions of `programmaticInterface` that do not change the project """
+
+writeOperations = ("openProject", "saveProject", "addProject", "addTopic",
+        "addComment", "addFile", "addLabel", "addDocumentReference",
+        "addViewpointToComment", "copyFileToProject", "deleteObject",
+        "modifyComment", "modifyElement", "importBcfApi")
+""" Functions of `programmaticInterface` that change the project or its
+working directory """
+
+
+class ReadWriteLock:
+
+    """ Lock for asyncio tasks that is either held by any number of readers or
+    by one writer.
+
+    Waiting tasks are granted the lock in the order they asked for it, so a
+    writer is not starved by a steady stream of readers. Unlike
+    `asyncio.Lock`, `release()` is an ordinary function, so the lock can be
+    released from a callback.
+    """
+
+    def __init__(self):
+
+        self._readers = 0
+        self._writer = False
+        self._waiters = deque()
+        """ (future, write) of every waiting task """
+
+
+    def _canAcquire(self, write: bool):
+
+        if write:
+            return not self._writer and self._readers == 0
+        return not self._writer
+
+
+    def _take(self, write: bool):
+
+        if write:
+            self._writer = True
+        else:
+            self._readers += 1
+
+
+    def _wakeUp(self):
+
+        while len(self._waiters) > 0:
+            (future, write) = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if not self._canAcquire(write):
+                break
+            self._waiters.popleft()
+            self._take(write)
+            future.set_result(None)
+
+
+    async def acquire(self, write: bool):
+
+        """ Waits until the lock can be taken for writing if `write` is set,
+        otherwise for reading, and takes it """
+
+        if len(self._waiters) == 0 and self._canAcquire(write):
+            self._take(write)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((future, write))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the lock was granted right before the cancellation
+                self.release(write)
+            else:
+                self._wakeUp()
+            raise
+
+
+    def release(self, write: bool):
+
+        """ Releases the lock taken by `acquire(write)` """
+
+        if write:
+            self._writer = False
+        else:
+            self._readers -= 1
+        self._wakeUp()
+
+
+def _callInSession(session: Session, function, args, kwargs):
+
+    """ Calls `function` with `session` being the current session """
+
+    token = activate(session)
+    try:
+        return function(*args, **kwargs)
+    finally:
+        deactivate(token)
+
+
+class AsyncSession:
+
+    """ Awaitable interface to one project.
+
+    For each name in `readOperations` and `writeOperations` an `AsyncSession`
+    has a coroutine method of the same name and parameters, returning the
+    result of the function of `programmaticInterface`. `executor` is passed
+    to `loop.run_in_executor()`, by default the executor of the event loop is
+    used.
+    """
+
+    def __init__(self, executor = None, persistent: bool = False):
+
+        self.session = Session(persistent)
+        self.executor = executor
+        self._lock = ReadWriteLock()
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, etype, value, traceback):
+        await self.closeProject()
+
+
+    async def run(self, function, *args, write: bool = True, **kwargs):
+
+        """ Runs `function` with the given arguments in the executor, in the
+        session of this object.
+
+        If `write` is set `function` runs alone, otherwise concurrently with
+        other functions run with `write` unset. If the awaiting task is
+        cancelled, the lock is still held until `function` returned, so
+        that a cancelled change can not overlap with the next one.
+        """
+
+        loop = asyncio.get_running_loop()
+        await self._lock.acquire(write)
+        try:
+            future = loop.run_in_executor(self.executor, _callInSession,
+                    self.session, function, args, kwargs)
+        except BaseException:
+            self._lock.release(write)
+            raise
+
+        future.add_done_callback(lambda f: self._lock.release(write))
+        return await asyncio.shield(future)
+
+
+    async def closeProject(self, snapshotFile: str = None):
+
+        """ Closes the project and deletes the working directory.
+
+        Unlike `programmaticInterface.closeProject()` the user is never asked
+        to save changes. If `snapshotFile` is given, a snapshot is written to
+        it, from which `openProject()` can restore the unsaved changes.
+        Otherwise they are discarded.
+        """
+
+        await self.run(self._close, snapshotFile)
+
+
+    def _close(self, snapshotFile):
+
+        session = self.session
+        if (snapshotFile is not None and session.project is not None and
+                not snapshot.writeSnapshot(session.project, session.bcfFile,
+                    snapshotFile)):
+            logger.error("The snapshot of {} could not be written to {}."\
+                    " Unsaved changes are lost.".format(session.bcfFile,
+                        snapshotFile))
+        session.close()
+
+
+def _operation(name: str, write: bool):
+
+    """ Returns a coroutine method running `programmaticInterface.<name>` """
+
+    function = getattr(pI, name)
+
+    @functools.wraps(function)
+    async def operation(self, *args, **kwargs):
+        return await self.run(function, *args, write=write, **kwargs)
+
+    return operation
+
+
+for name in readOperations:
+    setattr(AsyncSession, name, _operation(name, False))
+for name in writeOperations:
+    setattr(AsyncSession, name, _operation(name, True))
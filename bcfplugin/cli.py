@@ -0,0 +1,471 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file provides the command line interface for processing many BCF files at
+once, without FreeCAD:
+
+    python -m bcfplugin.cli stats archives/ [--json]
+    python -m bcfplugin.cli filter archives/ --status Open -o filtered/
+    python -m bcfplugin.cli relabel archives/ --rename Old=New --add Checked \\
+            -o relabelled/
+    python -m bcfplugin.cli export archives/ --format csv -o topics.csv
+
+Arguments naming a directory stand for all BCF files found in it. The files are
+distributed over a pool of processes, `--jobs` many. Each process reads the
+topics of its file one at a time through `reader.iterMarkups()`, so neither the
+whole file is extracted, nor is a data model of all topics built. `filter` and
+`relabel` copy the files entry by entry, only the markup files of relabelled
+topics are rewritten.
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import bcfplugin
+import bcfplugin.util as util
+import bcfplugin.rdwr.reader as reader
+import bcfplugin.rdwr.writer as writer
+from bcfplugin.session import Session, activate
+
+logger = bcfplugin.createLogger(__name__)
+
+bcfExtensions = (".bcf", ".bcfzip")
+""" Extensions of the files searched for in directories """
+
+filterFields = ("status", "type", "priority", "assignee", "stage")
+""" Members of Topic the topics can be filtered by """
+
+exportColumns = ("archive", "guid", "index", "title", "status", "type",
+        "priority", "assignee", "stage", "labels", "creationDate",
+        "creationAuthor", "modifiedDate", "dueDate", "comments",
+        "viewpoints")
+""" Columns of the exported topic table """
+
+
+def findArchives(paths):
+
+    """ Returns the list of BCF files in `paths`. Directories are searched
+    recursively for files ending in one of `bcfExtensions`. """
+
+    archives = list()
+    for path in paths:
+        if not os.path.isdir(path):
+            archives.append(path)
+            continue
+        for (dirPath, dirNames, fileNames) in os.walk(path):
+            dirNames.sort()
+            archives.extend(os.path.join(dirPath, fileName)
+                    for fileName in sorted(fileNames)
+                    if fileName.lower().endswith(bcfExtensions))
+    return archives
+
+
+def topicLabels(topic):
+
+    """ Returns the list of label strings of `topic` """
+
+    return [ label.value for label in topic.labels ]
+
+
+def matchesFilters(topic, options):
+
+    """ Returns True if `topic` passes the filters given in `options`.
+
+    A topic passes a field filter if its value is one of the given ones, and
+    the label filter if it carries all given labels.
+    """
+
+    for field in filterFields:
+        values = getattr(options, field, None)
+        if values and getattr(topic, field) not in values:
+            return False
+
+    labels = getattr(options, "label", None)
+    if labels and not set(labels).issubset(topicLabels(topic)):
+        return False
+    return True
+
+
+def _dateString(date):
+
+    return "" if date is None else date.isoformat()
+
+
+def collectStats(bcfFile, options):
+
+    """ Returns a dictionary holding the number of topics, comments and
+    viewpoints of `bcfFile`, and for each of `filterFields` and for labels, a
+    dictionary mapping each value to the number of topics holding it """
+
+    stats = { "topics": 0, "comments": 0, "viewpoints": 0 }
+    counters = { field: Counter() for field in filterFields + ("labels",) }
+    for (topicDir, markup) in reader.iterMarkups(bcfFile):
+        topic = markup.topic
+        if not matchesFilters(topic, options):
+            continue
+        stats["topics"] += 1
+        stats["comments"] += len(markup.comments)
+        stats["viewpoints"] += len(markup.viewpoints)
+        for field in filterFields:
+            counters[field][getattr(topic, field)] += 1
+        counters["labels"].update(topicLabels(topic))
+
+    for (field, counter) in counters.items():
+        stats[field] = dict(counter)
+    return stats
+
+
+def exportTopics(bcfFile, options):
+
+    """ Returns one row, a dictionary with the keys `exportColumns`, per topic
+    of `bcfFile` """
+
+    rows = list()
+    for (topicDir, markup) in reader.iterMarkups(bcfFile):
+        topic = markup.topic
+        if not matchesFilters(topic, options):
+            continue
+        rows.append({ "archive": bcfFile,
+            "guid": str(topic.xmlId),
+            "index": topic.index,
+            "title": topic.title,
+            "status": topic.status,
+            "type": topic.type,
+            "priority": topic.priority,
+            "assignee": topic.assignee,
+            "stage": topic.stage,
+            "labels": ";".join(topicLabels(topic)),
+            "creationDate": _dateString(topic.date),
+            "creationAuthor": topic.author,
+            "modifiedDate": _dateString(topic.modDate),
+            "dueDate": _dateString(topic.dueDate),
+            "comments": len(markup.comments),
+            "viewpoints": len(markup.viewpoints) })
+    return rows
+
+
+def relabelMarkup(content: bytes, rename, add, remove):
+
+    """ Returns the markup file `content` with the labels of its topic
+    changed.
+
+    Labels are renamed according to the dictionary `rename`, the labels in
+    `remove` are dropped and those in `add` appended. If no label changes,
+    None is returned.
+    """
+
+    root = ET.fromstring(content)
+    topicElem = root.find("Topic")
+    labelElems = topicElem.findall("Labels")
+    oldLabels = [ elem.text or "" for elem in labelElems ]
+
+    newLabels = list()
+    for label in oldLabels + list(add):
+        label = rename.get(label, label)
+        if label not in remove and label not in newLabels:
+            newLabels.append(label)
+    if newLabels == oldLabels:
+        return None
+
+    # Labels precede CreationDate in the sequence of Topic
+    children = list(topicElem)
+    if len(labelElems) > 0:
+        position = children.index(labelElems[0])
+    else:
+        creationDate = topicElem.find("CreationDate")
+        position = (children.index(creationDate) if creationDate is not None
+                else len(children))
+    for elem in labelElems:
+        topicElem.remove(elem)
+    for (offset, label) in enumerate(newLabels):
+        elem = ET.Element("Labels")
+        elem.text = label
+        topicElem.insert(position + offset, elem)
+
+    return writer.xmlPrettify(root)
+
+
+def rewriteArchive(bcfFile, options, selectedTopics, relabel, topicCount):
+
+    """ Writes `bcfFile` to the output directory of `options`.
+
+    Without `relabel` the directories of all topics not in `selectedTopics`
+    are left out. With `relabel` every topic is copied, and the labels of the
+    topics in `selectedTopics` are changed as described by `options`.
+    `topicCount` is the number of topics of `bcfFile`. Returns the path of the
+    written file together with the number of written and of relabelled
+    topics. """
+
+    dstFile = os.path.join(options.output, os.path.basename(bcfFile))
+    if os.path.abspath(dstFile) == os.path.abspath(bcfFile):
+        raise ValueError("{} would be overwritten. Choose another output"\
+                " directory.".format(bcfFile))
+
+    rename = dict(options.rename) if relabel else dict()
+    add = options.add if relabel else list()
+    remove = set(options.remove) if relabel else set()
+
+    relabelled = 0
+    with zipfile.ZipFile(bcfFile) as src, \
+            zipfile.ZipFile(dstFile, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            parts = info.filename.split("/", 1)
+            selected = len(parts) == 2 and parts[0] in selectedTopics
+            if not relabel and len(parts) == 2 and not selected:
+                continue
+            content = src.read(info)
+            if relabel and selected and parts[1] == "markup.bcf":
+                changed = relabelMarkup(content, rename, add, remove)
+                if changed is not None:
+                    content = changed
+                    relabelled += 1
+            dst.writestr(info, content)
+
+    topics = topicCount if relabel else len(selectedTopics)
+    return { "output": dstFile, "topics": topics, "relabelled": relabelled }
+
+
+def processArchive(command, bcfFile, options):
+
+    """ Runs `command` on `bcfFile`. This is the function executed in the
+    worker processes.
+
+    Returns (bcfFile, result, error), where `error` is None if the command
+    succeeded.
+    """
+
+    try:
+        if command == "stats":
+            result = collectStats(bcfFile, options)
+        elif command == "export":
+            result = exportTopics(bcfFile, options)
+        else:
+            topicCount = 0
+            selectedTopics = set()
+            for (topicDir, markup) in reader.iterMarkups(bcfFile):
+                topicCount += 1
+                if matchesFilters(markup.topic, options):
+                    selectedTopics.add(topicDir)
+            result = rewriteArchive(bcfFile, options, selectedTopics,
+                    command == "relabel", topicCount)
+    except Exception as err:
+        logger.error("{} could not be processed: {}".format(bcfFile, err))
+        return (bcfFile, None, str(err))
+    return (bcfFile, result, None)
+
+
+def _initWorker():
+
+    """ Gives each worker process its own session, and thereby its own
+    temporary directory """
+
+    activate(Session())
+
+
+def runCommand(command, archives, options):
+
+    """ Runs `command` on every file of `archives` in `options.jobs`
+    processes. Returns the list of (bcfFile, result, error) in the order of
+    `archives`. """
+
+    if options.jobs == 1 or len(archives) <= 1:
+        return [ processArchive(command, bcfFile, options)
+                for bcfFile in archives ]
+
+    try:
+        with ProcessPoolExecutor(max_workers=options.jobs,
+                initializer=_initWorker) as pool:
+            futures = [ pool.submit(processArchive, command, bcfFile, options)
+                    for bcfFile in archives ]
+            return [ future.result() for future in futures ]
+    finally:
+        # the worker processes ended, their directories are stale now
+        util.deleteStaleSessions()
+
+
+def _totalStats(results):
+
+    total = dict()
+    for (bcfFile, stats, error) in results:
+        if stats is None:
+            continue
+        for (key, value) in stats.items():
+            if isinstance(value, dict):
+                counter = total.setdefault(key, Counter())
+                counter.update(value)
+            else:
+                total[key] = total.get(key, 0) + value
+    return { key: (dict(value) if isinstance(value, Counter) else value)
+            for (key, value) in total.items() }
+
+
+def _printStats(name, stats):
+
+    print("{}: {} topics, {} comments, {} viewpoints".format(name,
+        stats["topics"], stats["comments"], stats["viewpoints"]))
+    for field in filterFields + ("labels",):
+        counts = sorted(stats.get(field, dict()).items(),
+                key=lambda item: (-item[1], item[0]))
+        if len(counts) > 0:
+            print("    {}: {}".format(field, ", ".join("{} ({})".format(
+                value if value != "" else "-", count)
+                for (value, count) in counts)))
+
+
+def _renameArgument(value):
+
+    (old, sep, new) = value.partition("=")
+    if sep == "" or old == "":
+        raise argparse.ArgumentTypeError("expected OLD=NEW, got"\
+                " {}".format(value))
+    return (old, new)
+
+
+def buildParser():
+
+    """ Returns the argument parser of `main()` """
+
+    parser = argparse.ArgumentParser(prog="bcfbatch",
+            description="Compute statistics of, filter, relabel and export"\
+                    " many BCF files at once.")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("paths", nargs="+",
+            help="BCF files, or directories to search for BCF files")
+    common.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+            help="number of worker processes (default: number of CPUs)")
+    for field in filterFields:
+        common.add_argument("--{}".format(field), action="append",
+                help="only topics with this {}, can be repeated".format(field))
+    common.add_argument("--label", action="append",
+            help="only topics carrying this label, can be repeated")
+
+    statsParser = subparsers.add_parser("stats", parents=[common],
+            help="print the number of topics, comments and viewpoints")
+    statsParser.add_argument("--json", action="store_true",
+            help="print the statistics as JSON")
+
+    filterParser = subparsers.add_parser("filter", parents=[common],
+            help="write copies containing only the matching topics")
+    filterParser.add_argument("-o", "--output", required=True,
+            help="directory the filtered files are written to")
+
+    relabelParser = subparsers.add_parser("relabel", parents=[common],
+            help="write copies with changed labels of the matching topics")
+    relabelParser.add_argument("--rename", type=_renameArgument,
+            action="append", default=[], metavar="OLD=NEW",
+            help="rename a label, can be repeated")
+    relabelParser.add_argument("--add", action="append", default=[],
+            help="add a label, can be repeated")
+    relabelParser.add_argument("--remove", action="append", default=[],
+            help="remove a label, can be repeated")
+    relabelParser.add_argument("-o", "--output", required=True,
+            help="directory the relabelled files are written to")
+
+    exportParser = subparsers.add_parser("export", parents=[common],
+            help="write a table of all matching topics")
+    exportParser.add_argument("--format", choices=("csv", "json"),
+            default="csv")
+    exportParser.add_argument("-o", "--output", default=None,
+            help="file the table is written to (default: stdout)")
+
+    return parser
+
+
+def main(argv = None):
+
+    """ Command line entry point. Returns the exit code, which is 1 if any
+    file could not be processed. """
+
+    options = buildParser().parse_args(argv)
+    if options.jobs < 1:
+        print("--jobs has to be at least 1", file=sys.stderr)
+        return 2
+
+    archives = findArchives(options.paths)
+    if len(archives) == 0:
+        print("No BCF files found", file=sys.stderr)
+        return 1
+    if options.command in ("filter", "relabel"):
+        os.makedirs(options.output, exist_ok=True)
+
+    results = runCommand(options.command, archives, options)
+    failed = [ (bcfFile, error) for (bcfFile, result, error) in results
+            if error is not None ]
+
+    if options.command == "stats":
+        total = _totalStats(results)
+        if options.json:
+            print(json.dumps({ "archives": { bcfFile: result
+                    for (bcfFile, result, error) in results
+                    if error is None },
+                "total": total }, indent=2, sort_keys=True))
+        else:
+            for (bcfFile, stats, error) in results:
+                if error is None:
+                    _printStats(bcfFile, stats)
+            if len(results) > 1 and "topics" in total:
+                _printStats("total", total)
+
+    elif options.command == "export":
+        rows = [ row for (bcfFile, result, error) in results
+                if error is None for row in result ]
+        out = (sys.stdout if options.output is None else
+                open(options.output, "w", newline=""))
+        try:
+            if options.format == "json":
+                json.dump(rows, out, indent=2)
+                out.write("\n")
+            else:
+                csvWriter = csv.DictWriter(out, fieldnames=exportColumns)
+                csvWriter.writeheader()
+                csvWriter.writerows(rows)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+    else:
+        for (bcfFile, result, error) in results:
+            if error is None:
+                print("{}: {} topics written to {}{}".format(bcfFile,
+                    result["topics"], result["output"],
+                    ", {} relabelled".format(result["relabelled"])
+                        if options.command == "relabel" else ""))
+
+    for (bcfFile, error) in failed:
+        print("{}: {}".format(bcfFile, error), file=sys.stderr)
+    return 0 if len(failed) == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
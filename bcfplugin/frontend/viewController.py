@@ -41,6 +41,8 @@ from random import randrange
 from pivy import coin
 
 import rdwr.threedvector as vector
+import rdwr.ifcguid as ifcguid
+import rdwr.geometryarrays as geometryarrays
 import util
 
 from rdwr.threedvector import (Point, Direction)
@@ -326,6 +328,34 @@ def checkIfGroupExists(name: str):
     return obj
 
 
+def getLinePoints(lines: List[Line]):
+
+    """ Returns the start and end point of every line in `lines` as tuple of
+    FreeCAD.Vectors, converted to FreeCAD units. Points that are not set are
+    None.
+
+    If NumPy is available the points of all lines are converted at once.
+    """
+
+    conversionFactor = getConversionFactor(Unit.METER, Unit.MMETER)
+    toVector = lambda p: (None if p is None or any(v != v for v in p)
+            else FreeCAD.Vector(*p))
+
+    if geometryarrays.isAvailable():
+        starts = geometryarrays.convertUnits(geometryarrays.vectorArray(
+            [ line.start for line in lines ]), conversionFactor).tolist()
+        ends = geometryarrays.convertUnits(geometryarrays.vectorArray(
+            [ line.end for line in lines ]), conversionFactor).tolist()
+    else:
+        scale = lambda p: (None if p is None else (p.x * conversionFactor,
+                p.y * conversionFactor, p.z * conversionFactor))
+        starts = [ scale(line.start) for line in lines ]
+        ends = [ scale(line.end) for line in lines ]
+
+    return [ (toVector(start), toVector(end))
+            for (start, end) in zip(starts, ends) ]
+
+
 def createLines(lines: List[Line]):
 
     """ Creates every line in `lines` and adds them to the BCF group
@@ -345,11 +375,7 @@ def createLines(lines: List[Line]):
             bcfGroup = obj
 
     # try to add all lines in `lines`. Skip the failing ones
-    for line in lines:
-        start = line.start
-        end = line.end
-        fStart = FreeCAD.Vector(start.x, start.y, start.z)
-        fEnd = FreeCAD.Vector(end.x, end.y, end.z)
+    for (fStart, fEnd) in getLinePoints(lines):
         line = drawLine(fStart, fEnd)
 
         if line is not None:
@@ -445,7 +471,9 @@ def getIfcObjects():
     `IfcData`, which is a dictionary; and this dictionary must have key value
     pair with the key "IfcUID".
     The dictionary returned will have keys corresponding to the IfcUIDs and the
-    values will be the objects themselves.
+    values will be the objects themselves. The IfcUIDs are converted to 128 bit
+    integers by `ifcguid.toKey()`, use `iterIfcKeys()` to look up components
+    in it.
     """
 
     doc = FreeCAD.ActiveDocument
@@ -459,11 +487,25 @@ def getIfcObjects():
     # walk through all freecad objects and check if they are ifc objects
     for fObj in doc.Objects:
         if isIfcObject(fObj):
-            ifcObjects[fObj.IfcData["IfcUID"]] = fObj
+            ifcObjects[ifcguid.toKey(fObj.IfcData["IfcUID"])] = fObj
 
     return ifcObjects
 
 
+def iterIfcKeys(components):
+
+    """ Yields the IfcGuid of every component in `components` in the form of
+    the keys of `getIfcObjects()`.
+
+    For a `ComponentList` the stored integers are taken directly, without
+    converting every IfcGuid to a string and back.
+    """
+
+    if hasattr(components, "ifcIdKeys"):
+        return iter(components.ifcIdKeys())
+    return (ifcguid.toKey(component.ifcId) for component in components)
+
+
 def colourToTuple(colour: str):
 
     """ Convert a html colour value to a tuple of three elements.
@@ -523,8 +565,7 @@ def colourComponents(colourings: List[ComponentColour], ifcObjects = None):
 
         util.printInfo("Got colour {} for components {}".format(colTuple,
             colouring.components))
-        for component in colouring.components:
-            cIfcId = component.ifcId
+        for cIfcId in iterIfcKeys(colouring.components):
 
             # colour object if it has an ifcId <=> obj \in ifcObjects
             if cIfcId in ifcObjects:
@@ -561,9 +602,7 @@ def applyVisibilitySettings(defaultVisibility: bool,
 
     # set visibility of exceptions, if they are found by their ifcId, to the
     # complement of `defaultVisibility`
-    for exception in exceptions:
-        excId = exception.ifcId
-
+    for excId in iterIfcKeys(exceptions):
         if excId in ifcObjects:
             ifcObjects[excId].ViewObject.Visibility = not defaultVisibility
 
@@ -602,9 +641,7 @@ def selectComponents(components: List[Component], ifcObjects = None):
     selectionCnt = 0
     backupSelection()
     FreeCADGui.Selection.clearSelection()
-    for component in components:
-        ifcUID = component.ifcId
-
+    for ifcUID in iterIfcKeys(components):
         util.printInfo("Checking {} if it is in ifcObjects {}".format(ifcUID,
             ifcObjects))
         if ifcUID in ifcObjects:
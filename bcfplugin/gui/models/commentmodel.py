@@ -59,13 +59,21 @@ class CommentModel(QAbstractListModel):
     Also this model introduces the notion of a 'special comment'. A special
     comment is a comment object where the 'viewpoint' member references an
     actual instance of ViewpointReference.
+
+    Comments are loaded in pages of `pageSize` comments. Further pages are
+    loaded through `fetchMore()` once the view scrolls to the end of the
+    loaded comments.
     """
 
+    pageSize = 100
+    """ Number of comments loaded at once """
+
     def __init__(self, parent = None):
 
         QAbstractListModel.__init__(self, parent)
         self.items = []
         self.currentTopic = None
+        self.commentCount = 0
 
 
     def removeRow(self, index):
@@ -103,6 +111,36 @@ class CommentModel(QAbstractListModel):
         return len(self.items)
 
 
+    def canFetchMore(self, parent = QModelIndex()):
+
+        """ Returns True if not all comments of the current topic are loaded
+        """
+
+        if parent.isValid():
+            return False
+        return len(self.items) < self.commentCount
+
+
+    def fetchMore(self, parent = QModelIndex()):
+
+        """ Loads the next page of comments of the current topic """
+
+        if parent.isValid() or self.currentTopic is None:
+            return
+
+        comments = pI.getComments(self.currentTopic, offset=len(self.items),
+                limit=self.pageSize)
+        if comments == pI.OperationResults.FAILURE or len(comments) == 0:
+            # do not ask for the same page over and over again
+            self.commentCount = len(self.items)
+            return
+
+        first = len(self.items)
+        self.beginInsertRows(QModelIndex(), first, first + len(comments) - 1)
+        self.items += [ comment[1] for comment in comments ]
+        self.endInsertRows()
+
+
     def data(self, index, role=Qt.DisplayRole):
 
         """ Returns the data to be displayed by the comment view.
@@ -187,7 +225,8 @@ class CommentModel(QAbstractListModel):
         if not index.isValid() or role != Qt.EditRole:
             return False
 
-        commentToEdit = self.items[index.row()]
+        # the comments are read-only views of the data model
+        commentToEdit = copy.deepcopy(self.items[index.row()])
         commentToEdit.comment = value[0]
         commentToEdit.modAuthor = value[1]
 
@@ -205,14 +244,17 @@ class CommentModel(QAbstractListModel):
         deletes the internal list.
 
         If topic is set to `None` then all elements will be deleted from the
-        model. Otherwise all comments of `topic` are retrieved and stored in
-        `items`."""
+        model. Otherwise the first page of comments of `topic` is retrieved and
+        stored in `items`. If comments of the same topic were loaded before, at
+        least as many comments are loaded again, so the view keeps its
+        position."""
 
         self.beginResetModel()
 
         if topic is None:
             del self.items
             self.items = list()
+            self.commentCount = 0
             self.endResetModel()
             return
 
@@ -222,8 +264,14 @@ class CommentModel(QAbstractListModel):
             self.endResetModel()
             return
 
-        comments = pI.getComments(topic)
-        if comments == pI.OperationResults.FAILURE:
+        limit = self.pageSize
+        if self.currentTopic is not None and topic.id == self.currentTopic.id:
+            limit = max(limit, len(self.items))
+
+        comments = pI.getComments(topic, limit=limit)
+        commentCount = pI.getCommentCount(topic)
+        if (comments == pI.OperationResults.FAILURE or
+                commentCount == pI.OperationResults.FAILURE):
             util.showError("Could not get any comments for topic" \
                     " {}".format(str(topic)))
             logger.error("Could not get any comments for topic" \
@@ -233,6 +281,7 @@ class CommentModel(QAbstractListModel):
 
         self.items = [ comment[1] for comment in comments ]
         self.currentTopic = topic
+        self.commentCount = commentCount
 
         self.endResetModel()
 
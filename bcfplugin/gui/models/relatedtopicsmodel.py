@@ -131,19 +131,15 @@ class RelatedTopicsModel(QAbstractListModel):
         """ Compiles a list of `Topic` instances based on a list of UUIDs.
 
         An instance of `Topic` has a list of UUIDs, each specifying one related
-        topic. This function now searches in the data model for each of these
-        UUIDs and stores a reference to the corresponding `Topic` instance in
-        `relatedTopics` and returns the result.
+        topic. The corresponding `Topic` instances are retrieved at once from
+        the topic graph of the project and stored in `relTopics`.
         """
 
         if topic is None:
             return False
 
-        relatedTopics = topic.relatedTopics
-        for t in relatedTopics:
-            # in this list only the uid of a topic is stored
-            tUId = t.value
-            match = pI.getTopicFromUUID(tUId)
-            if match != pI.OperationResults.FAILURE:
-                self.relTopics.append(match)
+        relatedTopics = pI.getRelatedTopics(topic)
+        if relatedTopics == pI.OperationResults.FAILURE:
+            return False
+        self.relTopics = [ t[1] for t in relatedTopics ]
 
@@ -43,7 +43,15 @@ logger = bcfplugin.createLogger(__name__)
 
 class TopicListModel(QAbstractListModel):
 
-    """ Model for the list view displaying the topics. """
+    """ Model for the list view displaying the topics.
+
+    Topics are loaded in pages of `pageSize` topics, further pages are loaded
+    through `fetchMore()` once the view scrolls to the end of the loaded
+    topics.
+    """
+
+    pageSize = 200
+    """ Number of topics loaded at once """
 
     selectionChanged = Signal((Topic,))
     """ Signal emitted when a new topic was selected. """
@@ -51,8 +59,9 @@ class TopicListModel(QAbstractListModel):
     def __init__(self):
 
         QAbstractListModel.__init__(self)
-        self.updateTopics()
         self.items = []
+        self.topicCount = 0
+        self.updateTopics()
 
 
     def rowCount(self, parent = QModelIndex()):
@@ -61,6 +70,34 @@ class TopicListModel(QAbstractListModel):
         return len(self.items)
 
 
+    def canFetchMore(self, parent = QModelIndex()):
+
+        """ Returns True if not all topics are loaded """
+
+        if parent.isValid():
+            return False
+        return len(self.items) < self.topicCount
+
+
+    def fetchMore(self, parent = QModelIndex()):
+
+        """ Loads the next page of topics """
+
+        if parent.isValid() or not pI.isProjectOpen():
+            return
+
+        topics = pI.getTopicsPage(len(self.items), self.pageSize)
+        if topics == pI.OperationResults.FAILURE or len(topics) == 0:
+            # do not ask for the same page over and over again
+            self.topicCount = len(self.items)
+            return
+
+        first = len(self.items)
+        self.beginInsertRows(QModelIndex(), first, first + len(topics) - 1)
+        self.items += [ topic[1] for topic in topics ]
+        self.endInsertRows()
+
+
     def data(self, index, role = Qt.DisplayRole):
 
         """ Function used for retrieving data to display. """
@@ -87,7 +124,8 @@ class TopicListModel(QAbstractListModel):
     @Slot()
     def updateTopics(self):
 
-        """ Updates the internal list of topics. """
+        """ Updates the internal list of topics. At least as many topics as
+        were loaded before are loaded again. """
 
         self.beginResetModel()
 
@@ -95,9 +133,11 @@ class TopicListModel(QAbstractListModel):
             self.endResetModel()
             return
 
-        topics = pI.getTopics()
+        limit = max(self.pageSize, len(self.items))
+        topics = pI.getTopicsPage(0, limit)
         if topics != pI.OperationResults.FAILURE:
             self.items = [ topic[1] for topic in topics ]
+            self.topicCount = pI.getTopicCount()
 
         self.endResetModel()
 
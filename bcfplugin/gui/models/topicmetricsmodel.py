@@ -182,7 +182,9 @@ class TopicMetricsModel(QAbstractTableModel):
             self.topic = None
             self.members = []
         else:
-            self.topic = topic
+            # the members are edited in place, so a copy of the read-only view
+            # is needed
+            self.topic = copy.deepcopy(topic)
             self.members = self.createMembersList(self.topic)
 
         self.endResetModel()
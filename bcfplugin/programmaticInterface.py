@@ -30,22 +30,26 @@ It fulfills two purposes:
     - providing a library for the GUI part of the plugin, to access the data
       model.
 
-Every function in here operates on `curProject`, which is the active instance
-of the data model. No object of the data model is passes to the frontend,
-rather for every retrieve operation a deepcopy of the result is created. This
-ensures that the programmaticInterface remains in full control of the data
-model at every point in time.
+Every function in here operates on the project of the current session (see
+`bcfplugin.session`), which is the active instance of the data model. No
+modifiable object of the data model is passed to the frontend. Retrieve
+operations return read-only views of the live objects instead (see
+`bcfplugin.rdwr.readonly`), which can be read without copying but raise an
+AttributeError on any attempt to alter them. The functions modifying the data
+model accept these views and `unwrap()` them to get to the live object. A
+frontend that needs a modifiable copy calls `detach()` on a view, which
+returns a deep copy. This ensures that the programmaticInterface remains in
+full control of the data model at every point in time.
 """
 
 import os
-import re
 import sys
 import copy
 import pytz
 import shutil
-import inspect
 import logging
 import datetime
+import threading
 from enum import Enum
 from typing import List, Tuple
 from uuid import uuid4, UUID
@@ -54,6 +58,10 @@ import bcfplugin
 import bcfplugin.util as util
 import bcfplugin.rdwr.reader as reader
 import bcfplugin.rdwr.writer as writer
+import bcfplugin.rdwr.snapshot as snapshot
+import bcfplugin.rdwr.bcfapi as bcfapi
+import bcfplugin.rdwr.ifcguid as ifcguid
+import bcfplugin.rdwr.geometryarrays as geometryarrays
 import bcfplugin.rdwr.project as p
 import bcfplugin.rdwr.markup as m
 from bcfplugin.rdwr.modification import (ModificationDate, ModificationAuthor,
@@ -62,11 +70,14 @@ from bcfplugin.rdwr.viewpoint import Viewpoint, OrthogonalCamera, PerspectiveCam
 from bcfplugin.rdwr.topic import Topic, DocumentReference, BimSnippet
 from bcfplugin.rdwr.markup import Comment, Header, HeaderFile, ViewpointReference, Markup
 from bcfplugin.rdwr.uri import Uri
+from bcfplugin.rdwr.readonly import ReadOnlyView, view, unwrap
 from bcfplugin.rdwr.interfaces.identifiable import Identifiable
 from bcfplugin.rdwr.interfaces.hierarchy import Hierarchy
 from bcfplugin.rdwr.interfaces.state import State
 from bcfplugin.rdwr.interfaces.xmlname import XMLName
+from bcfplugin.rdwr.interfaces.fingerprint import invalidateFingerprint
 from bcfplugin.frontend.viewController import CamType
+from bcfplugin.session import Session, getSession
 from bcfplugin import FREECAD, GUI
 
 __all__ = [ "CamType", "OperationResults", "deleteObject", "openProject", "closeProject",
@@ -75,14 +86,15 @@ __all__ = [ "CamType", "OperationResults", "deleteObject", "openProject", "close
         "activateViewpoint", "addCurrentViewpoint",
         "addComment", "addFile", "addLabel", "addDocumentReference", "addTopic",
         "copyFileToProject", "modifyComment", "modifyElement", "saveProject",
-        "getTopicFromUUID"
+        "getTopicFromUUID", "getViewpointGeometry", "queryTopics", "search",
+        "getTopicsPage", "getTopicCount", "getCommentCount", "exportBcfApi",
+        "importBcfApi", "getRelatedTopics", "getReferencingTopics",
+        "getTopicCycles", "getTopicClusters"
         ]
 
 utc = pytz.UTC
 """ For localized times """
 
-curProject = None
-""" This variable holds the reference to the currently active data model. """
 
 App = None
 """ Alias for the FreeCAD module """
@@ -92,6 +104,19 @@ Gui = None
 
 logger = bcfplugin.createLogger(__name__)
 
+
+def __getattr__(name):
+
+    """ Provides `curProject` and `curBcfFile`, the project of the current
+    session respectively the path to the BCF file it was opened from. """
+
+    if name == "curProject":
+        return getSession().project
+    if name == "curBcfFile":
+        return getSession().bcfFile
+    raise AttributeError("module {} has no attribute {}".format(__name__,
+        name))
+
 if GUI:
     import frontend.viewController as vCtrl
     import FreeCADGui as Gui
@@ -118,14 +143,14 @@ def _handleProjectUpdate(errMsg, backup):
     the current state is rolled back.
     """
 
-    global curProject
+    session = getSession()
 
     errorenousUpdate = writer.processProjectUpdates()
     if errorenousUpdate is not None:
         logger.error(errMsg)
         logger.info("Project state is reset to before the update.")
-        oldProject = curProject
-        curProject = backup
+        oldProject = session.project
+        session.project = backup
         del oldProject
         return OperationResults.FAILURE
 
@@ -133,28 +158,6 @@ def _handleProjectUpdate(errMsg, backup):
     return OperationResults.SUCCESS
 
 
-def _getCallerFileName():
-
-    """ Return the file name of the second to last function on the stack.
-
-    This function assumes that it is called from another function inside this
-    module.
-    For every method a new stack frame is pushed onto the stack, thus the
-    previous stack frame (gotten via `inspect.stack()[1]`) will be of the
-    function inside this module. `_getCallerFileName` now returns the file name
-    of the function that called the former.
-
-    For example:
-        a() -> b() -> _getCallerFileName()
-        Returns module(a).__file__
-    """
-
-    frame = inspect.stack()[2]
-    module = inspect.getmodule(frame[0])
-
-    return module.__file__
-
-
 def isProjectOpen():
 
     """ Check whether a project is currently open and display an error message
@@ -162,9 +165,7 @@ def isProjectOpen():
     Returns true if a project is currently open. False otherwise.
     """
 
-    if curProject is None:
-        return False
-    return True
+    return getSession().isOpen()
 
 
 def saveProject(dstFile):
@@ -176,15 +177,87 @@ def saveProject(dstFile):
     writer.zipToBcfFile(bcfRootPath, dstFile)
 
 
-def openProject(bcfFile):
+def exportBcfApi(dstFile: str, format: str = "ndjson", snapshots: bool = False):
+
+    """ Writes all topics, viewpoints and comments of the current project to
+    `dstFile` as BCF-API JSON.
+
+    `format` is either "ndjson" or "json", see `bcfapi`. The records are
+    written one after the other, without building the whole document first.
+    If `snapshots` is set the snapshots are embedded in the viewpoints.
+    Returns the number of written records.
+    """
+
+    session = getSession()
+    if not isProjectOpen():
+        return OperationResults.FAILURE
+
+    logger.info("Exporting the project to {}".format(dstFile))
+    records = (record for markup in session.project.topicList
+            for record in bcfapi.markupRecords(markup, snapshots))
+    try:
+        with open(dstFile, "w", encoding="utf-8") as f:
+            return bcfapi.writeRecords(records, f, format)
+    except (OSError, ValueError) as err:
+        logger.error("The project could not be exported to"\
+                " {}: {}".format(dstFile, str(err)))
+        return OperationResults.FAILURE
+
+
+def importBcfApi(srcFile: str):
+
+    """ Adds the topics, viewpoints and comments of the BCF-API JSON file
+    `srcFile` to the current project.
+
+    The file is read record by record and all new topics are written to the
+    working directory in one batch. Topics that already exist in the project
+    are skipped. Returns the number of added topics.
+    """
+
+    session = getSession()
+    if not isProjectOpen():
+        return OperationResults.FAILURE
+
+    logger.info("Importing topics from {}".format(srcFile))
+    try:
+        with open(srcFile, "r", encoding="utf-8") as f:
+            markups = bcfapi.importRecords(session.project,
+                    bcfapi.readRecords(f))
+    except (OSError, ValueError, KeyError) as err:
+        logger.error("The topics of {} could not be read: {}".format(srcFile,
+            str(err)))
+        return OperationResults.FAILURE
+
+    if markups is None:
+        logger.error("Could not add the topics of {} to the"\
+                " project.".format(srcFile))
+        return OperationResults.FAILURE
+    return len(markups)
+
+
+def openProject(bcfFile, snapshotFile = None):
 
     """ Reads in the given bcfFile and makes it available to the plugin.
 
     bcfFile is read using reader.readBcfFile(), if it returned `None` it is
     assumed that the file is invalid and the user is notified.
+    If `snapshotFile` is given and holds a snapshot of `bcfFile`, written by
+    `closeProject()`, the project is restored from it instead, including
+    changes that were not saved yet. Snapshots of an older version of
+    `bcfFile` are ignored.
+    After the project is opened its text index, used by `search()`, is built
+    in a background thread.
+    A persistent session that has no temporary directory yet first resumes
+    the one of a persistent session that crashed, see
+    `util.recoverSession()`, so its dirty bit and author are kept.
     """
 
-    global curProject
+    session = getSession()
+    if session.persistent and session.tmpDir is None:
+        recovered = util.recoverSession()
+        if recovered is not None:
+            logger.info("Recovered the crashed session in {}".format(
+                recovered))
 
     logger.info("Opening {}".format(bcfFile))
     if not os.path.exists(bcfFile):
@@ -192,29 +265,56 @@ def openProject(bcfFile):
             " file!".format(bcfFile))
         return OperationResults.FAILURE
 
-    project = reader.readBcfFile(bcfFile)
+    project = None
+    if snapshotFile is not None:
+        project = snapshot.readSnapshot(snapshotFile, bcfFile)
+    if project is None:
+        project = reader.readBcfFile(bcfFile)
     if project is None:
         logger.error("{} could not be read.".format(bcfFile))
         return OperationResults.FAILURE
 
-    curProject = project
+    session.project = project
+    session.bcfFile = bcfFile
+    _buildTextIndex(session.project)
     return OperationResults.SUCCESS
 
 
-def closeProject():
+def _buildTextIndex(project):
+
+    """ Indexes the text of all topics and comments of `project` in a
+    background thread. A search started before the thread finished waits for
+    it. """
+
+    index = project.getTextIndex()
+    thread = threading.Thread(target=index.refresh, name="BCF text index",
+            daemon=True)
+    thread.start()
+
+
+def closeProject(snapshotFile = None):
 
     """ Encompasses an interactive CLI close project prompt.
 
-    First the user is given the choice to save the dirty state or discard it.
-    If he/she wants to save the state the path to the file (the state shall be
-    stored to) is requested. With this path the `saveProject` is then called.
-    After a successful operation, the data model is deleted.
+    If `snapshotFile` is given, a snapshot of the project and the working
+    directory is written to it, from which `openProject()` can resume the
+    session. Unsaved changes are kept in the snapshot, so the user is not
+    asked to save them.
+    Otherwise the user is given the choice to save the dirty state or discard
+    it. If he/she wants to save the state the path to the file (the state
+    shall be stored to) is requested. With this path the `saveProject` is then
+    called. After a successful operation, the data model is deleted.
     """
 
-    global curProject
+    session = getSession()
 
     logger.info("Closing project...")
-    if util.getDirtyBit():
+    snapshotWritten = False
+    if snapshotFile is not None and session.bcfFile is not None:
+        snapshotWritten = snapshot.writeSnapshot(session.project,
+                session.bcfFile, snapshotFile)
+
+    if util.getDirtyBit() and not snapshotWritten:
 
         answer = "x"
         while answer not in "ny " and answer != "":
@@ -230,7 +330,8 @@ def closeProject():
             else:
                 saveProject(os.path.join(currentDir, file))
 
-    del curProject
+    session.project = None
+    session.bcfFile = None
     util.deleteTmp()
 
 
@@ -241,28 +342,30 @@ def _searchRealTopic(topic: Topic):
     If not found then an error message is printed in addition
     """
 
-    global curProject
+    session = getSession()
 
     logger.debug("Retrieving original copy of topic: {}".format(topic.title))
-    realTopic = curProject.searchObject(topic)
+    realTopic = session.project.searchObject(topic)
     if realTopic is None:
         logger.error("Topic {} could not be found in the open project."\
                 "Cannot retrieve any comments for it then".format(topic))
     return realTopic
 
 
-def _filterCommentsForViewpoint(comments: List[Tuple[str, m.Comment]], viewpoint: Viewpoint):
+def _filterCommentsForViewpoint(comments: List[m.Comment], viewpoint: Viewpoint):
 
     """ Filter comments referencing viewpoint """
 
+    session = getSession()
+
     if viewpoint is None:
         return comments
 
-    realVp = curProject.searchObject(viewpoint)
+    realVp = session.project.searchObject(viewpoint)
     realVpRef = realVp.containingObject
 
     f = lambda cm:\
-        cm if (cm[1].viewpoint and cm[1].viewpoint.id == realVpRef.id) else None
+        cm if (cm.viewpoint and cm.viewpoint.id == realVpRef.id) else None
     filtered = list(filter(f, comments))
     return filtered
 
@@ -299,6 +402,8 @@ def activateViewpoint(viewpoint: Viewpoint,
     """ Sets the camera view the model from the specified viewpoint."""
 
     logger.info("Activating viewpoint")
+    # the viewpoint is only read, so the view is not needed
+    viewpoint = unwrap(viewpoint)
     if not (GUI and FREECAD):
         logger.error("Application is running either not inside FreeCAD or without"\
                 " Gui. Thus cannot set camera position")
@@ -367,17 +472,11 @@ def _isIfcGuid(guid: str):
     """ Check whether `guid` is an ifc guid.
 
     According to `markup.xsd` of version 2.1 an ifcguid is composed of 22 alpha
-    numeric characters + '_' and '$'.
-    Regex: [0-9,A-Z,a-z,_$]
+    numeric characters + '_' and '$'. The check is done by
+    `ifcguid.isIfcGuid()`, which also rejects guids exceeding 128 bits.
     """
 
-    if len(guid) != 22:
-        return False
-
-    pattern = re.compile("[0-9,A-Z,a-z,_$]*")
-    if pattern.fullmatch(guid) is None:
-        return False
-    return True
+    return ifcguid.isIfcGuid(guid)
 
 
 def copyFileToProject(path: str, destName: str = "", topic: Topic = None):
@@ -393,7 +492,7 @@ def copyFileToProject(path: str, destName: str = "", topic: Topic = None):
     an error occurs, the current project will be rolled back to the backup.
     """
 
-    global curProject
+    session = getSession()
 
     logger.info("Copying file {} into the project".format(path))
     if not os.path.exists(path):
@@ -436,6 +535,8 @@ def setModDateAuthor(element, author="", addUpdate=True):
 
     """ Update the modAuthor and modDate members of element """
 
+    session = getSession()
+
     logger.debug("Updating ModifiedDate and ModifiedAuthor in"\
             " {}".format(element))
     # timestamp used as modification datetime
@@ -447,7 +548,7 @@ def setModDateAuthor(element, author="", addUpdate=True):
     # set the modAuthor if `author` is set
     if author != "" and author is not None:
         oldAuthor = element.modAuthor
-        element.modAuthor = author
+        element.modAuthor = p.internString(author)
     # if author is left empty, the previous modification author will be
     # overwritten
     elif author == "" or author is None:
@@ -458,18 +559,19 @@ def setModDateAuthor(element, author="", addUpdate=True):
     # add the author/date modification as update to the writers module
     if addUpdate:
         element._modDate.state = State.States.MODIFIED
-        writer.addProjectUpdate(curProject, element._modDate, oldDate)
+        writer.addProjectUpdate(session.project, element._modDate, oldDate)
 
         if author != "" and author is not None:
             element._modAuthor.state = State.States.MODIFIED
-            writer.addProjectUpdate(curProject, element._modAuthor, oldDate)
+            writer.addProjectUpdate(session.project, element._modAuthor,
+                    oldDate)
 
 
 def getProjectName():
 
     """ Return the name of the open project """
 
-    return curProject.name
+    return getSession().project.name
 
 
 def getTopics():
@@ -477,53 +579,141 @@ def getTopics():
     """ Retrieves ordered list of topics from the currently open project.
 
     A list is constructed that holds tuples, in which the first element contains
-    the name of the topic and the second element is a copy of the topic object
-    itself.
+    the name of the topic and the second element is a read-only view of the
+    topic object itself.
     The list is sorted based on the index a topic is assigned to. Topics without
     an index are shown as last elements.
     """
 
+    session = getSession()
+
     logger.debug("Retrieving list of topics in the project")
     if not isProjectOpen():
         return OperationResults.FAILURE
 
-    topics = list()
-    for markup in curProject.topicList:
-        topic = copy.deepcopy(markup.topic)
-        topics.append((topic.title, topic))
+    topics = [ markup.topic for markup in session.project.topicList ]
+    # topics without an index are moved to the end of the list
+    topics.sort(key=lambda topic: (topic.index == topic._index.defaultValue,
+        topic.index))
+
+    return [ (topic.title, ReadOnlyView(topic)) for topic in topics ]
+
+
+def queryTopics(status=None, type=None, priority=None, assignee=None,
+        stage=None, labels=None, dueBefore=None, dueAfter=None,
+        orderBy: str = "index", descending: bool = False, offset: int = 0,
+        limit: int = None):
+
+    """ Retrieves the topics of the currently open project that match all given
+    filters.
+
+    The topics are looked up in the indexes of the project, instead of
+    visiting every topic. `status`, `type`, `priority`, `assignee` and
+    `stage` each take one value or a list of values, `labels` one label or a
+    list of labels that all have to be set on a topic. Topics due in the range
+    `dueAfter <= dueDate < dueBefore` can be selected through `dueBefore` and
+    `dueAfter`. The result is ordered by `orderBy`, which is one of
+    `topicindex.orderFields`. Of the ordered topics the first `offset` ones
+    are skipped and at most `limit` are returned.
+
+    As in `getTopics()` a list of tuples is returned, the first element
+    being the title and the second element a read-only view of the topic.
+    """
+
+    session = getSession()
+
+    logger.debug("Querying topics in the project")
+    if not isProjectOpen():
+        return OperationResults.FAILURE
+
+    try:
+        topicIndex = session.project.getTopicIndex()
+        topics = topicIndex.query(status=status, type=type,
+                priority=priority, assignee=assignee, stage=stage,
+                labels=labels, dueBefore=dueBefore, dueAfter=dueAfter,
+                orderBy=orderBy, descending=descending, offset=offset,
+                limit=limit)
+    except ValueError as err:
+        logger.error(str(err))
+        return OperationResults.FAILURE
+
+    return [ (topic.title, ReadOnlyView(topic)) for topic in topics ]
+
+
+def getTopicsPage(offset: int = 0, limit: int = 100, orderBy: str = "index",
+        descending: bool = False):
+
+    """ Retrieves `limit` topics of the currently open project, starting at
+    the `offset`th one, in the order `orderBy`.
+
+    With the default order the pages put together equal the list returned by
+    `getTopics()`. Use `getTopicCount()` to find out whether there are more
+    pages.
+    """
+
+    return queryTopics(orderBy=orderBy, descending=descending, offset=offset,
+            limit=limit)
 
-    # move all topics without an index to the end of the list
-    topics = sorted(topics, key=lambda topic: topic[1].index)
-    for i in range(0, len(topics)):
-        topic = topics[i][1]
 
-        if topic.index != topic._index.defaultValue:
-            # first element with a valid index. No invalid indices will follow
-            break
+def getTopicCount():
 
-        if topic.index == topic._index.defaultValue:
-            topics.append(topics[i])
-            del topics[i]
+    """ Returns the number of topics of the currently open project """
 
-    return topics
+    session = getSession()
+
+    if not isProjectOpen():
+        return OperationResults.FAILURE
 
+    return len(session.project.topicList)
 
-def getComments(topic: Topic, viewpoint: Viewpoint = None):
+
+def search(text: str, limit: int = 20):
+
+    """ Searches the titles and descriptions of all topics and the text of
+    all comments of the currently open project for `text`.
+
+    Every word of `text` has to occur in a hit, either as a whole word or as
+    beginning of a word. A list of at most `limit` tuples is returned, sorted
+    by relevance. The first element of a tuple is the score of the hit, the
+    second one a read-only view of the topic or comment. The topic of a comment
+    is found through `comment.containingObject.topic`.
+    """
+
+    session = getSession()
+
+    logger.debug("Searching the project for '{}'".format(text))
+    if not isProjectOpen():
+        return OperationResults.FAILURE
+
+    hits = session.project.getTextIndex().search(text, limit)
+    return [ (score, ReadOnlyView(document)) for (score, document) in hits ]
+
+
+def getComments(topic: Topic, viewpoint: Viewpoint = None, offset: int = 0,
+        limit: int = None, order: str = "date", descending: bool = False):
 
     """ Collect an ordered list of comments inside of topic.
 
     The list of comments is sorted by the date they were created in ascending
-    order => oldest entries will be first in the list.
+    order => oldest entries will be first in the list. With `order` set to
+    "modDate" they are sorted by the date of their last modification instead,
+    `descending` reverses the order.
     Every list element item will be a tuple where the first element is the
-    comments string representation and the second is the comment object itself.
+    comments string representation and the second is a read-only view of the
+    comment object itself.
 
     If this cannot be done OperationsResult.FAILURE is returned instead.
 
     If viewpoint is set then the list of comments is filtered for ones
     referencing viewpoint.
+
+    Of the ordered comments the first `offset` ones are skipped and at most
+    `limit` are returned. The comments are kept sorted by the project, so only
+    the returned window of comments is visited. Use `getCommentCount()` to
+    find out whether there are more comments.
     """
 
-    global curProject
+    session = getSession()
 
     logger.debug("Retrieving comments to topic {}".format(topic.title))
     if not isProjectOpen():
@@ -534,11 +724,38 @@ def getComments(topic: Topic, viewpoint: Viewpoint = None):
         return OperationResults.FAILURE
 
     markup = realTopic.containingObject
-    comments = [ (str(comment), copy.deepcopy(comment)) for comment in markup.comments ]
+    index = session.project.getCommentIndex()
+    try:
+        if viewpoint is None:
+            comments = index.window(markup, order, descending, offset, limit)
+        else:
+            comments = index.window(markup, order, descending)
+    except ValueError as err:
+        logger.error(str(err))
+        return OperationResults.FAILURE
+
+    if viewpoint is not None:
+        comments = _filterCommentsForViewpoint(comments, viewpoint)
+        end = None if limit is None else offset + limit
+        comments = comments[offset:end]
+
+    return [ (str(comment), ReadOnlyView(comment)) for comment in comments ]
+
+
+def getCommentCount(topic: Topic):
+
+    """ Returns the number of comments of `topic` """
+
+    session = getSession()
+
+    if not isProjectOpen():
+        return OperationResults.FAILURE
+
+    realTopic = _searchRealTopic(topic)
+    if realTopic is None:
+        return OperationResults.FAILURE
 
-    comments = sorted(comments, key=lambda cm: cm[1].date)
-    comments = _filterCommentsForViewpoint(comments, viewpoint)
-    return comments
+    return session.project.getCommentIndex().count(realTopic.containingObject)
 
 
 def getViewpoints(topic: Topic, realViewpoint = True):
@@ -546,7 +763,7 @@ def getViewpoints(topic: Topic, realViewpoint = True):
     """ Collect a list of viewpoints associated with the given topic.
 
     The list is constructed of tuples. Each tuple element contains the name of
-    the viewpoint file and a reference to the read-in viewpoint.
+    the viewpoint file and a read-only view of the read-in viewpoint.
     If the list cannot be constructed, because for example no project is
     currently open, OperationResults.FAILURE is returned.
     If `realViewpoint` == True then the second element of every tuple is the
@@ -554,7 +771,7 @@ def getViewpoints(topic: Topic, realViewpoint = True):
     is the viewpoint reference.
     """
 
-    global curProject
+    session = getSession()
 
     logger.debug("Retrieving viewpoints to topic {}".format(topic.title))
     if not isProjectOpen():
@@ -568,16 +785,46 @@ def getViewpoints(topic: Topic, realViewpoint = True):
     markup = realTopic.containingObject
     viewpoints = []
     if realViewpoint:
-        viewpoints = [ (str(vpRef.file), copy.deepcopy(vpRef.viewpoint))
+        viewpoints = [ (str(vpRef.file), view(vpRef.viewpoint))
                 for vpRef in markup.viewpoints ]
     else:
-        viewpoints = [ (str(vpRef.file), copy.deepcopy(vpRef))
+        viewpoints = [ (str(vpRef.file), ReadOnlyView(vpRef))
                 for vpRef in markup.viewpoints ]
 
 
     return viewpoints
 
 
+def getViewpointGeometry(topic: Topic = None):
+
+    """ Returns the cameras, lines and clipping planes of all viewpoints as
+    NumPy arrays, in form of a `geometryarrays.ViewpointGeometry`.
+
+    If `topic` is given, only the viewpoints of `topic` are exported.
+    OperationResults.FAILURE is returned if no project is open, the topic
+    cannot be found or NumPy is not installed.
+    """
+
+    session = getSession()
+
+    if not isProjectOpen():
+        return OperationResults.FAILURE
+
+    markups = session.project.topicList
+    if topic is not None:
+        realTopic = _searchRealTopic(topic)
+        if realTopic is None:
+            return OperationResults.FAILURE
+        markups = [ realTopic.containingObject ]
+
+    viewpoints = [ vpRef.viewpoint for markup in markups
+            for vpRef in markup.viewpoints if vpRef.viewpoint is not None ]
+    geometry = geometryarrays.getViewpointGeometry(viewpoints)
+    if geometry is None:
+        return OperationResults.FAILURE
+    return geometry
+
+
 def getSnapshots(topic: Topic):
 
     """ Returns a list of files representing the snapshots contained in `topic`.
@@ -615,7 +862,7 @@ def getRelevantIfcFiles(topic: Topic):
     currently open, OperationResults.FAILURE is returned.
     """
 
-    global curProject
+    session = getSession()
 
     logger.debug("Retrieving list of relevant IFC files for topic"\
             " {}".format(topic.title))
@@ -646,7 +893,7 @@ def getAdditionalDocumentReferences(topic: Topic):
 
     """ Returns a list of all document references of a topic """
 
-    global curProject
+    session = getSession()
 
     logger.debug("Retrieving list of document references to topic"\
             " {}".format(topic.title))
@@ -662,50 +909,58 @@ def getAdditionalDocumentReferences(topic: Topic):
     return docRefs
 
 
-def getTopic(element):
+def _getRealTopic(element):
 
-    """ Returns the topic to which `element` is associated.
+    """ Returns the topic of the data model to which `element` is associated.
 
     If `element` could not be found inside the current project `None` is
     returned. If `element` could not be associated to any existing topic `None`
-    is returned. In the case that this function is called from outside this
-    module (`programmaticInterface.py`), a deep copy of the found topic is
-    returned.
+    is returned.
     """
 
-    logger.debug("Retrieving topic associated to {}".format(element))
-    realElement = curProject.searchObject(element)
+    session = getSession()
+
+    realElement = session.project.searchObject(element)
     if realElement is None:
-        logger.erroror("Element {} could not be found in the current project.")
+        logger.error("Element {} could not be found in the current"\
+                " project.".format(element))
         return None
 
-    elemHierarchy = realElement.getHierarchyList()
-
-    topic = None
-    for elem in elemHierarchy:
+    for elem in realElement.getHierarchyList():
         if isinstance(elem, Markup):
-            topic = elem.topic
-            break
+            return elem.topic
         elif isinstance(elem, Topic):
-            topic = elem
-            break
-        else:
-            continue
+            return elem
 
-    if _getCallerFileName() == __file__:
-        return topic
-    elif topic is not None:
-        topicCpy = copy.deepcopy(topic)
-        return topicCpy
-    else:
+    return None
+
+
+def getTopic(element):
+
+    """ Returns a read-only view of the topic to which `element` is
+    associated.
+
+    If `element` could not be found inside the current project `None` is
+    returned. If `element` could not be associated to any existing topic `None`
+    is returned.
+    """
+
+    logger.debug("Retrieving topic associated to {}".format(element))
+    topic = _getRealTopic(element)
+    if topic is None:
         return None
+    return ReadOnlyView(topic)
 
 
 def getTopicFromUUID(uid: UUID):
 
-    """ Search the data model for a topic where `topic.xmlId == uid` holds. """
+    """ Search the data model for a topic where `topic.xmlId == uid` holds.
 
-    global curProject
+    The topic is looked up in the GUID index of the project, see
+    `getTopicGraph()` of `Project`.
+    """
+
+    session = getSession()
 
     logger.debug("Searching data model for topic with UUID {}".format(uid))
     if not isProjectOpen():
@@ -717,18 +972,104 @@ def getTopicFromUUID(uid: UUID):
         logger.error("uid is not of type UUID. Can only get topic by UUID.")
         return OperationResults.FAILURE
 
-    match = None
-    topics = [ item.topic for item in curProject.topicList ]
-    for topic in topics:
-        if topic.xmlId == uid:
-            match = copy.deepcopy(topic)
-            break
-
+    match = session.project.getTopicGraph().topic(uid)
     if match is None:
         logger.error("Could not find a topic to that uid: {}".format(str(uid)))
         return OperationResults.FAILURE
 
-    return match
+    return ReadOnlyView(match)
+
+
+def getRelatedTopics(topic: Topic, transitive: bool = False,
+        maxDepth: int = None):
+
+    """ Retrieves the topics `topic` refers to through its related topics.
+
+    If `transitive` is set, also the topics these refer to are retrieved, and
+    so on, up to `maxDepth` references away from `topic`. The nearest topics
+    come first. References to topics that are not part of the project are
+    left out.
+    As in `getTopics()` a list of tuples is returned, the first element
+    being the title and the second element a read-only view of the topic.
+    """
+
+    session = getSession()
+
+    if not isProjectOpen():
+        return OperationResults.FAILURE
+
+    realTopic = _searchRealTopic(topic)
+    if realTopic is None:
+        return OperationResults.FAILURE
+
+    graph = session.project.getTopicGraph()
+    if transitive:
+        topics = graph.transitive(realTopic.xmlId, maxDepth)
+    else:
+        topics = graph.related(realTopic.xmlId)
+    return [ (t.title, ReadOnlyView(t)) for t in topics ]
+
+
+def getReferencingTopics(topic: Topic):
+
+    """ Retrieves the topics that list `topic` as related topic, in the same
+    form as `getRelatedTopics()` """
+
+    session = getSession()
+
+    if not isProjectOpen():
+        return OperationResults.FAILURE
+
+    realTopic = _searchRealTopic(topic)
+    if realTopic is None:
+        return OperationResults.FAILURE
+
+    topics = session.project.getTopicGraph().referencedBy(realTopic.xmlId)
+    return [ (t.title, ReadOnlyView(t)) for t in topics ]
+
+
+def getTopicCycles():
+
+    """ Retrieves the cycles of related topics of the currently open project.
+
+    Every cycle is a list of topics that all reach each other through their
+    related topics, in the same form as `getRelatedTopics()`.
+    """
+
+    session = getSession()
+
+    if not isProjectOpen():
+        return OperationResults.FAILURE
+
+    return [ [ (t.title, ReadOnlyView(t)) for t in cycle ]
+            for cycle in session.project.getTopicGraph().cycles() ]
+
+
+def getTopicClusters(topic: Topic = None):
+
+    """ Retrieves the clusters of topics connected through related topics,
+    regardless of the direction of the reference, largest first.
+
+    If `topic` is given only the cluster containing `topic` is returned. Every
+    cluster is a list in the same form as `getRelatedTopics()`.
+    """
+
+    session = getSession()
+
+    if not isProjectOpen():
+        return OperationResults.FAILURE
+
+    graph = session.project.getTopicGraph()
+    if topic is None:
+        clusters = graph.components()
+    else:
+        realTopic = _searchRealTopic(topic)
+        if realTopic is None:
+            return OperationResults.FAILURE
+        clusters = [ graph.component(realTopic.xmlId) ]
+
+    return [ [ (t.title, ReadOnlyView(t)) for t in cluster ]
+            for cluster in clusters ]
 
 
 def addProject(name: str, extensionSchemaUri: ""):
@@ -738,7 +1079,7 @@ def addProject(name: str, extensionSchemaUri: ""):
     This means essentially creating a new folder named `name` and placing one
     new file in it, namely `project.bcfp`."""
 
-    global curProject
+    session = getSession()
 
     logger.info("Adding new project with name {}".format(name))
     newProject = p.Project(uuid4(), name, extensionSchemaUri)
@@ -747,7 +1088,7 @@ def addProject(name: str, extensionSchemaUri: ""):
     writer.addProjectUpdate(newProject, newProject, None)
     result = _handleProjectUpdate("Project could not be created", None)
     if result == OperationResults.SUCCESS:
-        curProject = copy.deepcopy(newProject)
+        session.project = copy.deepcopy(newProject)
 
     return result
 
@@ -764,8 +1105,8 @@ def addViewpointToComment(comment: Comment, viewpoint: ViewpointReference, autho
     an error occurs, the current project will be rolled back to the backup.
     """
 
-    global curProject
-    projectBackup = copy.deepcopy(curProject)
+    session = getSession()
+    projectBackup = copy.deepcopy(session.project)
     logger.info("Adding new viewpoint reference to comment {}".format(comment))
 
     if author == "":
@@ -775,8 +1116,8 @@ def addViewpointToComment(comment: Comment, viewpoint: ViewpointReference, autho
     if not isProjectOpen():
         return OperationResults.FAILURE
 
-    realComment = curProject.searchObject(comment)
-    realViewpoint = curProject.searchObject(viewpoint)
+    realComment = session.project.searchObject(comment)
+    realViewpoint = session.project.searchObject(viewpoint)
     if realComment == None:
         logger.error("No matching comment was found in the current project.")
         return OperationResults.FAILURE
@@ -788,21 +1129,21 @@ def addViewpointToComment(comment: Comment, viewpoint: ViewpointReference, autho
     modDate = utc.localize(datetime.datetime.now())
 
     realComment.state = State.States.DELETED
-    writer.addProjectUpdate(curProject, realComment, None)
+    writer.addProjectUpdate(session.project, realComment, None)
 
     realComment.viewpoint = viewpoint
     realComment.state = State.States.ADDED
-    writer.addProjectUpdate(curProject, realComment, None)
+    writer.addProjectUpdate(session.project, realComment, None)
 
     oldDate = realComment.modDate
     realComment.modDate = modDate
     realComment._modDate.state = State.States.MODIFIED
-    writer.addProjectUpdate(curProject, realComment._modDate, oldDate)
+    writer.addProjectUpdate(session.project, realComment._modDate, oldDate)
 
     oldAuthor = realComment.modAuthor
     realComment.modAuthor = author
     realComment._modAuthor.state = State.States.MODIFIED
-    writer.addProjectUpdate(curProject, realComment._modAuthor, oldAuthor)
+    writer.addProjectUpdate(session.project, realComment._modAuthor, oldAuthor)
 
     return _handleProjectUpdate("Could not assign viewpoint.", projectBackup)
 
@@ -817,8 +1158,8 @@ def addCurrentViewpoint(topic: Topic):
         - camera position and orientation
     """
 
-    global curProject
-    projectBackup = copy.deepcopy(curProject)
+    session = getSession()
+    projectBackup = copy.deepcopy(session.project)
     logger.info("Adding current view settings as viewpoint to topic"\
             " {}".format(topic.title))
 
@@ -869,7 +1210,7 @@ def addCurrentViewpoint(topic: Topic):
         vpRef.viewpoint = vp
         realMarkup.viewpoints.append(vpRef)
 
-        writer.addProjectUpdate(curProject, vpRef, None)
+        writer.addProjectUpdate(session.project, vpRef, None)
         return _handleProjectUpdate("Viewpoint could not be added. Rolling"\
                 " back to previous state", projectBackup)
 
@@ -889,10 +1230,10 @@ def addTopic(title: str, author: str, type: str = "", description = "",
     a new markup file created, with nothing set but the topic.
     """
 
-    global curProject
-    projectBackup = copy.deepcopy(curProject)
+    session = getSession()
+    projectBackup = copy.deepcopy(session.project)
     logger.info("Adding new topic({}) to project({})".format(title,
-        curProject.name))
+        session.project.name))
 
     if not isProjectOpen():
         return OperationResults.FAILURE
@@ -902,8 +1243,8 @@ def addTopic(title: str, author: str, type: str = "", description = "",
 
     # create and add new markup to curProject, bot nto write yet
     newMarkup = Markup(None, state = State.States.ADDED,
-            containingElement = curProject)
-    curProject.topicList.append(newMarkup)
+            containingElement = session.project)
+    session.project.topicList.append(newMarkup)
 
     # create new topic and assign it to newMarkup
     creationDate = utc.localize(datetime.datetime.now())
@@ -915,7 +1256,8 @@ def addTopic(title: str, author: str, type: str = "", description = "",
     # adding the markup
 
     newMarkup.topic = newTopic
-    writer.addProjectUpdate(curProject, newMarkup, None)
+    p.internValues(newTopic)
+    writer.addProjectUpdate(session.project, newMarkup, None)
 
     return _handleProjectUpdate("Could not add topic {} to"\
             " project.".format(title), projectBackup)
@@ -931,8 +1273,8 @@ def addComment(topic: Topic, text: str, author: str,
     an error occurs, the current project will be rolled back to the backup.
     """
 
-    global curProject
-    projectBackup = copy.deepcopy(curProject)
+    session = getSession()
+    projectBackup = copy.deepcopy(session.project)
     logger.info("Adding comment {} to topic {}".format(text, topic.title))
 
     if not isProjectOpen():
@@ -951,14 +1293,15 @@ def addComment(topic: Topic, text: str, author: str,
     comment = Comment(guid, localisedDate, author, text, viewpoint,
             containingElement = realMarkup, state=state)
     realMarkup.comments.append(comment)
+    p.internValues(comment)
 
-    writer.addProjectUpdate(curProject, comment, None)
+    writer.addProjectUpdate(session.project, comment, None)
     errorenousUpdate = writer.processProjectUpdates()
     if errorenousUpdate is not None:
         logger.error("Error while adding {}".format(errorenousUpdate[1]))
         logger.error("Project is reset to before the addition.")
         logger.info("Please fix comment {}".format(comment))
-        curProject = projectBackup
+        session.project = projectBackup
 
         return OperationResults.FAILURE
 
@@ -980,8 +1323,8 @@ def addFile(topic: Topic, ifcProject: str = "",
     an error occurs, the current project will be rolled back to the backup.
     """
 
-    global curProject
-    projectBackup = copy.deepcopy(curProject)
+    session = getSession()
+    projectBackup = copy.deepcopy(session.project)
     logger.info("Adding new file({}) to topic({})".format(filename, topic.title))
 
     if not isExternal:
@@ -1025,12 +1368,13 @@ def addFile(topic: Topic, ifcProject: str = "",
         realMarkup.header = Header([newFile])
         realMarkup.header.state = State.States.ADDED
         realMarkup.header.containingObject = realMarkup
-        writer.addProjectUpdate(curProject, realMarkup.header, None)
+        writer.addProjectUpdate(session.project, realMarkup.header, None)
     else:
         realMarkup.header.files.append(newFile)
     newFile.containingObject = realMarkup.header
+    p.internValues(newFile)
 
-    writer.addProjectUpdate(curProject, newFile, None)
+    writer.addProjectUpdate(session.project, newFile, None)
     return _handleProjectUpdate("File could not be added. Project is reset to"\
             " last valid state", projectBackup)
 
@@ -1054,8 +1398,8 @@ def addDocumentReference(topic: Topic,
     an error occurs, the current project will be rolled back to the backup.
     """
 
-    global curProject
-    projectBackup = copy.deepcopy(curProject)
+    session = getSession()
+    projectBackup = copy.deepcopy(session.project)
     logger.info("Adding new document reference({}) to topic"\
             " {}".format(description, topic.title))
 
@@ -1102,7 +1446,7 @@ def addDocumentReference(topic: Topic,
             State.States.ADDED)
     realTopic.docRefs.append(docRef)
 
-    writer.addProjectUpdate(curProject, docRef, None)
+    writer.addProjectUpdate(session.project, docRef, None)
     return _handleProjectUpdate("Document reference could not be added."\
             " Returning to last valid state...", projectBackup)
 
@@ -1115,8 +1459,8 @@ def addLabel(topic: Topic, label: str):
     an error occurs, the current project will be rolled back to the backup.
     """
 
-    global curProject
-    projectBackup = copy.deepcopy(curProject)
+    session = getSession()
+    projectBackup = copy.deepcopy(session.project)
     logger.info("Adding new label({}) to topic {}".format(label, topic.title))
 
     if label == "":
@@ -1133,10 +1477,10 @@ def addLabel(topic: Topic, label: str):
         return OperationResults.FAILURE
 
     # create and add a new label to curProject
-    realTopic.labels.append(label)
+    realTopic.labels.append(p.internString(label))
     addedLabel = realTopic.labels[-1] # get reference to added label
 
-    writer.addProjectUpdate(curProject, addedLabel, None)
+    writer.addProjectUpdate(session.project, addedLabel, None)
     return _handleProjectUpdate("Label '{}' could not be added. Returning"\
             " to last valid state...".format(label), projectBackup)
 
@@ -1150,8 +1494,9 @@ def deleteObject(object):
     one deletes the object from the data model.
     """
 
-    global curProject
-    projectBackup = copy.deepcopy(curProject)
+    session = getSession()
+    object = unwrap(object)
+    projectBackup = copy.deepcopy(session.project)
     logger.info("Deleting object {} from project".format(object.__class__))
 
     if not issubclass(type(object), Identifiable):
@@ -1168,29 +1513,29 @@ def deleteObject(object):
     if not isProjectOpen():
         return OperationResults.FAILURE
 
-    realObject = curProject.searchObject(object)
+    realObject = session.project.searchObject(object)
     if realObject is None:
         # No rollback has to be done here, since the state of the project is not
         # changed anyways.
         logger.error("Object {} could not be found in project {}".format(
-            object.__class__, curProject.__class__))
+            object.__class__, session.project.__class__))
         return OperationResults.FAILURE
 
     realObject.state = State.States.DELETED
-    writer.addProjectUpdate(curProject, realObject, None)
+    writer.addProjectUpdate(session.project, realObject, None)
     result = _handleProjectUpdate("Object could not be deleted from "\
             "data model" , projectBackup)
 
     # `result == None` if the update could not be processed.
     if result ==  OperationResults.FAILURE:
-        curProject = projectBackup
+        session.project = projectBackup
         errMsg = "Couldn't delete {} from the file.".format(object)
         logger.error(errMsg)
         return OperationResults.FAILURE
 
     # otherwise the updated project is returned
     else:
-        curProject = curProject.deleteObject(realObject)
+        session.project = session.project.deleteObject(realObject)
         return OperationResults.SUCCESS
 
 
@@ -1205,8 +1550,8 @@ def modifyComment(comment: Comment, newText: str, author: str):
     an error occurs, the current project will be rolled back to the backup.
     """
 
-    global curProject
-    projectBackup = copy.deepcopy(curProject)
+    session = getSession()
+    projectBackup = copy.deepcopy(session.project)
     logger.info("Modifying comment({})".format(comment))
 
     if newText == "":
@@ -1217,7 +1562,7 @@ def modifyComment(comment: Comment, newText: str, author: str):
     if not isProjectOpen():
         return OperationResults.FAILURE
 
-    realComment = curProject.searchObject(comment)
+    realComment = session.project.searchObject(comment)
     if realComment is None:
         logger.error("Comment {} could not be found in the data model. Not"\
                 "modifying anything".format(comment))
@@ -1226,7 +1571,7 @@ def modifyComment(comment: Comment, newText: str, author: str):
     oldVal = realComment.comment
     realComment.comment = newText
     realComment._comment.state = State.States.MODIFIED
-    writer.addProjectUpdate(curProject, realComment._comment, oldVal)
+    writer.addProjectUpdate(session.project, realComment._comment, oldVal)
 
     # update `modDate` and `modAuthor`
     setModDateAuthor(realComment, author)
@@ -1247,8 +1592,9 @@ def modifyElement(element, author=""):
     `modAuthor` and `modDate` are updated.
     """
 
-    global curProject
-    projectBackup = copy.deepcopy(curProject)
+    session = getSession()
+    element = unwrap(element)
+    projectBackup = copy.deepcopy(session.project)
     logger.info("Modifying element {} in the"\
             " project".format(element.__class__))
 
@@ -1266,34 +1612,53 @@ def modifyElement(element, author=""):
 
     # ---- Operation ---- #
     # get a reference to the real element in the data model
-    realElement = curProject.searchObject(element)
+    realElement = session.project.searchObject(element)
     if realElement is None:
         logger.error("{} object, that shall be changed, could not be"\
                 " found in the current project.".format(element.xmlName))
         return OperationResults.FAILURE
 
     # get the associated topic
-    realTopic = getTopic(realElement)
+    realTopic = _getRealTopic(realElement)
     if realTopic is None:
         logger.error("{} currently it is only possible to modify values of"\
                 " markup.bcf.")
         return OperationResults.FAILURE
 
     realElement.state = State.States.DELETED
-    writer.addProjectUpdate(curProject, realElement, None)
+    writer.addProjectUpdate(session.project, realElement, None)
 
-    # copy the state of the given element to the real element
+    # copy the state of the given element to the real element. Only members
+    # that are children of the element are (re)attached, references like the
+    # viewpoint of a comment are left untouched.
+    isChild = lambda item, parent: (issubclass(type(item), Hierarchy) and
+            item.containingObject is parent)
     for property, value in vars(element).items():
-        if property == "containingObject":
+        if property == "_containingObject":
             continue
-        setattr(realElement, property, copy.deepcopy(value))
+        oldValue = getattr(realElement, property, None)
+        oldChildren = oldValue if isinstance(oldValue, list) else [ oldValue ]
+        for item in oldChildren:
+            if isChild(item, realElement):
+                session.project.unregisterObjects(item)
+
+        newValue = copy.deepcopy(value)
+        setattr(realElement, property, newValue)
+        newChildren = ([ (item, newItem) for (item, newItem)
+                in zip(value, newValue) ] if isinstance(value, list)
+                else [ (value, newValue) ])
+        for (item, newItem) in newChildren:
+            if isChild(item, element):
+                newItem.containingObject = realElement
+    p.internValues(realElement)
+    invalidateFingerprint(realElement)
 
     # if topic/comment was modified update `modDate` and `modAuthor`
     if isinstance(realElement, Topic) or isinstance(realElement, Comment):
         setModDateAuthor(realElement, author, False)
 
     realElement.state = State.States.ADDED
-    writer.addProjectUpdate(curProject, realElement, None)
+    writer.addProjectUpdate(session.project, realElement, None)
     realElement.state = State.States.ORIGINAL
     return _handleProjectUpdate("Could not modify element {}".format(element.xmlName),
             projectBackup)
@@ -0,0 +1,619 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file converts topics, comments and viewpoints to and from the JSON
+representation of the BCF-API (version 2.1).
+
+A stream is a sequence of records, each a JSON object
+
+    {"type": "topic" | "viewpoint" | "comment", "topic_guid": ..., "data": ...}
+
+where `data` is the BCF-API object. The records of a topic follow the topic
+itself, viewpoints before comments, so comments can refer to viewpoints. A
+stream is written either as newline-delimited JSON (`"ndjson"`), one record per
+line, or as one JSON array (`"json"`) that is written and read element by
+element. Either way only one topic is held in memory at a time.
+
+Besides the BCF-API fields, topics carry `related_topics` and
+`document_references` in the form of the corresponding BCF-API resources.
+Snapshots are only exported if requested, as base64 encoded PNG/JPG data.
+
+The module can also be run from the command line:
+
+    python -m bcfplugin.rdwr.bcfapi export in.bcf -o topics.ndjson
+    python -m bcfplugin.rdwr.bcfapi import in.bcf topics.ndjson -o out.bcf
+"""
+
+import os
+import sys
+import json
+import base64
+import argparse
+import dateutil.parser
+from uuid import UUID
+
+import bcfplugin
+import bcfplugin.util as util
+import bcfplugin.rdwr.reader as reader
+import bcfplugin.rdwr.writer as writer
+import bcfplugin.rdwr.project as p
+from bcfplugin.rdwr.uri import Uri
+from bcfplugin.rdwr.topic import Topic, BimSnippet, DocumentReference
+from bcfplugin.rdwr.markup import Comment, ViewpointReference, Markup
+from bcfplugin.rdwr.viewpoint import (Viewpoint, Components,
+        ComponentColour, ComponentList, ViewSetupHints, OrthogonalCamera,
+        PerspectiveCamera)
+from bcfplugin.rdwr.threedvector import Point, Direction, Line, ClippingPlane
+from bcfplugin.rdwr.interfaces.state import State
+from bcfplugin.session import Session
+
+logger = bcfplugin.createLogger(__name__)
+
+formats = ("ndjson", "json")
+""" Formats a stream can be written in """
+
+readChunkSize = 64 * 1024
+""" Number of characters read at once from streams in the "json" format """
+
+
+def _optional(value):
+
+    """ Returns None for empty strings and unset values """
+
+    if value is None or value == "" or value == -1:
+        return None
+    return value
+
+
+def _date(value):
+
+    return None if value is None else value.isoformat()
+
+
+def _parseDate(value):
+
+    return None if value is None else dateutil.parser.parse(value)
+
+
+def _vector(vector, names = ("x", "y", "z")):
+
+    return { name: value for (name, value) in
+            zip(names, (vector.x, vector.y, vector.z)) }
+
+
+def _point(data):
+
+    return Point(data["x"], data["y"], data["z"])
+
+
+def _direction(data):
+
+    return Direction(data["x"], data["y"], data["z"])
+
+
+def _components(components):
+
+    return [ { "ifc_guid": _optional(c.ifcId),
+        "originating_system": _optional(c.originatingSystem),
+        "authoring_tool_id": _optional(c.authoringtoolId) }
+        for c in components ]
+
+
+def _componentList(data):
+
+    componentList = ComponentList()
+    componentList.extendValues(
+            [ c.get("ifc_guid") for c in data ],
+            [ c.get("originating_system") or "" for c in data ],
+            [ c.get("authoring_tool_id") or "" for c in data ])
+    return componentList
+
+
+def topicToJson(topic: Topic):
+
+    """ Returns the BCF-API topic object of `topic` """
+
+    data = { "guid": str(topic.xmlId),
+        "topic_type": _optional(topic.type),
+        "topic_status": _optional(topic.status),
+        "reference_links": [ link.value for link in topic.referenceLinks ],
+        "title": topic.title,
+        "priority": _optional(topic.priority),
+        "index": _optional(topic.index),
+        "labels": [ label.value for label in topic.labels ],
+        "creation_date": _date(topic.date),
+        "creation_author": topic.author,
+        "modified_date": _date(topic.modDate),
+        "modified_author": _optional(topic.modAuthor),
+        "assigned_to": _optional(topic.assignee),
+        "stage": _optional(topic.stage),
+        "description": _optional(topic.description),
+        "due_date": _date(topic.dueDate),
+        "related_topics": [ { "related_topic_guid": str(related.value) }
+            for related in topic.relatedTopics ],
+        "document_references": [ { "guid": _optional(str(docRef.guid)
+                if docRef.guid is not None else None),
+            "referenced_document": _optional(str(docRef.reference)
+                if docRef.reference is not None else None),
+            "description": _optional(docRef.description),
+            "is_external": docRef.external }
+            for docRef in topic.docRefs ] }
+
+    snippet = topic.bimSnippet
+    if snippet is not None:
+        data["bim_snippet"] = { "snippet_type": snippet.type,
+            "is_external": snippet.external,
+            "reference": str(snippet.reference),
+            "reference_schema": str(snippet.schema) }
+    return data
+
+
+def commentToJson(comment: Comment, topicGuid: str):
+
+    """ Returns the BCF-API comment object of `comment` """
+
+    viewpoint = comment.viewpoint
+    return { "guid": str(comment.xmlId),
+        "date": _date(comment.date),
+        "author": comment.author,
+        "comment": comment.comment,
+        "topic_guid": topicGuid,
+        "viewpoint_guid": (str(viewpoint.xmlId) if viewpoint is not None
+            else None),
+        "modified_date": _date(comment.modDate),
+        "modified_author": _optional(comment.modAuthor) }
+
+
+def viewpointToJson(vpRef: ViewpointReference, snapshotPath: str = None):
+
+    """ Returns the BCF-API viewpoint object of `vpRef`.
+
+    If `snapshotPath` is given, the snapshot file it points to is embedded.
+    """
+
+    data = { "guid": str(vpRef.xmlId), "index": _optional(vpRef.index) }
+    vp = vpRef.viewpoint
+    if vp is not None:
+        if vp.oCamera is not None:
+            cam = vp.oCamera
+            data["orthogonal_camera"] = {
+                "camera_view_point": _vector(cam.viewPoint),
+                "camera_direction": _vector(cam.direction),
+                "camera_up_vector": _vector(cam.upVector),
+                "view_to_world_scale": cam.viewWorldScale }
+        if vp.pCamera is not None:
+            cam = vp.pCamera
+            data["perspective_camera"] = {
+                "camera_view_point": _vector(cam.viewPoint),
+                "camera_direction": _vector(cam.direction),
+                "camera_up_vector": _vector(cam.upVector),
+                "field_of_view": cam.fieldOfView }
+        data["lines"] = [ { "start_point": _vector(line.start),
+            "end_point": _vector(line.end) } for line in vp.lines ]
+        data["clipping_planes"] = [ { "location": _vector(plane.location),
+            "direction": _vector(plane.direction) }
+            for plane in vp.clippingPlanes ]
+
+        components = vp.components
+        if components is not None:
+            hints = components.viewSetuphints
+            data["components"] = {
+                "selection": _components(components.selection),
+                "coloring": [ { "color": colour.colour,
+                    "components": _components(colour.components) }
+                    for colour in components.colouring ],
+                "visibility": {
+                    "default_visibility": components.visibilityDefault,
+                    "exceptions": _components(
+                        components.visibilityExceptions),
+                    "view_setup_hints": None if hints is None else {
+                        "spaces_visible": hints.spacesVisible,
+                        "space_boundaries_visible":
+                            hints.spaceBoundariesVisible,
+                        "openings_visible": hints.openingsVisible } } }
+
+    if snapshotPath is not None and os.path.isfile(snapshotPath):
+        with open(snapshotPath, "rb") as f:
+            content = f.read()
+        data["snapshot"] = { "snapshot_type": ("jpg"
+                if snapshotPath.lower().endswith((".jpg", ".jpeg"))
+                else "png"),
+            "snapshot_data": base64.b64encode(content).decode("ascii") }
+    return data
+
+
+def markupRecords(markup: Markup, snapshots: bool = False):
+
+    """ Yields the records of the topic of `markup`, its viewpoints and its
+    comments. Snapshots are embedded if `snapshots` is set. """
+
+    topicGuid = str(markup.topic.xmlId)
+    yield { "type": "topic", "topic_guid": topicGuid,
+            "data": topicToJson(markup.topic) }
+
+    snapshotFiles = { os.path.basename(path): path
+            for path in markup.snapshotFiles } if snapshots else dict()
+    for vpRef in markup.viewpoints:
+        snapshotPath = None
+        if vpRef.snapshot is not None:
+            snapshotPath = snapshotFiles.get(str(vpRef.snapshot))
+        yield { "type": "viewpoint", "topic_guid": topicGuid,
+                "data": viewpointToJson(vpRef, snapshotPath) }
+
+    for comment in markup.comments:
+        yield { "type": "comment", "topic_guid": topicGuid,
+                "data": commentToJson(comment, topicGuid) }
+
+
+def writeRecords(records, out, format: str = "ndjson"):
+
+    """ Writes `records` to the text stream `out` in `format`, one of
+    `formats`. Returns the number of written records. """
+
+    if format not in formats:
+        raise ValueError("Unknown format {}. Valid values are: {}".format(
+            format, ", ".join(formats)))
+
+    count = 0
+    if format == "json":
+        out.write("[")
+    for record in records:
+        if format == "json":
+            out.write(",\n" if count > 0 else "\n")
+        out.write(json.dumps(record, ensure_ascii=False))
+        if format == "ndjson":
+            out.write("\n")
+        count += 1
+    if format == "json":
+        out.write("\n]\n")
+    return count
+
+
+def exportFile(bcfFile: str, out, format: str = "ndjson",
+        snapshots: bool = False):
+
+    """ Writes all topics of `bcfFile` to the text stream `out`.
+
+    The file is read topic by topic through `reader.iterMarkups()`, so it is
+    never held in memory as a whole. Returns the number of written records.
+    """
+
+    records = (record for (topicDir, markup) in
+            reader.iterMarkups(bcfFile, viewpoints=True)
+            for record in markupRecords(markup, snapshots))
+    return writeRecords(records, out, format)
+
+
+def readRecords(stream):
+
+    """ Yields the records of the text stream `stream`, which is in one of
+    `formats`. The format is detected from the first character. """
+
+    first = ""
+    while first == "":
+        first = stream.read(1)
+        if first == "":
+            return
+        if first.isspace():
+            first = ""
+
+    if first != "[":
+        line = first + stream.readline()
+        while line != "":
+            if line.strip() != "":
+                yield json.loads(line)
+            line = stream.readline()
+        return
+
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if buffer.startswith(","):
+            buffer = buffer[1:].lstrip()
+        if buffer.startswith("]"):
+            return
+        if buffer != "":
+            try:
+                (record, end) = decoder.raw_decode(buffer)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                yield record
+                buffer = buffer[end:]
+                continue
+        elif eof:
+            raise ValueError("The JSON array is not terminated")
+
+        chunk = stream.read(readChunkSize)
+        eof = (chunk == "")
+        buffer += chunk
+
+
+def topicFromJson(data):
+
+    """ Builds a topic from the BCF-API topic object `data` """
+
+    snippet = None
+    if data.get("bim_snippet"):
+        s = data["bim_snippet"]
+        snippet = BimSnippet(s.get("snippet_type") or "",
+                bool(s.get("is_external")), Uri(s["reference"]),
+                Uri(s["reference_schema"]))
+
+    docRefs = list()
+    for d in data.get("document_references") or []:
+        docRefs.append(DocumentReference(
+            UUID(d["guid"]) if d.get("guid") else None,
+            bool(d.get("is_external")),
+            Uri(d["referenced_document"]) if d.get("referenced_document")
+                else None,
+            d.get("description") or ""))
+
+    topic = Topic(UUID(data["guid"]), data.get("title") or "",
+            _parseDate(data.get("creation_date")),
+            data.get("creation_author") or "",
+            data.get("topic_type") or "", data.get("topic_status") or "",
+            list(data.get("reference_links") or []), docRefs,
+            data.get("priority") or "",
+            data["index"] if data.get("index") is not None else -1,
+            list(data.get("labels") or []),
+            _parseDate(data.get("modified_date")),
+            data.get("modified_author") or "",
+            _parseDate(data.get("due_date")),
+            data.get("assigned_to") or "", data.get("description") or "",
+            data.get("stage") or "",
+            [ UUID(r["related_topic_guid"])
+                for r in data.get("related_topics") or [] ],
+            snippet)
+    return topic
+
+
+def viewpointFromJson(data):
+
+    """ Builds a viewpoint reference, holding the viewpoint, from the
+    BCF-API viewpoint object `data`. Returns it together with the decoded
+    snapshot, or None. """
+
+    guid = UUID(data["guid"])
+
+    oCam = None
+    if data.get("orthogonal_camera"):
+        cam = data["orthogonal_camera"]
+        oCam = OrthogonalCamera(_point(cam["camera_view_point"]),
+                _direction(cam["camera_direction"]),
+                _direction(cam["camera_up_vector"]),
+                cam["view_to_world_scale"])
+    pCam = None
+    if data.get("perspective_camera"):
+        cam = data["perspective_camera"]
+        pCam = PerspectiveCamera(_point(cam["camera_view_point"]),
+                _direction(cam["camera_direction"]),
+                _direction(cam["camera_up_vector"]),
+                cam["field_of_view"])
+    lines = [ Line(_point(l["start_point"]), _point(l["end_point"]))
+            for l in data.get("lines") or [] ]
+    planes = [ ClippingPlane(_point(c["location"]),
+        _direction(c["direction"])) for c in data.get("clipping_planes") or [] ]
+
+    components = None
+    if data.get("components"):
+        c = data["components"]
+        visibility = c.get("visibility") or dict()
+        hints = visibility.get("view_setup_hints")
+        if hints:
+            hints = ViewSetupHints(bool(hints.get("openings_visible")),
+                    bool(hints.get("spaces_visible")),
+                    bool(hints.get("space_boundaries_visible")))
+        colouring = [ ComponentColour(colour["color"],
+            _componentList(colour["components"]))
+            for colour in c.get("coloring") or []
+            if colour.get("color") and len(colour.get("components") or []) > 0 ]
+        components = Components(visibility.get("default_visibility", True),
+                _componentList(visibility.get("exceptions") or []),
+                _componentList(c.get("selection") or []), hints or None,
+                colouring)
+
+    vp = Viewpoint(guid, components, oCam, pCam, lines, planes)
+    vpRef = ViewpointReference(guid, Uri("{}.bcfv".format(guid)), None,
+            data["index"] if data.get("index") is not None else -1)
+    vpRef.viewpoint = vp
+
+    snapshot = None
+    if data.get("snapshot") and data["snapshot"].get("snapshot_data"):
+        extension = "jpg" if data["snapshot"].get("snapshot_type") == "jpg"\
+                else "png"
+        vpRef.snapshot = Uri("{}.{}".format(guid, extension))
+        snapshot = base64.b64decode(data["snapshot"]["snapshot_data"])
+    return (vpRef, snapshot)
+
+
+def commentFromJson(data, markup: Markup):
+
+    """ Builds a comment of `markup` from the BCF-API comment object `data`.
+    The viewpoint it refers to has to be part of `markup` already. """
+
+    viewpoint = None
+    if data.get("viewpoint_guid"):
+        viewpoint = markup.getViewpointRefByGuid(UUID(data["viewpoint_guid"]))
+    return Comment(UUID(data["guid"]), _parseDate(data.get("date")),
+            data.get("author") or "", data.get("comment") or "", viewpoint,
+            _parseDate(data.get("modified_date")),
+            data.get("modified_author") or "")
+
+
+def buildMarkups(records):
+
+    """ Yields (markup, files) for every topic in `records`. `files` maps the
+    names of the snapshot files of the topic to their content.
+
+    The markups are marked as added and do not belong to a project yet.
+    Records of unknown types or of topics that did not appear before are
+    logged and skipped.
+    """
+
+    markup = None
+    files = dict()
+    for record in records:
+        kind = record.get("type")
+        data = record.get("data") or dict()
+        if kind == "topic":
+            if markup is not None:
+                yield (markup, files)
+            markup = Markup(topicFromJson(data), comments=list(),
+                    viewpoints=list(), snapshotFiles=list(),
+                    state=State.States.ADDED)
+            files = dict()
+            continue
+
+        if markup is None or record.get("topic_guid") != str(
+                markup.topic.xmlId):
+            logger.error("Record of type {} refers to topic {}, which does"\
+                    " not precede it. It is skipped.".format(kind,
+                        record.get("topic_guid")))
+            continue
+
+        if kind == "viewpoint":
+            (vpRef, snapshot) = viewpointFromJson(data)
+            vpRef.containingObject = markup
+            markup.viewpoints.append(vpRef)
+            if snapshot is not None:
+                files[str(vpRef.snapshot)] = snapshot
+        elif kind == "comment":
+            comment = commentFromJson(data, markup)
+            comment.containingObject = markup
+            markup.comments.append(comment)
+        else:
+            logger.error("Unknown record type {} is skipped.".format(kind))
+
+    if markup is not None:
+        yield (markup, files)
+
+
+def importRecords(project, records):
+
+    """ Adds the topics in `records` to `project`.
+
+    The topics are written to the working directory in one batch, see
+    `writer.addMarkups()`, and only attached to `project` afterwards. Topics
+    whose GUID already exists in `project` are skipped. Returns the list of
+    added markups, or None if they could not be written.
+    """
+
+    existing = { markup.topic.xmlId for markup in project.topicList
+            if markup.topic is not None }
+    markups = list()
+    files = dict()
+    for (markup, markupFiles) in buildMarkups(records):
+        if markup.topic.xmlId in existing:
+            logger.error("Topic {} does already exist in the project. It is"\
+                    " skipped.".format(markup.topic.xmlId))
+            continue
+        existing.add(markup.topic.xmlId)
+        p.internValues(markup)
+        markups.append(markup)
+        files[str(markup.topic.xmlId)] = markupFiles
+
+    if not writer.addMarkups(markups, files):
+        return None
+
+    for markup in markups:
+        markup.containingObject = project
+        project.topicList.append(markup)
+    return markups
+
+
+def importFile(bcfFile: str, stream, dstFile: str):
+
+    """ Adds the topics of the text stream `stream` to the BCF file `bcfFile`
+    and writes the result to `dstFile`. Returns the number of added topics,
+    or None on failure. """
+
+    with Session():
+        project = reader.readBcfFile(bcfFile)
+        if project is None:
+            logger.error("{} could not be read.".format(bcfFile))
+            return None
+        markups = importRecords(project, readRecords(stream))
+        if markups is None:
+            return None
+        writer.zipToBcfFile(util.getBcfDir(), dstFile)
+        return len(markups)
+
+
+def main(argv = None):
+
+    """ Command line entry point. Returns the exit code. """
+
+    parser = argparse.ArgumentParser(prog="bcfapi",
+            description="Convert BCF files to and from BCF-API JSON.")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    exportParser = subparsers.add_parser("export",
+            help="write the topics of a BCF file as JSON")
+    exportParser.add_argument("bcfFile")
+    exportParser.add_argument("-o", "--output", default=None,
+            help="file the JSON is written to (default: stdout)")
+    exportParser.add_argument("--format", choices=formats, default="ndjson")
+    exportParser.add_argument("--snapshots", action="store_true",
+            help="embed the snapshots of the viewpoints")
+
+    importParser = subparsers.add_parser("import",
+            help="add the topics of a JSON stream to a BCF file")
+    importParser.add_argument("bcfFile")
+    importParser.add_argument("jsonFile",
+            help="newline-delimited JSON or a JSON array, - for stdin")
+    importParser.add_argument("-o", "--output", required=True,
+            help="path the resulting BCF file is written to")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        out = (sys.stdout if args.output is None else
+                open(args.output, "w", encoding="utf-8"))
+        try:
+            exportFile(args.bcfFile, out, args.format, args.snapshots)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        return 0
+
+    stream = (sys.stdin if args.jsonFile == "-" else
+            open(args.jsonFile, "r", encoding="utf-8"))
+    try:
+        count = importFile(args.bcfFile, stream, args.output)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    if count is None:
+        print("The topics could not be imported", file=sys.stderr)
+        return 1
+    print("{} topics imported".format(count))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
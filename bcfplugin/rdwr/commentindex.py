@@ -0,0 +1,215 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file keeps the comments of every markup sorted, so that a window of
+comments (e.g. the 100 oldest comments starting from the 300th) can be
+retrieved without sorting all comments of a topic.
+
+Like `topicindex.TopicIndex`, the index is owned by `Project`. Added comments
+and comments whose dates changed are only marked as stale, and moved to their
+new position in the sorted lists before the next access. As there, sorting
+them in is guarded by a lock.
+"""
+
+import threading
+from itertools import count
+from bisect import bisect_left, insort
+
+import bcfplugin
+from bcfplugin.rdwr.topicindex import dateKey
+
+logger = bcfplugin.createLogger(__name__)
+
+orderFields = ("date", "modDate")
+""" Orders comments can be retrieved in. "date" is the date of creation,
+"modDate" the date of the last modification, or of the creation if the comment
+was never modified """
+
+_missingDate = float("-inf")
+""" Key of comments without a date, these are sorted first """
+
+
+def _commentKey(comment, order):
+
+    """ Returns the key `comment` is sorted by in `order` """
+
+    date = None
+    if order == "modDate":
+        date = dateKey(comment.modDate)
+    if date is None:
+        date = dateKey(comment.date)
+    return _missingDate if date is None else date
+
+
+class CommentIndex:
+
+    """ Sorted lists of the comments of each markup.
+
+    For every markup and every order of `orderFields` a list of
+    (key, position, id) tuples is kept sorted. `position` counts the comments
+    added to the index, comments with equal dates are thereby kept in the order
+    they were added in.
+    """
+
+    def __init__(self):
+
+        self._lock = threading.Lock()
+        """ Guards `refresh()` """
+
+        self._comments = dict()
+        """ Maps `id()` of every indexed comment to the comment """
+
+        self._positions = dict()
+        """ Maps `id()` of every indexed comment to the number of comments
+        added before it """
+        self._counter = count()
+
+        self._entries = dict()
+        """ Maps `id()` of every sorted comment to the markup it was sorted
+        into and to the tuple of its keys, one per order """
+
+        self._orders = dict()
+        """ Maps `id()` of every markup to a dictionary mapping each order to
+        the sorted list of comments of the markup """
+
+        self._stale = set()
+        """ Ids of comments that were added or changed since they were
+        sorted """
+
+
+    def __len__(self):
+        return len(self._comments)
+
+
+    def add(self, comment):
+
+        """ Adds `comment` to the index """
+
+        if id(comment) not in self._comments:
+            self._positions[id(comment)] = next(self._counter)
+        self._comments[id(comment)] = comment
+        self._stale.add(id(comment))
+
+
+    def remove(self, comment):
+
+        """ Removes `comment` from the index. Comments that are not indexed are
+        ignored. """
+
+        commentId = id(comment)
+        if self._comments.get(commentId) is not comment:
+            return
+        if commentId in self._entries:
+            self._drop(commentId)
+        del self._comments[commentId]
+        del self._positions[commentId]
+        self._stale.discard(commentId)
+
+
+    def invalidate(self, comment):
+
+        """ Marks `comment` to be sorted anew before the next access """
+
+        if self._comments.get(id(comment)) is comment:
+            self._stale.add(id(comment))
+
+
+    def refresh(self):
+
+        """ Sorts all comments that were added or changed since the last
+        access into the lists of their markups """
+
+        with self._lock:
+            for commentId in self._stale:
+                if commentId in self._entries:
+                    self._drop(commentId)
+                self._insert(commentId)
+            self._stale.clear()
+
+
+    def _insert(self, commentId):
+
+        comment = self._comments[commentId]
+        markupId = id(comment.containingObject)
+        position = self._positions[commentId]
+        keys = tuple(_commentKey(comment, order) for order in orderFields)
+
+        orders = self._orders.setdefault(markupId,
+                { order: list() for order in orderFields })
+        for (order, key) in zip(orderFields, keys):
+            insort(orders[order], (key, position, commentId))
+        self._entries[commentId] = (markupId, keys)
+
+
+    def _drop(self, commentId):
+
+        (markupId, keys) = self._entries.pop(commentId)
+        position = self._positions[commentId]
+
+        orders = self._orders[markupId]
+        for (order, key) in zip(orderFields, keys):
+            sortedList = orders[order]
+            del sortedList[bisect_left(sortedList, (key, position, commentId))]
+        if len(orders[orderFields[0]]) == 0:
+            del self._orders[markupId]
+
+
+    def count(self, markup):
+
+        """ Returns the number of comments of `markup` """
+
+        self.refresh()
+        orders = self._orders.get(id(markup))
+        if orders is None:
+            return 0
+        return len(orders[orderFields[0]])
+
+
+    def window(self, markup, order: str = "date", descending: bool = False,
+            offset: int = 0, limit: int = None):
+
+        """ Returns at most `limit` comments of `markup`, skipping the first
+        `offset` ones, in the order `order`, one of `orderFields`. Only the
+        returned comments are visited. """
+
+        if order not in orderFields:
+            raise ValueError("Comments cannot be ordered by {}. Valid values"\
+                    " are: {}".format(order, ", ".join(orderFields)))
+
+        self.refresh()
+        orders = self._orders.get(id(markup))
+        if orders is None:
+            return []
+
+        sortedList = orders[order]
+        length = len(sortedList)
+        end = length if limit is None else min(length, offset + limit)
+        if descending:
+            entries = sortedList[max(0, length - end):max(0, length - offset)]
+            entries.reverse()
+        else:
+            entries = sortedList[offset:end]
+
+        return [ self._comments[commentId]
+                for (key, position, commentId) in entries ]
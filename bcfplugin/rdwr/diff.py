@@ -0,0 +1,498 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+The diff module computes the differences between two versions of a BCF file
+and can package them into a patch archive.
+
+The diff works on the data model. Topics, comments and viewpoints are matched by
+their GUID. Two topics whose fingerprints (see `merge.markupFingerprint`) are
+equal are not looked into any further, so only the topics that really changed
+contribute to the cost of a diff. Changed fields are reported by their XML
+name, attributes being prefixed with '@'.
+
+A patch is a zip archive containing only the files of the new version that
+differ from the base version, plus a manifest `patch.json` listing the removed
+topics and files and the CRCs of all base files it replaces. Applying a patch
+streams the base archive entry by entry into the new one, no extraction to disk
+is necessary. The CRCs are checked beforehand, so a patch is never applied to
+a file it was not created for.
+
+The module can also be run from the command line:
+
+    python -m bcfplugin.rdwr.diff diff old.bcf new.bcf [--patch out.bcfpatch]
+    python -m bcfplugin.rdwr.diff apply base.bcf patch.bcfpatch -o new.bcf
+"""
+
+import sys
+import json
+import zipfile
+import argparse
+import xml.etree.ElementTree as ET
+
+import bcfplugin
+import bcfplugin.rdwr.merge as merge
+from bcfplugin.rdwr.project import Project
+from bcfplugin.rdwr.markup import Markup
+
+logger = bcfplugin.createLogger(__name__)
+
+manifestFileName = "patch.json"
+""" Name of the file inside a patch archive describing the patch """
+
+patchFormatVersion = 1
+""" Version of the manifest format written by this module """
+
+
+class FieldChange:
+
+    """ A single field that differs between the old and the new version of an
+    element. `oldValue` is `None` if the field was added, `newValue` is `None`
+    if it was removed. """
+
+    def __init__(self, name, oldValue, newValue):
+
+        self.name = name
+        self.oldValue = oldValue
+        self.newValue = newValue
+
+
+    def __str__(self):
+
+        return "{}: '{}' -> '{}'".format(self.name, self.oldValue,
+                self.newValue)
+
+
+class ElementDiff:
+
+    """ Differences of one element, e.g. a comment, identified by `guid` """
+
+    def __init__(self, guid, fields = None):
+
+        self.guid = guid
+        self.fields = fields if fields is not None else list()
+
+
+class TopicDiff:
+
+    """ Differences of one topic that exists in both versions.
+
+    `fields` contains the `FieldChange`s of the topic itself and of the header.
+    Comments and viewpoints are listed by their GUIDs in `addedComments`,
+    `removedComments`, `addedViewpoints` and `removedViewpoints`. Modified
+    comments and viewpoints are listed as `ElementDiff`s.
+    """
+
+    def __init__(self, guid):
+
+        self.guid = guid
+        self.fields = list()
+        self.addedComments = list()
+        self.removedComments = list()
+        self.modifiedComments = list()
+        self.addedViewpoints = list()
+        self.removedViewpoints = list()
+        self.modifiedViewpoints = list()
+
+
+    def isEmpty(self):
+
+        """ Returns True if no difference was recorded. """
+
+        return not (self.fields or self.addedComments or self.removedComments
+                or self.modifiedComments or self.addedViewpoints
+                or self.removedViewpoints or self.modifiedViewpoints)
+
+
+    def __str__(self):
+
+        lines = ["~ Topic {}".format(self.guid)]
+        lines += [ "    {}".format(str(f)) for f in self.fields ]
+        lines += [ "    + Comment {}".format(g) for g in self.addedComments ]
+        lines += [ "    - Comment {}".format(g) for g in self.removedComments ]
+        for elemDiff in self.modifiedComments:
+            lines.append("    ~ Comment {}".format(elemDiff.guid))
+            lines += [ "        {}".format(str(f)) for f in elemDiff.fields ]
+        lines += [ "    + Viewpoint {}".format(g) for g in self.addedViewpoints ]
+        lines += [ "    - Viewpoint {}".format(g) for g in
+                self.removedViewpoints ]
+        for elemDiff in self.modifiedViewpoints:
+            lines.append("    ~ Viewpoint {}".format(elemDiff.guid))
+            lines += [ "        {}".format(str(f)) for f in elemDiff.fields ]
+        return "\n".join(lines)
+
+
+class ProjectDiff:
+
+    """ Differences between two projects.
+
+    `addedTopics` and `removedTopics` contain GUIDs, `modifiedTopics` maps the
+    GUID of every changed topic to its `TopicDiff`. `unchangedTopics` counts
+    the topics that were found to be equal.
+    """
+
+    def __init__(self):
+
+        self.addedTopics = list()
+        self.removedTopics = list()
+        self.modifiedTopics = dict()
+        self.unchangedTopics = 0
+
+
+    def isEmpty(self):
+
+        """ Returns True if both projects contain the same topics. """
+
+        return not (self.addedTopics or self.removedTopics or
+                self.modifiedTopics)
+
+
+    def __str__(self):
+
+        lines = [ "+ Topic {}".format(g) for g in self.addedTopics ]
+        lines += [ "- Topic {}".format(g) for g in self.removedTopics ]
+        lines += [ str(t) for t in self.modifiedTopics.values() ]
+        lines.append("{} added, {} removed, {} modified, {} unchanged"\
+                " topic(s)".format(len(self.addedTopics),
+                    len(self.removedTopics), len(self.modifiedTopics),
+                    self.unchangedTopics))
+        return "\n".join(lines)
+
+
+def _etFields(element):
+
+    """ Returns a dictionary mapping the field names of `element` to their
+    serialized values.
+
+    Attributes are prefixed with '@'. Fields occurring multiple times, like
+    labels, are joined into one entry. `None` yields an empty dictionary.
+    """
+
+    if element is None:
+        return dict()
+
+    etElem = element.getEtElement(ET.Element(element.xmlName))
+    fields = { "@{}".format(k): v for (k, v) in etElem.attrib.items() }
+    for child in etElem:
+        if len(child) == 0 and not child.attrib:
+            value = child.text if child.text is not None else ""
+        else:
+            value = ET.tostring(child, encoding="unicode")
+        if child.tag in fields:
+            fields[child.tag] = "{}, {}".format(fields[child.tag], value)
+        else:
+            fields[child.tag] = value
+    return fields
+
+
+def diffFields(old, new, prefix = ""):
+
+    """ Returns the list of `FieldChange`s between the elements `old` and
+    `new`. Each field name is prepended by `prefix`. """
+
+    oldFields = _etFields(old)
+    newFields = _etFields(new)
+
+    changes = list()
+    for name in list(oldFields.keys()) + [ n for n in newFields.keys()
+            if n not in oldFields ]:
+        oldValue = oldFields.get(name)
+        newValue = newFields.get(name)
+        if oldValue != newValue:
+            changes.append(FieldChange(prefix + name, oldValue, newValue))
+    return changes
+
+
+def viewpointFingerprint(vpRef):
+
+    """ Returns a fingerprint over the viewpoint reference `vpRef` and the
+    viewpoint it references. """
+
+    vpFp = merge.elementFingerprint(vpRef.viewpoint)
+    return "{}{}".format(merge.elementFingerprint(vpRef), vpFp or "")
+
+
+def topicFingerprint(markup: Markup):
+
+    """ Returns a fingerprint over the whole topic `markup` describes,
+    including the contents of its viewpoints. """
+
+    return markup.getFingerprint()
+
+
+def _diffLists(oldList, newList, fingerprint, added, removed, modified,
+        withViewpoint = False):
+
+    """ Compares two lists of XMLIdentifiable elements by GUID and appends the
+    GUIDs of added and removed elements and the `ElementDiff`s of modified ones
+    to the respective list.
+
+    If `withViewpoint` is set the elements are viewpoint references and the
+    viewpoints they reference are compared as well.
+    """
+
+    oldIdx = { elem.xmlId: elem for elem in oldList }
+    newIdx = { elem.xmlId: elem for elem in newList }
+
+    for elem in newList:
+        oldElem = oldIdx.get(elem.xmlId)
+        if oldElem is None:
+            added.append(elem.xmlId)
+        elif fingerprint(oldElem) != fingerprint(elem):
+            fields = diffFields(oldElem, elem)
+            if withViewpoint:
+                oldFp = merge.elementFingerprint(oldElem.viewpoint)
+                newFp = merge.elementFingerprint(elem.viewpoint)
+                if oldFp != newFp:
+                    fields.append(FieldChange("VisualizationInfo", oldFp,
+                        newFp))
+            modified.append(ElementDiff(elem.xmlId, fields))
+
+    removed += [ elem.xmlId for elem in oldList if elem.xmlId not in newIdx ]
+
+
+def diffMarkups(old: Markup, new: Markup):
+
+    """ Returns a `TopicDiff` describing the changes from `old` to `new`.
+
+    Both markups are expected to describe the same topic.
+    """
+
+    topicDiff = TopicDiff(new.topic.xmlId)
+    topicDiff.fields = diffFields(old.topic, new.topic)
+    if merge.elementFingerprint(old.header) != \
+            merge.elementFingerprint(new.header):
+        topicDiff.fields += diffFields(old.header, new.header, "Header/")
+
+    _diffLists(old.comments, new.comments, merge.elementFingerprint,
+            topicDiff.addedComments, topicDiff.removedComments,
+            topicDiff.modifiedComments)
+    _diffLists(old.viewpoints, new.viewpoints, viewpointFingerprint,
+            topicDiff.addedViewpoints, topicDiff.removedViewpoints,
+            topicDiff.modifiedViewpoints, True)
+
+    return topicDiff
+
+
+def diffProjects(old: Project, new: Project):
+
+    """ Returns a `ProjectDiff` describing the changes from `old` to `new`.
+
+    Topics with equal fingerprints are considered unchanged without comparing
+    any of their members.
+    """
+
+    projectDiff = ProjectDiff()
+    oldIdx = merge.indexProject(old)
+    newIdx = merge.indexProject(new)
+
+    for (guid, newMarkup) in newIdx.items():
+        oldMarkup = oldIdx.get(guid)
+        if oldMarkup is None:
+            projectDiff.addedTopics.append(guid)
+        elif topicFingerprint(oldMarkup) == topicFingerprint(newMarkup):
+            projectDiff.unchangedTopics += 1
+        else:
+            topicDiff = diffMarkups(oldMarkup, newMarkup)
+            if topicDiff.isEmpty():
+                projectDiff.unchangedTopics += 1
+            else:
+                projectDiff.modifiedTopics[guid] = topicDiff
+
+    projectDiff.removedTopics = [ guid for guid in oldIdx.keys()
+            if guid not in newIdx ]
+    return projectDiff
+
+
+def _topicOfPath(path):
+
+    """ Returns the name of the topic directory `path` lies in, or `None` for
+    files in the root of the archive. """
+
+    parts = path.split("/", 1)
+    return parts[0] if len(parts) == 2 else None
+
+
+def writePatch(projectDiff: ProjectDiff, baseFile: str, newFile: str,
+        patchFile: str):
+
+    """ Writes the patch transforming `baseFile` into `newFile` to `patchFile`.
+
+    Only the topics contained in `projectDiff` are looked at. Of those only
+    files whose CRC differs from the one in `baseFile` are added to the patch.
+    Files in the root of the archive, like the project file, are always
+    compared.
+    """
+
+    touched = set(str(g) for g in projectDiff.addedTopics)
+    touched |= set(str(g) for g in projectDiff.modifiedTopics.keys())
+    removedTopics = [ str(g) for g in projectDiff.removedTopics ]
+
+    manifest = { "version": patchFormatVersion,
+            "removedTopics": removedTopics,
+            "removedFiles": list(),
+            "baseCrc": dict() }
+
+    with zipfile.ZipFile(baseFile) as base, zipfile.ZipFile(newFile) as new, \
+            zipfile.ZipFile(patchFile, "w", zipfile.ZIP_DEFLATED) as patch:
+        baseInfos = { i.filename: i for i in base.infolist() if not i.is_dir() }
+        newInfos = { i.filename: i for i in new.infolist() if not i.is_dir() }
+
+        def isRelevant(path):
+            topic = _topicOfPath(path)
+            return topic is None or topic in touched
+
+        for (path, info) in newInfos.items():
+            if not isRelevant(path):
+                continue
+            baseInfo = baseInfos.get(path)
+            if (baseInfo is not None and baseInfo.CRC == info.CRC and
+                    baseInfo.file_size == info.file_size):
+                continue
+            if baseInfo is not None:
+                manifest["baseCrc"][path] = baseInfo.CRC
+            patch.writestr(path, new.read(info))
+
+        for (path, baseInfo) in baseInfos.items():
+            if path in newInfos or not isRelevant(path):
+                continue
+            manifest["removedFiles"].append(path)
+            manifest["baseCrc"][path] = baseInfo.CRC
+
+        for topic in removedTopics:
+            markupPath = "{}/{}".format(topic, "markup.bcf")
+            if markupPath in baseInfos:
+                manifest["baseCrc"][markupPath] = baseInfos[markupPath].CRC
+
+        patch.writestr(manifestFileName, json.dumps(manifest, indent=2))
+
+    logger.info("Patch written to {}".format(patchFile))
+    return patchFile
+
+
+def createPatch(baseFile: str, newFile: str, patchFile: str):
+
+    """ Reads both archives, diffs them and writes the patch to `patchFile`.
+
+    Returns the `ProjectDiff` or `None` if one of the files could not be read.
+    """
+
+    (baseProject, _) = merge.readArchive(baseFile)
+    (newProject, _) = merge.readArchive(newFile)
+    if baseProject is None or newProject is None:
+        logger.error("Could not create the patch, reading failed.")
+        return None
+
+    projectDiff = diffProjects(baseProject, newProject)
+    writePatch(projectDiff, baseFile, newFile, patchFile)
+    return projectDiff
+
+
+def applyPatch(baseFile: str, patchFile: str, dstFile: str):
+
+    """ Applies `patchFile` to `baseFile` and writes the result to `dstFile`.
+
+    Returns `dstFile` on success. If `baseFile` does not match the base the
+    patch was created for, nothing is written and `None` is returned.
+    """
+
+    with zipfile.ZipFile(baseFile) as base, \
+            zipfile.ZipFile(patchFile) as patch:
+        try:
+            manifest = json.loads(patch.read(manifestFileName))
+        except KeyError:
+            logger.error("{} is not a patch, {} is missing.".format(patchFile,
+                manifestFileName))
+            return None
+        if manifest.get("version") != patchFormatVersion:
+            logger.error("Patch format version {} is not supported.".format(
+                manifest.get("version")))
+            return None
+
+        baseInfos = { i.filename: i for i in base.infolist() }
+        for (path, crc) in manifest["baseCrc"].items():
+            if path not in baseInfos or baseInfos[path].CRC != crc:
+                logger.error("{} does not match the base of the patch, {}"\
+                        " differs.".format(baseFile, path))
+                return None
+
+        removedTopics = set(manifest["removedTopics"])
+        removedFiles = set(manifest["removedFiles"])
+        patchPaths = set(n for n in patch.namelist() if n != manifestFileName)
+
+        with zipfile.ZipFile(dstFile, "w", zipfile.ZIP_DEFLATED) as dst:
+            for info in base.infolist():
+                path = info.filename
+                if (path in removedFiles or path in patchPaths or
+                        path.split("/", 1)[0] in removedTopics):
+                    continue
+                dst.writestr(info, base.read(info))
+            for path in patchPaths:
+                dst.writestr(path, patch.read(path))
+
+    logger.info("Patch applied, result written to {}".format(dstFile))
+    return dstFile
+
+
+def main(argv = None):
+
+    """ Command line entry point of the diff. Returns the exit code. """
+
+    parser = argparse.ArgumentParser(prog="bcfdiff",
+            description="Compare BCF files and create or apply patches.")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    diffParser = subparsers.add_parser("diff",
+            help="print the differences between two BCF files")
+    diffParser.add_argument("old", help="base version of the BCF file")
+    diffParser.add_argument("new", help="new version of the BCF file")
+    diffParser.add_argument("-p", "--patch", default=None,
+            help="additionally write a patch archive to this path")
+
+    applyParser = subparsers.add_parser("apply",
+            help="apply a patch to a BCF file")
+    applyParser.add_argument("base", help="BCF file the patch is applied to")
+    applyParser.add_argument("patch", help="patch archive")
+    applyParser.add_argument("-o", "--output", required=True,
+            help="path the patched BCF file is written to")
+    args = parser.parse_args(argv)
+
+    if args.command == "apply":
+        return 0 if applyPatch(args.base, args.patch, args.output) else 1
+
+    (oldProject, _) = merge.readArchive(args.old)
+    (newProject, _) = merge.readArchive(args.new)
+    if oldProject is None or newProject is None:
+        print("The BCF files could not be read", file=sys.stderr)
+        return 1
+
+    projectDiff = diffProjects(oldProject, newProject)
+    print(str(projectDiff))
+    if args.patch:
+        writePatch(projectDiff, args.old, args.new, args.patch)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
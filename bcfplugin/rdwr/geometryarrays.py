@@ -0,0 +1,243 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file exports the geometry of viewpoints (cameras, lines and clipping
+planes) as NumPy arrays, and provides unit conversion, normalization and
+rotation on whole arrays of vectors at once.
+
+NumPy is an optional dependency of the plugin. If it is not installed
+`isAvailable()` returns False, and every other function of this file logs an
+error and returns None. Callers are expected to fall back to working on the
+objects of the data model one by one.
+
+All vector arrays are of shape (n, 3) and of dtype float64. Vectors that are
+not set in the data model are represented by a row of NaN.
+"""
+
+import bcfplugin
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = bcfplugin.createLogger(__name__)
+
+
+def isAvailable():
+
+    """ Returns True if NumPy could be imported """
+
+    return np is not None
+
+
+def _checkAvailable():
+
+    if np is None:
+        logger.error("NumPy is not installed. Install it through pip to use"\
+                " array based geometry:\n\tpip install numpy")
+        return False
+    return True
+
+
+def vectorArray(vectors):
+
+    """ Returns the vectors (ThreeDVector or None) in `vectors` as array of
+    shape (n, 3). """
+
+    if not _checkAvailable():
+        return None
+
+    nan = float("nan")
+    rows = [ (v.x, v.y, v.z) if v is not None else (nan, nan, nan)
+            for v in vectors ]
+    return np.array(rows, dtype=np.float64).reshape(len(rows), 3)
+
+
+def convertUnits(vectors, conversionFactor: float):
+
+    """ Returns `vectors` multiplied by `conversionFactor`. Use
+    `viewController.getConversionFactor()` to get the factor between two
+    units. """
+
+    if not _checkAvailable():
+        return None
+
+    return np.asarray(vectors, dtype=np.float64) * conversionFactor
+
+
+def normalize(vectors):
+
+    """ Returns every row of `vectors` scaled to length 1. Rows of length 0
+    are returned unchanged. """
+
+    if not _checkAvailable():
+        return None
+
+    vectors = np.asarray(vectors, dtype=np.float64)
+    lengths = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, lengths, out=vectors.copy(),
+            where=lengths != 0)
+
+
+def rotationMatrices(directions, upVectors):
+
+    """ Returns the rotation matrices, of shape (n, 3, 3), of cameras looking
+    along `directions` with the up vectors `upVectors`.
+
+    As in `viewController.getRotation()` the columns of a matrix are the axes
+    X = Y x Z, Y = Z x X and Z = direction of the camera, but normalized.
+    """
+
+    if not _checkAvailable():
+        return None
+
+    z = normalize(directions)
+    x = normalize(np.cross(np.asarray(upVectors, dtype=np.float64), z))
+    y = np.cross(z, x)
+    return np.stack((x, y, z), axis=-1)
+
+
+def rotate(vectors, matrices):
+
+    """ Returns every row of `vectors` multiplied with the corresponding matrix
+    of `matrices`, or with `matrices` itself if it is a single 3x3 matrix. """
+
+    if not _checkAvailable():
+        return None
+
+    vectors = np.asarray(vectors, dtype=np.float64)
+    matrices = np.asarray(matrices, dtype=np.float64)
+    if matrices.ndim == 2:
+        return vectors @ matrices.T
+    return np.einsum("nij,nj->ni", matrices, vectors)
+
+
+class ViewpointGeometry:
+
+    """ The cameras, lines and clipping planes of a list of viewpoints as
+    arrays.
+
+    `viewpoints` holds the viewpoints in the order they were given. Every
+    group of arrays has an index array (`pCameraIdx`, `oCameraIdx`, `lineIdx`,
+    `clipIdx`) holding for each row the index of the viewpoint it belongs to:
+
+        - perspective cameras: `pCameraPositions`, `pCameraDirections`,
+          `pCameraUpVectors` and `fieldOfViews`
+        - orthogonal cameras: `oCameraPositions`, `oCameraDirections`,
+          `oCameraUpVectors` and `viewWorldScales`
+        - lines: `lineStarts` and `lineEnds`
+        - clipping planes: `clipLocations` and `clipDirections`
+
+    The arrays are copies, changing them does not change the data model.
+    """
+
+    def __init__(self, viewpoints):
+
+        self.viewpoints = list(viewpoints)
+
+        pCameras = [ (idx, vp.pCamera)
+                for (idx, vp) in enumerate(self.viewpoints)
+                if vp.pCamera is not None ]
+        self.pCameraIdx = np.array([ idx for (idx, cam) in pCameras ],
+                dtype=np.intp)
+        (self.pCameraPositions, self.pCameraDirections,
+                self.pCameraUpVectors) = self._cameraArrays(pCameras)
+        self.fieldOfViews = np.array([ cam.fieldOfView
+            for (idx, cam) in pCameras ], dtype=np.float64)
+
+        oCameras = [ (idx, vp.oCamera)
+                for (idx, vp) in enumerate(self.viewpoints)
+                if vp.oCamera is not None ]
+        self.oCameraIdx = np.array([ idx for (idx, cam) in oCameras ],
+                dtype=np.intp)
+        (self.oCameraPositions, self.oCameraDirections,
+                self.oCameraUpVectors) = self._cameraArrays(oCameras)
+        self.viewWorldScales = np.array([ cam.viewWorldScale
+            for (idx, cam) in oCameras ], dtype=np.float64)
+
+        lines = [ (idx, line) for (idx, vp) in enumerate(self.viewpoints)
+                for line in (vp.lines or []) ]
+        self.lineIdx = np.array([ idx for (idx, line) in lines ],
+                dtype=np.intp)
+        self.lineStarts = vectorArray([ line.start for (idx, line) in lines ])
+        self.lineEnds = vectorArray([ line.end for (idx, line) in lines ])
+
+        clips = [ (idx, clip) for (idx, vp) in enumerate(self.viewpoints)
+                for clip in (vp.clippingPlanes or []) ]
+        self.clipIdx = np.array([ idx for (idx, clip) in clips ],
+                dtype=np.intp)
+        self.clipLocations = vectorArray([ clip.location
+            for (idx, clip) in clips ])
+        self.clipDirections = vectorArray([ clip.direction
+            for (idx, clip) in clips ])
+
+
+    @staticmethod
+    def _cameraArrays(cameras):
+
+        return (vectorArray([ cam.viewPoint for (idx, cam) in cameras ]),
+                vectorArray([ cam.direction for (idx, cam) in cameras ]),
+                vectorArray([ cam.upVector for (idx, cam) in cameras ]))
+
+
+    def convertUnits(self, conversionFactor: float):
+
+        """ Multiplies all positions (camera positions, start and end points of
+        lines and locations of clipping planes) by `conversionFactor`.
+        Directions are left untouched. """
+
+        self.pCameraPositions = convertUnits(self.pCameraPositions,
+                conversionFactor)
+        self.oCameraPositions = convertUnits(self.oCameraPositions,
+                conversionFactor)
+        self.lineStarts = convertUnits(self.lineStarts, conversionFactor)
+        self.lineEnds = convertUnits(self.lineEnds, conversionFactor)
+        self.clipLocations = convertUnits(self.clipLocations,
+                conversionFactor)
+
+
+    def pCameraRotations(self):
+
+        """ Returns the rotation matrices of all perspective cameras """
+
+        return rotationMatrices(self.pCameraDirections, self.pCameraUpVectors)
+
+
+    def oCameraRotations(self):
+
+        """ Returns the rotation matrices of all orthogonal cameras """
+
+        return rotationMatrices(self.oCameraDirections, self.oCameraUpVectors)
+
+
+def getViewpointGeometry(viewpoints):
+
+    """ Returns a `ViewpointGeometry` of `viewpoints`, or None if NumPy is not
+    available. """
+
+    if not _checkAvailable():
+        return None
+
+    return ViewpointGeometry(viewpoints)
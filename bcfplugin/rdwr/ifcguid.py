@@ -0,0 +1,197 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file converts IFC GUIDs between their compressed form, the 22 character
+strings used in IFC and BCF files, and 128 bit values (integers, UUIDs or 16
+bytes).
+
+The compressed form is a base 64 encoding with its own alphabet. The first
+character holds the two most significant bits, every other character six bits.
+Prefixed with two zero characters a compressed GUID is therefore exactly 18
+bytes in standard base64. This is used to convert many GUIDs at once with a
+single call to `base64`, see `expandAll()` and `compressAll()`.
+"""
+
+import base64
+import binascii
+from uuid import UUID
+
+
+IFC_GUID_CHARS = ("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+        "abcdefghijklmnopqrstuvwxyz_$")
+""" Alphabet of compressed IFC GUIDs, ordered by the value of the digits """
+
+B64_CHARS = ("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+        "0123456789+/")
+""" Alphabet of standard base64, ordered by the value of the digits """
+
+IFC_GUID_LENGTH = 22
+""" Number of characters of a compressed IFC GUID """
+
+_toB64 = str.maketrans(dict(zip(IFC_GUID_CHARS, B64_CHARS),
+    **{ "+": "!", "/": "!", "=": "!" }))
+""" Translates the IFC alphabet to the base64 alphabet. Characters that are
+valid in base64 but not in compressed GUIDs are mapped to an invalid one """
+
+_fromB64 = str.maketrans(B64_CHARS, IFC_GUID_CHARS)
+""" Translates the base64 alphabet to the IFC alphabet """
+
+_padding = IFC_GUID_CHARS[0] * 2
+""" Prefix that aligns a compressed GUID to 18 bytes of base64 """
+
+
+def isIfcGuid(guid):
+
+    """ Returns True if `guid` is a compressed IFC GUID.
+
+    According to `markup.xsd` of version 2.1 an IfcGuid is composed of 22
+    characters of [0-9A-Za-z_$]. The first character can only be one of
+    [0-3], since it holds just two bits.
+    """
+
+    if not isinstance(guid, str) or len(guid) != IFC_GUID_LENGTH:
+        return False
+    try:
+        toBytes(guid)
+    except ValueError:
+        return False
+    return True
+
+
+def toBytes(guid: str):
+
+    """ Returns the 16 bytes (big endian) encoded by the compressed GUID
+    `guid`. Raises a ValueError if `guid` is no IFC GUID. """
+
+    if (not isinstance(guid, str) or len(guid) != IFC_GUID_LENGTH or
+            guid[0] not in "0123"):
+        raise ValueError("{} is no IFC GUID".format(guid))
+    try:
+        return base64.b64decode((_padding + guid).translate(_toB64),
+                validate=True)[2:]
+    except (binascii.Error, UnicodeEncodeError, ValueError):
+        raise ValueError("{} contains characters that are not allowed in IFC"\
+                " GUIDs".format(guid))
+
+
+def fromBytes(data):
+
+    """ Returns the compressed GUID of the 16 bytes `data` """
+
+    return base64.b64encode(b"\0\0" + bytes(data)).decode("ascii")[2:]\
+            .translate(_fromB64)
+
+
+def expand(guid: str):
+
+    """ Returns the compressed GUID `guid` as 128 bit integer """
+
+    return int.from_bytes(toBytes(guid), "big")
+
+
+def compress(value: int):
+
+    """ Returns the compressed GUID of the 128 bit integer `value` """
+
+    return fromBytes(value.to_bytes(16, "big"))
+
+
+def toUuid(guid: str):
+
+    """ Returns the compressed GUID `guid` as UUID """
+
+    return UUID(bytes=toBytes(guid))
+
+
+def fromUuid(uuid: UUID):
+
+    """ Returns the compressed GUID of `uuid` """
+
+    return fromBytes(uuid.bytes)
+
+
+def expandAll(guids):
+
+    """ Returns the compressed GUIDs of the sequence `guids` as one bytes
+    object, holding 16 bytes per GUID.
+
+    All GUIDs are decoded by one call to `base64.b64decode()`. A ValueError is
+    raised if one of them is no IFC GUID.
+    """
+
+    if not isinstance(guids, (list, tuple)):
+        guids = list(guids)
+    for guid in guids:
+        if (not isinstance(guid, str) or len(guid) != IFC_GUID_LENGTH or
+                guid[0] not in "0123"):
+            raise ValueError("{} is no IFC GUID".format(guid))
+    if len(guids) == 0:
+        return b""
+
+    encoded = (_padding + _padding.join(guids)).translate(_toB64)
+    try:
+        decoded = base64.b64decode(encoded, validate=True)
+    except (binascii.Error, UnicodeEncodeError, ValueError):
+        raise ValueError("One of the GUIDs contains characters that are not"\
+                " allowed in IFC GUIDs")
+
+    return b"".join([ decoded[i + 2:i + 18]
+        for i in range(0, len(decoded), 18) ])
+
+
+def compressAll(data):
+
+    """ Returns the list of compressed GUIDs encoded in `data`, a bytes like
+    object holding 16 bytes per GUID.
+
+    All GUIDs are encoded by one call to `base64.b64encode()`.
+    """
+
+    data = bytes(data)
+    aligned = b"".join([ b"\0\0" + data[i:i + 16]
+        for i in range(0, len(data), 16) ])
+    encoded = base64.b64encode(aligned).decode("ascii").translate(_fromB64)
+    return [ encoded[i + 2:i + 24] for i in range(0, len(encoded), 24) ]
+
+
+def toKey(value):
+
+    """ Returns the 128 bit integer `value` identifies, if it is a compressed
+    IFC GUID, a UUID or already an integer. Other values are returned as they
+    are.
+
+    The result can be used as key in dictionaries and sets, where integers are
+    hashed and compared faster than strings.
+    """
+
+    if isinstance(value, int):
+        return value
+    if isinstance(value, UUID):
+        return value.int
+    if isinstance(value, str) and len(value) == IFC_GUID_LENGTH:
+        try:
+            return expand(value)
+        except ValueError:
+            pass
+    return value
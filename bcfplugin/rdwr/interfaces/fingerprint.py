@@ -0,0 +1,124 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+See the class documentation.
+"""
+
+import hashlib
+import xml.etree.ElementTree as ET
+from operator import attrgetter
+
+
+def invalidateFingerprint(element):
+
+    """ Drops the cached fingerprint of `element` and of every object above it
+    in the hierarchy.
+
+    The climb stops at the first object without a cached fingerprint. Objects
+    above it cannot have one either, since a fingerprint is always computed
+    from the fingerprints of the objects below.
+    """
+
+    while element is not None:
+        if isinstance(element, Fingerprint):
+            if element._fingerprint is None:
+                return
+            element._fingerprint = None
+        element = getattr(element, "containingObject", None)
+
+
+def fingerprintedMember(member: str):
+
+    """ Returns a property storing its value in `member` that drops the cached
+    fingerprints above the object whenever it is set.
+
+    It is meant for plain members of data model objects that are not wrapped
+    in a `SimpleElement`, like the coordinates of a point. Constructors set
+    `member` directly, so that building an object costs nothing extra.
+    """
+
+    def setter(self, newVal):
+        setattr(self, member, newVal)
+        invalidateFingerprint(self)
+
+    return property(attrgetter(member), setter)
+
+
+def fingerprintsDiffer(element, other):
+
+    """ Returns True if `element` and `other` are both fingerprinted and their
+    fingerprints differ, i.e. if they cannot be equal. """
+
+    return (isinstance(element, Fingerprint) and
+            isinstance(other, Fingerprint) and
+            element.getFingerprint() != other.getFingerprint())
+
+
+class Fingerprint:
+
+    """
+    Provides a hash over the contents of an object and all objects below it.
+
+    The fingerprint is computed from `getFingerprintParts()` and cached until
+    the object or one of its descendants changes. It is combined from the
+    fingerprints of fingerprinted descendants, so a change of one comment only
+    causes the comment and the markup to be hashed again.
+    Changes are registered through `invalidateFingerprint()`, which is called
+    if the value of a `SimpleElement` or `Attribute` or of a
+    `fingerprintedMember()` changes, and if an object is attached to or
+    detached from another.
+    """
+
+    __slots__ = ()
+
+    _fingerprint = None
+    """ Cached fingerprint, `None` if it has to be computed again """
+
+    def getFingerprint(self):
+
+        """ Returns the fingerprint of the object as hex string """
+
+        if self._fingerprint is None:
+            digest = hashlib.sha1(self.__class__.__name__.encode("utf8"))
+            for part in self.getFingerprintParts():
+                if isinstance(part, str):
+                    part = part.encode("utf8")
+                digest.update(part)
+                digest.update(b"\0")
+            self._fingerprint = digest.hexdigest()
+
+        return self._fingerprint
+
+
+    def getFingerprintParts(self):
+
+        """ Yields the parts the fingerprint is computed of, either str or bytes.
+
+        The default implementation yields the serialized form of the object.
+        Implementing classes with fingerprinted children yield the fingerprints
+        of these instead of serializing them.
+        """
+
+        yield ET.tostring(self.getEtElement(ET.Element(self.xmlName)),
+                encoding="utf8")
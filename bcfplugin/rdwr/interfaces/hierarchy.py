@@ -25,17 +25,139 @@ Github: @podestplatz
 See the class documentation.
 """
 
+from bcfplugin.rdwr.interfaces.fingerprint import invalidateFingerprint
+
+_slotNames = dict()
+""" Maps classes to the names of all slots of their instances """
+
+
+def getRoot(element):
+
+    """ Returns the topmost object of the hierarchy `element` is part of """
+
+    root = element
+    while True:
+        parent = getattr(root, "containingObject", None)
+        if parent is None:
+            return root
+        root = parent
+
+
+def isDescendant(element, ancestor):
+
+    """ Returns True if `ancestor` is found above `element` in its hierarchy
+    """
+
+    parent = getattr(element, "containingObject", None)
+    while parent is not None:
+        if parent is ancestor:
+            return True
+        parent = getattr(parent, "containingObject", None)
+    return False
+
+
+def _memberValues(element):
+
+    """ Returns the values of all members of `element`, stored in its
+    dictionary or in slots """
+
+    cls = type(element)
+    names = _slotNames.get(cls)
+    if names is None:
+        names = list()
+        for base in cls.__mro__:
+            slots = getattr(base, "__slots__", ())
+            names += [ slots ] if isinstance(slots, str) else list(slots)
+        names = _slotNames[cls] = tuple(name for name in names
+                if name != "_containingObject")
+
+    values = [ getattr(element, name, None) for name in names ]
+    if hasattr(element, "__dict__"):
+        values += [ value for (name, value) in vars(element).items()
+                if name != "_containingObject" ]
+    return values
+
+
+def clearRouting(element):
+
+    """ Drops the cached routing of `element` and of every object below it.
+
+    The descent stops at objects without a cached routing. Objects below them
+    cannot have one either, since the routing of an object is always derived
+    from the routing of its parent.
+    """
+
+    stack = [ element ]
+    while stack:
+        obj = stack.pop()
+        if getattr(obj, "_routing", None) is None:
+            continue
+        obj._routing = None
+
+        if isinstance(obj, list):
+            stack += [ item for item in obj if isinstance(item, Hierarchy) ]
+        for value in _memberValues(obj):
+            if isinstance(value, list):
+                # items of SimpleList reference the owner of the list as parent
+                stack += [ item for item in value
+                        if getattr(item, "containingObject", None) is obj ]
+            if (isinstance(value, Hierarchy) and
+                    value.containingObject is obj):
+                stack.append(value)
+
+
 class Hierarchy:
 
     """
     Every class implementing Hierarchy gets the member containingObject. This
     shall reference the object that hierarchically preceeds the object itself.
+
+    Whenever `containingObject` changes, the topmost objects of the old and the
+    new hierarchy are notified through `unregisterObjects()` respectively
+    `registerObjects()`, if they implement these methods. `Project` uses that to
+    keep its index of all objects up to date.
+
+    The writer stores the routing of an object, i.e. where it is written to,
+    in `_routing`. It is derived from the hierarchy and therefore dropped
+    for the object and everything below it when the object changes its parent.
     """
 
+    __slots__ = ()
+
+    _routing = None
+    """ Cached `writer.ElementRouting` of the object, `None` if it has to be
+    computed again """
+
     def __init__(self, containingObject=None):
         self.containingObject = containingObject
 
 
+    @property
+    def containingObject(self):
+        return self._containingObject
+
+    @containingObject.setter
+    def containingObject(self, newVal):
+
+        oldVal = getattr(self, "_containingObject", None)
+        self._containingObject = newVal
+        if oldVal is newVal:
+            return
+
+        clearRouting(self)
+        invalidateFingerprint(oldVal)
+        invalidateFingerprint(newVal)
+
+        if oldVal is not None:
+            unregister = getattr(getRoot(oldVal), "unregisterObjects", None)
+            if unregister is not None:
+                unregister(self)
+        if newVal is not None:
+            register = getattr(getRoot(newVal), "registerObjects", None)
+            if register is not None:
+                register(self)
+
+
     def __eq__(self, other):
         if other is None:
             return False
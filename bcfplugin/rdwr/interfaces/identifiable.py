@@ -26,18 +26,39 @@ See the class documentation.
 """
 
 from uuid import UUID
+from bcfplugin.rdwr.interfaces.hierarchy import getRoot
 
 class Identifiable:
 
     """
     This class supplies every object, that inherits it, with a unique id. This
     id shall not be changed during runtime and is only set at object creation.
+
+    Copies of an object keep its id. If the id is set, the topmost object of the
+    hierarchy is notified through `reindexObject()`, if it implements it.
     """
 
     def __init__(self):
         self.id = id(self)
 
 
+    @property
+    def id(self):
+        return self._objectId
+
+    @id.setter
+    def id(self, newVal):
+
+        oldVal = getattr(self, "_objectId", None)
+        self._objectId = newVal
+        if oldVal == newVal:
+            return
+
+        reindex = getattr(getRoot(self), "reindexObject", None)
+        if reindex is not None:
+            reindex(self, oldVal)
+
+
     def searchObject(self, object):
 
         """ Search for a member whose id == object.id
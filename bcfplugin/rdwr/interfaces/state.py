@@ -26,6 +26,7 @@ See the class documentation.
 """
 
 from enum import Enum
+from bcfplugin.rdwr.interfaces.hierarchy import getRoot
 
 class State:
 
@@ -34,6 +35,10 @@ class State:
     Four states are provided: ORIGINAL, ADDED, DELETED and MODIFIEd. Alongside
     these state also convenience functions are provided, that exploit the added
     state property of an object.
+
+    Whenever the state changes, the topmost object of the hierarchy is notified
+    through `stateChanged()`, if it implements it. `Project` uses that to keep
+    track of all objects that are not in the state ORIGINAL.
     """
 
     class States(Enum):
@@ -42,10 +47,32 @@ class State:
         DELETED = 3
         MODIFIED = 4
 
+    __slots__ = ()
+
     def __init__(self, state=States.ORIGINAL):
         self.state = state
 
 
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, newVal):
+
+        oldVal = getattr(self, "_state", None)
+        self._state = newVal
+        if oldVal == newVal:
+            return
+        # a newly created object is of no interest unless it is created dirty
+        if oldVal is None and newVal == State.States.ORIGINAL:
+            return
+
+        notify = getattr(getRoot(self), "stateChanged", None)
+        if notify is not None:
+            notify(self)
+
+
     def isOriginal(self)-> 'bool':
         return self.state == State.States.ORIGINAL
 
@@ -33,12 +33,21 @@ class XMLName:
     the node/attribute. Every class that corresponds to a node is also expected
     to implement getEtElement() which serializes the contents of itself into a
     object of type xml.etree.ElementTree.Element.
+
+    Classes whose instances all share the same name, and which do not carry an
+    instance dictionary (i.e. use `__slots__`), can set `_xmlname` on the class
+    level. Their instances then do not store the name at all.
     """
 
+    __slots__ = ()
+
+    _xmlname = None
+    """ Name of the node, instances only set it if it differs from this """
+
     def __init__(self, name = ""):
         if name == "":
-            self._xmlname = self.__class__.__name__
-        else:
+            name = self.__class__.__name__
+        if name != self._xmlname:
             self._xmlname = name
 
     def __eq__(self, other):
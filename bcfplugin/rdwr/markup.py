@@ -37,12 +37,14 @@ from bcfplugin.rdwr.uri import Uri
 from bcfplugin.rdwr.modification import (ModificationDate, ModificationAuthor, ModificationType)
 from bcfplugin.rdwr.topic import Topic
 from bcfplugin.rdwr.project import (SimpleElement, Attribute,
-        listSetContainingElement, searchListObject)
+        listSetContainingElement, searchListObject, getSubtreeStateList)
 from bcfplugin.rdwr.viewpoint import (Viewpoint)
 from bcfplugin.rdwr.interfaces.state import State
 from bcfplugin.rdwr.interfaces.hierarchy import Hierarchy
 from bcfplugin.rdwr.interfaces.identifiable import XMLIdentifiable, Identifiable
 from bcfplugin.rdwr.interfaces.xmlname import XMLName
+from bcfplugin.rdwr.interfaces.fingerprint import (Fingerprint,
+        fingerprintsDiffer, fingerprintedMember)
 
 logger = bcfplugin.createLogger(__name__)
 
@@ -540,10 +542,14 @@ class ViewpointReference(Hierarchy, State, XMLIdentifiable, XMLName,
         return searchResult
 
 
-class Comment(Hierarchy, XMLIdentifiable, State, XMLName, Identifiable):
+class Comment(Hierarchy, XMLIdentifiable, State, XMLName, Identifiable,
+        Fingerprint):
 
     """ Class representing the XML type markup.bcf:Comment. """
 
+    viewpoint = fingerprintedMember("_viewpoint")
+    """ ViewpointReference the comment refers to, it is not its parent """
+
     def __init__(self,
             guid: UUID,
             date: datetime,
@@ -563,7 +569,7 @@ class Comment(Hierarchy, XMLIdentifiable, State, XMLName, Identifiable):
         XMLName.__init__(self)
         Identifiable.__init__(self)
         self._comment = SimpleElement(comment, "Comment", "", self)
-        self.viewpoint = viewpoint
+        self._viewpoint = viewpoint
         self._date = ModificationDate(date, self)
         self._author = ModificationAuthor(author, self)
         self._modDate = ModificationDate(modDate, self,
@@ -617,6 +623,10 @@ class Comment(Hierarchy, XMLIdentifiable, State, XMLName, Identifiable):
         if type(self) != type(other):
             return False
 
+        # objects whose fingerprints differ cannot be equal
+        if fingerprintsDiffer(self, other):
+            return False
+
         return (self.idEquals(other.xmlId) and
                 (self.date == other.date or
                     (self.date is None and
@@ -733,14 +743,20 @@ class Comment(Hierarchy, XMLIdentifiable, State, XMLName, Identifiable):
 
     def getStateList(self):
 
+        stateList = getSubtreeStateList(self)
+        if stateList is not None:
+            return stateList
+
         stateList = list()
         if not self.isOriginal():
             stateList.append((self.state, self))
 
-        stateList += self.creation.getStateList()
+        stateList += self._date.getStateList()
+        stateList += self._author.getStateList()
         stateList += self._comment.getStateList()
         # viewpoint is already added to list by Markup
-        stateList += self.lastModification.getStateList()
+        stateList += self._modDate.getStateList()
+        stateList += self._modAuthor.getStateList()
 
         return stateList
 
@@ -761,7 +777,7 @@ class Comment(Hierarchy, XMLIdentifiable, State, XMLName, Identifiable):
         return searchResult
 
 
-class Markup(Hierarchy, State, XMLName, Identifiable):
+class Markup(Hierarchy, State, XMLName, Identifiable, Fingerprint):
 
     """ Represents both the XML type markup.bcf:Markup and the markup.bcf file
     itself. """
@@ -827,6 +843,10 @@ class Markup(Hierarchy, State, XMLName, Identifiable):
         if type(self) != type(other):
             return False
 
+        # objects whose fingerprints differ cannot be equal
+        if fingerprintsDiffer(self, other):
+            return False
+
         return (self.header == other.header and
                 self.topic == other.topic and
                 self.comments == other.comments and
@@ -922,8 +942,30 @@ class Markup(Hierarchy, State, XMLName, Identifiable):
         return elem
 
 
+    def getFingerprintParts(self):
+
+        """ Yields the header and the viewpoint references serialized, and the
+        fingerprints of the topic, the comments and the viewpoints. """
+
+        if self.header is not None:
+            yield ET.tostring(self.header.getEtElement(ET.Element("Header")),
+                    encoding="utf8")
+        yield self.topic.getFingerprint()
+        for comment in self.comments:
+            yield comment.getFingerprint()
+        for vpRef in self.viewpoints:
+            yield ET.tostring(vpRef.getEtElement(ET.Element("Viewpoints")),
+                    encoding="utf8")
+            if vpRef.viewpoint is not None:
+                yield vpRef.viewpoint.getFingerprint()
+
+
     def getStateList(self):
 
+        stateList = getSubtreeStateList(self)
+        if stateList is not None:
+            return stateList
+
         stateList = list()
         if not self.isOriginal():
             stateList.append((self.state, self))
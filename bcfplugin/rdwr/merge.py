@@ -0,0 +1,561 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+The merge module combines two (or three, if a common base is known) versions of
+the same BCF file into one.
+
+Topics, comments and viewpoints are matched by their GUID (`xmlId`). For every
+topic a fingerprint, a hash over its serialized markup, is computed. Topics
+whose fingerprints are equal on both sides, or that only changed on one side,
+are taken over as a whole without looking any further into them. Only topics
+that changed on both sides are merged comment by comment and viewpoint by
+viewpoint. Conflicts, i.e. the same element changed differently on both sides,
+are resolved in favour of the side with the more recent `ModifiedDate` (or
+creation date if no modification date is set). Every conflict is reported.
+
+The module can also be run from the command line:
+
+    python -m bcfplugin.rdwr.merge ours.bcf theirs.bcf --base base.bcf -o out.bcf
+"""
+
+import os
+import sys
+import shutil
+import hashlib
+import zipfile
+import argparse
+import tempfile
+import xml.etree.ElementTree as ET
+from copy import deepcopy
+from datetime import datetime, timezone
+
+import bcfplugin
+import bcfplugin.util as util
+import bcfplugin.rdwr.reader as reader
+import bcfplugin.rdwr.writer as writer
+import bcfplugin.rdwr.version as version
+from bcfplugin.rdwr.project import Project
+from bcfplugin.rdwr.markup import Markup
+
+logger = bcfplugin.createLogger(__name__)
+
+OURS = "ours"
+""" Label of the first input of a merge """
+
+THEIRS = "theirs"
+""" Label of the second input of a merge """
+
+BASE = "base"
+""" Label of the common ancestor of both inputs """
+
+
+class MergeConflict:
+
+    """ Describes one element that was changed differently on both sides.
+
+    `elementType` is the XML name of the element (Topic, Comment, Viewpoints,
+    Header, Markup), `elementId` its GUID if it has one. `resolution` is the
+    label of the side whose version was taken, `reason` is a short human
+    readable explanation.
+    """
+
+    def __init__(self, topicId, elementType, elementId, resolution, reason):
+
+        self.topicId = topicId
+        self.elementType = elementType
+        self.elementId = elementId
+        self.resolution = resolution
+        self.reason = reason
+
+
+    def __str__(self):
+
+        return ("Conflict in topic {}: {} {} -> took '{}' ({})").format(
+                self.topicId, self.elementType, self.elementId,
+                self.resolution, self.reason)
+
+
+class MergeResult:
+
+    """ Result of a merge.
+
+    `project` is the merged data model, `conflicts` the list of
+    `MergeConflict`s that were resolved automatically. `topicSources` maps the
+    GUID of every merged topic to the label of the input whose topic directory
+    serves as basis for the merged one, `viewpointSources` maps viewpoint GUIDs
+    to the label of the input the viewpoint file is taken from.
+    `mergedTopics` holds the GUIDs of topics that were merged element by
+    element and whose markup therefore exists on neither side. `stats` counts
+    how each topic was handled.
+    """
+
+    def __init__(self, project):
+
+        self.project = project
+        self.conflicts = list()
+        self.topicSources = dict()
+        self.viewpointSources = dict()
+        self.mergedTopics = set()
+        self.stats = { "identical": 0, "ours": 0, "theirs": 0, "merged": 0,
+                "removed": 0 }
+
+
+def elementFingerprint(element):
+
+    """ Returns a hash over the serialized form of `element`.
+
+    `element` can be any object of the data model implementing
+    `getEtElement()`. `None` yields `None`. For objects implementing
+    `Fingerprint` the cached fingerprint is returned.
+    """
+
+    if element is None:
+        return None
+    if hasattr(element, "getFingerprint"):
+        return element.getFingerprint()
+
+    etElem = element.getEtElement(ET.Element(element.xmlName))
+    return hashlib.sha1(ET.tostring(etElem, encoding="utf8")).hexdigest()
+
+
+def markupFingerprint(markup: Markup):
+
+    """ Returns the fingerprint of a whole topic, including the contents of its
+    viewpoints. """
+
+    return elementFingerprint(markup)
+
+
+def indexProject(project: Project):
+
+    """ Returns a dictionary mapping the GUID of every topic in `project` to
+    its markup. `None` yields an empty dictionary. """
+
+    if project is None:
+        return dict()
+
+    return { markup.topic.xmlId: markup for markup in project.topicList }
+
+
+def _lastModified(element):
+
+    """ Returns the point in time `element` was changed the last time.
+
+    That is its `modDate` if it is set or else its creation `date`. Naive
+    datetimes are assumed to be UTC.
+    """
+
+    date = getattr(element, "modDate", None)
+    if date is None:
+        date = getattr(element, "date", None)
+    if date is None:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date
+
+
+def _newerSide(oursElem, theirsElem):
+
+    """ Returns the label of the side whose element was modified last. On a tie
+    `OURS` is returned. """
+
+    if _lastModified(theirsElem) > _lastModified(oursElem):
+        return THEIRS
+    return OURS
+
+
+def _threeWay(baseFp, oursFp, theirsFp):
+
+    """ Decides, solely on fingerprints, which side to take.
+
+    Returns `OURS` or `THEIRS` if that side holds the result, or `None` if both
+    sides changed the element differently.
+    """
+
+    if oursFp == theirsFp:
+        return OURS
+    if oursFp == baseFp:
+        return THEIRS
+    if theirsFp == baseFp:
+        return OURS
+    return None
+
+
+def _mergeElementLists(topicId, elementType, baseList, oursList, theirsList,
+        result):
+
+    """ Merges lists of XMLIdentifiable elements (comments or viewpoint
+    references) by their GUID.
+
+    Returns a list of tuples `(side, element)` in the order the elements occur
+    in `oursList` followed by new elements of `theirsList`.
+    """
+
+    baseIdx = { elem.xmlId: elem for elem in baseList }
+    oursIdx = { elem.xmlId: elem for elem in oursList }
+    theirsIdx = { elem.xmlId: elem for elem in theirsList }
+
+    guids = [ elem.xmlId for elem in oursList ]
+    guids += [ elem.xmlId for elem in theirsList if elem.xmlId not in oursIdx ]
+
+    merged = list()
+    for guid in guids:
+        baseElem = baseIdx.get(guid)
+        oursElem = oursIdx.get(guid)
+        theirsElem = theirsIdx.get(guid)
+
+        side = _threeWay(elementFingerprint(baseElem),
+                elementFingerprint(oursElem),
+                elementFingerprint(theirsElem))
+
+        if side is None:
+            if oursElem is None or theirsElem is None:
+                # deleted on one side, modified on the other. Keep the data.
+                side = OURS if theirsElem is None else THEIRS
+                reason = "deleted on one side, modified on the other"
+            else:
+                side = _newerSide(oursElem, theirsElem)
+                reason = "modified on both sides, newer one taken"
+            result.conflicts.append(MergeConflict(topicId, elementType, guid,
+                side, reason))
+
+        elem = oursElem if side == OURS else theirsElem
+        if elem is not None:
+            merged.append((side, elem))
+
+    return merged
+
+
+def _mergeMarkup(baseMarkup, oursMarkup, theirsMarkup, result):
+
+    """ Merges a topic that was modified on both sides.
+
+    The topic and header are taken over as a whole from one side. Comments and
+    viewpoint references are merged by GUID. Returns the newly created markup.
+    """
+
+    topicId = oursMarkup.topic.xmlId
+    baseTopic = baseMarkup.topic if baseMarkup else None
+    winner = _newerSide(oursMarkup.topic, theirsMarkup.topic)
+
+    topicSide = _threeWay(elementFingerprint(baseTopic),
+            elementFingerprint(oursMarkup.topic),
+            elementFingerprint(theirsMarkup.topic))
+    if topicSide is None:
+        topicSide = winner
+        result.conflicts.append(MergeConflict(topicId, "Topic", topicId,
+            topicSide, "modified on both sides, newer one taken"))
+
+    baseHeader = baseMarkup.header if baseMarkup else None
+    headerSide = _threeWay(elementFingerprint(baseHeader),
+            elementFingerprint(oursMarkup.header),
+            elementFingerprint(theirsMarkup.header))
+    if headerSide is None:
+        headerSide = winner
+        result.conflicts.append(MergeConflict(topicId, "Header", None,
+            headerSide, "modified on both sides, newer one taken"))
+
+    sides = { OURS: oursMarkup, THEIRS: theirsMarkup }
+    comments = _mergeElementLists(topicId, "Comment",
+            baseMarkup.comments if baseMarkup else [],
+            oursMarkup.comments, theirsMarkup.comments, result)
+    viewpoints = _mergeElementLists(topicId, "Viewpoints",
+            baseMarkup.viewpoints if baseMarkup else [],
+            oursMarkup.viewpoints, theirsMarkup.viewpoints, result)
+
+    vpRefs = list()
+    for (side, vpRef) in viewpoints:
+        vpRefs.append(deepcopy(vpRef))
+        result.viewpointSources[vpRef.xmlId] = side
+    vpRefIdx = { vpRef.xmlId: vpRef for vpRef in vpRefs }
+
+    newComments = list()
+    for (side, comment) in comments:
+        newComment = deepcopy(comment)
+        # point to the viewpoint reference of the merged markup
+        if newComment.viewpoint is not None:
+            newComment.viewpoint = vpRefIdx.get(newComment.viewpoint.xmlId)
+        newComments.append(newComment)
+
+    merged = Markup(deepcopy(sides[topicSide].topic),
+            deepcopy(sides[headerSide].header),
+            newComments, vpRefs)
+    result.topicSources[topicId] = winner
+    return merged
+
+
+def mergeProjects(ours: Project, theirs: Project, base: Project = None):
+
+    """ Merges `ours` and `theirs` into a new project.
+
+    If `base`, the common ancestor of both, is given a three-way merge is done,
+    otherwise every difference between `ours` and `theirs` is treated as
+    addition, respectively as conflict if a topic is contained in both.
+    Topics that are taken over unchanged are moved from the input projects
+    into the merged one, so the inputs must not be used afterwards.
+    Returns an object of `MergeResult`.
+    """
+
+    logger.debug("Merging projects {} and {}".format(ours.name, theirs.name))
+    merged = Project(ours.xmlId, ours.name, ours.extSchemaSrc)
+    result = MergeResult(merged)
+
+    baseIdx = indexProject(base)
+    oursIdx = indexProject(ours)
+    theirsIdx = indexProject(theirs)
+
+    guids = list(oursIdx.keys())
+    guids += [ guid for guid in theirsIdx.keys() if guid not in oursIdx ]
+    # topics deleted on both sides are never looked at
+    for guid in guids:
+        baseMarkup = baseIdx.get(guid)
+        oursMarkup = oursIdx.get(guid)
+        theirsMarkup = theirsIdx.get(guid)
+
+        oursFp = markupFingerprint(oursMarkup)
+        theirsFp = markupFingerprint(theirsMarkup)
+        if oursFp == theirsFp:
+            side = OURS
+            result.stats["identical"] += 1
+        else:
+            side = _threeWay(markupFingerprint(baseMarkup), oursFp, theirsFp)
+
+        if side is None and (oursMarkup is None or theirsMarkup is None):
+            side = OURS if theirsMarkup is None else THEIRS
+            result.conflicts.append(MergeConflict(guid, "Markup", guid, side,
+                "deleted on one side, modified on the other"))
+
+        if side is None:
+            markup = _mergeMarkup(baseMarkup, oursMarkup, theirsMarkup, result)
+            result.mergedTopics.add(guid)
+            result.stats["merged"] += 1
+        else:
+            markup = oursMarkup if side == OURS else theirsMarkup
+            if markup is None:
+                result.stats["removed"] += 1
+                continue
+            if oursFp != theirsFp:
+                result.stats[side] += 1
+            result.topicSources[guid] = side
+            for vpRef in markup.viewpoints:
+                result.viewpointSources[vpRef.xmlId] = side
+
+        markup.containingObject = merged
+        merged.topicList.append(markup)
+
+    logger.info("Merged {} topics with {} conflict(s)".format(
+        len(merged.topicList), len(result.conflicts)))
+    return result
+
+
+def readArchive(bcfFile: str):
+
+    """ Reads `bcfFile` and returns the project together with the directory it
+    was extracted to.
+
+    If another archive with the same file name was already extracted during
+    this session, `bcfFile` is read through a copy with a unique name, so the
+    two extraction directories do not mix. The copy is deleted once the
+    project is read. Returns `(None, None)` on failure.
+    """
+
+    tmpDir = util.getSystemTmp()
+    uniqueDir = None
+    if os.path.exists(os.path.join(tmpDir, os.path.basename(bcfFile))):
+        uniqueDir = tempfile.mkdtemp(dir=tmpDir)
+        uniqueFile = os.path.join(uniqueDir, "{}_{}".format(
+            os.path.basename(uniqueDir), os.path.basename(bcfFile)))
+        shutil.copyfile(bcfFile, uniqueFile)
+        bcfFile = uniqueFile
+
+    try:
+        project = reader.readBcfFile(bcfFile)
+    finally:
+        # the archive was extracted next to `uniqueDir`, not into it
+        if uniqueDir is not None:
+            shutil.rmtree(uniqueDir, ignore_errors=True)
+    if project is None:
+        return (None, None)
+    return (project, util.getBcfDir())
+
+
+def _uniqueFileName(dirPath, fileName):
+
+    """ Returns `fileName` or, if it is already taken inside `dirPath`, a
+    variation of it that is not. """
+
+    candidate = fileName
+    (name, ext) = os.path.splitext(fileName)
+    idx = 1
+    while os.path.exists(os.path.join(dirPath, candidate)):
+        candidate = "{}_{}{}".format(name, idx, ext)
+        idx += 1
+    return candidate
+
+
+def _copyViewpointFiles(vpRef, srcTopicDir, dstTopicDir):
+
+    """ Copies the viewpoint and snapshot file of `vpRef` from `srcTopicDir`
+    into `dstTopicDir`. Files that would overwrite a different file are
+    renamed and `vpRef` is updated accordingly. """
+
+    for member in ["file", "snapshot"]:
+        fileName = getattr(vpRef, member)
+        if fileName is None:
+            continue
+
+        srcPath = os.path.join(srcTopicDir, str(fileName))
+        if not os.path.exists(srcPath):
+            logger.warning("{} referenced by viewpoint {} does not"\
+                    " exist".format(srcPath, vpRef.xmlId))
+            continue
+
+        dstName = str(fileName)
+        dstPath = os.path.join(dstTopicDir, dstName)
+        if os.path.exists(dstPath):
+            with open(srcPath, "rb") as src, open(dstPath, "rb") as dst:
+                if src.read() == dst.read():
+                    continue
+            dstName = _uniqueFileName(dstTopicDir, dstName)
+            dstPath = os.path.join(dstTopicDir, dstName)
+            if member == "file":
+                vpRef.file = dstName
+            else:
+                vpRef.snapshot.uri = dstName
+
+        shutil.copyfile(srcPath, dstPath)
+
+
+def zipDirectory(rootPath, dstFile):
+
+    """ Packs the contents of `rootPath` into the archive `dstFile`.
+
+    Other than `writer.zipToBcfFile` this does not touch the dirty state of
+    the currently open project.
+    """
+
+    dstFile = os.path.abspath(dstFile)
+    with zipfile.ZipFile(dstFile, "w", zipfile.ZIP_DEFLATED) as zipFile:
+        writer.recursiveZipping("./", zipFile, rootPath)
+    return dstFile
+
+
+def writeMergedArchive(result: MergeResult, bcfDirs, dstFile: str):
+
+    """ Writes the merged project of `result` to `dstFile`.
+
+    `bcfDirs` maps the labels `OURS` and `THEIRS` to the directories the input
+    archives were extracted to. Topic directories that were taken over as a
+    whole are copied unchanged; topics that were merged get their markup.bcf
+    regenerated from the data model and the viewpoint files of both sides
+    copied.
+    """
+
+    logger.info("Writing merged project to {}".format(dstFile))
+    outDir = tempfile.mkdtemp(prefix=util.PREFIX)
+    try:
+        with open(os.path.join(outDir, writer.versionFileName), "w") as f:
+            f.write(version.version_str)
+
+        project = result.project
+        projectFile = os.path.join(bcfDirs[OURS], writer.projectFileName)
+        if os.path.exists(projectFile):
+            shutil.copyfile(projectFile,
+                    os.path.join(outDir, writer.projectFileName))
+
+        for markup in project.topicList:
+            guid = markup.topic.xmlId
+            srcSide = result.topicSources[guid]
+            srcTopicDir = os.path.join(bcfDirs[srcSide], str(guid))
+            dstTopicDir = os.path.join(outDir, str(guid))
+            if os.path.isdir(srcTopicDir):
+                shutil.copytree(srcTopicDir, dstTopicDir)
+            else:
+                os.mkdir(dstTopicDir)
+
+            # only merged topics have a markup that is not found on any side
+            if guid not in result.mergedTopics:
+                continue
+
+            for vpRef in markup.viewpoints:
+                vpSide = result.viewpointSources.get(vpRef.xmlId, srcSide)
+                if vpSide != srcSide:
+                    _copyViewpointFiles(vpRef,
+                            os.path.join(bcfDirs[vpSide], str(guid)),
+                            dstTopicDir)
+
+            markupRoot = markup.getEtElement(ET.Element("Markup"))
+            writer.writeXMLFile(markupRoot, os.path.join(dstTopicDir,
+                writer.markupFileName))
+
+        zipDirectory(outDir, dstFile)
+    finally:
+        shutil.rmtree(outDir, ignore_errors=True)
+
+    return dstFile
+
+
+def main(argv=None):
+
+    """ Command line entry point of the merge. Returns the exit code. """
+
+    parser = argparse.ArgumentParser(prog="bcfmerge",
+            description="Merge two versions of a BCF file by GUID.")
+    parser.add_argument("ours", help="first version of the BCF file")
+    parser.add_argument("theirs", help="second version of the BCF file")
+    parser.add_argument("-b", "--base", default=None,
+            help="common ancestor of both versions")
+    parser.add_argument("-o", "--output", required=True,
+            help="path the merged BCF file is written to")
+    args = parser.parse_args(argv)
+
+    bcfDirs = dict()
+    projects = dict()
+    for (label, path) in [(OURS, args.ours), (THEIRS, args.theirs),
+            (BASE, args.base)]:
+        if path is None:
+            projects[label] = None
+            continue
+        (projects[label], bcfDirs[label]) = readArchive(path)
+        if projects[label] is None:
+            print("{} could not be read".format(path), file=sys.stderr)
+            return 1
+
+    result = mergeProjects(projects[OURS], projects[THEIRS], projects[BASE])
+    for conflict in result.conflicts:
+        print(str(conflict))
+
+    writeMergedArchive(result, bcfDirs, args.output)
+    print("{} topics written to {} ({} identical, {} from ours, {} from"\
+            " theirs, {} merged, {} removed, {} conflict(s))".format(
+                len(result.project.topicList), args.output,
+                result.stats["identical"], result.stats["ours"],
+                result.stats["theirs"], result.stats["merged"],
+                result.stats["removed"], len(result.conflicts)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
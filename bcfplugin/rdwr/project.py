@@ -27,21 +27,77 @@ file. It also builds the top of the hierarchy of the data model.
 """
 
 import os
+import sys
 import logging
 import datetime
 import xml.etree.ElementTree as ET
 from uuid import UUID
 from copy import deepcopy
+from collections.abc import MutableSequence
 
 import bcfplugin
 from bcfplugin.rdwr.uri import Uri
-from bcfplugin.rdwr.interfaces.hierarchy import Hierarchy
+import bcfplugin.util as util
+from bcfplugin.rdwr.interfaces.hierarchy import Hierarchy, getRoot, isDescendant
 from bcfplugin.rdwr.interfaces.state import State
 from bcfplugin.rdwr.interfaces.xmlname import XMLName
 from bcfplugin.rdwr.interfaces.identifiable import XMLIdentifiable, Identifiable
+from bcfplugin.rdwr.interfaces.fingerprint import invalidateFingerprint
+from bcfplugin.rdwr.readonly import unwrap
+from bcfplugin.rdwr.topicindex import TopicIndex
+from bcfplugin.rdwr.textindex import TextIndex
+from bcfplugin.rdwr.commentindex import CommentIndex
+from bcfplugin.rdwr.topicgraph import TopicGraph
 
 logger = bcfplugin.createLogger(__name__)
 
+internedNames = {"CreationAuthor", "ModifiedAuthor", "TopicType",
+        "TopicStatus", "Priority", "Labels", "AssignedTo", "Stage", "Filename",
+        "Reference", "IfcProject", "IfcSpatialStructureElement", "SnippetType"}
+""" XML names of the simple elements and attributes whose values are interned.
+These are the values that repeat across topics and comments, like authors or
+statuses. Free text, like titles and comments, is not interned. """
+
+
+def internString(value):
+
+    """ Returns the interned instance of `value` if it is a string, otherwise
+    `value` itself.
+
+    Equal strings that are interned share one object. Large projects repeat
+    the same authors, statuses and file names thousands of times, keeping only
+    one copy of each saves the memory of the others.
+    """
+
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+def internValues(element):
+
+    """ Interns the values of all simple elements and attributes below
+    `element`, whose XML name is listed in `internedNames`.
+
+    This is meant for objects created through the programmatic interface. The
+    reader interns the values already while building the objects.
+    """
+
+    for obj in iterHierarchy(element):
+        if (getattr(obj, "xmlName", None) in internedNames and
+                type(getattr(obj, "_value", None)) is str):
+            obj._value = sys.intern(obj._value)
+
+
+def notifyValueChanged(element):
+
+    """ Notifies the project `element` is part of, that the value of `element`
+    changed. Does nothing if `element` is not part of a project. """
+
+    valueChanged = getattr(getRoot(element), "valueChanged", None)
+    if valueChanged is not None:
+        valueChanged(element)
+
 
 def listSetContainingElement(itemList, containingObject):
 
@@ -51,17 +107,69 @@ def listSetContainingElement(itemList, containingObject):
     if len(itemList) == 0:
         return None
 
-    ignoreList = list()
-    for item in itemList:
-        if not issubclass(type(item), Hierarchy):
-            index = itemList.index(item)
-            ignoreList.append(index)
-
     for item in itemList:
-        if itemList.index(item) not in ignoreList:
+        if issubclass(type(item), Hierarchy):
             item.containingObject = containingObject
 
 
+def iterHierarchy(element):
+
+    """ Yields `element` and every object below it in the hierarchy.
+
+    An object is considered to be below another one if it is referenced by a
+    member, or by an item of a list member, and its `containingObject` points
+    back. References that are no parent-child relation, like the viewpoint of a
+    comment, are thereby not followed.
+    """
+
+    stack = [ element ]
+    while stack:
+        obj = stack.pop()
+        yield obj
+
+        if isinstance(obj, list):
+            # items of SimpleList reference the owner of the list as parent
+            stack += [ item for item in obj
+                    if issubclass(type(item), Hierarchy) ]
+        if not hasattr(obj, "__dict__"):
+            continue
+
+        for (name, value) in vars(obj).items():
+            if name == "_containingObject":
+                continue
+            if isinstance(value, list) and not issubclass(type(value),
+                    Hierarchy):
+                stack += [ item for item in value
+                        if issubclass(type(item), Hierarchy) and
+                            item.containingObject is obj ]
+            elif (issubclass(type(value), Hierarchy) and
+                    value.containingObject is obj):
+                stack.append(value)
+
+
+def iterIdentifiables(element):
+
+    """ Yields `element` and every object below it in the hierarchy that
+    inherits from Identifiable. """
+
+    return (obj for obj in iterHierarchy(element)
+            if issubclass(type(obj), Identifiable))
+
+
+def getSubtreeStateList(element):
+
+    """ Returns the state list of `element` and all objects below it.
+
+    The list is taken from the set of changed objects of the project `element`
+    is part of. If `element` is not part of a project `None` is returned.
+    """
+
+    root = getRoot(element)
+    if root is element or not hasattr(root, "stateChanged"):
+        return None
+    return root.getStateList(element)
+
+
 def searchListObject(object, elementList):
 
     """ Invokes the `searchObject` algorithm of every element in `elementList`
@@ -164,6 +272,8 @@ class SimpleElement(XMLName, Hierarchy, State, Identifiable):
             self._value = self.typeDict[dstClassName](newValue)
         else:
             self._value = newValue
+        invalidateFingerprint(self.containingObject)
+        notifyValueChanged(self)
 
 
     def getEtElement(self, elem):
@@ -271,6 +381,15 @@ class SimpleList(list, XMLName, Hierarchy, State, Identifiable):
         list.append(self, newElem)
 
 
+    def getStateList(self):
+
+        stateList = State.getStateList(self)
+        for item in self:
+            stateList += item.getStateList()
+
+        return stateList
+
+
     def __eq__(self, other):
 
         return (list.__eq__(self, other) and
@@ -319,6 +438,18 @@ class Attribute(XMLName, Hierarchy, State, Identifiable):
         return retstr
 
 
+    @property
+    def value(self):
+        return self._value
+
+
+    @value.setter
+    def value(self, newValue):
+        self._value = newValue
+        invalidateFingerprint(self.containingObject)
+        notifyValueChanged(self)
+
+
     def searchObject(self, object):
 
         if not issubclass(type(object), Identifiable):
@@ -368,6 +499,29 @@ class Project(Hierarchy, State, XMLName, XMLIdentifiable, Identifiable):
 
         """ Initialisation function of Project """
 
+        self._objectIndex = dict()
+        """ Maps the `id` of every Identifiable in the project to the object """
+
+        self._dirtyObjects = dict()
+        """ Maps `id()` of every object in the project, whose state is not
+        ORIGINAL, to the object """
+
+        self._topicIndex = None
+        """ Secondary indexes over the topics of the project. Built on first
+        use by `getTopicIndex()` """
+
+        self._textIndex = None
+        """ Full-text index over topics and comments. Built on first use by
+        `getTextIndex()` """
+
+        self._commentIndex = None
+        """ Sorted comments of every markup. Built on first use by
+        `getCommentIndex()` """
+
+        self._topicGraph = None
+        """ GUIDs and references of all topics. Built on first use by
+        `getTopicGraph()` """
+
         Hierarchy.__init__(self, None) # Project is the topmost element
         State.__init__(self, state)
         XMLName.__init__(self, xmlName)
@@ -390,6 +544,7 @@ class Project(Hierarchy, State, XMLName, XMLIdentifiable, Identifiable):
         cpytopics = deepcopy(self.topicList, memo)
 
         cpy = Project(cpyxmlid)
+        cpy._objectIndex.clear()
         cpy.id = cpyid
         cpy.state = self.state
         cpy._name = cpyname
@@ -403,6 +558,30 @@ class Project(Hierarchy, State, XMLName, XMLIdentifiable, Identifiable):
         return cpy
 
 
+    def __getstate__(self):
+
+        """ Returns the members to pickle. The topic, text and comment
+        indexes and the topic graph refer to objects by their `id()`, which
+        does not survive pickling, so they are left out. """
+
+        state = self.__dict__.copy()
+        state["_topicIndex"] = None
+        state["_textIndex"] = None
+        state["_commentIndex"] = None
+        state["_topicGraph"] = None
+        return state
+
+
+    def __setstate__(self, state):
+
+        """ Restores the members of an unpickled project. The set of changed
+        objects is keyed by `id()` as well and therefore rebuilt. """
+
+        self.__dict__.update(state)
+        self._dirtyObjects = { id(obj): obj
+                for obj in self._dirtyObjects.values() }
+
+
     @property
     def name(self):
         return self._name.value
@@ -448,32 +627,233 @@ topicList='{}')""".format(str(self.xmlId),
         return ret_str
 
 
-    def getStateList(self):
+    def getStateList(self, element=None):
+
+        """ Returns a list of tuples (state, object) of every changed object.
 
-        stateList = list()
-        if not self.isOriginal():
-            stateList.append((self.state, self))
+        The list is built from the set of changed objects, so the costs are
+        proportional to the number of changes, not to the size of the project.
+        If `element` is given only `element` and the objects below it are
+        considered.
+        """
 
-        stateList += self._name.getStateList()
-        stateList += self._extSchemaSrc.getStateList()
+        return [ (obj.state, obj) for obj in self._dirtyObjects.values()
+                if element is None or element is self or obj is element or
+                    isDescendant(obj, element) ]
 
-        for markup in self.topicList:
-            stateList += markup.getStateList()
 
-        return stateList
+    def registerObjects(self, element):
+
+        """ Adds `element` and all objects below it to the index and, if they
+        are changed, to the set of changed objects of the project. Called
+        whenever an object is attached to the project. """
+
+        for obj in iterHierarchy(element):
+            # objects that are still being constructed have no id yet
+            if hasattr(obj, "_objectId"):
+                self._objectIndex[obj.id] = obj
+            if getattr(obj, "_state", State.States.ORIGINAL) !=\
+                    State.States.ORIGINAL:
+                self.stateChanged(obj)
+            if self._hasIndexes():
+                self._updateIndexes(obj, True)
+
+
+    def unregisterObjects(self, element):
+
+        """ Removes `element` and all objects below it from the index and the
+        set of changed objects of the project. Called whenever an object is
+        detached from the project. """
+
+        for obj in iterHierarchy(element):
+            if (hasattr(obj, "_objectId") and
+                    self._objectIndex.get(obj.id) is obj):
+                del self._objectIndex[obj.id]
+            self._dirtyObjects.pop(id(obj), None)
+            if self._hasIndexes():
+                self._updateIndexes(obj, False)
+
+
+    def stateChanged(self, element):
+
+        """ Adds `element` to the set of changed objects of the project, or
+        removes it if its state is ORIGINAL again.
+
+        As soon as the first object is changed the dirty bit is set.
+        """
+
+        wasDirty = len(self._dirtyObjects) > 0
+        if element.isOriginal():
+            self._dirtyObjects.pop(id(element), None)
+        else:
+            self._dirtyObjects[id(element)] = element
+
+        if not wasDirty and len(self._dirtyObjects) > 0:
+            util.setDirty(True)
+
+
+    def valueChanged(self, element):
+
+        """ Marks the topic or comment `element` belongs to for reindexing,
+        if its value changed. """
+
+        if self._hasIndexes():
+            self._updateIndexes(element, True)
+
+
+    def _hasIndexes(self):
+
+        """ Returns True if one of the topic, text or comment indexes or the
+        topic graph is built """
+
+        return (self._topicIndex is not None or self._textIndex is not None or
+                self._commentIndex is not None or self._topicGraph is not None)
+
+
+    def _documentIndexes(self, obj):
+
+        """ Returns the list of built indexes that hold `obj` """
+
+        # Topic and Comment cannot be imported here, they import this module.
+        # The class name is also set before `__init__` runs, unlike `xmlName`.
+        typeName = type(obj).__name__
+        indexes = list()
+        if typeName == "Topic" and self._topicIndex is not None:
+            indexes.append(self._topicIndex)
+        if typeName == "Topic" and self._topicGraph is not None:
+            indexes.append(self._topicGraph)
+        if typeName in ("Topic", "Comment") and self._textIndex is not None:
+            indexes.append(self._textIndex)
+        if typeName == "Comment" and self._commentIndex is not None:
+            indexes.append(self._commentIndex)
+        return indexes
+
+
+    def _updateIndexes(self, obj, attached):
+
+        """ Updates the topic, text and comment indexes and the topic graph
+        after `obj` was attached to, detached from or changed in the
+        project. """
+
+        indexes = self._documentIndexes(obj)
+        if len(indexes) > 0:
+            for index in indexes:
+                if attached:
+                    index.add(obj)
+                else:
+                    index.remove(obj)
+            return
+
+        parent = getattr(obj, "containingObject", None)
+        for index in self._documentIndexes(parent):
+            index.invalidate(parent)
+
+
+    def getTopicIndex(self):
+
+        """ Returns the `TopicIndex` over all topics of the project.
+
+        The index is built the first time it is requested. From then on it is
+        updated through the notifications the project receives on every
+        change.
+        """
+
+        if self._topicIndex is None:
+            self._topicIndex = TopicIndex(markup.topic
+                    for markup in self.topicList if markup.topic is not None)
+        return self._topicIndex
+
+
+    def getTextIndex(self):
+
+        """ Returns the `TextIndex` over all topics and comments of the
+        project.
+
+        The first time the index is requested, all topics and comments are
+        only registered with it. They are indexed by the first search, or
+        earlier by calling `refresh()` of the index, e.g. in a background
+        thread.
+        """
+
+        if self._textIndex is None:
+            index = TextIndex()
+            for markup in self.topicList:
+                if markup.topic is not None:
+                    index.add(markup.topic)
+                for comment in markup.comments:
+                    index.add(comment)
+            self._textIndex = index
+        return self._textIndex
+
+
+    def getCommentIndex(self):
+
+        """ Returns the `CommentIndex` holding the sorted comments of every
+        markup of the project. It is built the first time it is requested. """
+
+        if self._commentIndex is None:
+            index = CommentIndex()
+            for markup in self.topicList:
+                for comment in markup.comments:
+                    index.add(comment)
+            self._commentIndex = index
+        return self._commentIndex
+
+
+    def getTopicGraph(self):
+
+        """ Returns the `TopicGraph` mapping the GUIDs of all topics of the
+        project to the topics and holding their references. It is built the
+        first time it is requested. """
+
+        if self._topicGraph is None:
+            self._topicGraph = TopicGraph(markup.topic
+                    for markup in self.topicList if markup.topic is not None)
+        return self._topicGraph
+
+
+    def reindexObject(self, element, oldId):
+
+        """ Moves `element` from `oldId` to its current id in the index """
+
+        if oldId is not None and self._objectIndex.get(oldId) is element:
+            del self._objectIndex[oldId]
+        self._objectIndex[element.id] = element
 
 
     def searchObject(self, object):
 
-        """ Searches this object and its members for one that matches
-        `object.id`.
+        """ Returns the object of the project that matches `object.id`.
 
-        The search algorithm, effectively implemented, is a depth first search. """
+        The object is looked up in the index of the project. Only if it is not
+        found there, the project is searched depth first, which covers objects
+        that were attached without setting their `containingObject`.
+        `object` may also be a read-only view of an object.
+        """
 
+        object = unwrap(object)
         if not issubclass(type(object), Identifiable):
             logger.error("object {} is not a subclass of Identifiable".format(object))
             return None
 
+        id = object.id
+        searchResult = self._objectIndex.get(id)
+        if searchResult is not None:
+            return searchResult
+
+        searchResult = self._searchObjectRecursive(object)
+        if searchResult is not None:
+            self._objectIndex[id] = searchResult
+        return searchResult
+
+
+    def _searchObjectRecursive(self, object):
+
+        """ Searches this object and its members for one that matches
+        `object.id`.
+
+        The search algorithm, effectively implemented, is a depth first search. """
+
         # check if itself is the wanted object
         id = object.id
         if self.id == id:
@@ -512,7 +892,7 @@ topicList='{}')""".format(str(self.xmlId),
         # if `object` is part of a list then its name will be referenced by
         # `memberName`
         for (mName, mValue) in vars(parent).items():
-            if issubclass(type(mValue), list):
+            if isinstance(mValue, MutableSequence):
                 if object in mValue:
                     memberName = mName
                     isList = True
@@ -531,6 +911,8 @@ topicList='{}')""".format(str(self.xmlId),
             logger.error(msg)
             return None
 
+        self.unregisterObjects(object)
+
         # remove the object fom the list
         if isList:
             l = getattr(parent, memberName)
@@ -546,6 +928,7 @@ topicList='{}')""".format(str(self.xmlId),
                 object.state = State.States.ORIGINAL
             else:
                 setattr(parent, memberName, None)
+        invalidateFingerprint(parent)
 
         return self
 
@@ -27,13 +27,22 @@ temporary directory and subsequently reading the contents of all files in an
 building a instance of the data model out of it.
 
 The main function of this file is therefore `readBcfFile()`. There should be no
-need for any other function to be called from the outside.
+need for any other function to be called from the outside, except for
+`iterMarkups()`, which reads the topics of a BCF file one at a time for tools
+that process many files and do not need the whole data model.
+
+Parsed schema files are cached by their path, see `loadSchema()`.
 """
 
 import sys
 import os
+import re
+import shutil
+import tempfile
+import functools
 import dateutil.parser
 import logging
+import xml.etree.ElementTree as ET
 from zipfile import ZipFile
 from xmlschema import XMLSchema
 from uuid import UUID
@@ -41,13 +50,14 @@ from typing import List, Dict
 
 import bcfplugin
 import bcfplugin.util as util
-from bcfplugin.rdwr.project import Project
+from bcfplugin.rdwr.project import Project, internString
 from bcfplugin.rdwr.uri import Uri as Uri
 from bcfplugin.rdwr.markup import (Comment, Header, HeaderFile, ViewpointReference, Markup)
 from bcfplugin.rdwr.topic import (Topic, BimSnippet, DocumentReference)
 from bcfplugin.rdwr.viewpoint import (Viewpoint, Component, Components, ViewSetupHints,
         ComponentColour, PerspectiveCamera, OrthogonalCamera, BitmapFormat,
-        Bitmap)
+        Bitmap, ComponentList)
+from bcfplugin.rdwr.ifcguid import IFC_GUID_CHARS, IFC_GUID_LENGTH
 from bcfplugin.rdwr.threedvector import (Point, Line, Direction, ClippingPlane)
 
 SUPPORTED_VERSIONS = ["2.1"]
@@ -56,6 +66,18 @@ SUPPORTED_VERSIONS = ["2.1"]
 logger = bcfplugin.createLogger(__name__)
 
 
+@functools.lru_cache(maxsize=16)
+def loadSchema(schemaPath: str):
+
+    """ Returns the parsed XSD file `schemaPath`.
+
+    Parsing a schema takes considerably longer than reading a markup file with
+    it, so every schema is only parsed once.
+    """
+
+    return XMLSchema(schemaPath)
+
+
 def modifyVisinfoSchema(schema):
 
     """ Alters the FieldOfView restrictions put upon a perspective camera.
@@ -108,7 +130,7 @@ def getVersion(extrBcfPath: str, versionSchemaPath: str):
                     versionFileName,
                     os.path.basename(extrBcfPath)))
 
-    versionSchema = XMLSchema(versionSchemaPath)
+    versionSchema = loadSchema(versionSchemaPath)
     if not versionSchema.is_valid(versionFilePath):
         return None
 
@@ -205,7 +227,7 @@ def buildProject(projectFilePath: str, projectSchema: str):
                 " '{}'".format(projectSchema))
         return None
 
-    schema = XMLSchema(projectSchema)
+    schema = loadSchema(projectSchema)
     (projectDict, errors) = schema.to_dict(projectFilePath, validation="lax")
     errorList = [ str(err) for err in errors ]
     if len(errorList) > 0:
@@ -231,9 +253,10 @@ def buildComment(commentDict: Dict):
     logger.debug("Building new comment object")
     id = UUID(commentDict["@Guid"])
     commentDate = dateutil.parser.parse(commentDict["Date"]) # parse ISO 8601 datetime
-    commentAuthor = commentDict["Author"]
+    commentAuthor = internString(commentDict["Author"])
 
-    modifiedAuthor = getOptionalFromDict(commentDict, "ModifiedAuthor", "")
+    modifiedAuthor = internString(getOptionalFromDict(commentDict,
+        "ModifiedAuthor", ""))
     modifiedDate = getOptionalFromDict(commentDict, "ModifiedDate", None)
     if modifiedDate is not None:
         modifiedDate = dateutil.parser.parse(modifiedDate)
@@ -256,7 +279,7 @@ def buildBimSnippet(snippetDict: Dict):
     logger.debug("Building new BimSnippet object")
     reference = Uri(snippetDict["Reference"])
     referenceSchema = Uri(snippetDict["ReferenceSchema"])
-    snippetType = snippetDict["@SnippetType"]
+    snippetType = internString(snippetDict["@SnippetType"])
     isExternal = getOptionalFromDict(snippetDict, "@isExternal", False)
 
     bimSnippet = BimSnippet(snippetType, isExternal, reference, referenceSchema)
@@ -291,31 +314,35 @@ def buildTopic(topicDict: Dict):
     title = topicDict["Title"]
 
     topicDate = dateutil.parser.parse(topicDict["CreationDate"])
-    topicAuthor = topicDict["CreationAuthor"]
+    topicAuthor = internString(topicDict["CreationAuthor"])
 
-    topicStatus = getOptionalFromDict(topicDict, "@TopicStatus", "")
-    topicType = getOptionalFromDict(topicDict, "@TopicType", "")
-    topicPriority = getOptionalFromDict(topicDict, "Priority", "")
+    topicStatus = internString(getOptionalFromDict(topicDict, "@TopicStatus",
+        ""))
+    topicType = internString(getOptionalFromDict(topicDict, "@TopicType", ""))
+    topicPriority = internString(getOptionalFromDict(topicDict, "Priority",
+        ""))
 
     modifiedDate = getOptionalFromDict(topicDict, "ModifiedDate", None)
     if modifiedDate is not None:
         modifiedDate = dateutil.parser.parse(modifiedDate)
-    modifiedAuthor = getOptionalFromDict(topicDict, "ModifiedAuthor", "")
+    modifiedAuthor = internString(getOptionalFromDict(topicDict,
+        "ModifiedAuthor", ""))
 
     index = getOptionalFromDict(topicDict, "Index", -1)
     dueDate = getOptionalFromDict(topicDict, "DueDate", None)
     if dueDate is not None:
         dueDate = dateutil.parser.parse(dueDate)
 
-    assignee = getOptionalFromDict(topicDict, "AssignedTo", "")
-    stage = getOptionalFromDict(topicDict, "Stage", "")
+    assignee = internString(getOptionalFromDict(topicDict, "AssignedTo", ""))
+    stage = internString(getOptionalFromDict(topicDict, "Stage", ""))
     description = getOptionalFromDict(topicDict, "Description", "")
 
     bimSnippet = None
     if "BimSnippet" in topicDict:
         bimSnippet = buildBimSnippet(topicDict["BimSnippet"])
 
-    labelList = getOptionalFromDict(topicDict, "Labels", [])
+    labelList = [ internString(label)
+            for label in getOptionalFromDict(topicDict, "Labels", []) ]
 
     docRefList = getOptionalFromDict(topicDict, "DocumentReference", [])
     docRefs = [ buildDocRef(docRef) for docRef in docRefList ]
@@ -339,23 +366,19 @@ def buildTopic(topicDict: Dict):
 def buildFile(fileDict):
 
     logger.debug("Building new HeaderFile object")
-    filename = getOptionalFromDict(fileDict, "Filename", "")
+    filename = internString(getOptionalFromDict(fileDict, "Filename", ""))
     filedate = getOptionalFromDict(fileDict, "Date", None)
     if filedate:
         filedate = dateutil.parser.parse(filedate)
 
     reference = getOptionalFromDict(fileDict, "Reference", "")
     if reference:
-        reference = Uri(reference)
+        reference = Uri(internString(reference))
 
-    ifcProjectId = getOptionalFromDict(fileDict, "@IfcProject", "")
-    if ifcProjectId:
-        ifcProjectId = ifcProjectId
-
-    ifcSpatialStructureElement = getOptionalFromDict(fileDict,
-            "@IfcSpatialStructureElement", "")
-    if ifcSpatialStructureElement:
-        ifcSpatialStructureElement = ifcSpatialStructureElement
+    ifcProjectId = internString(getOptionalFromDict(fileDict, "@IfcProject",
+        ""))
+    ifcSpatialStructureElement = internString(getOptionalFromDict(fileDict,
+            "@IfcSpatialStructureElement", ""))
 
     isExternal = getOptionalFromDict(fileDict, "@isExternal", True)
 
@@ -418,7 +441,7 @@ def buildSnapshotList(topicDir: str):
 def buildMarkup(markupFilePath: str, markupSchemaPath: str):
 
     logger.debug("Building new Markup object")
-    markupSchema = XMLSchema(markupSchemaPath)
+    markupSchema = loadSchema(markupSchemaPath)
     (markupDict, errors) = markupSchema.to_dict(markupFilePath, validation="lax")
     errorList = [ str(err) for err in errors ]
     if len(errorList) > 0:
@@ -474,17 +497,33 @@ def buildComponent(componentDict: Dict):
     logger.debug("Building new Component object")
     id = getOptionalFromDict(componentDict, "@IfcGuid", None) # is no UUID
 
-    authoringToolId = getOptionalFromDict(componentDict,
-            "AuthoringToolId", "")
+    authoringToolId = internString(getOptionalFromDict(componentDict,
+            "AuthoringToolId", ""))
 
-    originatingSystem = getOptionalFromDict(componentDict,
-            "OriginatingSystem", "")
+    originatingSystem = internString(getOptionalFromDict(componentDict,
+            "OriginatingSystem", ""))
 
     component = Component(id, originatingSystem, authoringToolId)
     logger.debug("New Component object created")
     return component
 
 
+def buildComponentList(componentDicts: List[Dict]):
+
+    """ Fills a `ComponentList` directly from the component dictionaries,
+    without creating an object for every component. """
+
+    componentList = ComponentList()
+    componentList.extendValues(
+            [ getOptionalFromDict(componentDict, "@IfcGuid", None)
+                for componentDict in componentDicts ],
+            [ getOptionalFromDict(componentDict, "OriginatingSystem", "")
+                for componentDict in componentDicts ],
+            [ getOptionalFromDict(componentDict, "AuthoringToolId", "")
+                for componentDict in componentDicts ])
+    return componentList
+
+
 def buildComponentColour(ccDict: Dict):
 
     logger.debug("Building new ComponentColour object")
@@ -492,8 +531,7 @@ def buildComponentColour(ccDict: Dict):
     colourComponents = list()
     cc = None
     if colour: # if a colour is defined then at least one component has to exist
-        colourComponentList = [ buildComponent(cp)
-                                for cp in ccDict["Component"] ]
+        colourComponentList = buildComponentList(ccDict["Component"])
         cc = ComponentColour(colour, colourComponentList)
 
 
@@ -513,7 +551,7 @@ def buildComponents(componentsDict: Dict):
     sel = list()
     if componentDict:
         componentList = componentDict["Component"]
-        sel = [ buildComponent(cpDict) for cpDict in componentList ]
+        sel = buildComponentList(componentList)
 
     visibilityDict = componentsDict["Visibility"]
     defaultVisibility = getOptionalFromDict(visibilityDict,
@@ -523,7 +561,7 @@ def buildComponents(componentsDict: Dict):
     exceptions = list()
     if exceptionDict:
         exceptionList = exceptionDict["Component"] # at least one element has to be present
-        exceptions = [ buildComponent(cp) for cp in exceptionList ]
+        exceptions = buildComponentList(exceptionList)
 
     colourComponentDict = getOptionalFromDict(componentsDict, "Coloring", None)
     componentColours = list()
@@ -539,6 +577,181 @@ def buildComponents(componentsDict: Dict):
     return components
 
 
+def decodeComponentList(parentElem: ET.Element):
+
+    """ Fills a `ComponentList` from the `Component` children of
+    `parentElem`. """
+
+    componentElems = parentElem.findall("Component")
+    componentList = ComponentList()
+    componentList.extendValues(
+            [ elem.get("IfcGuid") for elem in componentElems ],
+            [ elem.findtext("OriginatingSystem", "") for elem in componentElems ],
+            [ elem.findtext("AuthoringToolId", "") for elem in componentElems ])
+    return componentList
+
+
+def validateComponentList(parentElem: ET.Element, path: str):
+
+    """ Returns the violations of the schema type Component by the children of
+    `parentElem`, which is reached through `path`.
+
+    The checks are made for all components at once, so for each kind of
+    violation at most one message is returned.
+    """
+
+    errors = list()
+    componentElems = list(parentElem)
+    if len(componentElems) == 0:
+        errors.append("{}: at least one Component is required".format(path))
+    unexpected = { elem.tag for elem in componentElems
+            if elem.tag != "Component" }
+    unexpected |= { child.tag for elem in componentElems for child in elem
+            if child.tag not in ("OriginatingSystem", "AuthoringToolId") }
+    if len(unexpected) > 0:
+        errors.append("{}: unexpected nodes {}".format(path,
+            sorted(unexpected)))
+
+    # the pattern of the schema allows "," as well
+    allowed = set(IFC_GUID_CHARS + ",")
+    ifcIds = [ ifcId for ifcId in (elem.get("IfcGuid")
+            for elem in componentElems) if ifcId is not None ]
+    # checking the characters of all IfcGuids at once is a lot faster
+    if (any(len(ifcId) != IFC_GUID_LENGTH for ifcId in ifcIds) or
+            not set("".join(ifcIds)) <= allowed):
+        invalidIds = [ ifcId for ifcId in ifcIds
+                if len(ifcId) != IFC_GUID_LENGTH or not set(ifcId) <= allowed ]
+        errors.append("{}: {} IfcGuid(s) are not valid, e.g."\
+                " '{}'".format(path, len(invalidIds), invalidIds[0]))
+
+    return errors
+
+
+def validateComponents(componentsElem: ET.Element):
+
+    """ Returns the list of violations of the constraints `visinfo.xsd` puts
+    on the `Components` node `componentsElem`.
+
+    `decodeComponents()` reads the node without xmlschema, validating it with
+    xmlschema would again take most of the time of reading a large viewpoint.
+    Therefore the types Components, ViewSetupHints, ComponentSelection,
+    ComponentVisibility, ComponentColoring and Component are checked here.
+    Like for the other nodes of a viewpoint, violations are only reported.
+    """
+
+    errors = list()
+    boolValues = ("true", "false", "1", "0")
+    checkBool = lambda elem, name: (elem.get(name) is None or
+            elem.get(name).strip() in boolValues)
+
+    sequence = ["ViewSetupHints", "Selection", "Visibility", "Coloring"]
+    tags = [ elem.tag for elem in componentsElem ]
+    if not set(tags) <= set(sequence):
+        errors.append("Components: unexpected nodes {}".format(
+            sorted(set(tags) - set(sequence))))
+    elif (len(set(tags)) != len(tags) or
+            tags != sorted(tags, key=sequence.index)):
+        errors.append("Components: the nodes {} are not in the order {}"\
+                "".format(tags, sequence))
+    if "Visibility" not in tags:
+        errors.append("Components: Visibility is required")
+
+    for vshElem in componentsElem.iterfind("ViewSetupHints"):
+        for name in ("SpacesVisible", "SpaceBoundariesVisible",
+                "OpeningsVisible"):
+            if not checkBool(vshElem, name):
+                errors.append("Components/ViewSetupHints: {} is no"\
+                        " boolean".format(name))
+
+    for selElem in componentsElem.iterfind("Selection"):
+        errors += validateComponentList(selElem, "Components/Selection")
+
+    for visibilityElem in componentsElem.iterfind("Visibility"):
+        if not checkBool(visibilityElem, "DefaultVisibility"):
+            errors.append("Components/Visibility: DefaultVisibility is no"\
+                    " boolean")
+        exceptionsElems = list(visibilityElem)
+        if any(elem.tag != "Exceptions" for elem in exceptionsElems):
+            errors.append("Components/Visibility: only Exceptions may be"\
+                    " contained")
+        for exceptionsElem in exceptionsElems[:1]:
+            errors += validateComponentList(exceptionsElem,
+                    "Components/Visibility/Exceptions")
+
+    for colouringElem in componentsElem.iterfind("Coloring"):
+        colourElems = list(colouringElem)
+        if len(colourElems) == 0:
+            errors.append("Components/Coloring: at least one Color is"\
+                    " required")
+        for colourElem in colourElems:
+            if colourElem.tag != "Color":
+                errors.append("Components/Coloring: unexpected node"\
+                        " {}".format(colourElem.tag))
+                continue
+            colour = colourElem.get("Color")
+            if (colour is not None and
+                    not re.fullmatch("[0-9,A-F]{6}([0-9,A-F]{2})?", colour)):
+                errors.append("Components/Coloring/Color: '{}' is no"\
+                        " colour".format(colour))
+            errors += validateComponentList(colourElem,
+                    "Components/Coloring/Color")
+
+    return errors
+
+
+def decodeComponents(componentsElem: ET.Element):
+
+    """ Builds a `Components` object straight from the `Components` node of a
+    viewpoint file.
+
+    Viewpoints of large models can list hundreds of thousands of components.
+    Decoding them through xmlschema, and creating an object per component, is
+    by far the most expensive part of reading such a viewpoint. Therefore the
+    nodes are read here directly into a `ComponentList`.
+    """
+
+    logger.debug("Decoding Components node")
+    toBool = lambda value, default: (default if value is None
+            else value.strip() in ("true", "1"))
+
+    vsh = None
+    vshElem = componentsElem.find("ViewSetupHints")
+    if vshElem is not None:
+        vsh = ViewSetupHints(
+                toBool(vshElem.get("OpeningsVisible"), False),
+                toBool(vshElem.get("SpacesVisible"), False),
+                toBool(vshElem.get("SpaceBoundariesVisible"), False))
+
+    sel = ComponentList()
+    selElem = componentsElem.find("Selection")
+    if selElem is not None:
+        sel = decodeComponentList(selElem)
+
+    defaultVisibility = True
+    exceptions = ComponentList()
+    visibilityElem = componentsElem.find("Visibility")
+    if visibilityElem is not None:
+        defaultVisibility = toBool(visibilityElem.get("DefaultVisibility"),
+                True)
+        exceptionsElem = visibilityElem.find("Exceptions")
+        if exceptionsElem is not None:
+            exceptions = decodeComponentList(exceptionsElem)
+    else:
+        logger.error("Visibility is required in the node Components")
+
+    componentColours = list()
+    colouringElem = componentsElem.find("Coloring")
+    if colouringElem is not None:
+        for colourElem in colouringElem.iterfind("Color"):
+            colourComponents = decodeComponentList(colourElem)
+            if colourElem.get("Color") and len(colourComponents) > 0:
+                componentColours.append(ComponentColour(colourElem.get("Color"),
+                    colourComponents))
+
+    return Components(defaultVisibility, exceptions, sel, vsh,
+            componentColours)
+
+
 def buildPoint(pointDict: Dict):
 
     logger.debug("Building new Point object")
@@ -622,18 +835,25 @@ def buildBitmap(bmDict: Dict):
 def buildViewpoint(viewpointFilePath: str, viewpointSchemaPath: str):
 
     logger.debug("Building new Viewpoint object")
-    vpSchema = XMLSchema(viewpointSchemaPath)
+    vpSchema = loadSchema(viewpointSchemaPath)
     vpSchema = modifyVisinfoSchema(vpSchema)
-    (vpDict, errors) = vpSchema.to_dict(viewpointFilePath, validation="lax")
-    errorList = [ str(err) for err in errors ]
+
+    # the components are decoded separately, see `decodeComponents()`
+    vpRoot = ET.parse(viewpointFilePath).getroot()
+    componentsElem = vpRoot.find("Components")
+    components = None
+    componentsErrors = list()
+    if componentsElem is not None:
+        vpRoot.remove(componentsElem)
+        componentsErrors = validateComponents(componentsElem)
+        components = decodeComponents(componentsElem)
+
+    (vpDict, errors) = vpSchema.to_dict(vpRoot, validation="lax")
+    errorList = [ str(err) for err in errors ] + componentsErrors
     if len(errorList) > 0:
         logger.error(errorList)
 
     id = UUID(vpDict["@Guid"])
-    componentsDict = getOptionalFromDict(vpDict, "Components", None)
-    components = None
-    if componentsDict:
-        components = buildComponents(componentsDict)
 
     oCamDict = getOptionalFromDict(vpDict, "OrthogonalCamera", None)
     oCam = None
@@ -684,7 +904,7 @@ def validateFile(validateFilePath: str,
 
     logger.debug("Validating file {} against {}".format(validateFilePath,
         schemaPath))
-    schema = XMLSchema(schemaPath)
+    schema = loadSchema(schemaPath)
     try:
         schema.validate(validateFilePath)
     except Exception as e:
@@ -802,3 +1022,65 @@ def readBcfFile(bcfFile: str):
     logger.debug("BCF file is read in and open in"\
             " {}".format(bcfExtractedPath))
     return proj
+
+
+def iterMarkups(bcfFile: str, viewpoints: bool = False):
+
+    """ Yields (directory, markup) for every topic in `bcfFile`, one at a
+    time. `directory` is the name of the directory of the topic.
+
+    Instead of extracting the whole file, only the directory of the topic
+    that is read next is extracted into the temporary directory, and deleted
+    again once the next markup is requested. Paths of snapshots are therefore
+    only valid until then. The markups do not belong to a project. Viewpoint
+    files are only read if `viewpoints` is set.
+
+    Markup files are not validated, parsing errors are logged as in
+    `buildMarkup()`. A ValueError is raised if `bcfFile` has no `bcf.version`
+    file or a version that is not supported.
+    """
+
+    (projectSchemaPath, extensionsSchemaPath,\
+        markupSchemaPath, versionSchemaPath,\
+        visinfoSchemaPath) = util.copySchemas(util.getSystemTmp())
+
+    with ZipFile(bcfFile) as zipFile:
+        topicEntries = dict()
+        for name in zipFile.namelist():
+            if "/" in name:
+                topicEntries.setdefault(name.split("/", 1)[0], list()).append(name)
+
+        try:
+            versionRoot = ET.fromstring(zipFile.read("bcf.version"))
+        except KeyError:
+            raise ValueError("{} contains no bcf.version file. Make sure that"\
+                    " it is a BCF file.".format(bcfFile))
+        version = versionRoot.get("VersionId")
+        if version not in SUPPORTED_VERSIONS:
+            raise ValueError("BCF version {} of {} is not supported. Supported"\
+                    " versions are: {}".format(version, bcfFile,
+                        SUPPORTED_VERSIONS))
+
+        for (topic, names) in sorted(topicEntries.items()):
+            if "{}/markup.bcf".format(topic) not in names:
+                continue
+
+            extractionPath = tempfile.mkdtemp(dir=util.getSystemTmp())
+            try:
+                zipFile.extractall(extractionPath, names)
+                topicDir = os.path.join(extractionPath, topic)
+                markup = buildMarkup(os.path.join(topicDir, "markup.bcf"),
+                        markupSchemaPath)
+                if viewpoints:
+                    for vpRef in markup.viewpoints:
+                        vpPath = os.path.join(topicDir, vpRef.file.uri)
+                        try:
+                            vpRef.viewpoint = buildViewpoint(vpPath,
+                                    visinfoSchemaPath)
+                        except KeyError as err:
+                            logger.error("{} is required in a viewpoint"\
+                                    " file. Viewpoint {}/{} is skipped"\
+                                    "".format(str(err), topic, vpRef.file))
+                yield (topic, markup)
+            finally:
+                shutil.rmtree(extractionPath, ignore_errors=True)
@@ -0,0 +1,175 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file provides read-only views onto objects of the data model. The
+programmatic interface hands them out instead of deep copies, so that callers
+can read the live data model without copying it, but cannot alter it behind
+the back of the writer.
+"""
+
+from copy import deepcopy
+from collections.abc import MutableSequence
+
+from bcfplugin.rdwr.interfaces.hierarchy import Hierarchy
+from bcfplugin.rdwr.interfaces.xmlname import XMLName
+
+
+readMethodPrefixes = ("get", "is", "has", "iter", "search", "idEquals",
+        "index", "count")
+""" Prefixes of the names of methods that do not alter an object and thus can
+be called through a view """
+
+readMethods = {"ifcIdColumn", "ifcIdKeys", "systemColumn", "toolIdColumn",
+        "ifcIdSet", "ifcIdKeySet", "union", "intersection", "difference"}
+""" Names of further methods that can be called through a view """
+
+
+def view(value):
+
+    """ Returns a `ReadOnlyView` of `value` if it is part of the data model or
+    a list, otherwise `value` itself is returned. """
+
+    if isinstance(value, ReadOnlyView):
+        return value
+    if isinstance(value, (Hierarchy, XMLName, MutableSequence)):
+        return ReadOnlyView(value)
+    return value
+
+
+def unwrap(value):
+
+    """ Returns the object of the data model `value` is a view of, or `value`
+    itself if it is no view. """
+
+    if isinstance(value, ReadOnlyView):
+        return object.__getattribute__(value, "_target")
+    return value
+
+
+class ReadOnlyView:
+
+    """ Gives read access to an object of the data model without copying it.
+
+    Members are read from the viewed object. Members that are objects of the
+    data model, or lists, are again returned as views. Setting or deleting a
+    member raises an AttributeError, as does accessing a method that is not
+    known to leave the object untouched.
+    The view reports the class of the viewed object as its `__class__`, so
+    `isinstance()` checks keep working on it. If a modifiable object is needed
+    `detach()` returns a deep copy of the viewed object.
+    """
+
+    __slots__ = ("_target",)
+
+    def __init__(self, target):
+
+        object.__setattr__(self, "_target", target)
+
+
+    @property
+    def __class__(self):
+        return type(object.__getattribute__(self, "_target"))
+
+
+    def __getattr__(self, name):
+
+        target = object.__getattribute__(self, "_target")
+        value = getattr(target, name)
+        if not callable(value) or isinstance(value, type):
+            return view(value)
+
+        if not (name.startswith(readMethodPrefixes) or name in readMethods):
+            raise AttributeError("{} cannot be called on a read-only view of"\
+                    " {}. Use detach() to get a modifiable copy.".format(name,
+                        type(target).__name__))
+        return lambda *args, **kwargs: view(value(*args, **kwargs))
+
+
+    def __setattr__(self, name, value):
+
+        raise AttributeError("Cannot set {} on a read-only view. Use detach()"\
+                " to get a modifiable copy.".format(name))
+
+
+    def __delattr__(self, name):
+
+        raise AttributeError("Cannot delete {} from a read-only"\
+                " view.".format(name))
+
+
+    def detach(self):
+
+        """ Returns a deep copy of the viewed object """
+
+        return deepcopy(object.__getattribute__(self, "_target"))
+
+
+    def __deepcopy__(self, memo):
+
+        return self.detach()
+
+
+    def __eq__(self, other):
+
+        return object.__getattribute__(self, "_target") == unwrap(other)
+
+
+    __hash__ = None
+
+
+    def __bool__(self):
+
+        return bool(object.__getattribute__(self, "_target"))
+
+
+    def __len__(self):
+
+        return len(object.__getattribute__(self, "_target"))
+
+
+    def __iter__(self):
+
+        for item in object.__getattribute__(self, "_target"):
+            yield view(item)
+
+
+    def __getitem__(self, idx):
+
+        return view(object.__getattribute__(self, "_target")[idx])
+
+
+    def __contains__(self, item):
+
+        return unwrap(item) in object.__getattribute__(self, "_target")
+
+
+    def __str__(self):
+
+        return str(object.__getattribute__(self, "_target"))
+
+
+    def __repr__(self):
+
+        return "ReadOnlyView({!r})".format(
+                object.__getattribute__(self, "_target"))
@@ -0,0 +1,212 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file writes and restores session snapshots. A snapshot holds the complete
+data model of an open project together with the contents of the working
+directory (the directory the BCF file got extracted to) and the dirty bit. This
+way a project, including changes that were not yet saved to a BCF file, can be
+resumed without reading and validating every XML file again.
+
+A snapshot file starts with a fixed header:
+
+    magic (8 bytes) | format version (uint16) | CRC32 of the payload (uint32)
+
+followed by the payload, a zlib compressed pickle of a dictionary. A snapshot
+is only restored if its format version equals `SNAPSHOT_VERSION` and the BCF
+file it was taken of still has the same member CRCs as at the time the
+snapshot was written.
+"""
+
+import os
+import zlib
+import pickle
+import shutil
+import struct
+from zipfile import ZipFile, BadZipFile
+
+import bcfplugin
+import bcfplugin.util as util
+
+logger = bcfplugin.createLogger(__name__)
+
+SNAPSHOT_MAGIC = b"BCFSNAP\0"
+""" First bytes of every snapshot file """
+
+SNAPSHOT_VERSION = 1
+""" Version of the snapshot format. Has to be increased whenever the data
+model changes in a way that makes older pickles unusable """
+
+SNAPSHOT_HEADER = struct.Struct("<8sHI")
+""" Layout of the header: magic, format version, CRC32 of the payload """
+
+
+def getArchiveCrcs(bcfFile: str):
+
+    """ Returns a dictionary mapping the name of every member of `bcfFile` to
+    its CRC32, as stored in the central directory of the archive.
+
+    If `bcfFile` does not exist or is no zip file `None` is returned.
+    """
+
+    try:
+        with ZipFile(bcfFile) as archive:
+            return { info.filename: info.CRC for info in archive.infolist() }
+    except (OSError, BadZipFile) as err:
+        logger.debug("Could not read the members of {}: {}".format(bcfFile,
+            str(err)))
+        return None
+
+
+def readWorkDir(workDir: str):
+
+    """ Returns the contents of all files below `workDir` as dictionary,
+    mapping the path relative to `workDir` to the content of the file. """
+
+    files = dict()
+    for (dirPath, dirNames, fileNames) in os.walk(workDir):
+        for fileName in fileNames:
+            path = os.path.join(dirPath, fileName)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, workDir)] = f.read()
+
+    return files
+
+
+def writeWorkDir(workDir: str, files):
+
+    """ Writes every file of `files`, as returned by `readWorkDir()`, into
+    `workDir`. """
+
+    for (relPath, content) in files.items():
+        path = os.path.join(workDir, relPath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+
+def writeSnapshot(project, bcfFile: str, snapshotFile: str):
+
+    """ Writes a snapshot of `project`, which was read from `bcfFile`, and of
+    the current working directory to `snapshotFile`.
+
+    Returns True on success, False otherwise.
+    """
+
+    archiveCrcs = getArchiveCrcs(bcfFile)
+    if archiveCrcs is None:
+        logger.error("{} is not readable. No snapshot of it is"\
+                " written.".format(bcfFile))
+        return False
+
+    workDir = util.getBcfDir()
+    state = { "bcfFile": os.path.abspath(bcfFile),
+            "archiveCrcs": archiveCrcs,
+            "workDirName": os.path.basename(workDir),
+            "workDir": readWorkDir(workDir),
+            "dirty": util.getDirtyBit(),
+            "project": project }
+
+    try:
+        payload = zlib.compress(pickle.dumps(state,
+            protocol=pickle.HIGHEST_PROTOCOL), 1)
+    except (pickle.PicklingError, RecursionError) as err:
+        logger.error("The project could not be serialized: {}".format(str(err)))
+        return False
+
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+            zlib.crc32(payload))
+    try:
+        with open(snapshotFile, "wb") as f:
+            f.write(header)
+            f.write(payload)
+    except OSError as err:
+        logger.error("Snapshot could not be written to {}: {}".format(
+            snapshotFile, str(err)))
+        return False
+
+    logger.debug("Wrote snapshot of {} to {}".format(bcfFile, snapshotFile))
+    return True
+
+
+def readSnapshot(snapshotFile: str, bcfFile: str):
+
+    """ Restores the project saved in `snapshotFile`, if it was taken of
+    `bcfFile` and `bcfFile` did not change since.
+
+    The working directory is recreated in the temporary directory of the
+    system and registered via `util.setBcfDir()`, the dirty bit is restored as
+    well. Returns the restored project, or `None` if the snapshot is missing,
+    corrupt, of another format version or outdated. In that case `bcfFile`
+    has to be read again.
+    """
+
+    if not os.path.exists(snapshotFile):
+        return None
+
+    with open(snapshotFile, "rb") as f:
+        header = f.read(SNAPSHOT_HEADER.size)
+        payload = f.read()
+
+    if len(header) != SNAPSHOT_HEADER.size:
+        logger.debug("{} is too short to be a snapshot".format(snapshotFile))
+        return None
+
+    (magic, version, crc) = SNAPSHOT_HEADER.unpack(header)
+    if magic != SNAPSHOT_MAGIC:
+        logger.debug("{} is no snapshot file".format(snapshotFile))
+        return None
+    if version != SNAPSHOT_VERSION:
+        logger.info("Snapshot {} has format version {}, expected {}. It is"\
+                " ignored.".format(snapshotFile, version, SNAPSHOT_VERSION))
+        return None
+    if zlib.crc32(payload) != crc:
+        logger.error("Snapshot {} is corrupt. It is ignored.".format(
+            snapshotFile))
+        return None
+
+    try:
+        state = pickle.loads(zlib.decompress(payload))
+    except Exception as err:
+        logger.error("Snapshot {} could not be loaded: {}".format(
+            snapshotFile, str(err)))
+        return None
+
+    if state["bcfFile"] != os.path.abspath(bcfFile):
+        logger.debug("Snapshot {} was taken of {}, not of {}".format(
+            snapshotFile, state["bcfFile"], bcfFile))
+        return None
+    if state["archiveCrcs"] != getArchiveCrcs(bcfFile):
+        logger.info("{} changed since the snapshot was taken. The snapshot is"\
+                " ignored.".format(bcfFile))
+        return None
+
+    workDir = os.path.join(util.getSystemTmp(), state["workDirName"])
+    if os.path.exists(workDir):
+        shutil.rmtree(workDir)
+    writeWorkDir(workDir, state["workDir"])
+    util.setBcfDir(workDir)
+    util.setDirty(state["dirty"])
+
+    logger.debug("Restored {} from snapshot {}".format(bcfFile, snapshotFile))
+    return state["project"]
@@ -0,0 +1,599 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file provides a storage backend for BCF files with very many topics. Instead
+of holding the whole data model in memory and the extracted files in the
+working directory, a `ProjectStore` mirrors the topics, comments and viewpoint
+references of a BCF file into an indexed SQLite database:
+
+    with openStore("issues.bcf") as store:
+        topics = store.query(status="Open", orderBy="dueDate", limit=50)
+        store.save("issues.bcf")
+
+The file is read topic by topic, see `reader.iterMarkups()`. Topics and
+comments are stored as their BCF-API JSON objects (see `bcfapi`) next to
+indexed columns for the values they can be queried by. Viewpoint files,
+snapshots and all other files of the archive are stored as blobs, and
+viewpoints are only built from them when asked for.
+
+Objects returned by a store do not belong to a project. Changes are made
+through the functions of the store, e.g. `updateTopic()`, and written to a
+BCF file by `save()`. Topics that did not change are written back byte by
+byte, the others are serialized again from the database.
+
+A store, like a session, is meant to be used by one thread at a time.
+"""
+
+import io
+import os
+import json
+import sqlite3
+import zipfile
+from uuid import UUID
+import xml.etree.ElementTree as ET
+
+import bcfplugin
+import bcfplugin.util as util
+import bcfplugin.rdwr.reader as reader
+import bcfplugin.rdwr.writer as writer
+import bcfplugin.rdwr.bcfapi as bcfapi
+from bcfplugin.rdwr.uri import Uri
+from bcfplugin.rdwr.topic import Topic
+from bcfplugin.rdwr.markup import Comment, ViewpointReference, Markup
+from bcfplugin.rdwr.topicindex import indexedFields, orderFields, dateKey
+
+logger = bcfplugin.createLogger(__name__)
+
+storeFileName = "project.sqlite"
+""" Name of the database file a store creates in the temporary directory of
+the session, if no path is given """
+
+schema = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    topic TEXT,
+    content BLOB);
+CREATE TABLE IF NOT EXISTS topics (
+    position INTEGER PRIMARY KEY,
+    guid TEXT UNIQUE NOT NULL,
+    dir TEXT NOT NULL,
+    title TEXT,
+    status TEXT,
+    type TEXT,
+    priority TEXT,
+    assignee TEXT,
+    stage TEXT,
+    idx INTEGER,
+    date REAL,
+    modDate REAL,
+    dueDate REAL,
+    data TEXT NOT NULL,
+    header BLOB,
+    markup BLOB);
+CREATE INDEX IF NOT EXISTS topicsStatus ON topics (status);
+CREATE INDEX IF NOT EXISTS topicsType ON topics (type);
+CREATE INDEX IF NOT EXISTS topicsPriority ON topics (priority);
+CREATE INDEX IF NOT EXISTS topicsAssignee ON topics (assignee);
+CREATE INDEX IF NOT EXISTS topicsStage ON topics (stage);
+CREATE INDEX IF NOT EXISTS topicsDueDate ON topics (dueDate);
+CREATE TABLE IF NOT EXISTS labels (
+    topic TEXT NOT NULL,
+    label TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS labelsLabel ON labels (label, topic);
+CREATE INDEX IF NOT EXISTS labelsTopic ON labels (topic);
+CREATE TABLE IF NOT EXISTS comments (
+    position INTEGER PRIMARY KEY,
+    guid TEXT UNIQUE NOT NULL,
+    topic TEXT NOT NULL,
+    data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS commentsTopic ON comments (topic, position);
+CREATE TABLE IF NOT EXISTS viewpoints (
+    position INTEGER PRIMARY KEY,
+    guid TEXT UNIQUE NOT NULL,
+    topic TEXT NOT NULL,
+    file TEXT,
+    snapshot TEXT,
+    idx INTEGER,
+    body BLOB);
+CREATE INDEX IF NOT EXISTS viewpointsTopic ON viewpoints (topic, position);
+"""
+""" Tables of the database. Rows of topics, comments and viewpoints are kept
+in the order they were read in through `position` """
+
+columns = { "index": "idx", "title": "title", "date": "date",
+        "modDate": "modDate", "dueDate": "dueDate", "status": "status",
+        "type": "type", "priority": "priority", "assignee": "assignee",
+        "stage": "stage" }
+""" Column of the topics table every member of `topicindex.orderFields` is
+stored in """
+
+
+def _valueList(value):
+
+    """ Returns the list of values a filter argument stands for, like
+    `topicindex._valueSet()` """
+
+    if isinstance(value, str) or not hasattr(value, "__iter__"):
+        return [ value ]
+    return list(value)
+
+
+def _topicColumns(topic: Topic):
+
+    """ Returns the values of the indexed columns of `topic`, in the order of
+    `columns` """
+
+    value = lambda v: None if v == "" else v
+    return (value(topic.title), value(topic.status), value(topic.type),
+            value(topic.priority), value(topic.assignee), value(topic.stage),
+            None if topic.index == topic._index.defaultValue else topic.index,
+            dateKey(topic.date), dateKey(topic.modDate),
+            dateKey(topic.dueDate))
+
+
+class ProjectStore:
+
+    """ SQLite mirror of a BCF file.
+
+    `path` is the database file, by default `storeFileName` in the temporary
+    directory of the current session. An existing database is reused, so a
+    store can be opened again without reading the BCF file.
+    """
+
+    def __init__(self, path: str = None):
+
+        if path is None:
+            path = os.path.join(util.getSystemTmp(), storeFileName)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(schema)
+        self.dirty = False
+        """ Set if the store was changed since it was loaded or saved """
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, etype, value, traceback):
+        self.close()
+
+
+    def close(self):
+
+        """ Closes the database. The database file is kept. """
+
+        self.connection.close()
+
+
+    def load(self, bcfFile: str):
+
+        """ Replaces the contents of the store with the contents of `bcfFile`.
+
+        The topics are read one at a time and the store is filled in one
+        transaction, so a file that could not be read completely leaves the
+        store as it was. A ValueError is raised if `bcfFile` is no BCF file of
+        a supported version.
+        """
+
+        logger.info("Loading {} into {}".format(bcfFile, self.path))
+        with self.connection, zipfile.ZipFile(bcfFile) as zipFile:
+            for table in ("files", "topics", "labels", "comments",
+                    "viewpoints"):
+                self.connection.execute("DELETE FROM {}".format(table))
+
+            stored = set()
+            for (topicDir, markup) in reader.iterMarkups(bcfFile):
+                self._insertMarkup(zipFile, topicDir, markup)
+                stored.add("{}/markup.bcf".format(topicDir))
+                stored.update("{}/{}".format(topicDir, vpRef.file)
+                        for vpRef in markup.viewpoints if vpRef.file)
+
+            for info in zipFile.infolist():
+                if info.is_dir() or info.filename in stored:
+                    continue
+                topicDir = (info.filename.split("/", 1)[0] if "/" in
+                        info.filename else None)
+                self.connection.execute("INSERT INTO files VALUES (?, ?, ?)",
+                        (info.filename, topicDir, zipFile.read(info)))
+
+        self.dirty = False
+
+
+    def _insertMarkup(self, zipFile, topicDir, markup: Markup):
+
+        """ Inserts the rows of `markup`, read from the directory `topicDir`
+        of `zipFile` """
+
+        raw = zipFile.read("{}/markup.bcf".format(topicDir))
+        headerElem = ET.fromstring(raw).find("Header")
+        header = (ET.tostring(headerElem, encoding="utf8")
+                if headerElem is not None else None)
+
+        topic = markup.topic
+        guid = str(topic.xmlId)
+        self.connection.execute("INSERT INTO topics (guid, dir, title,"\
+                " status, type, priority, assignee, stage, idx, date,"\
+                " modDate, dueDate, data, header, markup) VALUES (?, ?, ?, ?,"\
+                " ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (guid, topicDir) + _topicColumns(topic) +
+                (json.dumps(bcfapi.topicToJson(topic)), header, raw))
+        self.connection.executemany("INSERT INTO labels VALUES (?, ?)",
+                [ (guid, label.value) for label in topic.labels ])
+        self.connection.executemany("INSERT INTO comments (guid, topic, data)"\
+                " VALUES (?, ?, ?)", [ (str(comment.xmlId), guid,
+                    json.dumps(bcfapi.commentToJson(comment, guid)))
+                    for comment in markup.comments ])
+
+        for vpRef in markup.viewpoints:
+            body = None
+            if vpRef.file:
+                try:
+                    body = zipFile.read("{}/{}".format(topicDir, vpRef.file))
+                except KeyError:
+                    logger.error("Viewpoint file {}/{} does not"\
+                            " exist.".format(topicDir, vpRef.file))
+            self.connection.execute("INSERT INTO viewpoints (guid, topic,"\
+                    " file, snapshot, idx, body) VALUES (?, ?, ?, ?, ?, ?)",
+                    (str(vpRef.xmlId), guid,
+                        str(vpRef.file) if vpRef.file else None,
+                        str(vpRef.snapshot) if vpRef.snapshot else None,
+                        vpRef.index, body))
+
+
+    @property
+    def projectName(self):
+
+        """ Name of the project, as stated in project.bcfp """
+
+        content = self.getFile("project.bcfp")
+        if content is None:
+            return ""
+        return ET.fromstring(content).findtext("Project/Name", "")
+
+
+    def getTopicCount(self):
+
+        """ Returns the number of topics in the store """
+
+        return self.connection.execute("SELECT COUNT(*) FROM"\
+                " topics").fetchone()[0]
+
+
+    def getTopic(self, guid: UUID):
+
+        """ Returns the topic with the GUID `guid` or None """
+
+        row = self.connection.execute("SELECT data FROM topics WHERE"\
+                " guid = ?", (str(guid),)).fetchone()
+        return None if row is None else bcfapi.topicFromJson(
+                json.loads(row[0]))
+
+
+    def query(self, status=None, type=None, priority=None, assignee=None,
+            stage=None, labels=None, dueBefore=None, dueAfter=None,
+            orderBy: str = "index", descending: bool = False,
+            offset: int = 0, limit: int = None):
+
+        """ Returns the list of topics matching all given filters.
+
+        The arguments have the same meaning as for `TopicIndex.query()`, but
+        the topics are selected and ordered by the database. Ties are broken by
+        index and then by the order the topics were read in.
+        """
+
+        if orderBy not in orderFields:
+            raise ValueError("Topics cannot be ordered by {}. Valid values"\
+                    " are: {}".format(orderBy, ", ".join(orderFields)))
+
+        conditions = list()
+        parameters = list()
+        filters = dict(zip(indexedFields,
+            (status, type, priority, assignee, stage)))
+        for (field, value) in filters.items():
+            if value is None:
+                continue
+            values = _valueList(value)
+            alternatives = [ "{} = ?".format(columns[field])
+                    for v in values if v != "" ]
+            parameters.extend(v for v in values if v != "")
+            if "" in values:
+                alternatives.append("{} IS NULL".format(columns[field]))
+            conditions.append("({})".format(" OR ".join(alternatives)))
+
+        if labels is not None:
+            for label in _valueList(labels):
+                conditions.append("guid IN (SELECT topic FROM labels WHERE"\
+                        " label = ?)")
+                parameters.append(label)
+
+        if dueAfter is not None:
+            conditions.append("dueDate >= ?")
+            parameters.append(dateKey(dueAfter))
+        if dueBefore is not None:
+            conditions.append("dueDate < ?")
+            parameters.append(dateKey(dueBefore))
+
+        direction = "DESC" if descending else "ASC"
+        column = columns[orderBy]
+        statement = "SELECT data FROM topics"
+        if len(conditions) > 0:
+            statement += " WHERE " + " AND ".join(conditions)
+        statement += " ORDER BY {0} IS NULL, {0} {1}".format(column, direction)
+        if orderBy != "index":
+            statement += ", idx IS NULL, idx {}".format(direction)
+        statement += ", position {}".format(direction)
+        statement += " LIMIT ? OFFSET ?"
+        parameters.extend([ -1 if limit is None else limit, offset ])
+
+        return [ bcfapi.topicFromJson(json.loads(row[0])) for row in
+                self.connection.execute(statement, parameters) ]
+
+
+    def getLabels(self):
+
+        """ Returns the set of labels used by any topic """
+
+        return { row[0] for row in self.connection.execute(
+            "SELECT DISTINCT label FROM labels") }
+
+
+    def _viewpointReference(self, row):
+
+        (guid, file, snapshot, index) = row
+        return ViewpointReference(UUID(guid), Uri(file) if file else None,
+                Uri(snapshot) if snapshot else None,
+                -1 if index is None else index)
+
+
+    def getViewpointReferences(self, topicGuid: UUID):
+
+        """ Returns the viewpoint references of the topic `topicGuid`. Their
+        viewpoints are not loaded, see `getViewpoint()`. """
+
+        return [ self._viewpointReference(row) for row in
+                self.connection.execute("SELECT guid, file, snapshot, idx"\
+                    " FROM viewpoints WHERE topic = ? ORDER BY position",
+                    (str(topicGuid),)) ]
+
+
+    def getViewpoint(self, guid: UUID):
+
+        """ Builds the viewpoint of the viewpoint reference `guid` from its
+        file. Returns None if there is no such viewpoint. """
+
+        row = self.connection.execute("SELECT body FROM viewpoints WHERE"\
+                " guid = ?", (str(guid),)).fetchone()
+        if row is None or row[0] is None:
+            return None
+
+        visinfoSchemaPath = util.copySchemas(util.getSystemTmp())[4]
+        return reader.buildViewpoint(io.BytesIO(row[0]), visinfoSchemaPath)
+
+
+    def getCommentCount(self, topicGuid: UUID):
+
+        """ Returns the number of comments of the topic `topicGuid` """
+
+        return self.connection.execute("SELECT COUNT(*) FROM comments WHERE"\
+                " topic = ?", (str(topicGuid),)).fetchone()[0]
+
+
+    def getComments(self, topicGuid: UUID, offset: int = 0,
+            limit: int = None):
+
+        """ Returns the comments of the topic `topicGuid` in the order of the
+        file, skipping the first `offset` and returning at most `limit`.
+
+        The viewpoint of a comment is a viewpoint reference without a loaded
+        viewpoint.
+        """
+
+        rows = self.connection.execute("SELECT data FROM comments WHERE"\
+                " topic = ? ORDER BY position LIMIT ? OFFSET ?",
+                (str(topicGuid), -1 if limit is None else limit,
+                    offset)).fetchall()
+        markup = Markup(None, viewpoints=self.getViewpointReferences(
+            topicGuid))
+        return [ bcfapi.commentFromJson(json.loads(row[0]), markup)
+                for row in rows ]
+
+
+    def getMarkup(self, topicGuid: UUID, viewpoints: bool = False):
+
+        """ Builds the complete markup of the topic `topicGuid`, without the
+        header. Viewpoints are loaded if `viewpoints` is set. Returns None if
+        there is no such topic. """
+
+        topic = self.getTopic(topicGuid)
+        if topic is None:
+            return None
+
+        vpRefs = self.getViewpointReferences(topicGuid)
+        if viewpoints:
+            for vpRef in vpRefs:
+                vpRef.viewpoint = self.getViewpoint(vpRef.xmlId)
+        markup = Markup(topic, comments=list(), viewpoints=vpRefs,
+                snapshotFiles=list())
+        for row in self.connection.execute("SELECT data FROM comments WHERE"\
+                " topic = ? ORDER BY position", (str(topicGuid),)):
+            comment = bcfapi.commentFromJson(json.loads(row[0]), markup)
+            comment.containingObject = markup
+            markup.comments.append(comment)
+        return markup
+
+
+    def getSnapshots(self, topicGuid: UUID):
+
+        """ Returns the paths, inside the BCF file, of the PNG snapshots of
+        the topic `topicGuid`. Their content is returned by `getFile()`. """
+
+        topicDir = self._topicDir(topicGuid)
+        return [ row[0] for row in self.connection.execute("SELECT path FROM"\
+                " files WHERE topic = ? ORDER BY path", (topicDir,))
+                if row[0].lower().endswith(".png") ]
+
+
+    def getFile(self, path: str):
+
+        """ Returns the content of the file `path` of the BCF file, or None """
+
+        row = self.connection.execute("SELECT content FROM files WHERE"\
+                " path = ?", (path,)).fetchone()
+        return None if row is None else row[0]
+
+
+    def _topicDir(self, topicGuid: UUID):
+
+        row = self.connection.execute("SELECT dir FROM topics WHERE guid = ?",
+                (str(topicGuid),)).fetchone()
+        return None if row is None else row[0]
+
+
+    def updateTopic(self, topic: Topic):
+
+        """ Stores the values of `topic`, a topic of this store, e.g. after it
+        was modified. Returns False if the topic is not part of the store. """
+
+        guid = str(topic.xmlId)
+        with self.connection:
+            cursor = self.connection.execute("UPDATE topics SET title = ?,"\
+                    " status = ?, type = ?, priority = ?, assignee = ?,"\
+                    " stage = ?, idx = ?, date = ?, modDate = ?, dueDate = ?,"\
+                    " data = ?, markup = NULL WHERE guid = ?",
+                    _topicColumns(topic) +
+                    (json.dumps(bcfapi.topicToJson(topic)), guid))
+            if cursor.rowcount == 0:
+                logger.error("Topic {} is not part of the store.".format(guid))
+                return False
+            self.connection.execute("DELETE FROM labels WHERE topic = ?",
+                    (guid,))
+            self.connection.executemany("INSERT INTO labels VALUES (?, ?)",
+                    [ (guid, label.value) for label in topic.labels ])
+        self.dirty = True
+        return True
+
+
+    def addComment(self, topicGuid: UUID, comment: Comment):
+
+        """ Appends `comment` to the comments of the topic `topicGuid`.
+        Returns False if there is no such topic. """
+
+        guid = str(topicGuid)
+        if self._topicDir(topicGuid) is None:
+            logger.error("Topic {} is not part of the store.".format(guid))
+            return False
+
+        with self.connection:
+            self.connection.execute("INSERT INTO comments (guid, topic, data)"\
+                    " VALUES (?, ?, ?)", (str(comment.xmlId), guid,
+                        json.dumps(bcfapi.commentToJson(comment, guid))))
+            self.connection.execute("UPDATE topics SET markup = NULL WHERE"\
+                    " guid = ?", (guid,))
+        self.dirty = True
+        return True
+
+
+    def deleteTopic(self, topicGuid: UUID):
+
+        """ Removes the topic `topicGuid` together with its comments,
+        viewpoints and files. Returns False if there is no such topic. """
+
+        guid = str(topicGuid)
+        topicDir = self._topicDir(topicGuid)
+        if topicDir is None:
+            logger.error("Topic {} is not part of the store.".format(guid))
+            return False
+
+        with self.connection:
+            for table in ("labels", "comments", "viewpoints"):
+                self.connection.execute("DELETE FROM {} WHERE topic ="\
+                        " ?".format(table), (guid,))
+            self.connection.execute("DELETE FROM files WHERE topic = ?",
+                    (topicDir,))
+            self.connection.execute("DELETE FROM topics WHERE guid = ?",
+                    (guid,))
+        self.dirty = True
+        return True
+
+
+    def _markupXml(self, guid, header):
+
+        """ Serializes the markup of topic `guid` from the database, with the
+        stored `header` in front """
+
+        markup = self.getMarkup(UUID(guid))
+        root = markup.getEtElement(ET.Element("Markup"))
+        if header is not None:
+            root.insert(0, ET.fromstring(header))
+        return writer.xmlPrettify(root)
+
+
+    def save(self, dstFile: str):
+
+        """ Writes the contents of the store to the BCF file `dstFile`.
+
+        The file is written topic by topic, straight from the database, so the
+        data model is never built for more than one topic at a time.
+        """
+
+        logger.info("Writing {} to {}".format(self.path, dstFile))
+        with zipfile.ZipFile(dstFile, "w", zipfile.ZIP_DEFLATED) as zipFile:
+            for (path, content) in self.connection.execute("SELECT path,"\
+                    " content FROM files WHERE topic IS NULL ORDER BY path"):
+                zipFile.writestr(path, content)
+
+            topics = self.connection.execute("SELECT guid, dir, header,"\
+                    " markup FROM topics ORDER BY position").fetchall()
+            for (guid, topicDir, header, markup) in topics:
+                if markup is None:
+                    markup = self._markupXml(guid, header)
+                zipFile.writestr("{}/markup.bcf".format(topicDir), markup)
+
+                for (file, body) in self.connection.execute("SELECT file,"\
+                        " body FROM viewpoints WHERE topic = ? AND body IS"\
+                        " NOT NULL ORDER BY position", (guid,)):
+                    zipFile.writestr("{}/{}".format(topicDir, file), body)
+                for (path, content) in self.connection.execute("SELECT path,"\
+                        " content FROM files WHERE topic = ? ORDER BY path",
+                        (topicDir,)):
+                    zipFile.writestr(path, content)
+
+        self.dirty = False
+        return dstFile
+
+
+def openStore(bcfFile: str, path: str = None):
+
+    """ Returns a `ProjectStore` at `path`, filled with the contents of
+    `bcfFile`, or None if `bcfFile` could not be read. """
+
+    store = ProjectStore(path)
+    try:
+        store.load(bcfFile)
+    except (OSError, ValueError, zipfile.BadZipFile) as err:
+        logger.error("{} could not be loaded: {}".format(bcfFile, str(err)))
+        store.close()
+        return None
+    return store
@@ -0,0 +1,256 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file provides an inverted index over the text of topics (title and
+description) and comments, used for full-text search.
+
+Text is split into lower case words. Every word of a query matches all words
+of the index it is a prefix of, so "wal" finds "wall" and "walls". A
+document has to match every word of the query. Hits are ranked by the
+frequency of the matched words in the document, weighted by their inverse
+document frequency; exact matches weigh more than prefix matches and words in
+titles more than words in descriptions.
+
+Like `topicindex.TopicIndex`, the index is owned by `Project`, and changed
+documents are only marked as stale and reindexed before the next search. All
+methods are guarded by a lock, so that the index can be filled in a
+background thread through `refresh()`.
+"""
+
+import re
+import math
+import heapq
+import threading
+from bisect import bisect_left, insort
+
+import bcfplugin
+
+logger = bcfplugin.createLogger(__name__)
+
+wordPattern = re.compile(r"\w+")
+""" Pattern of the words text is split into """
+
+titleWeight = 2.0
+""" Weight of a word occurring in the title of a topic """
+
+prefixWeight = 0.5
+""" Weight of a word that only starts with a word of the query """
+
+
+def tokenize(text):
+
+    """ Returns the list of lower case words in `text` """
+
+    if not isinstance(text, str):
+        return []
+    return wordPattern.findall(text.casefold())
+
+
+def _documentTerms(document):
+
+    """ Returns a dictionary mapping each word of `document`, a topic or a
+    comment, to its weighted number of occurrences. """
+
+    terms = dict()
+    if type(document).__name__ == "Topic":
+        fields = ((document.title, titleWeight), (document.description, 1.0))
+    else:
+        fields = ((document.comment, 1.0),)
+
+    for (text, weight) in fields:
+        for term in tokenize(text):
+            terms[term] = terms.get(term, 0.0) + weight
+    return terms
+
+
+class TextIndex:
+
+    """ Inverted index over topics and comments.
+
+    For every word the index holds the documents containing it together with
+    the weighted number of occurrences. The words are additionally kept in a
+    sorted list, in which all words starting with a prefix form one range that
+    is found through bisection.
+
+    Documents are referenced by their `id()` internally. `search()` returns
+    the documents themselves.
+    """
+
+    def __init__(self):
+
+        self._lock = threading.RLock()
+        """ Guards all members, see the description of the file """
+
+        self._documents = dict()
+        """ Maps `id()` of every indexed topic and comment to the object """
+
+        self._entries = dict()
+        """ Maps `id()` of every indexed document to the words it is indexed
+        under, as returned by `_documentTerms()` """
+
+        self._postings = dict()
+        """ Maps every word to a dictionary mapping the ids of the documents
+        containing it to the weighted number of occurrences """
+
+        self._terms = list()
+        """ Sorted list of all words in `_postings` """
+
+        self._stale = set()
+        """ Ids of documents that changed since they were indexed """
+
+
+    def __len__(self):
+        return len(self._documents)
+
+
+    def add(self, document):
+
+        """ Adds `document`, a topic or a comment, to the index """
+
+        with self._lock:
+            self._documents[id(document)] = document
+            self._stale.add(id(document))
+
+
+    def remove(self, document):
+
+        """ Removes `document` from the index. Documents that are not indexed
+        are ignored. """
+
+        with self._lock:
+            docId = id(document)
+            if self._documents.get(docId) is not document:
+                return
+            if docId in self._entries:
+                self._drop(docId)
+            del self._documents[docId]
+            self._stale.discard(docId)
+
+
+    def invalidate(self, document):
+
+        """ Marks `document` to be reindexed before the next search """
+
+        with self._lock:
+            if self._documents.get(id(document)) is document:
+                self._stale.add(id(document))
+
+
+    def isStale(self):
+
+        """ Returns True if documents are waiting to be indexed """
+
+        with self._lock:
+            return len(self._stale) > 0
+
+
+    def refresh(self):
+
+        """ Indexes all documents that were added or changed since the last
+        refresh """
+
+        with self._lock:
+            for docId in self._stale:
+                if docId in self._entries:
+                    self._drop(docId)
+                self._insert(docId)
+            self._stale.clear()
+
+
+    def _insert(self, docId):
+
+        terms = _documentTerms(self._documents[docId])
+        for (term, count) in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = dict()
+                insort(self._terms, term)
+            postings[docId] = count
+        self._entries[docId] = terms
+
+
+    def _drop(self, docId):
+
+        for term in self._entries.pop(docId):
+            postings = self._postings[term]
+            del postings[docId]
+            if len(postings) == 0:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+
+    def _expand(self, word):
+
+        """ Returns the words of the index starting with `word` """
+
+        start = bisect_left(self._terms, word)
+        end = start
+        while end < len(self._terms) and self._terms[end].startswith(word):
+            end += 1
+        return self._terms[start:end]
+
+
+    def search(self, text: str, limit: int = None):
+
+        """ Returns a list of (score, document) tuples of all documents that
+        contain every word of `text`, or a word starting with it. The list is
+        sorted by descending score and holds at most `limit` entries. """
+
+        words = set(tokenize(text))
+        if len(words) == 0:
+            return []
+
+        with self._lock:
+            self.refresh()
+            total = len(self._entries)
+
+            scores = None
+            for word in words:
+                wordScores = dict()
+                for term in self._expand(word):
+                    postings = self._postings[term]
+                    weight = math.log(1 + total / len(postings))
+                    if term != word:
+                        weight *= prefixWeight
+                    for (docId, count) in postings.items():
+                        score = count * weight
+                        if score > wordScores.get(docId, 0.0):
+                            wordScores[docId] = score
+
+                if scores is None:
+                    scores = wordScores
+                else:
+                    scores = { docId: score + wordScores[docId]
+                            for (docId, score) in scores.items()
+                            if docId in wordScores }
+                if len(scores) == 0:
+                    return []
+
+            if limit is None:
+                ranked = sorted(scores.items(), key=lambda item: -item[1])
+            else:
+                ranked = heapq.nlargest(limit, scores.items(),
+                        key=lambda item: item[1])
+            return [ (score, self._documents[docId])
+                    for (docId, score) in ranked ]
@@ -31,15 +31,29 @@ from copy import deepcopy
 from bcfplugin.rdwr.interfaces.hierarchy import Hierarchy
 from bcfplugin.rdwr.interfaces.state import State
 from bcfplugin.rdwr.interfaces.xmlname import XMLName
+from bcfplugin.rdwr.interfaces.fingerprint import fingerprintedMember
 
 
 class ThreeDVector(Hierarchy, State, XMLName):
 
     """
     General representation of a three dimensional vector which can be
-    specialised to a point or a direction vector
+    specialised to a point or a direction vector.
+
+    Viewpoints can contain a lot of vectors, therefore they, like all other
+    value like classes of this module, are stored in slots. The name of an
+    instance is the `_xmlname` of its class, the `xmlName` parameter of the
+    constructors is only accepted for compatibility and ignored.
     """
 
+    __slots__ = ("_containingObject", "_state", "_routing", "_x", "_y", "_z")
+
+    _xmlname = "ThreeDVector"
+
+    x = fingerprintedMember("_x")
+    y = fingerprintedMember("_y")
+    z = fingerprintedMember("_z")
+
     def __init__(self,
             x: float,
             y: float,
@@ -50,10 +64,10 @@ class ThreeDVector(Hierarchy, State, XMLName):
 
         Hierarchy.__init__(self, containingElement)
         State.__init__(self, state)
-        XMLName.__init__(self, xmlName)
-        self.x = x
-        self.y = y
-        self.z = z
+        XMLName.__init__(self)
+        self._x = x
+        self._y = y
+        self._z = z
 
 
     def __deepcopy__(self, memo):
@@ -82,9 +96,10 @@ class ThreeDVector(Hierarchy, State, XMLName):
         Convert the contents of the object to an xml.etree.ElementTree.Element
         representation. `element` is the object of type xml.e...Tree.Element
         which shall be modified and returned.
-        """
 
-        elem.tag = self.xmlName
+        The tag of `elem` is left untouched since the name of a vector depends
+        on its use in the parent (e.g. `CameraViewPoint`).
+        """
 
         xElem = ET.SubElement(elem, "X")
         xElem.text = str(self.x)
@@ -105,15 +120,19 @@ class Point(ThreeDVector):
     Therefore it represents a point in the three dimensional space
     """
 
+    __slots__ = ()
+
+    _xmlname = "Point"
+
     def __init__(self,
             x: float,
             y: float,
             z: float,
             containingElement = None,
-            state: State.States = State.States.ORIGINAL):
+            state: State.States = State.States.ORIGINAL,
+            xmlName: str = ""):
 
-        ThreeDVector.__init__(self, x, y, z, containingElement,
-                state, self.__class__.__name__)
+        ThreeDVector.__init__(self, x, y, z, containingElement, state)
 
 
     def __deepcopy__(self, memo):
@@ -145,15 +164,19 @@ class Direction(ThreeDVector, XMLName):
     Therefore it represents a vector in the three dimensional space
     """
 
+    __slots__ = ()
+
+    _xmlname = "Direction"
+
     def __init__(self,
             x: float,
             y: float,
             z: float,
             containingElement = None,
-            state: State.States = State.States.ORIGINAL):
+            state: State.States = State.States.ORIGINAL,
+            xmlName: str = ""):
 
         ThreeDVector.__init__(self, x, y, z, containingElement, state)
-        XMLName.__init__(self)
 
 
     def __deepcopy__(self, memo):
@@ -186,17 +209,25 @@ class Line(Hierarchy, State, XMLName):
     Represents a line that goes throught the three dimensional space.
     """
 
+    __slots__ = ("_containingObject", "_state", "_routing", "_start", "_end")
+
+    _xmlname = "Line"
+
+    start = fingerprintedMember("_start")
+    end = fingerprintedMember("_end")
+
     def __init__(self,
             start: Point,
             end: Point,
             containingElement = None,
-            state: State.States = State.States.ORIGINAL):
+            state: State.States = State.States.ORIGINAL,
+            xmlName: str = ""):
 
         Hierarchy.__init__(self, containingElement)
         State.__init__(self, state)
         XMLName.__init__(self)
-        self.start = start
-        self.end = end
+        self._start = start
+        self._end = end
 
         # set containingObject of complex members
         if self.start is not None:
@@ -243,8 +274,8 @@ class Line(Hierarchy, State, XMLName):
         startElem = ET.SubElement(elem, "StartPoint")
         startElem = self.start.getEtElement(startElem)
 
-        stopElem = ET.SubElement(elem, "StopPoint")
-        stopElem = self.stop.getEtElement(stopElem)
+        endElem = ET.SubElement(elem, "EndPoint")
+        endElem = self.end.getEtElement(endElem)
 
         return elem
 
@@ -258,17 +289,26 @@ class ClippingPlane(Hierarchy, State, XMLName):
     everything else shall be left visible.
     """
 
+    __slots__ = ("_containingObject", "_state", "_routing", "_location",
+            "_direction")
+
+    _xmlname = "ClippingPlane"
+
+    location = fingerprintedMember("_location")
+    direction = fingerprintedMember("_direction")
+
     def __init__(self,
             location: Point,
             direction: Direction,
             containingElement = None,
-            state: State.States = State.States.ORIGINAL):
+            state: State.States = State.States.ORIGINAL,
+            xmlName: str = ""):
 
         Hierarchy.__init__(self, containingElement)
         State.__init__(self, state)
         XMLName.__init__(self)
-        self.location = location
-        self.direction = direction
+        self._location = location
+        self._direction = direction
 
         # set containingObject of complex members
         if self.location is not None:
@@ -319,3 +359,4 @@ class ClippingPlane(Hierarchy, State, XMLName):
         dirElem = ET.SubElement(elem, "Direction")
         dirElem = self.direction.getEtElement(dirElem)
 
+        return elem
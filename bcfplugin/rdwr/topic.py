@@ -39,11 +39,13 @@ from bcfplugin.rdwr.modification import (ModificationDate, ModificationAuthor,
         ModificationType)
 from bcfplugin.rdwr.uri import Uri
 from bcfplugin.rdwr.project import (Attribute, SimpleElement, SimpleList,
-        searchListObject, listSetContainingElement)
+        searchListObject, listSetContainingElement, getSubtreeStateList)
 from bcfplugin.rdwr.interfaces.hierarchy import Hierarchy
 from bcfplugin.rdwr.interfaces.identifiable import XMLIdentifiable, Identifiable
 from bcfplugin.rdwr.interfaces.state import State
 from bcfplugin.rdwr.interfaces.xmlname import XMLName
+from bcfplugin.rdwr.interfaces.fingerprint import (Fingerprint,
+        fingerprintsDiffer)
 
 
 class DocumentReference(Hierarchy, State, XMLName, Identifiable):
@@ -373,7 +375,8 @@ class BimSnippet(Hierarchy, State, XMLName, Identifiable):
         return searchResult
 
 
-class Topic(Hierarchy, XMLIdentifiable, State, XMLName, Identifiable):
+class Topic(Hierarchy, XMLIdentifiable, State, XMLName, Identifiable,
+        Fingerprint):
 
     """ Represents the XML type markup.xsd:Topic """
 
@@ -477,7 +480,7 @@ class Topic(Hierarchy, XMLIdentifiable, State, XMLName, Identifiable):
         cpy._index = cpyindex
         cpy.labels = cpylabels
         cpy._modDate = cpymoddate
-        cpy._modauthor = cpymodauthor
+        cpy._modAuthor = cpymodauthor
         cpy._dueDate = cpyduedate
         cpy._assignee = cpyassignee
         cpy._description = cpydescription
@@ -508,6 +511,10 @@ class Topic(Hierarchy, XMLIdentifiable, State, XMLName, Identifiable):
         if type(self) != type(other):
             return False
 
+        # objects whose fingerprints differ cannot be equal
+        if fingerprintsDiffer(self, other):
+            return False
+
         return (self.xmlId == other.xmlId and
                 self.title == other.title and
                 self.__checkNone(self.date, other.date) and
@@ -519,7 +526,7 @@ class Topic(Hierarchy, XMLIdentifiable, State, XMLName, Identifiable):
                 self.index == other.index and
                 self.labels == other.labels and
                 self.__checkNone(self.modDate, other.modDate) and
-                self.modAuthor, other.modAuthor and
+                self.modAuthor == other.modAuthor and
                 self.__checkNone(self.dueDate, other.dueDate) and
                 self.assignee == other.assignee and
                 self.description == other.description and
@@ -700,7 +707,7 @@ class Topic(Hierarchy, XMLIdentifiable, State, XMLName, Identifiable):
                 self.index == other.index and
                 self.labels == other.labels and
                 self.__checkNone(self.modDate, other.modDate) and
-                self.modAuthor, other.modAuthor and
+                self.modAuthor == other.modAuthor and
                 self.__checkNone(self.dueDate, other.dueDate) and
                 self.assignee == other.assignee and
                 self.description == other.description and
@@ -825,23 +832,28 @@ class Topic(Hierarchy, XMLIdentifiable, State, XMLName, Identifiable):
 
     def getStateList(self):
 
+        stateList = getSubtreeStateList(self)
+        if stateList is not None:
+            return stateList
+
         stateList = list()
         if not self.isOriginal():
             stateList.append((self.state, self))
 
         stateList += self._title.getStateList()
-        stateList += self.creation.getStateList()
+        stateList += self._date.getStateList()
+        stateList += self._author.getStateList()
         stateList += self._type.getStateList()
         stateList += self._status.getStateList()
         stateList += self.referenceLinks.getStateList()
-        for ref in self.refs:
+        for ref in self.docRefs:
             stateList += ref.getStateList()
 
         stateList += self._priority.getStateList()
         stateList += self._index.getStateList()
         stateList += self.labels.getStateList()
-        if self.lastModification is not None:
-            stateList += self.lastModification.getStateList()
+        stateList += self._modDate.getStateList()
+        stateList += self._modAuthor.getStateList()
 
         stateList += self._dueDate.getStateList()
         stateList += self._assignee.getStateList()
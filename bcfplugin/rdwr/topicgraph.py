@@ -0,0 +1,373 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file maps the GUID of every topic of a project to the topic, and keeps
+the graph the `RelatedTopic` references of the topics span. With it the
+topics a topic refers to, directly or transitively, the topics referring to
+it, cycles of references and clusters of related topics are found without
+scanning the topic list.
+
+Like `topicindex.TopicIndex`, the graph is owned by `Project`. Added topics
+and topics whose references changed are only marked as stale, and their edges
+are replaced before the next access, guarded by a lock.
+
+References to GUIDs no topic of the project has are kept as edges, so they
+resolve as soon as such a topic is added, but they are never returned.
+"""
+
+import threading
+from uuid import UUID
+from itertools import count
+from collections import deque
+
+import bcfplugin
+
+logger = bcfplugin.createLogger(__name__)
+
+
+def guidKey(value):
+
+    """ Returns `value`, a UUID or its string representation, as UUID. A
+    ValueError is raised for anything else. """
+
+    if isinstance(value, UUID):
+        return value
+    return UUID(str(value))
+
+
+class TopicGraph:
+
+    """ GUID index of the topics of a project and the graph of their
+    references.
+
+    Outgoing and incoming edges are kept as sets of GUIDs per GUID. Results
+    are lists of topics, ordered by the order the topics were added in.
+    """
+
+    def __init__(self, topics=()):
+
+        self._lock = threading.Lock()
+        """ Guards `refresh()` """
+
+        self._topics = dict()
+        """ Maps `id()` of every indexed topic to the topic """
+
+        self._positions = dict()
+        """ Maps `id()` of every indexed topic to the number of topics added
+        before it """
+        self._counter = count()
+
+        self._entries = dict()
+        """ Maps `id()` of every topic in the graph to the tuple of its GUID
+        and the GUIDs it refers to """
+
+        self._byGuid = dict()
+        """ Maps the GUID of every topic in the graph to the topic """
+
+        self._forward = dict()
+        """ Maps every GUID to the set of GUIDs it refers to """
+
+        self._reverse = dict()
+        """ Maps every GUID to the set of GUIDs referring to it """
+
+        self._stale = set()
+        """ Ids of topics that were added or changed since they were put into
+        the graph """
+
+        for topic in topics:
+            self.add(topic)
+
+
+    def __len__(self):
+        return len(self._topics)
+
+
+    def __contains__(self, topic):
+        return id(topic) in self._topics
+
+
+    def add(self, topic):
+
+        """ Adds `topic` to the graph """
+
+        if id(topic) not in self._topics:
+            self._positions[id(topic)] = next(self._counter)
+        self._topics[id(topic)] = topic
+        self._stale.add(id(topic))
+
+
+    def remove(self, topic):
+
+        """ Removes `topic` and its references from the graph. Topics that
+        are not indexed are ignored. """
+
+        topicId = id(topic)
+        if self._topics.get(topicId) is not topic:
+            return
+        if topicId in self._entries:
+            self._drop(topicId)
+        del self._topics[topicId]
+        del self._positions[topicId]
+        self._stale.discard(topicId)
+
+
+    def invalidate(self, topic):
+
+        """ Marks the references of `topic` to be read anew before the next
+        access. Topics that are not indexed are ignored. """
+
+        if self._topics.get(id(topic)) is topic:
+            self._stale.add(id(topic))
+
+
+    def refresh(self):
+
+        """ Replaces the edges of all topics that were added or changed since
+        the last access """
+
+        with self._lock:
+            for topicId in self._stale:
+                if topicId in self._entries:
+                    self._drop(topicId)
+                self._insert(self._topics[topicId])
+            self._stale.clear()
+
+
+    def _insert(self, topic):
+
+        guid = topic.xmlId
+        related = set()
+        for reference in topic.relatedTopics:
+            try:
+                related.add(guidKey(reference.value))
+            except ValueError:
+                logger.warning("Topic {} refers to {}, which is no"\
+                        " GUID".format(guid, reference.value))
+
+        self._byGuid[guid] = topic
+        for target in related:
+            self._forward.setdefault(guid, set()).add(target)
+            self._reverse.setdefault(target, set()).add(guid)
+        self._entries[id(topic)] = (guid, frozenset(related))
+
+
+    def _drop(self, topicId):
+
+        (guid, related) = self._entries.pop(topicId)
+        if self._byGuid.get(guid) is self._topics[topicId]:
+            del self._byGuid[guid]
+        for target in related:
+            self._discard(self._forward, guid, target)
+            self._discard(self._reverse, target, guid)
+
+
+    @staticmethod
+    def _discard(edges, source, target):
+
+        targets = edges.get(source)
+        if targets is None:
+            return
+        targets.discard(target)
+        if len(targets) == 0:
+            del edges[source]
+
+
+    def _resolve(self, guids):
+
+        """ Returns the topics of `guids`, skipping unknown ones, in the order
+        they were added in """
+
+        topics = [ self._byGuid[guid] for guid in guids if guid in self._byGuid ]
+        topics.sort(key=lambda topic: self._positions[id(topic)])
+        return topics
+
+
+    def topic(self, guid):
+
+        """ Returns the topic with the GUID `guid`, or None """
+
+        self.refresh()
+        return self._byGuid.get(guidKey(guid))
+
+
+    def related(self, guid):
+
+        """ Returns the topics the topic `guid` refers to """
+
+        self.refresh()
+        return self._resolve(self._forward.get(guidKey(guid), ()))
+
+
+    def referencedBy(self, guid):
+
+        """ Returns the topics referring to the topic `guid` """
+
+        self.refresh()
+        return self._resolve(self._reverse.get(guidKey(guid), ()))
+
+
+    def transitive(self, guid, maxDepth: int = None):
+
+        """ Returns the topics reachable from the topic `guid` by following
+        at most `maxDepth`, by default any number of, references. The topics
+        are ordered by their distance to `guid`; `guid` itself is only
+        contained if it is part of a cycle. """
+
+        self.refresh()
+        start = guidKey(guid)
+        seen = set()
+        result = list()
+        level = [ start ]
+        depth = 0
+        while len(level) > 0 and (maxDepth is None or depth < maxDepth):
+            following = set()
+            for source in level:
+                for target in self._forward.get(source, ()):
+                    if target not in seen:
+                        seen.add(target)
+                        following.add(target)
+            # unknown GUIDs have no references, so they end the path anyway
+            result += self._resolve(following)
+            level = following
+            depth += 1
+        return result
+
+
+    def cycles(self):
+
+        """ Returns the list of cycles of references. A cycle is the list of
+        topics that all reach each other, a strongly connected component of
+        the graph, or a single topic referring to itself. """
+
+        self.refresh()
+        indexOf = dict()
+        lowLink = dict()
+        stack = list()
+        onStack = set()
+        components = list()
+        counter = count()
+
+        # iterative version of Tarjan's algorithm, deep reference chains
+        # would exceed the recursion limit
+        for root in list(self._byGuid.keys()):
+            if root in indexOf:
+                continue
+            work = [ (root, iter(self._forward.get(root, ()))) ]
+            indexOf[root] = lowLink[root] = next(counter)
+            stack.append(root)
+            onStack.add(root)
+            while len(work) > 0:
+                (node, targets) = work[-1]
+                pushed = False
+                for target in targets:
+                    if target not in self._byGuid:
+                        continue
+                    if target not in indexOf:
+                        indexOf[target] = lowLink[target] = next(counter)
+                        stack.append(target)
+                        onStack.add(target)
+                        work.append((target, iter(self._forward.get(target,
+                            ()))))
+                        pushed = True
+                        break
+                    if target in onStack:
+                        lowLink[node] = min(lowLink[node], indexOf[target])
+                if pushed:
+                    continue
+
+                work.pop()
+                if len(work) > 0:
+                    parent = work[-1][0]
+                    lowLink[parent] = min(lowLink[parent], lowLink[node])
+                if lowLink[node] == indexOf[node]:
+                    component = list()
+                    while True:
+                        member = stack.pop()
+                        onStack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if (len(component) > 1 or
+                            node in self._forward.get(node, ())):
+                        components.append(self._resolve(component))
+
+        components.sort(key=lambda topics: self._positions[id(topics[0])])
+        return components
+
+
+    def hasCycle(self, guid = None):
+
+        """ Returns True if the topic `guid`, or any topic if `guid` is None,
+        is part of a cycle of references """
+
+        if guid is None:
+            return len(self.cycles()) > 0
+        start = guidKey(guid)
+        return start in [ topic.xmlId for topic in self.transitive(start) ]
+
+
+    def _collect(self, start, seen):
+
+        """ Returns the GUIDs of the topics connected to `start`, which have
+        not been `seen` yet, and adds them to `seen` """
+
+        seen.add(start)
+        collected = list()
+        queue = deque([ start ])
+        while len(queue) > 0:
+            node = queue.popleft()
+            collected.append(node)
+            for edges in (self._forward, self._reverse):
+                for neighbour in edges.get(node, ()):
+                    if neighbour in self._byGuid and neighbour not in seen:
+                        seen.add(neighbour)
+                        queue.append(neighbour)
+        return collected
+
+
+    def components(self):
+
+        """ Returns the clusters of topics connected by references in either
+        direction, largest first. Topics without any references form
+        clusters of their own. """
+
+        self.refresh()
+        seen = set()
+        components = [ self._resolve(self._collect(guid, seen))
+                for guid in list(self._byGuid.keys()) if guid not in seen ]
+        components.sort(key=lambda topics: (-len(topics),
+            self._positions[id(topics[0])]))
+        return components
+
+
+    def component(self, guid):
+
+        """ Returns the cluster of topics connected to the topic `guid` by
+        references in either direction, including the topic itself """
+
+        self.refresh()
+        start = guidKey(guid)
+        if start not in self._byGuid:
+            return []
+        return self._resolve(self._collect(start, set()))
@@ -0,0 +1,357 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file provides secondary indexes over the topics of a project. Topics can
+be filtered by status, type, priority, assignee, stage, labels and due date
+without visiting every topic of the project.
+
+The index is owned by `Project` and kept up to date through the same
+notifications that maintain the object index of the project. A topic that is
+changed is only marked as stale; it is reindexed the next time the index is
+queried. This way a series of changes to one topic, or changes that are made
+before the object is attached to the topic (e.g. appending a label), are
+handled by reading the topic once.
+
+Reindexing is guarded by a lock, so that concurrent queries, e.g. of `aio`,
+can share the index as long as no topic is changed at the same time.
+"""
+
+import heapq
+import datetime
+import threading
+from itertools import count
+from bisect import bisect_left, insort
+
+import bcfplugin
+
+logger = bcfplugin.createLogger(__name__)
+
+indexedFields = ("status", "type", "priority", "assignee", "stage")
+""" Members of Topic that get an index mapping each value to the topics
+holding it """
+
+orderFields = ("index", "title", "date", "modDate", "dueDate", "status",
+        "type", "priority", "assignee", "stage")
+""" Members of Topic that query results can be ordered by """
+
+
+def dateKey(value):
+
+    """ Returns `value`, a datetime or date, as POSIX timestamp. Naive values
+    are interpreted as local time. Returns None for every other value. """
+
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time()).timestamp()
+    return None
+
+
+def _valueSet(value):
+
+    """ Returns the set of values a filter argument stands for. A single string
+    stands for itself, any other iterable for each of its items. """
+
+    if isinstance(value, str) or not hasattr(value, "__iter__"):
+        return { value }
+    return set(value)
+
+
+def _indexKey(topic):
+
+    """ Sort key that orders topics by index, with topics that have no index
+    at the end """
+
+    index = topic.index
+    return (index == topic._index.defaultValue, index)
+
+
+def _orderKey(topic, orderBy):
+
+    """ Returns the value `topic` is ordered by, converted so that values of
+    all topics can be compared """
+
+    value = getattr(topic, orderBy)
+    if orderBy in ("date", "modDate", "dueDate"):
+        return dateKey(value)
+    if value == "":
+        return None
+    return value
+
+
+class TopicIndex:
+
+    """ Secondary indexes over a set of topics.
+
+    For each member in `indexedFields` and for labels, a dictionary maps every
+    value to the set of topics holding it. Due dates are kept in a list sorted
+    by date, so that ranges of due dates can be looked up through bisection.
+
+    Topics are referenced by their `id()` internally. `query()` returns the
+    topic objects.
+    """
+
+    def __init__(self, topics=()):
+
+        self._lock = threading.Lock()
+        """ Guards `refresh()`, see the description of the file """
+
+        self._topics = dict()
+        """ Maps `id()` of every indexed topic to the topic """
+
+        self._positions = dict()
+        """ Maps `id()` of every indexed topic to the number of topics added
+        before it. Topics that are equal in the requested order are returned
+        in the order they were added. """
+        self._counter = count()
+
+        self._entries = dict()
+        """ Maps `id()` of every indexed topic to the values it is indexed
+        under: a tuple of the values of `indexedFields`, the frozenset of
+        labels and the due date as timestamp """
+
+        self._fields = { field: dict() for field in indexedFields }
+        """ Maps every field to a dictionary mapping values to the ids of the
+        topics holding the value """
+
+        self._labels = dict()
+        """ Maps every label to the ids of the topics carrying it """
+
+        self._dueDates = list()
+        """ Sorted list of (timestamp, id) of all topics with a due date """
+
+        self._stale = set()
+        """ Ids of topics that changed since they were indexed """
+
+        for topic in topics:
+            self._topics[id(topic)] = topic
+            self._positions[id(topic)] = next(self._counter)
+            self._insert(topic)
+
+
+    def __len__(self):
+        return len(self._topics)
+
+
+    def __contains__(self, topic):
+        return id(topic) in self._topics
+
+
+    def add(self, topic):
+
+        """ Adds `topic` to the index """
+
+        if id(topic) not in self._topics:
+            self._positions[id(topic)] = next(self._counter)
+        self._topics[id(topic)] = topic
+        self._stale.add(id(topic))
+
+
+    def remove(self, topic):
+
+        """ Removes `topic` from the index. Topics that are not indexed are
+        ignored. """
+
+        topicId = id(topic)
+        if self._topics.get(topicId) is not topic:
+            return
+        if topicId in self._entries:
+            self._drop(topicId)
+        del self._topics[topicId]
+        del self._positions[topicId]
+        self._stale.discard(topicId)
+
+
+    def invalidate(self, topic):
+
+        """ Marks `topic` to be reindexed before the next query. Topics that
+        are not indexed are ignored. """
+
+        if self._topics.get(id(topic)) is topic:
+            self._stale.add(id(topic))
+
+
+    def refresh(self):
+
+        """ Reindexes all topics that changed since the last query """
+
+        with self._lock:
+            for topicId in self._stale:
+                if topicId in self._entries:
+                    self._drop(topicId)
+                self._insert(self._topics[topicId])
+            self._stale.clear()
+
+
+    def _insert(self, topic):
+
+        topicId = id(topic)
+        values = tuple(getattr(topic, field) for field in indexedFields)
+        labels = frozenset(label.value for label in topic.labels)
+        dueDate = dateKey(topic.dueDate)
+
+        for (field, value) in zip(indexedFields, values):
+            self._fields[field].setdefault(value, set()).add(topicId)
+        for label in labels:
+            self._labels.setdefault(label, set()).add(topicId)
+        if dueDate is not None:
+            insort(self._dueDates, (dueDate, topicId))
+
+        self._entries[topicId] = (values, labels, dueDate)
+
+
+    def _drop(self, topicId):
+
+        (values, labels, dueDate) = self._entries.pop(topicId)
+
+        for (field, value) in zip(indexedFields, values):
+            self._discard(self._fields[field], value, topicId)
+        for label in labels:
+            self._discard(self._labels, label, topicId)
+        if dueDate is not None:
+            pos = bisect_left(self._dueDates, (dueDate, topicId))
+            del self._dueDates[pos]
+
+
+    @staticmethod
+    def _discard(index, value, topicId):
+
+        ids = index.get(value)
+        if ids is None:
+            return
+        ids.discard(topicId)
+        if len(ids) == 0:
+            del index[value]
+
+
+    def values(self, field: str):
+
+        """ Returns the set of values `field`, one of `indexedFields` or
+        "labels", takes among all indexed topics """
+
+        self.refresh()
+        if field == "labels":
+            return set(self._labels.keys())
+        return set(self._fields[field].keys())
+
+
+    def query(self, status=None, type=None, priority=None, assignee=None,
+            stage=None, labels=None, dueBefore=None, dueAfter=None,
+            orderBy: str = "index", descending: bool = False,
+            offset: int = 0, limit: int = None):
+
+        """ Returns the list of topics matching all given filters.
+
+        `status`, `type`, `priority`, `assignee` and `stage` each take a single
+        value or a collection of values; a topic matches if its value is one of
+        them. `labels` takes a single label or a collection of labels; a topic
+        matches if it carries all of them. `dueBefore` and `dueAfter` (dates or
+        datetimes) select topics with `dueAfter <= dueDate < dueBefore`. Filters
+        that are None are not applied.
+
+        The result is ordered by `orderBy`, one of `orderFields`. Topics that
+        do not have a value for `orderBy` are put at the end, also if
+        `descending` is set. The first `offset` topics of the ordered result
+        are skipped. If `limit` is given, at most `limit` topics are returned.
+        """
+
+        if orderBy not in orderFields:
+            raise ValueError("Topics cannot be ordered by {}. Valid values"\
+                    " are: {}".format(orderBy, ", ".join(orderFields)))
+
+        self.refresh()
+
+        candidates = list()
+        filters = dict(zip(indexedFields,
+            (status, type, priority, assignee, stage)))
+        for (field, value) in filters.items():
+            if value is None:
+                continue
+            index = self._fields[field]
+            ids = set()
+            for v in _valueSet(value):
+                ids |= index.get(v, set())
+            candidates.append(ids)
+
+        if labels is not None:
+            for label in _valueSet(labels):
+                candidates.append(self._labels.get(label, set()))
+
+        if dueBefore is not None or dueAfter is not None:
+            start = 0
+            end = len(self._dueDates)
+            if dueAfter is not None:
+                start = bisect_left(self._dueDates, (dateKey(dueAfter),))
+            if dueBefore is not None:
+                end = bisect_left(self._dueDates, (dateKey(dueBefore),))
+            candidates.append({ topicId for (dueDate, topicId) in
+                self._dueDates[start:end] })
+
+        if len(candidates) == 0:
+            ids = self._topics.keys()
+        else:
+            # intersect starting with the smallest set
+            candidates.sort(key=len)
+            ids = set(candidates[0])
+            for other in candidates[1:]:
+                ids &= other
+                if len(ids) == 0:
+                    break
+
+        return self._order(ids, orderBy, descending, offset, limit)
+
+
+    def _order(self, ids, orderBy, descending, offset, limit):
+
+        topics = [ self._topics[topicId] for topicId in ids ]
+        if orderBy == "index":
+            keyed = [ (_indexKey(topic), topic) for topic in topics ]
+            present = [ item for item in keyed if not item[0][0] ]
+            missing = [ item for item in keyed if item[0][0] ]
+        else:
+            keyed = [ (_orderKey(topic, orderBy), topic) for topic in topics ]
+            present = [ item for item in keyed if item[0] is not None ]
+            missing = [ item for item in keyed if item[0] is None ]
+
+        # ties and topics without a value are ordered by index, then by the
+        # order they were added in
+        def tieKey(topic):
+            return (_indexKey(topic), self._positions[id(topic)])
+
+        missing.sort(key=lambda item: tieKey(item[1]))
+
+        def key(item):
+            return (item[0], tieKey(item[1]))
+
+        if limit is None:
+            present.sort(key=key, reverse=descending)
+        elif descending:
+            present = heapq.nlargest(offset + limit, present, key=key)
+        else:
+            present = heapq.nsmallest(offset + limit, present, key=key)
+
+        result = [ topic for (k, topic) in present + missing ]
+        if limit is None:
+            return result[offset:]
+        return result[offset:offset + limit]
@@ -28,13 +28,18 @@ file.
 
 from copy import deepcopy
 from enum import Enum
+from array import array
+from collections.abc import MutableSequence
 from typing import List, Dict
 from uuid import UUID
 from bcfplugin.rdwr.threedvector import *
-from bcfplugin.rdwr.project import listSetContainingElement
+from bcfplugin.rdwr.project import listSetContainingElement, internString
+import bcfplugin.rdwr.ifcguid as ifcguid
 from bcfplugin.rdwr.interfaces.hierarchy import Hierarchy
 from bcfplugin.rdwr.interfaces.state import State
 from bcfplugin.rdwr.interfaces.xmlname import XMLName
+from bcfplugin.rdwr.interfaces.fingerprint import (Fingerprint,
+        fingerprintsDiffer, fingerprintedMember, invalidateFingerprint)
 from bcfplugin.rdwr.interfaces.identifiable import Identifiable, XMLIdentifiable
 
 
@@ -150,7 +155,21 @@ class Bitmap(Hierarchy, State, XMLName):
 
 class Camera(Hierarchy, State, XMLName):
 
-    """ Base class of PerspectiveCamera and OrthogonalCamera """
+    """ Base class of PerspectiveCamera and OrthogonalCamera
+
+    Like the vectors the cameras are stored in slots and named by the
+    `_xmlname` of their class. The `xmlName` parameter of the constructors is
+    only accepted for compatibility and ignored.
+    """
+
+    __slots__ = ("_containingObject", "_state", "_routing", "_viewPoint",
+            "_direction", "_upVector")
+
+    _xmlname = "Camera"
+
+    viewPoint = fingerprintedMember("_viewPoint")
+    direction = fingerprintedMember("_direction")
+    upVector = fingerprintedMember("_upVector")
 
     def __init__(self,
             viewPoint: Point,
@@ -164,13 +183,10 @@ class Camera(Hierarchy, State, XMLName):
 
         Hierarchy.__init__(self, containingElement)
         State.__init__(self, state)
-        XMLName.__init__(self, xmlName)
-        self.viewPoint = viewPoint
-        self.viewPoint.xmlName = "CameraViewpoint"
-        self.direction = direction
-        self.direction.xmlName = "CameraDirection"
-        self.upVector = upVector
-        self.upVector.xmlName = "CameraUpVector"
+        XMLName.__init__(self)
+        self._viewPoint = viewPoint
+        self._direction = direction
+        self._upVector = upVector
 
         # set containingObject of complex members
         if self.viewPoint is not None:
@@ -188,7 +204,7 @@ class Camera(Hierarchy, State, XMLName):
 
         cpyviewpoint = deepcopy(self.viewPoint, memo)
         cpydirection = deepcopy(self.direction, memo)
-        cpyupvector = deepcopy(self.upvector, memo)
+        cpyupvector = deepcopy(self.upVector, memo)
 
         cpy = Camera(cpyviewpoint, cpydirection, cpyupvector)
         cpy.state = self.state
@@ -235,21 +251,27 @@ class PerspectiveCamera(Camera, XMLName):
 
     """ Representing the XML type visinfo.xsd:PerspectiveCamera """
 
+    __slots__ = ("_fieldOfView",)
+
+    _xmlname = "PerspectiveCamera"
+
+    fieldOfView = fingerprintedMember("_fieldOfView")
+
     def __init__(self,
             viewPoint: Point,
             direction: Direction,
             upVector: Direction,
             fieldOfView: float,
             containingElement = None,
-            state: State.States = State.States.ORIGINAL):
+            state: State.States = State.States.ORIGINAL,
+            xmlName: str = ""):
         Camera.__init__(self,
                 viewPoint,
                 direction,
                 upVector,
                 containingElement,
-                state,
-                self.__class__.__name__)
-        self.fieldOfView = fieldOfView
+                state)
+        self._fieldOfView = fieldOfView
 
 
     def __deepcopy__(self, memo):
@@ -299,13 +321,20 @@ class OrthogonalCamera(Camera, XMLName):
 
     """ Representing the XML type visinfo.xsd:OrthogonalCamera """
 
+    __slots__ = ("_viewWorldScale",)
+
+    _xmlname = "OrthogonalCamera"
+
+    viewWorldScale = fingerprintedMember("_viewWorldScale")
+
     def __init__(self,
             viewPoint: Point,
             direction: Direction,
             upVector: Direction,
             viewWorldScale: float,
             containingElement = None,
-            state: State.States = State.States.ORIGINAL):
+            state: State.States = State.States.ORIGINAL,
+            xmlName: str = ""):
 
         """ Initialisation function of OrthogonalCamera """
 
@@ -315,8 +344,7 @@ class OrthogonalCamera(Camera, XMLName):
                 upVector,
                 containingElement,
                 state)
-        XMLName.__init__(self)
-        self.viewWorldScale = viewWorldScale
+        self._viewWorldScale = viewWorldScale
 
 
     def __deepcopy__(self, memo):
@@ -365,7 +393,16 @@ class OrthogonalCamera(Camera, XMLName):
 
 class Component(Hierarchy, State, XMLName):
 
-    """ Representing the XML type visinfo.xsd:Component """
+    """ Representing the XML type visinfo.xsd:Component
+
+    Viewpoints of large models reference hundreds of thousands of components,
+    therefore the members are stored in slots.
+    """
+
+    __slots__ = ("_containingObject", "_state", "_routing", "ifcId",
+            "originatingSystem", "authoringtoolId")
+
+    _xmlname = "Component"
 
     def __init__(self,
             ifcId: UUID = None,
@@ -402,7 +439,7 @@ class Component(Hierarchy, State, XMLName):
         Returns true if every variable member of both classes are the same
         """
 
-        if type(self) != type(other):
+        if not isinstance(other, Component):
             return False
 
         return (self.ifcId == other.ifcId and
@@ -442,6 +479,664 @@ class Component(Hierarchy, State, XMLName):
         return elem
 
 
+class ComponentView(Component):
+
+    """ A `Component` whose members live in a row of a `ComponentList`.
+
+    Views are created on access and read and write their members directly from
+    and to the list. A view refers to its row by index, so it should not be
+    kept across insertions or deletions in the list.
+
+    Components of a list have no state of their own. A change of one of them
+    is a change of the viewpoint holding the list, which is only ever written
+    as a whole (see `Viewpoint.searchObject()`). Therefore the state of a view
+    is the state of that viewpoint, and setting any other state than ORIGINAL
+    marks the viewpoint as MODIFIED.
+    """
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row: int):
+
+        self._store = store
+        self._row = row
+
+
+    def _viewpoint(self):
+
+        """ Returns the viewpoint the list is part of, or None """
+
+        element = self._store.containingObject
+        while element is not None and not isinstance(element, Viewpoint):
+            element = element.containingObject
+        return element
+
+
+    @property
+    def state(self):
+
+        viewpoint = self._viewpoint()
+        if viewpoint is None:
+            return State.States.ORIGINAL
+        return viewpoint.state
+
+    @state.setter
+    def state(self, newVal):
+
+        """ Lists outside of a viewpoint are never written, so the state of
+        their views is not kept """
+
+        viewpoint = self._viewpoint()
+        if (viewpoint is None or newVal == State.States.ORIGINAL or
+                viewpoint.state == State.States.ADDED):
+            return
+        viewpoint.state = State.States.MODIFIED
+
+
+    @property
+    def containingObject(self):
+        return self._store.containingObject
+
+    @containingObject.setter
+    def containingObject(self, newVal):
+        # a view always belongs to the element holding the list
+        pass
+
+    @property
+    def _routing(self):
+        # views are not reached when the list changes its parent, so their
+        # routing is not cached
+        return None
+
+    @_routing.setter
+    def _routing(self, newVal):
+        pass
+
+    @property
+    def ifcId(self):
+        return self._store._ifcIdAt(self._row)
+
+    @ifcId.setter
+    def ifcId(self, newVal):
+        self._store._setValues(self._row, ifcId=newVal)
+
+    @property
+    def ifcIdKey(self):
+
+        """ The IfcGuid as 128 bit integer, see `ifcguid.toKey()` """
+
+        return self._store._ifcIdKeyAt(self._row)
+
+    @property
+    def originatingSystem(self):
+        return self._store._systems[self._store._systemIdx[self._row]]
+
+    @originatingSystem.setter
+    def originatingSystem(self, newVal):
+        self._store._setValues(self._row, originatingSystem=newVal)
+
+    @property
+    def authoringtoolId(self):
+        return self._store._toolIds[self._store._toolIdIdx[self._row]]
+
+    @authoringtoolId.setter
+    def authoringtoolId(self, newVal):
+        self._store._setValues(self._row, authoringtoolId=newVal)
+
+
+class ComponentList(MutableSequence):
+
+    """ Columnar store for a list of components.
+
+    Instead of one object per component, the IfcGuids are kept in one column,
+    and OriginatingSystem and AuthoringToolId as indices into tables of
+    distinct values. Indexing and iterating yield `ComponentView`s, so the
+    list can be used like a list of `Component`s.
+
+    IfcGuids are stored as 16 bytes each in `_guids`. Values that are no valid
+    IfcGuid, and missing ones, cannot be encoded that way. They are kept in
+    `_rawIds` as 1-tuple `(value,)`, for all other rows `_rawIds` holds None.
+
+    Membership tests and the set operations `union`, `intersection` and
+    `difference` use an index of the IfcGuids that is built on first use. It
+    is keyed by the IfcGuids as 128 bit integers (see `ifcguid.toKey()`).
+    Components without IfcGuid are compared by all their members.
+    """
+
+    def __init__(self, components = None, containingElement = None):
+
+        self.containingObject = containingElement
+        self._guids = bytearray()
+        self._rawIds = list()
+        self._systemIdx = array("I")
+        self._toolIdIdx = array("I")
+        self._systems = [""]
+        self._toolIds = [""]
+        self._systemLookup = {"": 0}
+        self._toolIdLookup = {"": 0}
+        self._index = None
+
+        if components is not None:
+            self.extend(components)
+
+
+    def __deepcopy__(self, memo):
+
+        """ Create a deepcopy of the object without copying `containingObject`
+        """
+
+        cpy = ComponentList()
+        cpy._guids = bytearray(self._guids)
+        cpy._rawIds = list(self._rawIds)
+        cpy._systemIdx = array("I", self._systemIdx)
+        cpy._toolIdIdx = array("I", self._toolIdIdx)
+        cpy._systems = list(self._systems)
+        cpy._toolIds = list(self._toolIds)
+        cpy._systemLookup = dict(self._systemLookup)
+        cpy._toolIdLookup = dict(self._toolIdLookup)
+        return cpy
+
+
+    def __eq__(self, other):
+
+        """ Returns true if both lists contain the same components in the same
+        order. `other` may also be a list of `Component`s. """
+
+        if isinstance(other, ComponentList):
+            return (self._guids == other._guids and
+                    self._rawIds == other._rawIds and
+                    list(self.systemColumn()) == list(other.systemColumn()) and
+                    list(self.toolIdColumn()) == list(other.toolIdColumn()))
+        if isinstance(other, list):
+            return len(self) == len(other) and all(a == b
+                    for (a, b) in zip(self, other))
+        return NotImplemented
+
+
+    def __str__(self):
+
+        return "[{}]".format(", ".join(str(c) for c in self))
+
+
+    def __repr__(self):
+
+        return self.__str__()
+
+
+    @staticmethod
+    def _intern(value, table, lookup):
+
+        """ Returns the index of `value` in `table`, adding it if it's new.
+
+        New values are interned, so that lists of different viewpoints share
+        their originating systems and authoring tool ids. """
+
+        if value is None:
+            value = ""
+        idx = lookup.get(value)
+        if idx is None:
+            idx = len(table)
+            value = internString(value)
+            table.append(value)
+            lookup[value] = idx
+        return idx
+
+
+    @staticmethod
+    def _encodeId(ifcId):
+
+        """ Returns the tuple (16 bytes, raw value) to store `ifcId` as.
+
+        `ifcId` may be a compressed IfcGuid, a 128 bit integer or a UUID. Other
+        values are returned as raw value `(ifcId,)` along with 16 zero bytes.
+        """
+
+        try:
+            if isinstance(ifcId, str):
+                return (ifcguid.toBytes(ifcId), None)
+            if isinstance(ifcId, UUID):
+                return (ifcId.bytes, None)
+            if isinstance(ifcId, int) and not isinstance(ifcId, bool):
+                return (ifcId.to_bytes(16, "big"), None)
+        except (ValueError, OverflowError):
+            pass
+        return (bytes(16), (ifcId,))
+
+
+    def _guidBytes(self, row: int):
+
+        return self._guids[16 * row:16 * (row + 1)]
+
+
+    def _ifcIdAt(self, row: int):
+
+        """ Returns the IfcGuid of the component in `row` as string """
+
+        raw = self._rawIds[row]
+        if raw is not None:
+            return raw[0]
+        return ifcguid.fromBytes(self._guidBytes(row))
+
+
+    def _ifcIdKeyAt(self, row: int):
+
+        """ Returns the IfcGuid of the component in `row` as integer, or the
+        raw value if it is no valid IfcGuid """
+
+        raw = self._rawIds[row]
+        if raw is not None:
+            return raw[0]
+        return int.from_bytes(self._guidBytes(row), "big")
+
+
+    def _key(self, row: int):
+
+        """ Returns the key identifying the component in `row` """
+
+        ifcId = self._ifcIdKeyAt(row)
+        if ifcId is not None:
+            return ifcId
+        return (None, self._systems[self._systemIdx[row]],
+                self._toolIds[self._toolIdIdx[row]])
+
+
+    @staticmethod
+    def _componentKey(component):
+
+        if isinstance(component, (str, int, UUID)):
+            return ifcguid.toKey(component)
+        if isinstance(component, ComponentView):
+            return component._store._key(component._row)
+        if component.ifcId is not None:
+            return ifcguid.toKey(component.ifcId)
+        return (None, component.originatingSystem or "",
+                component.authoringtoolId or "")
+
+
+    def _getIndex(self):
+
+        """ Returns the dictionary mapping the key of each component to the
+        row it first occurs in. It is built on first use. """
+
+        if self._index is None:
+            keys = self.ifcIdKeys()
+            index = dict()
+            for row in range(len(keys) - 1, -1, -1):
+                key = keys[row]
+                if key is None:
+                    key = self._key(row)
+                index[key] = row
+            self._index = index
+        return self._index
+
+
+    def _appendRow(self, guid, raw, systemIdx: int, toolIdIdx: int):
+
+        self._guids += guid
+        self._rawIds.append(raw)
+        self._systemIdx.append(systemIdx)
+        self._toolIdIdx.append(toolIdIdx)
+        if self._index is not None:
+            self._index.setdefault(self._key(len(self) - 1), len(self) - 1)
+
+
+    def _copyRow(self, other, row: int):
+
+        """ Appends the component in `row` of the ComponentList `other`,
+        without decoding and encoding its IfcGuid again. """
+
+        self._appendRow(other._guidBytes(row), other._rawIds[row],
+                self._intern(other._systems[other._systemIdx[row]],
+                    self._systems, self._systemLookup),
+                self._intern(other._toolIds[other._toolIdIdx[row]],
+                    self._toolIds, self._toolIdLookup))
+
+
+    def appendValues(self, ifcId, originatingSystem = "",
+            authoringtoolId = ""):
+
+        """ Appends a component given by its members without creating a
+        `Component` object. """
+
+        (guid, raw) = self._encodeId(ifcId)
+        self._appendRow(guid, raw,
+                self._intern(originatingSystem, self._systems,
+                    self._systemLookup),
+                self._intern(authoringtoolId, self._toolIds,
+                    self._toolIdLookup))
+        invalidateFingerprint(self.containingObject)
+
+
+    def extendValues(self, ifcIds, originatingSystems, authoringtoolIds):
+
+        """ Appends one component per item of the three equally long
+        sequences. This is used by the reader.
+
+        The IfcGuids are encoded all at once through `ifcguid.expandAll()`.
+        Only if one of them is invalid, they are encoded one by one.
+        """
+
+        try:
+            self._guids += ifcguid.expandAll(ifcIds)
+            self._rawIds.extend([ None ] * len(ifcIds))
+        except ValueError:
+            for ifcId in ifcIds:
+                (guid, raw) = self._encodeId(ifcId)
+                self._guids += guid
+                self._rawIds.append(raw)
+
+        self._systemIdx.extend([ self._intern(system, self._systems,
+            self._systemLookup) for system in originatingSystems ])
+        self._toolIdIdx.extend([ self._intern(toolId, self._toolIds,
+            self._toolIdLookup) for toolId in authoringtoolIds ])
+        self._index = None
+        invalidateFingerprint(self.containingObject)
+
+
+    def _setValues(self, row: int, **values):
+
+        """ Overwrites the members of the component in `row` that are given in
+        `values`. """
+
+        if "ifcId" in values:
+            (guid, raw) = self._encodeId(values["ifcId"])
+            self._guids[16 * row:16 * (row + 1)] = guid
+            self._rawIds[row] = raw
+        if "originatingSystem" in values:
+            self._systemIdx[row] = self._intern(values["originatingSystem"],
+                    self._systems, self._systemLookup)
+        if "authoringtoolId" in values:
+            self._toolIdIdx[row] = self._intern(values["authoringtoolId"],
+                    self._toolIds, self._toolIdLookup)
+        self._index = None
+        invalidateFingerprint(self.containingObject)
+
+
+    def __len__(self):
+
+        return len(self._rawIds)
+
+
+    def __getitem__(self, idx):
+
+        if isinstance(idx, slice):
+            result = ComponentList()
+            for row in range(len(self))[idx]:
+                result._copyRow(self, row)
+            return result
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("ComponentList index out of range")
+        return ComponentView(self, idx)
+
+
+    def __setitem__(self, idx, component):
+
+        if isinstance(idx, slice):
+            values = list(ComponentList(component).iterValues())
+            rows = list(self.iterValues())
+            rows[idx] = values
+            self._replaceRows(rows)
+            return
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("ComponentList assignment index out of range")
+        self._setValues(idx, ifcId=component.ifcId,
+                originatingSystem=component.originatingSystem,
+                authoringtoolId=component.authoringtoolId)
+
+
+    def __delitem__(self, idx):
+
+        if isinstance(idx, slice) and idx.step in (None, 1):
+            (start, stop, _) = idx.indices(len(self))
+            stop = max(start, stop)
+            del self._guids[16 * start:16 * stop]
+        elif isinstance(idx, slice):
+            for row in sorted(range(len(self))[idx], reverse=True):
+                del self._guids[16 * row:16 * (row + 1)]
+        else:
+            row = idx + len(self) if idx < 0 else idx
+            if not 0 <= row < len(self):
+                raise IndexError("ComponentList index out of range")
+            del self._guids[16 * row:16 * (row + 1)]
+        del self._rawIds[idx]
+        del self._systemIdx[idx]
+        del self._toolIdIdx[idx]
+        self._index = None
+        invalidateFingerprint(self.containingObject)
+
+
+    def insert(self, idx, component):
+
+        if isinstance(component, tuple):
+            (ifcId, system, toolId) = component
+        else:
+            (ifcId, system, toolId) = (component.ifcId,
+                    component.originatingSystem, component.authoringtoolId)
+
+        if idx >= len(self):
+            self.appendValues(ifcId, system, toolId)
+            return
+        if idx < 0:
+            idx = max(0, idx + len(self))
+        (guid, raw) = self._encodeId(ifcId)
+        self._guids[16 * idx:16 * idx] = guid
+        self._rawIds.insert(idx, raw)
+        self._systemIdx.insert(idx, self._intern(system, self._systems,
+            self._systemLookup))
+        self._toolIdIdx.insert(idx, self._intern(toolId, self._toolIds,
+            self._toolIdLookup))
+        self._index = None
+        invalidateFingerprint(self.containingObject)
+
+
+    def append(self, component):
+
+        self.insert(len(self), component)
+
+
+    def extend(self, components):
+
+        if isinstance(components, ComponentList):
+            for row in range(len(components)):
+                self._copyRow(components, row)
+            invalidateFingerprint(self.containingObject)
+            return
+        for component in components:
+            self.append(component)
+
+
+    def _replaceRows(self, rows):
+
+        """ Replaces the whole content by `rows`, a list of value tuples """
+
+        del self[:]
+        for (ifcId, system, toolId) in rows:
+            self.appendValues(ifcId, system, toolId)
+
+
+    def __iter__(self):
+
+        for row in range(len(self)):
+            yield ComponentView(self, row)
+
+
+    def __contains__(self, component):
+
+        """ `component` may either be a `Component`, an IfcGuid or its integer
+        or UUID form. """
+
+        return self._componentKey(component) in self._getIndex()
+
+
+    def index(self, component, start = 0, stop = None):
+
+        row = self._getIndex().get(self._componentKey(component))
+        if row is not None and row >= start and (stop is None or row < stop):
+            return row
+        return MutableSequence.index(self, component, start,
+                stop if stop is not None else len(self))
+
+
+    def iterValues(self, rows = None):
+
+        """ Yields the members of every component (or of the components
+        selected by the slice `rows`) as tuple (ifcId, originatingSystem,
+        authoringtoolId). """
+
+        if rows is None:
+            ifcIds = self.ifcIdColumn()
+            for row in range(len(self)):
+                yield (ifcIds[row], self._systems[self._systemIdx[row]],
+                        self._toolIds[self._toolIdIdx[row]])
+            return
+
+        for row in range(len(self))[rows]:
+            yield (self._ifcIdAt(row), self._systems[self._systemIdx[row]],
+                    self._toolIds[self._toolIdIdx[row]])
+
+
+    def ifcIdColumn(self):
+
+        """ Returns the list of IfcGuids as strings. They are encoded all at
+        once through `ifcguid.compressAll()`. """
+
+        ifcIds = ifcguid.compressAll(self._guids)
+        return [ ifcId if raw is None else raw[0]
+                for (ifcId, raw) in zip(ifcIds, self._rawIds) ]
+
+
+    def ifcIdKeys(self):
+
+        """ Returns the list of IfcGuids as 128 bit integers. Values that are
+        no valid IfcGuid are returned as they are. """
+
+        guids = bytes(self._guids)
+        fromBytes = int.from_bytes
+        keys = [ fromBytes(guids[i:i + 16], "big")
+                for i in range(0, len(guids), 16) ]
+        for (row, raw) in enumerate(self._rawIds):
+            if raw is not None:
+                keys[row] = raw[0]
+        return keys
+
+
+    def systemColumn(self):
+
+        """ Yields the OriginatingSystem of every component """
+
+        return (self._systems[i] for i in self._systemIdx)
+
+
+    def toolIdColumn(self):
+
+        """ Yields the AuthoringToolId of every component """
+
+        return (self._toolIds[i] for i in self._toolIdIdx)
+
+
+    def ifcIdSet(self):
+
+        """ Returns the set of all IfcGuids in the list """
+
+        return set(ifcId for ifcId in self.ifcIdColumn() if ifcId is not None)
+
+
+    def ifcIdKeySet(self):
+
+        """ Returns the set of all IfcGuids in the list as integers """
+
+        return set(key for key in self.ifcIdKeys() if key is not None)
+
+
+    def _filtered(self, keep):
+
+        result = ComponentList()
+        for row in range(len(self)):
+            if keep(self._key(row)):
+                result._copyRow(self, row)
+        return result
+
+
+    def union(self, other):
+
+        """ Returns a new list holding the components of `self` followed by
+        those of `other` that are not contained in `self`. """
+
+        other = other if isinstance(other, ComponentList) else \
+                ComponentList(other)
+        own = self._getIndex()
+        result = deepcopy(self)
+        for row in range(len(other)):
+            if other._key(row) not in own:
+                result._copyRow(other, row)
+        return result
+
+
+    def intersection(self, other):
+
+        """ Returns a new list of the components of `self` that are also
+        contained in `other`. """
+
+        other = other if isinstance(other, ComponentList) else \
+                ComponentList(other)
+        otherIndex = other._getIndex()
+        return self._filtered(lambda key: key in otherIndex)
+
+
+    def difference(self, other):
+
+        """ Returns a new list of the components of `self` that are not
+        contained in `other`. """
+
+        other = other if isinstance(other, ComponentList) else \
+                ComponentList(other)
+        otherIndex = other._getIndex()
+        return self._filtered(lambda key: key not in otherIndex)
+
+
+    def getFingerprintParts(self):
+
+        """ Yields the columns of the list, which is much cheaper than
+        serializing every component. """
+
+        yield bytes(self._guids)
+        yield "\x1f".join([ "" if raw is None else repr(raw[0])
+            for raw in self._rawIds ])
+        yield "\x1f".join([ self._systems[i] for i in self._systemIdx ])
+        yield "\x1f".join([ self._toolIds[i] for i in self._toolIdIdx ])
+
+
+    def getEtElements(self, parent):
+
+        """ Serializes every component as `Component` node into `parent`. """
+
+        for (ifcId, system, toolId) in self.iterValues():
+            elem = ET.SubElement(parent, "Component")
+            if ifcId is not None:
+                elem.attrib["IfcGuid"] = str(ifcId)
+            if system != "":
+                ET.SubElement(elem, "OriginatingSystem").text = system
+            if toolId != "":
+                ET.SubElement(elem, "AuthoringToolId").text = toolId
+
+        return parent
+
+
+def toComponentList(components, containingObject):
+
+    """ Returns `components` as `ComponentList` owned by `containingObject`.
+    `None` results in an empty list. """
+
+    if not isinstance(components, ComponentList):
+        components = ComponentList(components)
+    components.containingObject = containingObject
+    return components
+
+
 class ComponentColour(Hierarchy, State, XMLName):
 
     """ Representing the XML type visinfo.xsd:ComponentColoring """
@@ -460,9 +1155,6 @@ class ComponentColour(Hierarchy, State, XMLName):
         self.colour = colour
         self.components = components
 
-        # set containingObject of complex members
-        listSetContainingElement(self.components, self)
-
 
     def __deepcopy__(self, memo):
 
@@ -497,6 +1189,18 @@ class ComponentColour(Hierarchy, State, XMLName):
         return ret_str
 
 
+    @property
+    def components(self):
+        return self._components
+
+    @components.setter
+    def components(self, newVal):
+
+        """ Lists of `Component`s are converted to a `ComponentList` """
+
+        self._components = toComponentList(newVal, self)
+
+
 
 class ViewSetupHints(Hierarchy, State, XMLName):
 
@@ -525,7 +1229,7 @@ class ViewSetupHints(Hierarchy, State, XMLName):
         cpyspacebound = deepcopy(self.spaceBoundariesVisible, memo)
         cpyspaces = deepcopy(self.spacesVisible, memo)
 
-        cpy = ViewSetupHints(cpyopenings, cpyspacebound, cpyspaces)
+        cpy = ViewSetupHints(cpyopenings, cpyspaces, cpyspacebound)
         cpy.state = self.state
         return cpy
 
@@ -561,7 +1265,7 @@ class ViewSetupHints(Hierarchy, State, XMLName):
         return elem
 
 
-class Components(Hierarchy, State, XMLName):
+class Components(Hierarchy, State, XMLName, Fingerprint):
 
     """ Representing the XML type visinfo.xsd:Components """
 
@@ -586,9 +1290,7 @@ class Components(Hierarchy, State, XMLName):
         # set containingObject for complex members
         if self.viewSetuphints is not None:
             self.viewSetuphints.containingObject = self
-        listSetContainingElement(self.selection, self)
         listSetContainingElement(self.colouring, self)
-        listSetContainingElement(self.visibilityExceptions, self)
 
 
     def __deepcopy__(self, memo):
@@ -617,6 +1319,10 @@ class Components(Hierarchy, State, XMLName):
         if type(self) != type(other):
             return False
 
+        # objects whose fingerprints differ cannot be equal
+        if fingerprintsDiffer(self, other):
+            return False
+
         return (self.viewSetuphints == other.viewSetuphints and
                 self.selection == other.selection and
                 self.visibilityDefault == other.visibilityDefault and
@@ -638,10 +1344,36 @@ class Components(Hierarchy, State, XMLName):
         return ret_str
 
 
+    @property
+    def selection(self):
+        return self._selection
+
+    @selection.setter
+    def selection(self, newVal):
+
+        """ Lists of `Component`s are converted to a `ComponentList` """
+
+        self._selection = toComponentList(newVal, self)
+
+    @property
+    def visibilityExceptions(self):
+        return self._visibilityExceptions
+
+    @visibilityExceptions.setter
+    def visibilityExceptions(self, newVal):
+
+        """ Lists of `Component`s are converted to a `ComponentList` """
+
+        self._visibilityExceptions = toComponentList(newVal, self)
+
+
     def _generateComponentList(self, parent, compList):
 
         """ Serializes `compList` and appens the new nodes to `parent` """
 
+        if isinstance(compList, ComponentList):
+            return compList.getEtElements(parent)
+
         for component in compList:
             newComponent = ET.SubElement(parent, "Component")
             newComponent = component.getEtElement(newComponent)
@@ -668,14 +1400,17 @@ class Components(Hierarchy, State, XMLName):
             selElem = self._generateComponentList(selElem, self.selection)
 
         visibilityElem = ET.SubElement(elem, "Visibility")
-        exceptionsElem = ET.SubElement(visibilityElem, "Exceptions")
-        exceptionsElem = self._generateComponentList(exceptionsElem,
-                self.visibilityExceptions)
+        visibilityElem.attrib["DefaultVisibility"] = str(
+                self.visibilityDefault).lower()
+        if len(self.visibilityExceptions) > 0:
+            exceptionsElem = ET.SubElement(visibilityElem, "Exceptions")
+            exceptionsElem = self._generateComponentList(exceptionsElem,
+                    self.visibilityExceptions)
 
         if len(self.colouring) > 0:
             colouringElem = ET.SubElement(elem, "Coloring")
             for col in self.colouring:
-                colourElem = ET.SubElement(elem, "Color")
+                colourElem = ET.SubElement(colouringElem, "Color")
                 if col.colour != "":
                     colourElem.attrib["Color"] = col.colour
 
@@ -685,7 +1420,26 @@ class Components(Hierarchy, State, XMLName):
         return elem
 
 
-class Viewpoint(Hierarchy, State, XMLName, Identifiable, XMLIdentifiable):
+    def getFingerprintParts(self):
+
+        """ Yields the members, the component lists contribute their columns
+        instead of their serialized form. """
+
+        if self.viewSetuphints is not None:
+            yield ET.tostring(self.viewSetuphints.getEtElement(
+                ET.Element("ViewSetupHints")), encoding="utf8")
+        yield str(self.visibilityDefault)
+        yield "Selection"
+        yield from self.selection.getFingerprintParts()
+        yield "Exceptions"
+        yield from self.visibilityExceptions.getFingerprintParts()
+        for col in self.colouring:
+            yield "Color {}".format(col.colour)
+            yield from col.components.getFingerprintParts()
+
+
+class Viewpoint(Hierarchy, State, XMLName, Identifiable, XMLIdentifiable,
+        Fingerprint):
 
     """ Representing the XML type visinfo.xsd:Viewpoint
 
@@ -761,6 +1515,10 @@ class Viewpoint(Hierarchy, State, XMLName, Identifiable, XMLIdentifiable):
         if type(self) != type(other):
             return False
 
+        # objects whose fingerprints differ cannot be equal
+        if fingerprintsDiffer(self, other):
+            return False
+
         return (self.xmlId == other.xmlId and
                 self.components == other.components and
                 self.oCamera == other.oCamera and
@@ -784,6 +1542,27 @@ class Viewpoint(Hierarchy, State, XMLName, Identifiable, XMLIdentifiable):
         return ret_str
 
 
+    def getFingerprintParts(self):
+
+        """ Yields the serialized viewpoint without its components. These,
+        possibly hundreds of thousands, contribute their own fingerprint. """
+
+        yield str(self.xmlId)
+        if self.components is not None:
+            yield self.components.getFingerprint()
+
+        elem = ET.Element(self.xmlName)
+        if self.oCamera is not None:
+            self.oCamera.getEtElement(ET.SubElement(elem, "OrthogonalCamera"))
+        if self.pCamera is not None:
+            self.pCamera.getEtElement(ET.SubElement(elem, "PerspectiveCamera"))
+        self._generateListElements(ET.SubElement(elem, "Lines"), self.lines)
+        self._generateListElements(ET.SubElement(elem, "ClippingPlanes"),
+                self.clippingPlanes)
+        self._generateListElements(elem, self.bitmaps)
+        yield ET.tostring(elem, encoding="utf8")
+
+
     def _generateListElements(self, parent, l):
 
         """ Serializes every item in `l` and appends them to `parent` as child.
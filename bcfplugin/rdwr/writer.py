@@ -35,16 +35,17 @@ The main functions of this file are `processProjectUpdates()` and
 import os
 import io # used for writing files in utf8
 import sys
+import shutil
 import logging
 import zipfile
 from uuid import UUID, uuid4
-from collections import deque
 
 import copy as c
 import xml.etree.ElementTree as ET
 import xml.dom.minidom as MD
 import bcfplugin
 import bcfplugin.util as util
+from bcfplugin.session import getSession, SNAPSHOT_CNT
 import bcfplugin.rdwr.reader as reader
 import bcfplugin.rdwr.interfaces.hierarchy as iH
 import bcfplugin.rdwr.interfaces.state as iS
@@ -52,6 +53,7 @@ import bcfplugin.rdwr.interfaces.identifiable as iI
 import bcfplugin.rdwr.markup as m
 import bcfplugin.rdwr.project as p
 import bcfplugin.rdwr.uri as u
+import bcfplugin.rdwr.viewpoint as v
 import bcfplugin.rdwr.version as version
 
 logger = bcfplugin.createLogger(__name__)
@@ -90,12 +92,11 @@ in `Markup`.
 """
 
 
-listElements = ["Comment", "DocumentReference", "RelatedTopic", "Labels"]
+listElements = {"Comment", "DocumentReference", "RelatedTopic", "Labels"}
 """ A list of elements that can occur multiple times in the corresponding XML file """
 
 
-projectUpdates = list()
-""" An ordered list of tuples.
+""" `projectUpdates` is an ordered list of tuples, held by the current session.
 
 Every tuple element denotes an addition,
 modification or deletion of exactly one object in the project. A tuple thereby
@@ -111,11 +112,8 @@ Following a schematic element is depicted:
 This list will contain all updates that were not processed.
 """
 
-SNAPSHOT_CNT = 5
-""" Amount of snapshots that will be kept in memory. """
-
-projectSnapshots = deque([None]*SNAPSHOT_CNT, SNAPSHOT_CNT)
-""" An ordered list of N elements.
+""" `projectSnapshots` is an ordered list of `SNAPSHOT_CNT` elements, held by
+the current session.
 
 Every element is a tuple previously
 held by `projectUpdates`. Every element of former list is, as soon as it is
@@ -124,6 +122,145 @@ It therefore serves as storage past plugin states and enables undo operations.
 """
 
 
+def __getattr__(name):
+
+    """ Returns `projectUpdates` and `projectSnapshots` of the current session
+    """
+
+    if name in ("projectUpdates", "projectSnapshots"):
+        return getattr(getSession(), name)
+    raise AttributeError("module {} has no attribute {}".format(__name__,
+        name))
+
+
+class ElementRouting:
+
+    """ Describes where in the working directory an element is written to.
+
+    The routing of an element is derived from the routing of its parent, so
+    that it is computed without walking up the hierarchy. `getRouting()`
+    stores it on the element, until the element or one of its ancestors
+    changes its parent.
+    """
+
+    def __init__(self, element, parent = None):
+
+        """ `parent` is the routing of the parent of `element`, None if
+        `element` has no parent """
+
+        self.hierarchy = (element,) + (parent.hierarchy if parent else ())
+        """ Hierarchy of the element, starting with the element itself """
+
+        name = element.__class__.__name__
+        parentName = (parent.hierarchy[0].__class__.__name__
+                if parent else None)
+
+        self.markup = (element if name == "Markup" else
+                parent.markup if parent else None)
+        """ Markup the element is part of """
+
+        self.listElement = None
+        """ First ancestor that may occur more than once in its XML parent """
+        if parent is not None:
+            self.listElement = (parent.hierarchy[0]
+                    if parentName in listElements else parent.listElement)
+
+        self._nearestReference = (element if name == "ViewpointReference"
+                else parent._nearestReference if parent else None)
+        """ The element itself or its nearest ancestor that is a viewpoint
+        reference """
+
+        self._inViewpoint = (name == "Viewpoint" or
+                (parent is not None and parent._inViewpoint))
+        self._inProject = (name == "Project" or
+                (parent is not None and parent._inProject))
+
+        self.viewpointReference = None
+        """ Viewpoint reference the element is written to, if it is part of a
+        viewpoint """
+        if name == "Viewpoint":
+            self.viewpointReference = (parent._nearestReference
+                    if parent else None)
+        elif parent is not None:
+            self.viewpointReference = parent.viewpointReference
+
+        self.fileType = None
+        """ Kind of file the element is written to: "Viewpoint", "Markup",
+        "Project" or `None` if it is not editable """
+
+        if self._inViewpoint:
+            self.fileType = "Viewpoint"
+        elif self.markup is not None:
+            self.fileType = "Markup"
+        elif self._inProject:
+            self.fileType = "Project"
+
+
+    def __reduce__(self):
+
+        # copies of an element compute their own routing
+        return (type(None), ())
+
+
+    @property
+    def topic(self):
+        return self.markup.topic if self.markup is not None else None
+
+
+    @property
+    def topicDir(self):
+        topic = self.topic
+        return str(topic.xmlId) if topic is not None else None
+
+
+    @property
+    def file(self):
+
+        if self.fileType == "Viewpoint":
+            if self.viewpointReference is None:
+                raise ValueError("ViewpointReference is not in Hierarchy of"\
+                        " Viewpoint")
+            return self.viewpointReference.file
+        elif self.fileType == "Markup":
+            return markupFileName
+        elif self.fileType == "Project":
+            return projectFileName
+        # This can only happen if someone wants to change the version file,
+        # which is not editable in the plugin
+        return None
+
+
+    @property
+    def listElementId(self):
+
+        if isinstance(self.listElement, iI.XMLIdentifiable):
+            return self.listElement.xmlId
+        return None
+
+
+def getRouting(element):
+
+    """ Returns the ElementRouting of `element`.
+
+    The routing is computed once and stored on the element, see
+    `Hierarchy`. It is derived from the routing of the parent, which is
+    thereby stored as well.
+    """
+
+    if not isinstance(element, iH.Hierarchy):
+        return ElementRouting(element)
+
+    routing = getattr(element, "_routing", None)
+    if routing is not None:
+        return routing
+
+    parent = element.containingObject
+    routing = ElementRouting(element,
+            getRouting(parent) if parent is not None else None)
+    element._routing = routing
+    return routing
+
+
 def getUniqueIdOfListElementInHierarchy(element):
 
     """ Returns the id of the list element `element` is a child of.
@@ -136,58 +273,17 @@ def getUniqueIdOfListElementInHierarchy(element):
     returned.
     """
 
-    logger.debug("Looking for list element in Hierarchy of {} and "
-            " retrieving its id".format(element.__class__))
-    elementHierarchy = iH.Hierarchy.checkAndGetHierarchy(element)
-    if not elementHierarchy:
-        logger.debug("No hierarchy could be found")
-        return None
-
-    listElement = None
-    # climb up the hierarchy starting with the direct parent
-    for item in elementHierarchy[1:]:
-        if item.__class__.__name__ in listElements:
-            listElement = item
-            break
-
-    if isinstance(listElement, iI.XMLIdentifiable):
-        logger.debug("Id of list element found {}".format(item.xmlId))
-        return item.xmlId
-
-    logger.debug("No id found for the list item")
-    return None
+    listElementId = getRouting(element).listElementId
+    logger.debug("Id of list element in hierarchy of {} is {}".format(
+        element.__class__, listElementId))
+    return listElementId
 
 
 def getFileOfElement(element):
 
     """ Returns the name of the file `element` has to be written to. """
 
-    logger.debug("Getting file {} is to be written to".format(element.__class__))
-    elementHierarchy = iH.Hierarchy.checkAndGetHierarchy(element)
-    if not elementHierarchy: # element cannot be modified
-        logger.debug("No hierarchy could be generated => no file can be found")
-        return None
-
-    strHierarchy = [ item.__class__.__name__ for item in elementHierarchy ]
-    file = ""
-    if "Viewpoint" in strHierarchy:
-        try:
-            vpRefIndex = strHierarchy.index("ViewpointReference")
-        except Exception as e:
-            logger.error("ViewpointReference is not in Hierarchy of Viewpoint")
-            raise e
-        else:
-            file = elementHierarchy[vpRefIndex].file
-            return viewpointFile
-
-    elif "Markup" in strHierarchy:
-        file = markupFileName
-    elif "Project" in strHierarchy:
-        file = projectFileName
-
-    if file == "":
-        # This can only happen if someone wants to change the version file, which is not editable in the plugin
-        return None
+    file = getRouting(element).file
     logger.debug("File {} belongs to is {}".format(element.__class__,
         file))
     return file
@@ -200,26 +296,10 @@ def getTopicOfElement(element):
     This is used to generate the right path to the file that shall be edited.
     """
 
-    logger.debug("Getting reference to instance of topic associated with"\
-            " {}".format(element))
-    elementHierarchy = iH.Hierarchy.checkAndGetHierarchy(element)
-    if not elementHierarchy: # just check for sanity
-        logger.debug("No hierarchy could be generated => element cannot be"\
-            " associated to a topic")
-        return None
-
-    strHierarchy = [ item.__class__.__name__ for item in elementHierarchy ]
-    if "Markup" in strHierarchy:
-        markupElem = None
-        for item in elementHierarchy:
-            if isinstance(item, m.Markup):
-                markupElem = item
-                break
-        logger.debug("Element {} is associated to topic {}".format(element,
-            markupElem.topic))
-        return markupElem.topic
-
-    return None
+    topic = getRouting(element).topic
+    logger.debug("Element {} is associated to topic {}".format(element,
+        topic))
+    return topic
 
 
 def getEtElementById(elemId, elemName, etRoot):
@@ -266,7 +346,7 @@ def getParentElement(element, etRoot):
 
     logger.debug("Getting parent of {} in subtree of"\
             " {}".format(element, etRoot))
-    elementHierarchy = element.getHierarchyList()
+    elementHierarchy = getRouting(element).hierarchy
     strHierarchy = [ elem.xmlName for elem in elementHierarchy ]
     parentName = strHierarchy[1]
 
@@ -362,7 +442,7 @@ def getXMLNodeCandidates(rootElem: ET.Element, wantedElement):
     This function searches `rootElem` for elements that have the same name as
     `wantedElement` as well as the same hierarchy.
     The hierarchy of `wantedElement` is retrieved by
-    `XMLName.getHierarchyList()` and is then trimmed at the front till the first
+    `getRouting()` and is then trimmed at the front till the first
     element is a first order child of rootElem.
     Out of this hierarchy list a XML path expression is generated that is used
     for searching `rootElem` for the list of possible candidates.
@@ -370,8 +450,7 @@ def getXMLNodeCandidates(rootElem: ET.Element, wantedElement):
 
     logger.debug("Searching {} for matches likely to equal {}".format(
         rootElem, wantedElement.__class__))
-    elementHierarchy = wantedElement.getHierarchyList()
-    elementHierarchy.reverse()
+    elementHierarchy = list(reversed(getRouting(wantedElement).hierarchy))
 
     # delete all elements in the hierarchy before rootElem
     i = len(elementHierarchy) -1
@@ -540,12 +619,7 @@ def getTopicDir(element):
     is part of.
     """
 
-    topic = getTopicOfElement(element)
-    if not topic:
-        return None
-
-    topicDir = str(topic.xmlId)
-    return topicDir
+    return getRouting(element).topicDir
 
 
 def writeXMLFile(xmlroot, filePath):
@@ -804,7 +878,6 @@ def deleteElement(element):
 
     logger.debug("Deleting element {} from the working"\
             " directory".format(element.__class__))
-    elementHierarchy = element.getHierarchyList()
 
     logger.debug("Deleting element {}".format(element))
     # filename in which `element` will be found
@@ -864,18 +937,44 @@ def deleteElement(element):
 
 
 
+def _rewriteViewpoint(element):
+
+    """ Helper function for `modifyElement`. Overwrites the viewpoint file of
+    `element` with the serialized contents of `element`.
+    """
+
+    fileName = getFileOfElement(element)
+    if not fileName:
+        raise ValueError("For {} no viewpoint file can be"\
+                " found".format(element))
+
+    topicPath = os.path.join(util.getBcfDir(), getTopicDir(element))
+    visinfoRootEtElem = ET.Element("", {})
+    element.getEtElement(visinfoRootEtElem)
+
+    vpFilePath = os.path.join(topicPath, str(fileName))
+    logger.debug("Rewriting viewpoint file {}".format(vpFilePath))
+    writeXMLFile(visinfoRootEtElem, vpFilePath)
+
+
 def modifyElement(element, previousValue):
 
     """ Updates the xml node corresponding to `element` in the correct file in
     the working directory.
 
-    `element` has to be of type Attribute or SimpleElement. Other elements
-    (e.g. comments, viewpoints, etc.) must not be of state modified since the
-    modification is inside an child-member.
+    `element` has to be of type Attribute, SimpleElement or Viewpoint. Other
+    elements (e.g. comments, etc.) must not be of state modified since the
+    modification is inside an child-member. A viewpoint is written as a whole,
+    this covers changes of its components, which have no identity of their
+    own (see `ComponentView`).
     """
 
     logger.debug("Modifying element {}, its previous value was"\
             " '{}'".format(element.__class__, previousValue))
+    if isinstance(element, v.Viewpoint):
+        _rewriteViewpoint(element)
+        return
+
     if not (issubclass(type(element), p.SimpleElement) or
             issubclass(type(element), p.Attribute)):
         raise ValueError("Element is not an attribute or simple element. Only"\
@@ -923,7 +1022,7 @@ def addProjectUpdate(project: p.Project, element, prevVal):
     `element` actually has changed since the last read/write.
     """
 
-    global projectUpdates
+    projectUpdates = getSession().projectUpdates
 
     projectCpy = c.deepcopy(project)
     # copy element and morph it into the hierarchy of the copied project
@@ -997,7 +1096,6 @@ def handleDeleteElement(element, oldVal):
     """
 
     try:
-        elementHierarchy = element.getHierarchyList()
         deleteElement(element)
 
     except ValueError as err:
@@ -1049,6 +1147,7 @@ def updateProjectSnapshots(newUpdates):
 
     logger.debug("Adding {} new snapshots to snapshot"\
             " dequeue".format(len(newUpdates)))
+    projectSnapshots = getSession().projectSnapshots
     for newUpdate in newUpdates:
         projectSnapshots.append(newUpdate)
 
@@ -1057,7 +1156,7 @@ def updateProjectUpdates(successfullyProcessed):
 
     """ Remove all elements in `successfullyProcessed` from `projectUpdates` """
 
-    global projectUpdates
+    projectUpdates = getSession().projectUpdates
 
     logger.debug("Removing {} successfully processed update(s) from the"\
         " projectUpdates list".format(len(successfullyProcessed)))
@@ -1077,7 +1176,7 @@ def processProjectUpdates():
     Otherwise the failed update will be returned.
     """
 
-    global projectUpdates
+    projectUpdates = getSession().projectUpdates
 
     logger.debug("Processing {} update(s)".format(len(projectUpdates)))
     # list of all updates that were successfully processed
@@ -1120,24 +1219,91 @@ def processProjectUpdates():
         return None
 
 
-def recursiveZipping(curDir, zipFile):
+def addMarkups(markups, files = None):
+
+    """ Writes the new topics `markups` to the working directory in one batch.
+
+    Unlike going through `addProjectUpdate()` no copy of the project is made
+    per topic, so this is meant for adding many topics at once. `files` maps
+    the GUID of a topic, as string, to a dictionary of file names and contents
+    (bytes) that are written into its directory, like snapshots. Their paths
+    are appended to the `snapshotFiles` of the markup.
+    If one topic could not be written, all directories created so far are
+    removed again and `False` is returned. Otherwise `True` is returned.
+    """
+
+    files = files or dict()
+    bcfPath = util.getBcfDir()
+    created = list()
+    try:
+        for markup in markups:
+            topicPath = os.path.join(bcfPath, getTopicDir(markup))
+            if os.path.exists(topicPath):
+                raise RuntimeError("The topic {} does already"\
+                        " exist.".format(getTopicDir(markup)))
+            created.append(topicPath)
+            _createMarkup(markup, topicPath)
+            for (name, content) in files.get(getTopicDir(markup),
+                    dict()).items():
+                filePath = os.path.join(topicPath, name)
+                with open(filePath, "wb") as f:
+                    f.write(content)
+                markup.snapshotFiles.append(filePath)
+    except Exception as err:
+        writeHandlerErrMsg("The topics could not be written. Removing the"\
+                " {} topics written so far.".format(len(created)), err)
+        for topicPath in created:
+            shutil.rmtree(topicPath, ignore_errors=True)
+        return False
+
+    util.setDirty(True)
+    return True
+
+
+def writeMarkup(markup: m.Markup):
+
+    """ Overwrites the markup.bcf file of `markup` with its current contents.
+
+    This is meant for replacing several parts of a topic at once, e.g. when
+    it was changed by another application. Viewpoint files are left as they
+    are. Returns `False` if the file could not be written.
+    """
+
+    markupPath = os.path.join(util.getBcfDir(), getTopicDir(markup),
+            markupFileName)
+    try:
+        markupXMLRoot = markup.getEtElement(ET.Element("Markup", {}))
+        writeXMLFile(markupXMLRoot, markupPath)
+    except Exception as err:
+        writeHandlerErrMsg("The markup of topic {} could not be"\
+                " written.".format(getTopicDir(markup)), err)
+        return False
+
+    util.setDirty(True)
+    return True
+
+
+def recursiveZipping(curDir, zipFile, rootDir = ""):
 
     """ Recursively walks through curDir and adds the contents to zipFile.
 
     Directories are added before the files in the directory. For every step
     deeper recursiveZipping is called => for every sudirectory recursiveZipping
     is called once.
+    `curDir` is relative to `rootDir`, and the contents are archived under
+    their path relative to `rootDir`. Other than changing the working
+    directory of the process, this is safe to use from several threads.
     """
 
-    for (root, dirs, files) in os.walk(curDir):
+    for (root, dirs, files) in os.walk(os.path.join(rootDir, curDir)):
         for dir in dirs:
             dirPath = os.path.join(curDir, dir)
-            zipFile.write(dirPath)
-            zipFile = recursiveZipping(dirPath, zipFile)
+            zipFile.write(os.path.join(rootDir, dirPath), dirPath)
+            zipFile = recursiveZipping(dirPath, zipFile, rootDir)
 
         for file in files:
             filePath = os.path.join(curDir, file)
-            zipFile.write(filePath)
+            zipFile.write(os.path.join(rootDir, filePath), filePath)
 
         # don't use the recursive behavior of os.walk()
         # only look in the current directory `curDir`
@@ -1157,9 +1323,8 @@ def zipToBcfFile(bcfRootPath, dstFile):
     """
 
     logger.debug("Writing working directory to file {}".format(dstFile))
-    with util.cd(bcfRootPath):
-        with zipfile.ZipFile(dstFile, "w") as zipFile:
-            recursiveZipping("./", zipFile)
+    with zipfile.ZipFile(dstFile, "w") as zipFile:
+        recursiveZipping("./", zipFile, bcfRootPath)
 
     util.setDirty(False)
     return dstFile
@@ -0,0 +1,600 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file provides a small HTTP server that gives read access to the project
+of a session through the routes of the BCF-API (version 2.1):
+
+    GET /bcf/versions
+    GET /bcf/2.1/projects[/{project_id}]
+    GET /bcf/2.1/projects/{project_id}/topics[/{topic_guid}]
+    GET /bcf/2.1/projects/{project_id}/topics/{topic_guid}/comments[/{guid}]
+    GET /bcf/2.1/projects/{project_id}/topics/{topic_guid}/viewpoints[/{guid}]
+    GET /bcf/2.1/projects/{project_id}/topics/{topic_guid}/viewpoints/{guid}/snapshot
+
+The list of topics can be paged through the query parameters `$top` and
+`$skip`. Bodies are the JSON objects of `bcfapi`.
+
+Every response carries an ETag derived from the fingerprints of the objects
+it is built of, so a request with a matching If-None-Match header is answered
+with 304 without serializing anything. Bodies are gzip compressed if the
+client accepts it. Requests are handled by a fixed pool of threads, all
+reading the same project; the project must therefore not be changed while the
+server is running. The server only uses the standard library:
+
+    python -m bcfplugin.server issues.bcf --port 8080
+"""
+
+import re
+import os
+import sys
+import gzip
+import json
+import time
+import socket
+import hashlib
+import argparse
+import selectors
+import threading
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import bcfplugin
+import bcfplugin.rdwr.bcfapi as bcfapi
+import bcfplugin.programmaticInterface as pI
+from bcfplugin.session import Session, getSession
+
+logger = bcfplugin.createLogger(__name__)
+
+apiVersion = "2.1"
+""" Version of the BCF-API the routes follow """
+
+minGzipSize = 512
+""" Bodies smaller than this many bytes are sent uncompressed """
+
+gzipLevel = 6
+""" Compression level of gzip compressed bodies """
+
+idlePollInterval = 0.05
+""" Seconds an idle kept alive connection waits for its next request before it
+checks again whether its thread is needed for another connection """
+
+
+def _etag(*parts):
+
+    """ Returns a strong ETag over `parts`, strings or bytes """
+
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf8")
+        digest.update(part)
+        digest.update(b"\0")
+    return '"{}"'.format(digest.hexdigest())
+
+
+class NotFound(Exception):
+
+    """ Raised by a route if the requested object does not exist """
+
+
+class Response:
+
+    """ Body of a response that is only built if the client does not have it
+    yet. `build` returns the body as bytes. """
+
+    def __init__(self, etag: str, build, contentType: str = "application/json"):
+
+        self.etag = etag
+        self.build = build
+        self.contentType = contentType
+
+
+def _json(data):
+
+    return json.dumps(data, ensure_ascii=False).encode("utf8")
+
+
+class PooledHTTPServer(HTTPServer):
+
+    """ HTTP server handling requests in a fixed pool of `workers` threads,
+    instead of starting a thread per request like `ThreadingHTTPServer`.
+
+    A connection occupies one thread as long as it is open. Handled by a
+    `PooledRequestHandler`, an idle connection is therefore closed after a
+    short time, or as soon as other connections wait for a thread. Connections
+    that are still open when the server is closed are shut down.
+    """
+
+    def __init__(self, address, handlerClass, workers: int = 8):
+
+        HTTPServer.__init__(self, address, handlerClass)
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers,
+                thread_name_prefix="bcfplugin-http")
+        self._connections = set()
+        self._connectionsLock = threading.Lock()
+        self._thread = None
+
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+    @property
+    def url(self):
+        return "http://{}:{}/bcf".format(self.server_address[0], self.port)
+
+
+    def __enter__(self):
+
+        self.start()
+        return self
+
+
+    def __exit__(self, etype, value, traceback):
+        self.stop()
+
+
+    def start(self):
+
+        """ Serves requests in a background thread until `stop()` is called """
+
+        self._thread = threading.Thread(target=self.serve_forever,
+                name="bcfplugin-http-server", daemon=True)
+        self._thread.start()
+        logger.info("Serving at {}".format(self.url))
+
+
+    def stop(self):
+
+        """ Stops serving and closes the socket and the thread pool """
+
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+    def process_request(self, request, clientAddress):
+
+        with self._connectionsLock:
+            self._connections.add(request)
+        self.pool.submit(self._processRequest, request, clientAddress)
+
+
+    def connectionsWaiting(self):
+
+        """ Returns True if connections wait for a thread of the pool """
+
+        with self._connectionsLock:
+            return len(self._connections) > self.workers
+
+
+    def _processRequest(self, request, clientAddress):
+
+        try:
+            self.finish_request(request, clientAddress)
+        except Exception:
+            self.handle_error(request, clientAddress)
+        finally:
+            with self._connectionsLock:
+                self._connections.discard(request)
+            self.shutdown_request(request)
+
+
+    def server_close(self):
+
+        HTTPServer.server_close(self)
+        with self._connectionsLock:
+            for connection in self._connections:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self.pool.shutdown(wait=True)
+
+
+class PooledRequestHandler(BaseHTTPRequestHandler):
+
+    """ Handler of the connections of a `PooledHTTPServer`.
+
+    Between two requests of a kept alive connection the handler waits at most
+    `keepAliveTimeout` seconds for the next one, and gives up the connection
+    as soon as other connections wait for a thread. Thereby idle clients
+    cannot occupy the whole pool. `timeout` limits how long the first request
+    of a connection, and any request that has been started, may take to
+    arrive.
+    """
+
+    protocol_version = "HTTP/1.1"
+    timeout = 30
+    keepAliveTimeout = 5
+    # headers and body are written separately, without this every response
+    # of a kept alive connection waits for the delayed ACK of the client
+    disable_nagle_algorithm = True
+
+    def handle(self):
+
+        self.close_connection = True
+        self.handle_one_request()
+        if self.close_connection:
+            return
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.connection, selectors.EVENT_READ)
+            while self._awaitRequest(selector):
+                self.handle_one_request()
+                if self.close_connection:
+                    return
+
+
+    def _awaitRequest(self, selector):
+
+        """ Returns True as soon as the next request of the connection
+        arrives. False is returned if the connection stayed idle for
+        `keepAliveTimeout` seconds, or if its thread is needed. `selector`
+        has the connection registered. """
+
+        # the next request may already be read into the buffer of `rfile`
+        try:
+            self.connection.settimeout(0.0)
+            buffered = len(self.rfile.peek(1)) > 0
+            self.connection.settimeout(self.timeout)
+        except OSError:
+            return False
+        if buffered:
+            return True
+
+        deadline = time.monotonic() + self.keepAliveTimeout
+        while not self.server.connectionsWaiting():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # a closed connection is readable as well
+            if selector.select(min(remaining, idlePollInterval)):
+                return True
+        return False
+
+
+class BcfApiServer(PooledHTTPServer):
+
+    """ Serves the project of `session`, by default of the current session.
+
+    `port` 0 selects a free port, see `port` for the one that was chosen.
+    """
+
+    def __init__(self, session: Session = None, host: str = "127.0.0.1",
+            port: int = 0, workers: int = 8):
+
+        self.session = session or getSession()
+        PooledHTTPServer.__init__(self, (host, port), BcfApiHandler, workers)
+        self._markups = (None, None, dict())
+        """ (project, number of topics, markups by topic GUID), built on
+        first use """
+        self._markupsLock = threading.Lock()
+
+
+    @property
+    def project(self):
+
+        project = self.session.project
+        if project is None:
+            raise NotFound("No project is open")
+        return project
+
+
+    def getMarkup(self, projectId: str, topicGuid: str):
+
+        """ Returns the markup of the topic `topicGuid` """
+
+        project = self.getProject(projectId)
+        (cachedProject, count, markups) = self._markups
+        if cachedProject is not project or count != len(project.topicList):
+            with self._markupsLock:
+                markups = { str(markup.topic.xmlId): markup
+                        for markup in project.topicList
+                        if markup.topic is not None }
+                self._markups = (project, len(project.topicList), markups)
+
+        markup = markups.get(topicGuid.lower())
+        if markup is None:
+            raise NotFound("Topic {} does not exist".format(topicGuid))
+        return markup
+
+
+    def getProject(self, projectId: str):
+
+        project = self.project
+        if projectId.lower() != str(project.xmlId):
+            raise NotFound("Project {} does not exist".format(projectId))
+        return project
+
+
+    def versions(self, query):
+
+        data = { "versions": [ { "api_id": "bcf",
+            "version_id": apiVersion,
+            "detailed_version": "https://github.com/buildingSMART/BCF-API" } ] }
+        return Response(_etag(apiVersion), lambda: _json(data))
+
+
+    def _projectJson(self, project):
+
+        return { "project_id": str(project.xmlId), "name": project.name }
+
+
+    def projects(self, query):
+
+        project = self.project
+        return Response(_etag(str(project.xmlId), project.name),
+                lambda: _json([ self._projectJson(project) ]))
+
+
+    def projectDetail(self, query, projectId):
+
+        project = self.getProject(projectId)
+        return Response(_etag(str(project.xmlId), project.name),
+                lambda: _json(self._projectJson(project)))
+
+
+    def topics(self, query, projectId):
+
+        project = self.getProject(projectId)
+        try:
+            skip = int(query.get("$skip", ["0"])[0])
+            top = query.get("$top")
+            top = int(top[0]) if top is not None else None
+        except ValueError:
+            raise NotFound("$top and $skip have to be integers")
+
+        topics = project.getTopicIndex().query(offset=skip, limit=top)
+        return Response(_etag(str(skip), str(top),
+                *[ topic.getFingerprint() for topic in topics ]),
+            lambda: _json([ bcfapi.topicToJson(topic) for topic in topics ]))
+
+
+    def topicDetail(self, query, projectId, topicGuid):
+
+        topic = self.getMarkup(projectId, topicGuid).topic
+        return Response(_etag(topic.getFingerprint()),
+                lambda: _json(bcfapi.topicToJson(topic)))
+
+
+    def comments(self, query, projectId, topicGuid):
+
+        markup = self.getMarkup(projectId, topicGuid)
+        comments = list(markup.comments)
+        guid = str(markup.topic.xmlId)
+        return Response(_etag(guid,
+                *[ comment.getFingerprint() for comment in comments ]),
+            lambda: _json([ bcfapi.commentToJson(comment, guid)
+                for comment in comments ]))
+
+
+    def commentDetail(self, query, projectId, topicGuid, commentGuid):
+
+        markup = self.getMarkup(projectId, topicGuid)
+        for comment in markup.comments:
+            if str(comment.xmlId) == commentGuid.lower():
+                return Response(_etag(comment.getFingerprint()),
+                        lambda: _json(bcfapi.commentToJson(comment,
+                            str(markup.topic.xmlId))))
+        raise NotFound("Comment {} does not exist".format(commentGuid))
+
+
+    def _viewpointEtag(self, vpRef):
+
+        vp = vpRef.viewpoint
+        return (str(vpRef.xmlId), str(vpRef.index),
+                vp.getFingerprint() if vp is not None else "")
+
+
+    def viewpoints(self, query, projectId, topicGuid):
+
+        markup = self.getMarkup(projectId, topicGuid)
+        vpRefs = list(markup.viewpoints)
+        return Response(_etag(*[ part for vpRef in vpRefs
+                for part in self._viewpointEtag(vpRef) ]),
+            lambda: _json([ bcfapi.viewpointToJson(vpRef)
+                for vpRef in vpRefs ]))
+
+
+    def _getViewpointReference(self, projectId, topicGuid, viewpointGuid):
+
+        markup = self.getMarkup(projectId, topicGuid)
+        for vpRef in markup.viewpoints:
+            if str(vpRef.xmlId) == viewpointGuid.lower():
+                return (markup, vpRef)
+        raise NotFound("Viewpoint {} does not exist".format(viewpointGuid))
+
+
+    def viewpointDetail(self, query, projectId, topicGuid, viewpointGuid):
+
+        (markup, vpRef) = self._getViewpointReference(projectId, topicGuid,
+                viewpointGuid)
+        return Response(_etag(*self._viewpointEtag(vpRef)),
+                lambda: _json(bcfapi.viewpointToJson(vpRef)))
+
+
+    def snapshot(self, query, projectId, topicGuid, viewpointGuid):
+
+        (markup, vpRef) = self._getViewpointReference(projectId, topicGuid,
+                viewpointGuid)
+        if vpRef.snapshot is None or self.session.bcfDir is None:
+            raise NotFound("Viewpoint {} has no snapshot".format(viewpointGuid))
+
+        path = os.path.join(self.session.bcfDir, str(markup.topic.xmlId),
+                str(vpRef.snapshot))
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            raise NotFound("Snapshot {} does not exist".format(vpRef.snapshot))
+
+        contentType = ("image/jpeg" if path.lower().endswith((".jpg", ".jpeg"))
+                else "image/png")
+        return Response(_etag(content), lambda: content, contentType)
+
+
+_guid = "([0-9a-fA-F-]{36})"
+_projectRoute = "/bcf/{}/projects/{}".format(re.escape(apiVersion), _guid)
+_topicRoute = _projectRoute + "/topics/" + _guid
+
+routes = [ (re.compile(pattern + "/?$"), name) for (pattern, name) in [
+    ("/bcf/versions", "versions"),
+    ("/bcf/{}/projects".format(re.escape(apiVersion)), "projects"),
+    (_projectRoute, "projectDetail"),
+    (_projectRoute + "/topics", "topics"),
+    (_topicRoute, "topicDetail"),
+    (_topicRoute + "/comments", "comments"),
+    (_topicRoute + "/comments/" + _guid, "commentDetail"),
+    (_topicRoute + "/viewpoints", "viewpoints"),
+    (_topicRoute + "/viewpoints/" + _guid, "viewpointDetail"),
+    (_topicRoute + "/viewpoints/" + _guid + "/snapshot", "snapshot") ] ]
+""" Pairs of the regular expression matching the path of a route and the name
+of the method of `BcfApiServer` answering it. The groups of the expression are
+passed to the method. """
+
+
+class BcfApiHandler(PooledRequestHandler):
+
+    """ Answers GET and HEAD requests through the routes of its
+    `BcfApiServer` """
+
+    server_version = "bcfplugin/" + apiVersion
+
+    def log_message(self, format, *args):
+
+        logger.debug("{} {}".format(self.address_string(), format % args))
+
+
+    def do_GET(self):
+        self._answer(True)
+
+
+    def do_HEAD(self):
+        self._answer(False)
+
+
+    def _route(self):
+
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        for (pattern, name) in routes:
+            match = pattern.match(url.path)
+            if match is not None:
+                return getattr(self.server, name)(query, *match.groups())
+        raise NotFound("{} does not exist".format(url.path))
+
+
+    def _matches(self, etag):
+
+        header = self.headers.get("If-None-Match")
+        if header is None:
+            return False
+        tags = [ tag.strip() for tag in header.split(",") ]
+        return "*" in tags or etag in tags or\
+                etag[:-1] + '-gzip"' in tags
+
+
+    def _answer(self, sendBody: bool):
+
+        try:
+            response = self._route()
+        except NotFound as err:
+            response = Response(None, lambda: _json({ "message": str(err) }))
+            self._send(404, response.build(), response.contentType, None,
+                    sendBody)
+            return
+
+        if self._matches(response.etag):
+            self.send_response(304)
+            self.send_header("ETag", response.etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self._send(200, response.build(), response.contentType,
+                response.etag, sendBody)
+
+
+    def _send(self, code, body, contentType, etag, sendBody):
+
+        encoding = None
+        accepted = self.headers.get("Accept-Encoding", "")
+        if len(body) >= minGzipSize and "gzip" in accepted:
+            body = gzip.compress(body, gzipLevel)
+            encoding = "gzip"
+            if etag is not None:
+                etag = etag[:-1] + '-gzip"'
+
+        self.send_response(code)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        if sendBody:
+            self.wfile.write(body)
+
+
+def main(argv = None):
+
+    """ Opens a BCF file in a new session and serves it until interrupted.
+    Returns the exit code. """
+
+    parser = argparse.ArgumentParser(prog="bcfserver",
+            description="Serve a BCF file through BCF-API routes.")
+    parser.add_argument("bcfFile")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("-j", "--workers", type=int, default=8,
+            help="number of threads answering requests")
+    args = parser.parse_args(argv)
+
+    with Session() as session:
+        if pI.openProject(args.bcfFile) != pI.OperationResults.SUCCESS:
+            print("{} could not be opened".format(args.bcfFile),
+                    file=sys.stderr)
+            return 1
+
+        server = BcfApiServer(session, args.host, args.port, args.workers)
+        print("Serving {} at {}".format(args.bcfFile, server.url))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
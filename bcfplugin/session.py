@@ -0,0 +1,196 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file provides `Session`. A session owns everything that belongs to one
+open project: the data model, the BCF file it was read from, the temporary
+directory with the working directory of the project, and the queue of updates
+that still have to be written.
+
+`programmaticInterface`, `writer` and `util` always work on the current
+session, see `getSession()`. Which session is current is stored in a context
+variable, so every thread and every asyncio task can work on its own session:
+
+    with Session() as session:
+        pI.openProject("a.bcf")
+        ...
+        pI.closeProject()
+
+Code that never activates a session works on the default session, which
+gives the plugin its behavior of having one project open at a time.
+
+All state of a session is kept in memory. A session created with
+`persistent=True` additionally writes its dirty bit and author to its
+temporary directory whenever they change. This directory is kept if the
+process crashes, and the next persistent session opening a project resumes it
+with `util.recoverSession()`.
+"""
+
+import os
+import shutil
+import weakref
+import contextvars
+from collections import deque
+
+SNAPSHOT_CNT = 5
+""" Amount of processed updates every session keeps in memory """
+
+_currentSession = contextvars.ContextVar("bcfplugin_session", default=None)
+""" The session activated in the current context, if any """
+
+_defaultSession = None
+""" Session used in contexts that did not activate one """
+
+_liveSessions = weakref.WeakSet()
+""" All sessions of this process that were not closed yet """
+
+
+class Session:
+
+    """ State of one open project.
+
+    `project` and `bcfFile` are set by `programmaticInterface.openProject()`.
+    `tmpDir` is the temporary directory of the session, it is created on first
+    use by `util.getSystemTmp()`. `bcfDir` is the working directory of the
+    project, a directory in `tmpDir` the BCF file got extracted to.
+    `projectUpdates` and `projectSnapshots` are the pending respectively the
+    last processed updates of `writer`. `dirty` tells whether the working
+    directory holds changes that were not saved to a BCF file yet, `author`
+    is the email address used for modifications.
+
+    A session is activated in the current context through `activate()`, or
+    by using it as context manager, which also closes it on exit.
+    """
+
+    def __init__(self, persistent: bool = False):
+
+        self.persistent = persistent
+        """ If set, `dirty` and `author` are written through to files in
+        `tmpDir`, see `util.setDirty()` and `util.setAuthor()` """
+
+        self.project = None
+        self.bcfFile = None
+        self.tmpDir = None
+        self.bcfDir = None
+        self.projectUpdates = list()
+        self.projectSnapshots = deque([None]*SNAPSHOT_CNT, SNAPSHOT_CNT)
+        self.dirty = False
+        self.author = None
+
+        self.ownedDirs = list()
+        """ Temporary directories created for this session. They are deleted
+        when the session is closed. """
+
+        self._tokens = list()
+        _liveSessions.add(self)
+
+
+    def __enter__(self):
+
+        self._tokens.append(activate(self))
+        return self
+
+
+    def __exit__(self, etype, value, traceback):
+
+        _currentSession.reset(self._tokens.pop())
+        self.close()
+
+
+    def isOpen(self):
+
+        """ Returns True if a project is open in this session """
+
+        return self.project is not None
+
+
+    def close(self):
+
+        """ Drops the project and the author and deletes the temporary
+        directories of the session. The session can be used again afterwards.
+        """
+
+        self.project = None
+        self.author = None
+        self.bcfFile = None
+        self.projectUpdates.clear()
+        self.projectSnapshots.extend([None]*SNAPSHOT_CNT)
+        self.deleteDirs()
+
+
+    def deleteDirs(self):
+
+        """ Deletes the temporary directories of the session with all their
+        contents """
+
+        for path in self.ownedDirs:
+            shutil.rmtree(path, ignore_errors=True)
+        self.ownedDirs.clear()
+        self.tmpDir = None
+        self.bcfDir = None
+        self.dirty = False
+
+
+def activate(session: Session):
+
+    """ Makes `session` the current session of the calling context. Returns a
+    token that can be passed to `deactivate()` to restore the previous one. """
+
+    return _currentSession.set(session)
+
+
+def deactivate(token):
+
+    """ Restores the session that was current before `activate()` returned
+    `token` """
+
+    _currentSession.reset(token)
+
+
+def getSession():
+
+    """ Returns the current session.
+
+    This is the session activated in the calling context, or the default
+    session if none was activated.
+    """
+
+    global _defaultSession
+
+    session = _currentSession.get()
+    if session is not None:
+        return session
+
+    if _defaultSession is None:
+        _defaultSession = Session()
+    return _defaultSession
+
+
+def getLiveDirs():
+
+    """ Returns the set of temporary directories owned by sessions of this
+    process that were not closed """
+
+    return { os.path.normcase(os.path.abspath(path))
+            for session in list(_liveSessions)
+            for path in session.ownedDirs }
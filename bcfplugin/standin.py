@@ -0,0 +1,366 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file provides `StandInServer`, a minimal BCF-API server keeping topics
+and comments in memory. It implements the routes `sync` uses, so that
+synchronization can be developed and tested without an issue server:
+
+    GET       /bcf/2.1/projects
+    GET, POST /bcf/2.1/projects/{project_id}/topics
+    GET, PUT  /bcf/2.1/projects/{project_id}/topics/{topic_guid}
+    GET, POST /bcf/2.1/projects/{project_id}/topics/{topic_guid}/comments
+    PUT       /bcf/2.1/projects/{project_id}/topics/{topic_guid}/comments/{guid}
+    GET       /bcf/2.1/projects/{project_id}/topics/comments/events
+
+Like a real server it sets `creation_date` respectively `modified_date` of
+what it is sent. Lists can be filtered through `$filter` with conditions of
+the form `field gt 'value'` (also ge, lt, le, eq), joined by `and` and `or`.
+Dates are compared as dates, everything else as strings.
+"""
+
+import re
+import json
+import gzip
+import datetime
+import threading
+import dateutil.parser
+from uuid import uuid4
+from urllib.parse import urlsplit, parse_qs
+
+import bcfplugin
+from bcfplugin.server import (PooledHTTPServer, PooledRequestHandler,
+        apiVersion)
+from bcfplugin.rdwr.topicindex import dateKey
+
+logger = bcfplugin.createLogger(__name__)
+
+dateFields = { "date", "creation_date", "modified_date", "due_date" }
+""" Fields that are compared as dates in `$filter` expressions """
+
+_condition = re.compile(r"^\s*(\w+)\s+(gt|ge|lt|le|eq)\s+'([^']*)'\s*$")
+
+_operators = { "gt": lambda a, b: a > b, "ge": lambda a, b: a >= b,
+        "lt": lambda a, b: a < b, "le": lambda a, b: a <= b,
+        "eq": lambda a, b: a == b }
+
+
+def _now():
+
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def parseFilter(expression: str):
+
+    """ Returns a function telling whether a JSON object matches the `$filter`
+    `expression`. A ValueError is raised if it cannot be parsed. """
+
+    alternatives = list()
+    for alternative in re.split(r"\s+or\s+", expression):
+        conditions = list()
+        for condition in re.split(r"\s+and\s+", alternative):
+            match = _condition.match(condition)
+            if match is None:
+                raise ValueError("Cannot parse the condition"\
+                        " '{}'".format(condition))
+            conditions.append(match.groups())
+        alternatives.append(conditions)
+
+    def value(field, raw):
+        if raw is None:
+            return None
+        if field in dateFields:
+            return dateKey(dateutil.parser.parse(raw))
+        return raw
+
+    def matches(data):
+        for conditions in alternatives:
+            fulfilled = True
+            for (field, operator, operand) in conditions:
+                left = value(field, data.get(field))
+                if left is None or not _operators[operator](left,
+                        value(field, operand)):
+                    fulfilled = False
+                    break
+            if fulfilled:
+                return True
+        return False
+
+    return matches
+
+
+class HttpError(Exception):
+
+    """ Raised by a route to answer with status `code` """
+
+    def __init__(self, code: int, message: str):
+
+        Exception.__init__(self, message)
+        self.code = code
+
+
+class StandInProject:
+
+    """ Topics, comments and comment events of one project """
+
+    def __init__(self, projectId: str, name: str):
+
+        self.projectId = projectId
+        self.name = name
+        self.topics = dict()
+        """ Topics by GUID, in the order they were created """
+        self.comments = dict()
+        """ Dictionary of comments by GUID for every topic GUID """
+        self.commentEvents = list()
+
+
+class StandInServer(PooledHTTPServer):
+
+    """ In-memory BCF-API server for tests.
+
+    `requestCount` counts the requests answered so far, `lock` guards all
+    projects. A project has to be added through `addProject()` first.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+            workers: int = 8):
+
+        PooledHTTPServer.__init__(self, (host, port), StandInHandler, workers)
+        self.projects = dict()
+        self.lock = threading.Lock()
+        self.requestCount = 0
+
+
+    def addProject(self, projectId: str = None, name: str = ""):
+
+        """ Adds an empty project and returns it """
+
+        projectId = str(projectId or uuid4())
+        with self.lock:
+            project = StandInProject(projectId, name)
+            self.projects[projectId] = project
+        return project
+
+
+    def getProject(self, projectId):
+
+        project = self.projects.get(projectId)
+        if project is None:
+            raise HttpError(404, "Project {} does not exist".format(projectId))
+        return project
+
+
+    def getTopic(self, project, topicGuid):
+
+        topic = project.topics.get(topicGuid)
+        if topic is None:
+            raise HttpError(404, "Topic {} does not exist".format(topicGuid))
+        return topic
+
+
+    def _filtered(self, items, query):
+
+        if "$filter" not in query:
+            return list(items)
+        try:
+            matches = parseFilter(query["$filter"][0])
+        except ValueError as err:
+            raise HttpError(400, str(err))
+        return [ item for item in items if matches(item) ]
+
+
+    def _commentEvent(self, project, comment, action):
+
+        project.commentEvents.append({ "comment_guid": comment["guid"],
+            "topic_guid": comment["topic_guid"],
+            "date": comment.get("modified_date") or comment["date"],
+            "author": (comment.get("modified_author") or
+                comment.get("author")),
+            "actions": [ { "type": action } ] })
+
+
+    def getProjects(self, body, query):
+
+        return [ { "project_id": project.projectId, "name": project.name }
+                for project in self.projects.values() ]
+
+
+    def getTopics(self, body, query, projectId):
+
+        project = self.getProject(projectId)
+        return self._filtered(project.topics.values(), query)
+
+
+    def postTopic(self, body, query, projectId):
+
+        project = self.getProject(projectId)
+        topic = dict(body)
+        topic["guid"] = topic.get("guid") or str(uuid4())
+        if topic["guid"] in project.topics:
+            raise HttpError(409, "Topic {} does already"\
+                    " exist".format(topic["guid"]))
+        topic["creation_date"] = _now()
+        project.topics[topic["guid"]] = topic
+        project.comments[topic["guid"]] = dict()
+        return topic
+
+
+    def getTopicDetail(self, body, query, projectId, topicGuid):
+
+        return self.getTopic(self.getProject(projectId), topicGuid)
+
+
+    def putTopic(self, body, query, projectId, topicGuid):
+
+        project = self.getProject(projectId)
+        old = self.getTopic(project, topicGuid)
+        topic = dict(body)
+        topic["guid"] = topicGuid
+        topic["creation_date"] = old["creation_date"]
+        topic["modified_date"] = _now()
+        project.topics[topicGuid] = topic
+        return topic
+
+
+    def getComments(self, body, query, projectId, topicGuid):
+
+        project = self.getProject(projectId)
+        self.getTopic(project, topicGuid)
+        return self._filtered(project.comments[topicGuid].values(), query)
+
+
+    def postComment(self, body, query, projectId, topicGuid):
+
+        project = self.getProject(projectId)
+        self.getTopic(project, topicGuid)
+        comment = dict(body)
+        comment["guid"] = comment.get("guid") or str(uuid4())
+        if comment["guid"] in project.comments[topicGuid]:
+            raise HttpError(409, "Comment {} does already"\
+                    " exist".format(comment["guid"]))
+        comment["topic_guid"] = topicGuid
+        comment["date"] = _now()
+        project.comments[topicGuid][comment["guid"]] = comment
+        self._commentEvent(project, comment, "add_comment")
+        return comment
+
+
+    def putComment(self, body, query, projectId, topicGuid, commentGuid):
+
+        project = self.getProject(projectId)
+        self.getTopic(project, topicGuid)
+        old = project.comments[topicGuid].get(commentGuid)
+        if old is None:
+            raise HttpError(404, "Comment {} does not"\
+                    " exist".format(commentGuid))
+        comment = dict(body)
+        comment.update({ "guid": commentGuid, "topic_guid": topicGuid,
+            "date": old["date"], "modified_date": _now() })
+        project.comments[topicGuid][commentGuid] = comment
+        self._commentEvent(project, comment, "update")
+        return comment
+
+
+    def getCommentEvents(self, body, query, projectId):
+
+        return self._filtered(self.getProject(projectId).commentEvents, query)
+
+
+_guid = "([0-9a-fA-F-]{36})"
+_projectRoute = "/bcf/{}/projects/{}".format(re.escape(apiVersion), _guid)
+_topicRoute = _projectRoute + "/topics/" + _guid
+
+routes = [ (method, re.compile(pattern + "/?$"), name)
+        for (method, pattern, name) in [
+    ("GET", "/bcf/{}/projects".format(re.escape(apiVersion)), "getProjects"),
+    ("GET", _projectRoute + "/topics", "getTopics"),
+    ("POST", _projectRoute + "/topics", "postTopic"),
+    ("GET", _projectRoute + "/topics/comments/events", "getCommentEvents"),
+    ("GET", _topicRoute, "getTopicDetail"),
+    ("PUT", _topicRoute, "putTopic"),
+    ("GET", _topicRoute + "/comments", "getComments"),
+    ("POST", _topicRoute + "/comments", "postComment"),
+    ("PUT", _topicRoute + "/comments/" + _guid, "putComment") ] ]
+""" Triples of HTTP method, regular expression matching the path and the name
+of the method of `StandInServer` answering it """
+
+
+class StandInHandler(PooledRequestHandler):
+
+    """ Answers requests through the routes of its `StandInServer` """
+
+    def log_message(self, format, *args):
+
+        logger.debug("{} {}".format(self.address_string(), format % args))
+
+
+    def do_GET(self):
+        self._answer("GET")
+
+
+    def do_POST(self):
+        self._answer("POST")
+
+
+    def do_PUT(self):
+        self._answer("PUT")
+
+
+    def _answer(self, method):
+
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length > 0 else b""
+
+        code = 200
+        try:
+            body = json.loads(raw.decode("utf8")) if raw else None
+            if method != "GET" and not isinstance(body, dict):
+                raise HttpError(400, "The body has to be a JSON object")
+            for (routeMethod, pattern, name) in routes:
+                match = pattern.match(url.path)
+                if match is not None and routeMethod == method:
+                    with self.server.lock:
+                        self.server.requestCount += 1
+                        data = getattr(self.server, name)(body, query,
+                                *match.groups())
+                        content = json.dumps(data).encode("utf8")
+                    if method == "POST":
+                        code = 201
+                    break
+            else:
+                raise HttpError(404, "{} {} does not exist".format(method,
+                    url.path))
+        except (HttpError, ValueError) as err:
+            code = getattr(err, "code", 400)
+            content = json.dumps({ "message": str(err) }).encode("utf8")
+
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            content = gzip.compress(content)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
@@ -0,0 +1,472 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+"""
+Author: Patrick Podest
+Date: 2019-08-16
+Github: @podestplatz
+
+**** Description ****
+This file synchronizes the topics and comments of the project of a session
+with a project on a BCF-API server, without downloading the whole project
+every time:
+
+    client = SyncClient("http://issues:8080/bcf", projectId, session)
+    client.sync()
+    ...
+    client.sync()
+    client.close()
+
+`pull()` only requests what changed since the watermark, the latest creation
+or modification date the client has seen from the server: the topics through
+a `$filter` on their dates, the comments through the comment events of the
+project and then per affected topic. Every changed topic of the working
+directory is written once. `push()` sends what changed locally since the last
+synchronization. Changes are found through the fingerprints of the markups,
+topics and comments, recorded whenever they were synchronized, so that topics
+whose markup did not change are skipped without looking at them.
+
+Requests are sent over keep-alive connections, one per worker thread, and the
+requests of different topics are sent concurrently by `workers` threads.
+
+If a topic or comment was changed both locally and on the server, the local
+version wins and is pushed. Viewpoints and deletions are not synchronized.
+See `standin` for a local server implementing the routes used here.
+"""
+
+import json
+import gzip
+import threading
+import http.client
+from urllib.parse import urlsplit, urlencode, quote
+from concurrent.futures import ThreadPoolExecutor
+
+import bcfplugin
+import bcfplugin.rdwr.bcfapi as bcfapi
+import bcfplugin.rdwr.writer as writer
+import bcfplugin.rdwr.project as p
+from bcfplugin.rdwr.markup import Markup
+from bcfplugin.rdwr.topicindex import dateKey
+from bcfplugin.rdwr.interfaces.state import State
+from bcfplugin.server import apiVersion
+from bcfplugin.session import Session, getSession, activate, deactivate
+
+import dateutil.parser
+
+logger = bcfplugin.createLogger(__name__)
+
+
+class SyncError(Exception):
+
+    """ Raised if the server could not be reached or answered with an error """
+
+
+class SyncClient:
+
+    """ Synchronizes the project of `session`, by default of the current
+    session, with the project `projectId` of the BCF-API server at `url`
+    (e.g. "http://localhost:8080/bcf").
+
+    `watermark` is the value of `watermark` of an earlier client, to continue
+    where it stopped. `requestCount` counts the requests sent so far.
+    """
+
+    def __init__(self, url: str, projectId: str, session: Session = None,
+            workers: int = 4, watermark: str = None, timeout: float = 30):
+
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError("{} is no http or https URL".format(url))
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.projectPath = "{}/{}/projects/{}".format(parts.path.rstrip("/"),
+                apiVersion, projectId)
+        self.session = session or getSession()
+        self.timeout = timeout
+
+        self.watermark = watermark
+        """ Latest creation or modification date seen on the server, as sent
+        by it """
+        self._watermarkKey = (dateKey(dateutil.parser.parse(watermark))
+                if watermark is not None else None)
+
+        self.requestCount = 0
+        self._countLock = threading.Lock()
+        self._local = threading.local()
+        self._connections = list()
+        self._pool = ThreadPoolExecutor(max_workers=workers,
+                thread_name_prefix="bcfplugin-sync")
+
+        self._fingerprints = dict()
+        """ Fingerprint of every markup, topic and comment, by kind and GUID,
+        as of its last synchronization """
+        self._remote = set()
+        """ GUIDs of the topics and comments that exist on the server """
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, etype, value, traceback):
+        self.close()
+
+
+    def close(self):
+
+        """ Closes all connections and stops the worker threads """
+
+        self._pool.shutdown(wait=True)
+        for connection in self._connections:
+            connection.close()
+        self._connections.clear()
+
+
+    def _connection(self, renew: bool = False):
+
+        """ Returns the connection of the calling thread """
+
+        connection = getattr(self._local, "connection", None)
+        if connection is None or renew:
+            if connection is not None:
+                connection.close()
+            connectionClass = (http.client.HTTPSConnection
+                    if self.scheme == "https" else http.client.HTTPConnection)
+            connection = connectionClass(self.netloc, timeout=self.timeout)
+            self._local.connection = connection
+            self._connections.append(connection)
+        return connection
+
+
+    def request(self, method: str, path: str, body = None, query = None):
+
+        """ Sends a request to `path`, relative to the project, and returns
+        the decoded JSON answer.
+
+        A connection that was closed by the server in the meantime is opened
+        again once. A SyncError is raised if the request failed.
+        """
+
+        url = self.projectPath + path
+        if query:
+            url += "?" + urlencode(query, quote_via=quote)
+        headers = { "Accept": "application/json",
+                "Accept-Encoding": "gzip" }
+        content = None
+        if body is not None:
+            content = json.dumps(body).encode("utf8")
+            headers["Content-Type"] = "application/json"
+
+        for attempt in range(2):
+            connection = self._connection(renew=(attempt > 0))
+            try:
+                connection.request(method, url, content, headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionError) as err:
+                if attempt > 0:
+                    raise SyncError("{} {} failed: {}".format(method, url,
+                        str(err)))
+            except (OSError, http.client.HTTPException) as err:
+                raise SyncError("{} {} failed: {}".format(method, url,
+                    str(err)))
+
+        with self._countLock:
+            self.requestCount += 1
+        if response.getheader("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        if response.status >= 400:
+            raise SyncError("{} {} failed with status {}: {}".format(method,
+                url, response.status, data.decode("utf8", "replace")))
+        return json.loads(data.decode("utf8")) if data else None
+
+
+    def _map(self, function, items):
+
+        """ Calls `function` for all `items` in the worker threads and returns
+        the list of results """
+
+        return list(self._pool.map(function, items))
+
+
+    def _see(self, *dates):
+
+        """ Moves the watermark to the latest of `dates`, strings as sent by
+        the server """
+
+        for date in dates:
+            if not date:
+                continue
+            key = dateKey(dateutil.parser.parse(date))
+            if self._watermarkKey is None or key > self._watermarkKey:
+                self._watermarkKey = key
+                self.watermark = date
+
+
+    def _record(self, markup: Markup):
+
+        """ Records the current fingerprints of `markup`, its topic and
+        comments as synchronized """
+
+        guid = str(markup.topic.xmlId)
+        self._fingerprints[("markup", guid)] = markup.getFingerprint()
+        self._fingerprints[("topic", guid)] = markup.topic.getFingerprint()
+        for comment in markup.comments:
+            self._fingerprints[("comment", str(comment.xmlId))] =\
+                    comment.getFingerprint()
+
+
+    def _changedLocally(self, kind: str, element):
+
+        """ Returns True if `element` changed since it was last synchronized.
+        Elements that never were synchronized did not change. """
+
+        recorded = self._fingerprints.get((kind, str(element.xmlId)))
+        return recorded is not None and recorded != element.getFingerprint()
+
+
+    def _project(self):
+
+        project = self.session.project
+        if project is None:
+            raise SyncError("No project is open in the session")
+        return project
+
+
+    def _build(self, topicData, commentsData):
+
+        """ Returns a new markup of the topic `topicData` and the comments
+        `commentsData`, BCF-API objects """
+
+        markup = Markup(bcfapi.topicFromJson(topicData), comments=list(),
+                viewpoints=list(), snapshotFiles=list(),
+                state=State.States.ADDED)
+        for data in commentsData:
+            comment = bcfapi.commentFromJson(data, markup)
+            comment.containingObject = markup
+            markup.comments.append(comment)
+        p.internValues(markup)
+        return markup
+
+
+    def _add(self, project, markups):
+
+        """ Writes the new `markups` in one batch and adds them to `project` """
+
+        if len(markups) == 0:
+            return
+        if not writer.addMarkups(markups):
+            raise SyncError("{} new topics could not be"\
+                    " written".format(len(markups)))
+        for markup in markups:
+            markup.containingObject = project
+            project.topicList.append(markup)
+            self._record(markup)
+
+
+    def _apply(self, project, markup, topicData, commentsData, force = False):
+
+        """ Applies the topic `topicData` and the comments `commentsData`,
+        BCF-API objects, to the existing `markup`. Local changes that were not
+        pushed yet are kept unless `force` is set. Returns True if the working
+        directory was changed. """
+
+        changed = False
+        if topicData is not None and (force or
+                not self._changedLocally("topic", markup.topic)):
+            topic = bcfapi.topicFromJson(topicData)
+            if topic.getFingerprint() != markup.topic.getFingerprint():
+                p.internValues(topic)
+                markup.topic.containingObject = None
+                markup.topic = topic
+                topic.containingObject = markup
+                changed = True
+
+        comments = { str(comment.xmlId): index for (index, comment) in
+                enumerate(markup.comments) }
+        for data in commentsData:
+            comment = bcfapi.commentFromJson(data, markup)
+            index = comments.get(str(comment.xmlId))
+            if index is None:
+                p.internValues(comment)
+                comment.containingObject = markup
+                markup.comments.append(comment)
+                changed = True
+                continue
+
+            old = markup.comments[index]
+            if (not force and self._changedLocally("comment", old)) or\
+                    comment.getFingerprint() == old.getFingerprint():
+                continue
+            p.internValues(comment)
+            old.containingObject = None
+            markup.comments[index] = comment
+            comment.containingObject = markup
+            changed = True
+
+        if changed and not writer.writeMarkup(markup):
+            raise SyncError("Topic {} could not be"\
+                    " written".format(markup.topic.xmlId))
+        self._record(markup)
+        return changed
+
+
+    def pull(self):
+
+        """ Applies the topics and comments that changed on the server since
+        the watermark to the project. Returns the number of changed topics. """
+
+        token = activate(self.session)
+        try:
+            return self._pull(self._project())
+        finally:
+            deactivate(token)
+
+
+    def _pull(self, project):
+
+        watermark = self.watermark
+        topicQuery = commentQuery = eventQuery = None
+        if watermark is not None:
+            topicQuery = { "$filter": "modified_date ge '{0}' or"\
+                    " creation_date ge '{0}'".format(watermark) }
+            commentQuery = { "$filter": "modified_date ge '{0}' or"\
+                    " date ge '{0}'".format(watermark) }
+            eventQuery = { "$filter": "date ge '{}'".format(watermark) }
+
+        # all requests are sent from the worker threads, so that no more
+        # connections than workers are kept open
+        lists = [ ("/topics", topicQuery) ]
+        if watermark is not None:
+            lists.append(("/topics/comments/events", eventQuery))
+        lists = self._map(lambda item: self.request("GET", item[0],
+            query=item[1]), lists)
+
+        topics = { data["guid"]: data for data in lists[0] }
+        guids = list(topics.keys())
+        if watermark is not None:
+            events = lists[1]
+            self._see(*[ event.get("date") for event in events ])
+            guids += [ guid for guid in dict.fromkeys(event["topic_guid"]
+                for event in events) if guid not in topics ]
+
+        markups = { str(markup.topic.xmlId): markup
+                for markup in project.topicList if markup.topic is not None }
+
+        def fetch(guid):
+            topic = topics.get(guid)
+            if topic is None and guid not in markups:
+                # comments of a topic that was never pulled; pull all of it
+                topic = self.request("GET", "/topics/{}".format(guid))
+                return (topic, self.request("GET",
+                    "/topics/{}/comments".format(guid)))
+            return (topic, self.request("GET", "/topics/{}/comments".format(
+                guid), query=commentQuery))
+
+        changed = 0
+        added = list()
+        for (guid, (topic, comments)) in zip(guids, self._map(fetch, guids)):
+            self._remote.add(guid)
+            self._remote.update(comment["guid"] for comment in comments)
+            self._see(*[ topic.get(key) for key in ("creation_date",
+                "modified_date") ] if topic else [])
+            self._see(*[ comment.get(key) for comment in comments
+                for key in ("date", "modified_date") ])
+            if guid not in markups:
+                added.append(self._build(topic, comments))
+            elif self._apply(project, markups[guid], topic, comments):
+                changed += 1
+        self._add(project, added)
+        changed += len(added)
+
+        logger.info("Pulled {} changed topics".format(changed))
+        return changed
+
+
+    def push(self):
+
+        """ Sends the topics and comments that were added or changed locally
+        since they were last synchronized to the server. Returns the number
+        of topics that were sent. """
+
+        token = activate(self.session)
+        try:
+            return self._push(self._project())
+        finally:
+            deactivate(token)
+
+
+    def _push(self, project):
+
+        pending = list()
+        for markup in project.topicList:
+            guid = str(markup.topic.xmlId)
+            if self._fingerprints.get(("markup", guid)) ==\
+                    markup.getFingerprint():
+                continue
+            sendTopic = (guid not in self._remote or
+                    self._changedLocally("topic", markup.topic))
+            comments = [ comment for comment in markup.comments
+                    if str(comment.xmlId) not in self._remote or
+                    self._changedLocally("comment", comment) ]
+            if sendTopic or len(comments) > 0:
+                pending.append((markup, sendTopic, comments))
+            else:
+                self._record(markup)
+
+        def send(item):
+            (markup, sendTopic, comments) = item
+            guid = str(markup.topic.xmlId)
+            topic = None
+            if sendTopic:
+                data = bcfapi.topicToJson(markup.topic)
+                if guid in self._remote:
+                    topic = self.request("PUT", "/topics/{}".format(guid), data)
+                else:
+                    topic = self.request("POST", "/topics", data)
+            answers = list()
+            for comment in comments:
+                data = bcfapi.commentToJson(comment, guid)
+                if str(comment.xmlId) in self._remote:
+                    answers.append(self.request("PUT", "/topics/{}/comments/"\
+                            "{}".format(guid, comment.xmlId), data))
+                else:
+                    answers.append(self.request("POST", "/topics/{}/"\
+                            "comments".format(guid), data))
+            return (topic, answers)
+
+        for ((markup, sendTopic, comments), (topic, answers)) in zip(pending,
+                self._map(send, pending)):
+            self._remote.add(str(markup.topic.xmlId))
+            self._remote.update(answer["guid"] for answer in answers)
+            # take over the dates set by the server
+            self._apply(project, markup, topic, answers, force=True)
+
+        logger.info("Pushed {} topics".format(len(pending)))
+        return len(pending)
+
+
+    def sync(self):
+
+        """ Pulls, then pushes. Returns the tuple (pulled, pushed) of the
+        numbers of topics that were changed locally respectively sent. """
+
+        pulled = self.pull()
+        pushed = self.push()
+        return (pulled, pushed)
@@ -0,0 +1,136 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, "../")
+import bcfplugin
+import bcfplugin.aio as aio
+import bcfplugin.util as util
+import bcfplugin.programmaticInterface as pI
+
+
+class AioTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpDir = tempfile.mkdtemp()
+        self.files = list()
+        for name in ("snapshots", "docref"):
+            path = os.path.join(self.tmpDir, "{}.bcf".format(name))
+            shutil.copyfile("../../bcf-examples/bcfexmple_{}.bcf".format(name),
+                    path)
+            self.files.append(path)
+
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmpDir)
+
+
+    def testProjects(self):
+
+        async def work(path):
+            async with aio.AsyncSession() as s:
+                self.assertEqual(await s.openProject(path),
+                        pI.OperationResults.SUCCESS)
+                topics = await s.getTopics()
+                topic = topics[0][1]
+                before = await s.getCommentCount(topic)
+                await asyncio.gather(*[ s.addComment(topic,
+                        "comment {}".format(i), "a@b.c") for i in range(5) ])
+                (count, hits) = await asyncio.gather(s.getCommentCount(topic),
+                        s.search("comment"))
+                self.assertEqual(count, before + 5)
+                self.assertTrue(len(hits) >= 5)
+                await s.saveProject(path + ".out")
+                return s.session
+
+        async def main():
+            return await asyncio.gather(*[ work(path) for path in self.files ])
+
+        sessions = asyncio.run(main())
+        for (session, path) in zip(sessions, self.files):
+            self.assertFalse(session.isOpen())
+            self.assertTrue(os.path.exists(path + ".out"))
+        self.assertFalse(pI.isProjectOpen())
+
+
+    def testReadsRunConcurrently(self):
+
+        barrier = threading.Barrier(3, timeout=5)
+
+        async def main():
+            s = aio.AsyncSession()
+            await asyncio.gather(*[ s.run(barrier.wait, write=False)
+                for i in range(3) ])
+
+        # the barrier is only passed if all three reads run at the same time
+        asyncio.run(main())
+
+
+    def testWritesAreSerialized(self):
+
+        active = list()
+        overlaps = list()
+
+        def change(name):
+            overlaps.append(len(active))
+            active.append(name)
+            time.sleep(0.02)
+            active.remove(name)
+
+        async def main():
+            s = aio.AsyncSession()
+            await asyncio.gather(*([ s.run(change, "write") for i in range(3) ]
+                + [ s.run(change, "read", write=False) for i in range(3) ]))
+
+        asyncio.run(main())
+        self.assertEqual(len(overlaps), 6)
+        # reads only overlap with reads, writes with nothing
+        self.assertEqual(overlaps[:3], [0, 0, 0])
+
+
+    def testCancelledWriteKeepsLock(self):
+
+        order = list()
+
+        def slowChange():
+            time.sleep(0.1)
+            order.append("change")
+
+        async def main():
+            s = aio.AsyncSession()
+            task = asyncio.ensure_future(s.run(slowChange))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await s.run(order.append, "read", write=False)
+
+        asyncio.run(main())
+        self.assertEqual(order, ["change", "read"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from uuid import uuid4
+
+sys.path.insert(0, "../")
+import bcfplugin
+import bcfplugin.util as util
+import bcfplugin.rdwr.bcfapi as bcfapi
+import bcfplugin.rdwr.reader as reader
+import bcfplugin.programmaticInterface as pI
+
+
+class BcfApiTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpDir = tempfile.mkdtemp()
+        self.bcfFile = os.path.join(self.tmpDir, "issues.bcf")
+        shutil.copyfile("search_tests/Issues-Example.bcf", self.bcfFile)
+
+
+    def tearDown(self):
+
+        if pI.isProjectOpen():
+            pI.closeProject()
+        shutil.rmtree(self.tmpDir)
+        util.deleteTmp()
+
+
+    def export(self, format = "ndjson", snapshots = False):
+
+        out = io.StringIO()
+        bcfapi.exportFile(self.bcfFile, out, format, snapshots)
+        return out.getvalue()
+
+
+    def testExport(self):
+
+        lines = self.export().splitlines()
+        records = [ json.loads(line) for line in lines ]
+        project = reader.readBcfFile(self.bcfFile)
+        markup = project.topicList[0]
+
+        self.assertEqual([ r["type"] for r in records ], ["topic"] +
+                [ "viewpoint" ] * len(markup.viewpoints) +
+                [ "comment" ] * len(markup.comments))
+        topic = records[0]["data"]
+        self.assertEqual(topic["guid"], str(markup.topic.xmlId))
+        self.assertEqual(topic["title"], markup.topic.title)
+        self.assertEqual(topic["labels"], [ l.value for l in
+            markup.topic.labels ])
+        comment = records[-1]["data"]
+        self.assertEqual(comment["topic_guid"], topic["guid"])
+
+        # both formats hold the same records
+        self.assertEqual(list(bcfapi.readRecords(io.StringIO(
+            self.export("json")))), records)
+
+
+    def testReadChunkedArray(self):
+
+        records = [ { "type": "comment", "data": { "comment": "x" * 50,
+            "n": i } } for i in range(20) ]
+        stream = io.StringIO()
+        bcfapi.writeRecords(records, stream, "json")
+
+        chunkSize = bcfapi.readChunkSize
+        bcfapi.readChunkSize = 7
+        try:
+            self.assertEqual(list(bcfapi.readRecords(io.StringIO(
+                stream.getvalue()))), records)
+            self.assertRaises(ValueError, list, bcfapi.readRecords(
+                io.StringIO(stream.getvalue()[:-10])))
+        finally:
+            bcfapi.readChunkSize = chunkSize
+
+
+    def testRoundTrip(self):
+
+        source = reader.readBcfFile(self.bcfFile).topicList[0]
+        markups = [ markup for (markup, files) in bcfapi.buildMarkups(
+            bcfapi.readRecords(io.StringIO(self.export()))) ]
+        self.assertEqual(len(markups), 1)
+        markup = markups[0]
+
+        self.assertEqual(markup.topic.xmlId, source.topic.xmlId)
+        self.assertEqual(markup.topic.title, source.topic.title)
+        self.assertEqual(markup.topic.date, source.topic.date)
+        self.assertEqual([ c.comment for c in markup.comments ],
+                [ c.comment for c in source.comments ])
+        self.assertEqual([ vp.xmlId for vp in markup.viewpoints ],
+                [ vp.xmlId for vp in source.viewpoints ])
+        for (new, old) in zip(markup.comments, source.comments):
+            if old.viewpoint is not None:
+                self.assertIs(new.viewpoint.containingObject, markup)
+                self.assertEqual(new.viewpoint.xmlId, old.viewpoint.xmlId)
+
+
+    def testImport(self):
+
+        records = [ json.loads(line) for line in self.export().splitlines() ]
+        # give the topic, its viewpoints and comments new GUIDs
+        text = json.dumps(records)
+        for guid in set([ r["data"]["guid"] for r in records ]):
+            text = text.replace(guid, str(uuid4()))
+        jsonFile = os.path.join(self.tmpDir, "topics.json")
+        with open(jsonFile, "w") as f:
+            f.write(text)
+
+        self.assertEqual(pI.openProject(self.bcfFile),
+                pI.OperationResults.SUCCESS)
+        self.assertEqual(pI.importBcfApi(jsonFile), 1)
+        self.assertEqual(pI.getTopicCount(), 2)
+        # existing topics are skipped
+        self.assertEqual(pI.importBcfApi(jsonFile), 0)
+
+        dstFile = os.path.join(self.tmpDir, "out.bcf")
+        pI.saveProject(dstFile)
+        project = reader.readBcfFile(dstFile)
+        self.assertEqual(len(project.topicList), 2)
+        self.assertEqual(sorted(len(m.comments) for m in project.topicList),
+                sorted([ len(records) - 1 - sum(r["type"] == "viewpoint"
+                    for r in records) ] * 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
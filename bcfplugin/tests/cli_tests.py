@@ -0,0 +1,169 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import io
+import os
+import sys
+import json
+import shutil
+import zipfile
+import tempfile
+import unittest
+from contextlib import redirect_stdout, redirect_stderr
+
+sys.path.insert(0, "../")
+import bcfplugin
+import bcfplugin.cli as cli
+import bcfplugin.util as util
+import bcfplugin.rdwr.reader as reader
+
+
+class CliTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpDir = tempfile.mkdtemp()
+        self.inputDir = os.path.join(self.tmpDir, "in")
+        self.outputDir = os.path.join(self.tmpDir, "out")
+        os.mkdir(self.inputDir)
+        shutil.copyfile("search_tests/Issues-Example.bcf",
+                os.path.join(self.inputDir, "issues.bcf"))
+        shutil.copyfile("../../bcf-examples/bcfexmple_docref2.bcf",
+                os.path.join(self.inputDir, "docref2.bcf"))
+        with open(os.path.join(self.inputDir, "broken.bcf"), "w") as f:
+            f.write("no zip file")
+
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmpDir)
+        util.deleteTmp()
+
+
+    def run(self, result=None):
+
+        # files that could not be processed are reported on stderr
+        with redirect_stderr(io.StringIO()):
+            return super().run(result)
+
+
+    def runCli(self, *argv):
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            code = cli.main(list(argv))
+        return (code, out.getvalue())
+
+
+    def testIterMarkups(self):
+
+        bcfFile = os.path.join(self.inputDir, "issues.bcf")
+        project = reader.readBcfFile(bcfFile)
+        streamed = [ markup for (topicDir, markup) in
+                reader.iterMarkups(bcfFile, viewpoints=True) ]
+        self.assertEqual(sorted(m.topic.xmlId for m in streamed),
+                sorted(m.topic.xmlId for m in project.topicList))
+        self.assertTrue(all(vpRef.viewpoint is not None
+            for m in streamed for vpRef in m.viewpoints))
+        self.assertRaises(ValueError, list, reader.iterMarkups(
+            self.writeArchiveWithout("bcf.version")))
+
+
+    def writeArchiveWithout(self, name):
+
+        path = os.path.join(self.tmpDir, "without.bcf")
+        with zipfile.ZipFile(os.path.join(self.inputDir, "issues.bcf")) as src, \
+                zipfile.ZipFile(path, "w") as dst:
+            for info in src.infolist():
+                if info.filename != name:
+                    dst.writestr(info, src.read(info))
+        return path
+
+
+    def testStats(self):
+
+        (code, out) = self.runCli("stats", self.inputDir, "--json", "-j", "2")
+        self.assertEqual(code, 1)
+        stats = json.loads(out)
+        self.assertEqual(len(stats["archives"]), 2)
+        self.assertEqual(stats["total"]["topics"], 3)
+        self.assertEqual(stats["total"]["type"]["Clash"], 1)
+        self.assertEqual(stats["total"]["labels"]["structure"], 1)
+
+        (code, out) = self.runCli("stats", os.path.join(self.inputDir,
+            "issues.bcf"), "--json", "--type", "Issue")
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(out)["total"]["topics"], 0)
+
+
+    def testFilterAndRelabel(self):
+
+        issues = os.path.join(self.inputDir, "issues.bcf")
+        (code, out) = self.runCli("filter", issues,
+                os.path.join(self.inputDir, "docref2.bcf"),
+                "--status", "Active", "-o", self.outputDir, "-j", "1")
+        self.assertEqual(code, 0)
+        project = reader.readBcfFile(os.path.join(self.outputDir,
+            "docref2.bcf"))
+        self.assertEqual([ m.topic.status for m in project.topicList ],
+                ["Active"])
+
+        relabelled = os.path.join(self.tmpDir, "relabelled")
+        (code, out) = self.runCli("relabel", issues, "--rename",
+                "architecture=arch", "--remove", "mechanical", "--add",
+                "checked", "-o", relabelled)
+        self.assertEqual(code, 0)
+        project = reader.readBcfFile(os.path.join(relabelled, "issues.bcf"))
+        self.assertEqual([ label.value for label in
+            project.topicList[0].topic.labels ],
+            ["arch", "structure", "checked"])
+
+        # topics not matching the filter are copied without being relabelled
+        filtered = os.path.join(self.tmpDir, "filtered")
+        docref2 = os.path.join(self.inputDir, "docref2.bcf")
+        (code, out) = self.runCli("relabel", docref2, "--status", "Active",
+                "--add", "x", "-o", filtered)
+        self.assertEqual(code, 0)
+        project = reader.readBcfFile(os.path.join(filtered, "docref2.bcf"))
+        self.assertEqual(len(project.topicList), 2)
+        for markup in project.topicList:
+            labels = [ label.value for label in markup.topic.labels ]
+            self.assertEqual("x" in labels, markup.topic.status == "Active")
+
+        # the input is never overwritten
+        (code, out) = self.runCli("relabel", issues, "--add", "x", "-o",
+                self.inputDir)
+        self.assertEqual(code, 1)
+
+
+    def testExport(self):
+
+        path = os.path.join(self.tmpDir, "topics.json")
+        (code, out) = self.runCli("export", os.path.join(self.inputDir,
+            "issues.bcf"), "--format", "json", "-o", path)
+        self.assertEqual(code, 0)
+        with open(path) as f:
+            rows = json.load(f)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["title"], "Intersection ventilation and wall")
+        self.assertEqual(rows[0]["comments"], 1)
+        self.assertEqual(set(rows[0].keys()), set(cli.exportColumns))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import time
+import unittest
+
+from uuid import UUID
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, "../")
+import bcfplugin
+import rdwr.topic as topic
+import rdwr.markup as markup
+import rdwr.project as project
+
+
+start = datetime(2019, 8, 1, tzinfo=timezone.utc)
+
+
+def createProject(commentCount):
+
+    """ Creates a project with two topics. The comments of the first one are
+    created in shuffled order. """
+
+    p = project.Project(UUID(int=1), "Project")
+    for t in range(2):
+        tp = topic.Topic(UUID(int=t + 1), "topic {}".format(t), start, "a@b.c")
+        comments = list()
+        for i in range(commentCount):
+            minutes = (i * 7919) % commentCount
+            c = markup.Comment(UUID(int=(t + 1) * 1000000 + i),
+                    start + timedelta(minutes=minutes), "a@b.c",
+                    "comment {}".format(minutes))
+            comments.append(c)
+        m = markup.Markup(tp, comments=comments)
+        tp.containingObject = m
+        for c in comments:
+            c.containingObject = m
+        m.containingObject = p
+        p.topicList.append(m)
+    return p
+
+
+class CommentIndexTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.project = createProject(200)
+        self.index = self.project.getCommentIndex()
+        self.markup = self.project.topicList[0]
+        self.sortedComments = sorted(self.markup.comments,
+                key=lambda c: c.date)
+
+
+    def testWindows(self):
+
+        self.assertEqual(self.index.count(self.markup), 200)
+        self.assertEqual(self.index.window(self.markup),
+                self.sortedComments)
+        self.assertEqual(self.index.window(self.markup, offset=50, limit=20),
+                self.sortedComments[50:70])
+        self.assertEqual(self.index.window(self.markup, descending=True,
+                    offset=10, limit=5),
+                self.sortedComments[::-1][10:15])
+        self.assertEqual(self.index.window(self.markup, offset=190,
+                    limit=20), self.sortedComments[190:])
+        self.assertEqual(self.index.window(self.markup, offset=300), [])
+        self.assertRaises(ValueError, self.index.window, self.markup,
+                order="author")
+
+
+    def testUpdates(self):
+
+        newest = markup.Comment(UUID(int=5), start + timedelta(days=30),
+                "a@b.c", "newest", containingElement=self.markup)
+        self.markup.comments.append(newest)
+        self.assertEqual(self.index.window(self.markup, descending=True,
+            limit=1), [newest])
+
+        # modifying a comment moves it in the order of modification dates
+        oldest = self.sortedComments[0]
+        oldest.modDate = start + timedelta(days=60)
+        self.assertEqual(self.index.window(self.markup, order="modDate",
+            descending=True, limit=1), [oldest])
+        self.assertEqual(self.index.window(self.markup, limit=1), [oldest])
+
+        self.project.deleteObject(newest)
+        self.assertEqual(self.index.count(self.markup), 200)
+        self.project.deleteObject(self.markup)
+        self.assertEqual(self.index.count(self.markup), 0)
+        self.assertEqual(len(self.index), 200)
+
+
+    def testTopicPages(self):
+
+        index = self.project.getTopicIndex()
+        topics = index.query()
+        self.assertEqual(index.query(offset=1, limit=1), topics[1:2])
+        self.assertEqual(index.query(offset=1), topics[1:])
+
+
+    def testPerformance(self):
+
+        p = createProject(20000)
+        index = p.getCommentIndex()
+        m = p.topicList[1]
+        self.assertEqual(index.count(m), 20000)
+        begin = time.perf_counter()
+        for i in range(100):
+            window = index.window(m, offset=10000, limit=100)
+        elapsed = (time.perf_counter() - begin) / 100
+        self.assertEqual(len(window), 100)
+        self.assertLess(elapsed, 0.005)
+
+
+if __name__ == "__main__":
+    unittest.main()
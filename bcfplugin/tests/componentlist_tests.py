@@ -0,0 +1,215 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import os
+import sys
+import copy
+import shutil
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+from uuid import UUID
+
+sys.path.insert(0, "../")
+import bcfplugin
+import util
+import rdwr.reader as reader
+import rdwr.writer as writer
+import rdwr.viewpoint as viewpoint
+import rdwr.ifcguid as ifcguid
+import bcfplugin.rdwr.interfaces.state as s
+
+
+def createComponents(count, system="Revit"):
+
+    return [ viewpoint.Component("{:022d}".format(i), system, str(i))
+            for i in range(count) ]
+
+
+class ComponentListTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.components = createComponents(5)
+        self.cList = viewpoint.ComponentList(self.components)
+
+
+    def testListSemantics(self):
+
+        self.assertEqual(len(self.cList), 5)
+        self.assertEqual(self.cList, self.components)
+        self.assertEqual(self.cList[-1].ifcId, self.components[-1].ifcId)
+        self.assertEqual(self.cList[1:3], self.components[1:3])
+
+        del self.cList[0]
+        self.cList.append(viewpoint.Component("new"))
+        self.assertEqual([ c.ifcId for c in self.cList ][-1], "new")
+        self.assertEqual(len(self.cList), 5)
+
+        # originating system is interned once
+        self.assertEqual(self.cList._systems, ["", "Revit"])
+
+
+    def testViewsWriteThrough(self):
+
+        self.cList[2].authoringtoolId = "changed"
+        self.assertEqual(list(self.cList.toolIdColumn())[2], "changed")
+        self.assertIn(self.components[0].ifcId, self.cList)
+
+
+    def testAssignmentOutOfRange(self):
+
+        new = viewpoint.Component("new", "ArchiCAD", "x")
+        for idx in (5, 100, -6):
+            with self.assertRaises(IndexError):
+                self.cList[idx] = new
+        self.assertEqual(len(self.cList), 5)
+        self.assertEqual(len(self.cList._guids), 16 * 5)
+        self.assertEqual(self.cList, self.components)
+
+        self.cList[-1] = new
+        self.assertEqual(self.cList[4].ifcId, "new")
+
+
+    def testMembershipAndSetOperations(self):
+
+        other = viewpoint.ComponentList(createComponents(8)[3:])
+        self.assertIn(self.components[4], self.cList)
+        self.assertNotIn(viewpoint.Component("unknown"), self.cList)
+
+        self.assertEqual([ c.ifcId for c in self.cList.intersection(other) ],
+                [ c.ifcId for c in self.components[3:] ])
+        self.assertEqual(len(self.cList.difference(other)), 3)
+        self.assertEqual(len(self.cList.union(other)), 8)
+
+
+    def testIntegerKeys(self):
+
+        ifcId = self.components[1].ifcId
+        self.assertIn(ifcguid.expand(ifcId), self.cList)
+        self.assertIn(ifcguid.toUuid(ifcId), self.cList)
+        self.assertEqual(self.cList[1].ifcIdKey, ifcguid.expand(ifcId))
+        self.assertEqual(self.cList.ifcIdKeySet(),
+                set(ifcguid.expand(c.ifcId) for c in self.components))
+        self.assertEqual(len(self.cList._guids), 16 * len(self.components))
+
+        # values that are no IfcGuid are kept as they are
+        self.cList.append(viewpoint.Component("not a guid"))
+        self.cList.append(viewpoint.Component(None, "Revit", "tool"))
+        self.assertEqual(self.cList[-2].ifcId, "not a guid")
+        self.assertIsNone(self.cList[-1].ifcId)
+        self.assertIn("not a guid", self.cList)
+        self.assertEqual(self.cList.ifcIdColumn()[:2],
+                [ c.ifcId for c in self.components[:2] ])
+
+
+    def testDeepcopy(self):
+
+        cpy = copy.deepcopy(self.cList)
+        self.assertEqual(cpy, self.cList)
+        cpy[0].ifcId = "other"
+        self.assertNotEqual(cpy, self.cList)
+
+
+    def testDecodeRoundTrip(self):
+
+        colour = viewpoint.ComponentColour("FF0000", self.components[:2])
+        components = viewpoint.Components(False, self.components[2:],
+                self.components[:1], colouring=[colour])
+        elem = components.getEtElement(ET.Element("Components"))
+
+        values = lambda components: [ (c.ifcId, c.originatingSystem,
+            c.authoringtoolId) for c in components ]
+        decoded = reader.decodeComponents(elem)
+        self.assertEqual(decoded.visibilityDefault, False)
+        self.assertEqual(list(decoded.visibilityExceptions.iterValues()),
+                values(self.components[2:]))
+        self.assertEqual(list(decoded.selection.iterValues()),
+                values(self.components[:1]))
+        self.assertEqual(list(decoded.colouring[0].components.iterValues()),
+                values(self.components[:2]))
+        self.assertIs(decoded.selection[0].containingObject, decoded)
+
+
+    def testValidation(self):
+
+        colour = viewpoint.ComponentColour("FF0000", self.components[:2])
+        components = viewpoint.Components(False, self.components[2:],
+                self.components[:1], colouring=[colour])
+        elem = components.getEtElement(ET.Element("Components"))
+        self.assertEqual(reader.validateComponents(elem), [])
+
+        elem.remove(elem.find("Visibility"))
+        elem.find("Coloring/Color").attrib["Color"] = "red"
+        selection = elem.find("Selection")
+        for ifcId in ("short", "0uX9DLa2n0IeYMk9SAnJH#"):
+            ET.SubElement(selection, "Component", IfcGuid=ifcId)
+        ET.SubElement(selection[0], "Unknown")
+
+        errors = reader.validateComponents(elem)
+        self.assertEqual(len(errors), 4)
+        self.assertIn("Visibility is required", errors[0])
+        self.assertIn("['Unknown']", errors[1])
+        self.assertIn("2 IfcGuid(s)", errors[2])
+        self.assertIn("'red'", errors[3])
+
+
+    def testViewStateIsTheViewpointState(self):
+
+        components = viewpoint.Components(True, [], self.components)
+        vp = viewpoint.Viewpoint(UUID(int=1), components)
+        view = components.selection[0]
+        self.assertEqual(view.state, s.State.States.ORIGINAL)
+
+        view.state = s.State.States.MODIFIED
+        self.assertEqual(vp.state, s.State.States.MODIFIED)
+        self.assertEqual(components.selection[1].state,
+                s.State.States.MODIFIED)
+
+        # lists outside of a viewpoint are never written
+        self.cList[0].state = s.State.States.MODIFIED
+        self.assertEqual(self.cList[0].state, s.State.States.ORIGINAL)
+
+
+    def testModifiedComponentsAreWritten(self):
+
+        tmpDir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpDir)
+        bcfFile = os.path.join(tmpDir, "snapshots.bcf")
+        shutil.copyfile("../../bcf-examples/bcfexmple_snapshots.bcf", bcfFile)
+        project = reader.readBcfFile(bcfFile)
+        self.addCleanup(util.deleteTmp)
+
+        vpRef = project.topicList[0].viewpoints[0]
+        view = vpRef.viewpoint.components.visibilityExceptions[0]
+        view.ifcId = "0uX9DLa2n0IeYMk9SAnJHx"
+        view.state = s.State.States.MODIFIED
+        writer.addProjectUpdate(project, vpRef.viewpoint, None)
+        self.assertIsNone(writer.processProjectUpdates())
+
+        vpFile = os.path.join(util.getBcfDir(), writer.getTopicDir(vpRef),
+                str(vpRef.file))
+        written = ET.parse(vpFile).getroot()
+        self.assertEqual([ elem.get("IfcGuid") for elem in
+            written.iterfind("Components/Visibility/Exceptions/Component") ],
+            ["0uX9DLa2n0IeYMk9SAnJHx", "2txH9wW_OHwQIUJ59Y2WFs"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import os
+import sys
+import copy
+import zipfile
+import unittest
+import tempfile
+
+from uuid import UUID
+from shutil import rmtree
+from datetime import datetime, timezone
+
+sys.path.insert(0, "../")
+import rdwr.diff as diff
+import rdwr.topic as topic
+import rdwr.markup as markup
+import rdwr.project as project
+
+
+def createMarkup(guid, title, comments=[]):
+
+    t = topic.Topic(UUID(int=guid), title,
+            datetime(2019, 8, 1, tzinfo=timezone.utc), "a@b.c")
+    c = [ markup.Comment(UUID(int=guid * 10 + i),
+            datetime(2019, 8, 2, tzinfo=timezone.utc), "a@b.c", text)
+            for (i, text) in enumerate(comments) ]
+    return markup.Markup(t, comments=c)
+
+
+def createProject(*markups):
+
+    p = project.Project(UUID(int=1), "Diff test")
+    for m in markups:
+        m.containingObject = p
+        p.topicList.append(m)
+    return p
+
+
+def createZip(path, files):
+
+    with zipfile.ZipFile(path, "w") as zf:
+        for (name, content) in files.items():
+            zf.writestr(name, content)
+    return path
+
+
+def readZip(path):
+
+    with zipfile.ZipFile(path) as zf:
+        return { name: zf.read(name) for name in zf.namelist() }
+
+
+class DiffProjectsTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.old = createProject(createMarkup(1, "first", ["a", "b"]),
+                createMarkup(2, "second"))
+        self.new = copy.deepcopy(self.old)
+
+
+    def testEqualProjects(self):
+
+        result = diff.diffProjects(self.old, self.new)
+        self.assertTrue(result.isEmpty())
+        self.assertEqual(result.unchangedTopics, 2)
+
+
+    def testTopicsAddedAndRemoved(self):
+
+        del self.new.topicList[1]
+        self.new.topicList.append(createMarkup(3, "third"))
+        result = diff.diffProjects(self.old, self.new)
+        self.assertEqual(result.addedTopics, [UUID(int=3)])
+        self.assertEqual(result.removedTopics, [UUID(int=2)])
+        self.assertEqual(result.unchangedTopics, 1)
+
+
+    def testFieldsAndComments(self):
+
+        m = self.new.topicList[0]
+        m.topic.title = "first, renamed"
+        m.comments[0].comment = "changed"
+        del m.comments[1]
+        result = diff.diffProjects(self.old, self.new)
+
+        topicDiff = result.modifiedTopics[UUID(int=1)]
+        self.assertEqual([ (f.name, f.oldValue, f.newValue)
+            for f in topicDiff.fields ], [("Title", "first", "first, renamed")])
+        self.assertEqual(topicDiff.removedComments, [UUID(int=11)])
+        self.assertEqual([ c.guid for c in topicDiff.modifiedComments ],
+                [UUID(int=10)])
+        self.assertEqual(topicDiff.modifiedComments[0].fields[0].name,
+                "Comment")
+
+
+class PatchTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpDir = tempfile.mkdtemp()
+        self.base = createZip(os.path.join(self.tmpDir, "base.bcf"), {
+            "bcf.version": b"version",
+            "1/markup.bcf": b"markup 1",
+            "1/snapshot.png": b"large snapshot",
+            "2/markup.bcf": b"markup 2",
+            "3/markup.bcf": b"markup 3",
+            "3/viewpoint.bcfv": b"viewpoint 3" })
+        self.new = createZip(os.path.join(self.tmpDir, "new.bcf"), {
+            "bcf.version": b"version",
+            "1/markup.bcf": b"markup 1, changed",
+            "1/snapshot.png": b"large snapshot",
+            "3/markup.bcf": b"markup 3, changed",
+            "4/markup.bcf": b"markup 4" })
+
+        self.projectDiff = diff.ProjectDiff()
+        self.projectDiff.addedTopics = ["4"]
+        self.projectDiff.removedTopics = ["2"]
+        self.projectDiff.modifiedTopics = { "1": None, "3": None }
+
+
+    def tearDown(self):
+
+        rmtree(self.tmpDir)
+
+
+    def testPatchRoundTrip(self):
+
+        patchFile = os.path.join(self.tmpDir, "patch.bcfpatch")
+        diff.writePatch(self.projectDiff, self.base, self.new, patchFile)
+
+        patchContent = readZip(patchFile)
+        self.assertNotIn("1/snapshot.png", patchContent)
+        self.assertNotIn("bcf.version", patchContent)
+
+        dstFile = os.path.join(self.tmpDir, "patched.bcf")
+        self.assertEqual(diff.applyPatch(self.base, patchFile, dstFile),
+                dstFile)
+        self.assertEqual(readZip(dstFile), readZip(self.new))
+
+
+    def testPatchRejectsWrongBase(self):
+
+        patchFile = os.path.join(self.tmpDir, "patch.bcfpatch")
+        diff.writePatch(self.projectDiff, self.base, self.new, patchFile)
+
+        dstFile = os.path.join(self.tmpDir, "patched.bcf")
+        self.assertIsNone(diff.applyPatch(self.new, patchFile, dstFile))
+        self.assertFalse(os.path.exists(dstFile))
+
+
+if __name__ == "__main__":
+    unittest.main()
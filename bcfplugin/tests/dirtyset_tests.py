@@ -0,0 +1,103 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import copy
+import unittest
+
+from uuid import UUID
+from datetime import datetime, timezone
+
+sys.path.insert(0, "../")
+import bcfplugin
+import util
+import rdwr.topic as topic
+import rdwr.markup as markup
+import rdwr.project as project
+import bcfplugin.rdwr.interfaces.state as s
+
+
+def createMarkup(guid):
+
+    t = topic.Topic(UUID(int=guid), "topic {}".format(guid),
+            datetime(2019, 8, 1, tzinfo=timezone.utc), "a@b.c")
+    c = markup.Comment(UUID(int=guid * 10),
+            datetime(2019, 8, 2, tzinfo=timezone.utc), "a@b.c", "text")
+    return markup.Markup(t, comments=[c])
+
+
+class DirtySetTests(unittest.TestCase):
+
+    def setUp(self):
+
+        util.setDirty(False)
+        self.project = project.Project(UUID(int=1), "Dirty test")
+        self.markups = [ createMarkup(1), createMarkup(2) ]
+        for m in self.markups:
+            m.containingObject = self.project
+            self.project.topicList.append(m)
+
+
+    def testStateTransitions(self):
+
+        self.assertEqual(self.project.getStateList(), [])
+        title = self.markups[0].topic._title
+        title.state = s.State.States.MODIFIED
+        self.assertEqual(self.project.getStateList(),
+                [(s.State.States.MODIFIED, title)])
+        self.assertTrue(util.getDirtyBit())
+
+        title.state = s.State.States.ORIGINAL
+        self.assertEqual(self.project.getStateList(), [])
+
+
+    def testSubtreeStateLists(self):
+
+        comment = self.markups[0].comments[0]
+        comment.state = s.State.States.DELETED
+        self.markups[1].topic.labels.append("new label")
+
+        self.assertEqual(self.markups[0].getStateList(),
+                [(s.State.States.DELETED, comment)])
+        self.assertEqual(self.markups[0].topic.getStateList(), [])
+        self.assertEqual([ o.value for (_, o) in
+            self.markups[1].topic.getStateList() ], ["new label"])
+        self.assertEqual(len(self.project.getStateList()), 2)
+
+
+    def testAttachAndDetach(self):
+
+        comment = self.markups[0].comments[0]
+        comment.state = s.State.States.MODIFIED
+        self.markups[0].containingObject = None
+        self.assertEqual(self.project.getStateList(), [])
+        # detached objects still compute their state list by walking
+        self.assertEqual(self.markups[0].getStateList(),
+                [(s.State.States.MODIFIED, comment)])
+
+        self.markups[0].containingObject = self.project
+        self.assertEqual(self.project.getStateList(),
+                [(s.State.States.MODIFIED, comment)])
+
+        cpy = copy.deepcopy(self.project)
+        self.assertEqual([ o.id for (_, o) in cpy.getStateList() ],
+                [comment.id])
+
+
+if __name__ == "__main__":
+    unittest.main()
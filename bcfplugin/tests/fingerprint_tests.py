@@ -0,0 +1,164 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import copy
+import timeit
+import unittest
+
+from uuid import UUID
+from datetime import datetime, timezone
+
+sys.path.insert(0, "../")
+import bcfplugin
+import rdwr.topic as topic
+import rdwr.markup as markup
+import rdwr.viewpoint as viewpoint
+import rdwr.threedvector as tdv
+
+
+def createMarkup(guid, commentCount):
+
+    t = topic.Topic(UUID(int=guid), "topic {}".format(guid),
+            datetime(2019, 8, 1, tzinfo=timezone.utc), "a@b.c")
+    c = [ markup.Comment(UUID(int=guid * 100000 + i),
+            datetime(2019, 8, 2, tzinfo=timezone.utc), "a@b.c",
+            "comment {}".format(i)) for i in range(commentCount) ]
+    m = markup.Markup(t, comments=c)
+    t.containingObject = m
+    for comment in c:
+        comment.containingObject = m
+    return m
+
+
+def createViewpoint(guid):
+
+    camera = viewpoint.PerspectiveCamera(tdv.Point(0, 0, 0),
+            tdv.Direction(1, 0, 0), tdv.Direction(0, 0, 1), 60)
+    lines = [ tdv.Line(tdv.Point(0, 0, 0), tdv.Point(1, 1, 1)) ]
+    planes = [ tdv.ClippingPlane(tdv.Point(0, 0, 0), tdv.Direction(0, 0, 1)) ]
+    return viewpoint.Viewpoint(UUID(int=guid), pCamera=camera, lines=lines,
+            clippingPlanes=planes)
+
+
+class FingerprintTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.markup = createMarkup(1, 3)
+
+
+    def testCopiesShareFingerprint(self):
+
+        cpy = copy.deepcopy(self.markup)
+        self.assertEqual(cpy.getFingerprint(), self.markup.getFingerprint())
+        self.assertEqual(cpy, self.markup)
+
+
+    def testChangeInvalidatesAncestors(self):
+
+        before = self.markup.getFingerprint()
+        topicFp = self.markup.topic.getFingerprint()
+        comment = self.markup.comments[1]
+        commentFp = comment.getFingerprint()
+
+        comment.comment = "changed"
+        self.assertIsNone(comment._fingerprint)
+        self.assertIsNone(self.markup._fingerprint)
+        # siblings keep their cached fingerprint
+        self.assertEqual(self.markup.topic._fingerprint, topicFp)
+
+        self.assertNotEqual(comment.getFingerprint(), commentFp)
+        self.assertNotEqual(self.markup.getFingerprint(), before)
+
+        comment.comment = "comment 1"
+        self.assertEqual(self.markup.getFingerprint(), before)
+
+
+    def testAttachInvalidates(self):
+
+        before = self.markup.getFingerprint()
+        comment = copy.deepcopy(self.markup.comments[0])
+        comment.xmlId = UUID(int=42)
+        self.markup.comments.append(comment)
+        comment.containingObject = self.markup
+        self.assertNotEqual(self.markup.getFingerprint(), before)
+
+
+    def testGeometryChangesInvalidate(self):
+
+        """ Members of cameras, lines, clipping planes and their points are
+        plain values, changing them has to reach the viewpoint too. """
+
+        vp = createViewpoint(1)
+        mutations = [
+                lambda vp: setattr(vp.pCamera.viewPoint, "x",
+                    vp.pCamera.viewPoint.x + 5),
+                lambda vp: setattr(vp.pCamera, "fieldOfView", 45),
+                lambda vp: setattr(vp.pCamera, "upVector",
+                    tdv.Direction(0, 1, 0)),
+                lambda vp: setattr(vp.lines[0].end, "z", 7),
+                lambda vp: setattr(vp.lines[0], "start", tdv.Point(2, 2, 2)),
+                lambda vp: setattr(vp.clippingPlanes[0].direction, "y", 1),
+                lambda vp: setattr(vp.clippingPlanes[0], "location",
+                    tdv.Point(0, 0, 3)) ]
+
+        for mutate in mutations:
+            unchanged = copy.deepcopy(vp)
+            before = vp.getFingerprint()
+            mutate(vp)
+            self.assertIsNone(vp._fingerprint)
+            self.assertNotEqual(vp.getFingerprint(), before)
+            self.assertEqual(vp, copy.deepcopy(vp))
+            self.assertNotEqual(vp, unchanged)
+
+
+    def testCommentViewpointInvalidates(self):
+
+        comment = self.markup.comments[0]
+        before = self.markup.getFingerprint()
+        commentFp = comment.getFingerprint()
+
+        comment.viewpoint = markup.ViewpointReference(UUID(int=7))
+        self.assertNotEqual(comment.getFingerprint(), commentFp)
+        self.assertNotEqual(self.markup.getFingerprint(), before)
+        self.assertEqual(comment, copy.deepcopy(comment))
+
+        comment.viewpoint = None
+        self.assertEqual(self.markup.getFingerprint(), before)
+
+
+    def testNegativeEqualityBenchmark(self):
+
+        """ Comparing two large markups that differ in their last comment has
+        to be cheap once the fingerprints are computed. """
+
+        count = 2000
+        markupA = createMarkup(1, count)
+        markupB = copy.deepcopy(markupA)
+        markupB.comments[-1].comment = "different"
+
+        self.assertNotEqual(markupA, markupB)
+        fieldByField = timeit.timeit(
+                lambda: markupA.comments == markupB.comments, number=20)
+        fingerprinted = timeit.timeit(lambda: markupA == markupB, number=20)
+        self.assertGreaterEqual(fieldByField / fingerprinted, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
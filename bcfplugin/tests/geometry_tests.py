@@ -0,0 +1,144 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import copy
+import unittest
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, "../")
+import bcfplugin
+import rdwr.interfaces.state as s
+import rdwr.threedvector as tdv
+import rdwr.viewpoint as viewpoint
+
+
+class DictComponent:
+
+    """ Layout of `Component` before it used slots, used as reference """
+
+    def __init__(self, ifcId, originatingSystem, authoringtoolId):
+
+        self.containingObject = None
+        self.state = s.State.States.ORIGINAL
+        self._xmlname = "Component"
+        self.ifcId = ifcId
+        self.originatingSystem = originatingSystem
+        self.authoringtoolId = authoringtoolId
+
+
+class DictPoint:
+
+    """ Layout of `Point` before it used slots, used as reference """
+
+    def __init__(self, x, y, z):
+
+        self.containingObject = None
+        self.state = s.State.States.ORIGINAL
+        self._xmlname = "Point"
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+def measure(factory, count):
+
+    """ Returns the number of bytes allocated by `count` calls to `factory` """
+
+    tracemalloc.start()
+    objects = [ factory(i) for i in range(count) ]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+class CompactGeometryTests(unittest.TestCase):
+
+    def testNoInstanceDict(self):
+
+        objects = [ tdv.Point(1, 2, 3), tdv.Direction(1, 0, 0),
+                tdv.Line(tdv.Point(0, 0, 0), tdv.Point(1, 1, 1)),
+                tdv.ClippingPlane(tdv.Point(0, 0, 0), tdv.Direction(0, 0, 1)),
+                viewpoint.Component("0uX9DLa2n0IeYMk9SAnJHx"),
+                viewpoint.PerspectiveCamera(tdv.Point(0, 0, 0),
+                    tdv.Direction(1, 0, 0), tdv.Direction(0, 0, 1), 60),
+                viewpoint.OrthogonalCamera(tdv.Point(0, 0, 0),
+                    tdv.Direction(1, 0, 0), tdv.Direction(0, 0, 1), 1) ]
+        for obj in objects:
+            self.assertFalse(hasattr(obj, "__dict__"), type(obj))
+            self.assertEqual(obj.xmlName, type(obj).__name__)
+
+
+    def testXmlNameIsAccepted(self):
+
+        objects = [ tdv.ThreeDVector(1, 2, 3, xmlName="ThreeDVector"),
+                tdv.Point(1, 2, 3, xmlName="CameraViewPoint"),
+                tdv.Direction(1, 0, 0, xmlName="CameraDirection"),
+                tdv.Line(tdv.Point(0, 0, 0), tdv.Point(1, 1, 1),
+                    xmlName="Line"),
+                tdv.ClippingPlane(tdv.Point(0, 0, 0), tdv.Direction(0, 0, 1),
+                    xmlName="ClippingPlane"),
+                viewpoint.Camera(tdv.Point(0, 0, 0), tdv.Direction(1, 0, 0),
+                    tdv.Direction(0, 0, 1), xmlName="Camera"),
+                viewpoint.PerspectiveCamera(tdv.Point(0, 0, 0),
+                    tdv.Direction(1, 0, 0), tdv.Direction(0, 0, 1), 60,
+                    xmlName="PerspectiveCamera"),
+                viewpoint.OrthogonalCamera(tdv.Point(0, 0, 0),
+                    tdv.Direction(1, 0, 0), tdv.Direction(0, 0, 1), 1,
+                    xmlName="OrthogonalCamera") ]
+        for obj in objects:
+            self.assertEqual(obj.xmlName, type(obj).__name__)
+
+
+    def testSerializationUsesParentTags(self):
+
+        line = tdv.Line(tdv.Point(0, 0, 0), tdv.Point(1, 1, 1))
+        elem = line.getEtElement(ET.Element("Line"))
+        self.assertEqual([ child.tag for child in elem ],
+                ["StartPoint", "EndPoint"])
+
+        camera = viewpoint.PerspectiveCamera(tdv.Point(0, 0, 0),
+                tdv.Direction(1, 0, 0), tdv.Direction(0, 0, 1), 60)
+        elem = copy.deepcopy(camera).getEtElement(ET.Element(""))
+        self.assertEqual([ child.tag for child in elem ], ["CameraViewPoint",
+            "CameraDirection", "CameraUpVector", "FieldOfView"])
+
+
+    def testMemoryReduction(self):
+
+        """ Python 3.11 stores the attributes of dict based objects inline,
+        which makes them notably cheaper than on the versions FreeCAD ships
+        with. """
+
+        minRatio = 3 if sys.version_info < (3, 11) else 1.5
+        count = 50000
+        ifcId = "0uX9DLa2n0IeYMk9SAnJHx"
+
+        dictSize = measure(lambda i: DictComponent(ifcId, "", ""), count)
+        slotSize = measure(lambda i: viewpoint.Component(ifcId), count)
+        self.assertGreaterEqual(dictSize / slotSize, minRatio)
+
+        dictSize = measure(lambda i: DictPoint(0.0, 0.0, 0.0), count)
+        slotSize = measure(lambda i: tdv.Point(0.0, 0.0, 0.0), count)
+        self.assertGreaterEqual(dictSize / slotSize, minRatio)
+
+
+if __name__ == "__main__":
+    unittest.main()
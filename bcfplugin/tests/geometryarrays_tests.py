@@ -0,0 +1,129 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import unittest
+
+from uuid import UUID
+
+sys.path.insert(0, "../")
+import bcfplugin
+import rdwr.viewpoint as viewpoint
+import rdwr.geometryarrays as geometryarrays
+from rdwr.threedvector import Point, Direction, Line, ClippingPlane
+
+if geometryarrays.isAvailable():
+    import numpy as np
+
+
+def createViewpoint(guid, lineCount):
+
+    pCamera = viewpoint.PerspectiveCamera(Point(guid, 0, 0),
+            Direction(0, 0, -2), Direction(0, 1, 0), 60)
+    lines = [ Line(Point(i, 0, 0), Point(i, 1, 0)) for i in range(lineCount) ]
+    clips = [ ClippingPlane(Point(0, 0, guid), Direction(0, 0, 1)) ]
+    return viewpoint.Viewpoint(UUID(int=guid), pCamera=pCamera, lines=lines,
+            clippingPlanes=clips)
+
+
+@unittest.skipUnless(geometryarrays.isAvailable(), "NumPy is not installed")
+class GeometryArraysTests(unittest.TestCase):
+
+    def setUp(self):
+
+        oCamera = viewpoint.OrthogonalCamera(Point(1, 2, 3),
+                Direction(1, 0, 0), Direction(0, 0, 1), 2.5)
+        self.viewpoints = [ createViewpoint(1, 2),
+                viewpoint.Viewpoint(UUID(int=2), oCamera=oCamera),
+                createViewpoint(3, 1) ]
+        self.geometry = geometryarrays.getViewpointGeometry(self.viewpoints)
+
+
+    def testExport(self):
+
+        g = self.geometry
+        self.assertEqual(g.pCameraIdx.tolist(), [0, 2])
+        self.assertEqual(g.pCameraPositions.tolist(), [[1, 0, 0], [3, 0, 0]])
+        self.assertEqual(g.fieldOfViews.tolist(), [60, 60])
+        self.assertEqual(g.oCameraIdx.tolist(), [1])
+        self.assertEqual(g.oCameraUpVectors.tolist(), [[0, 0, 1]])
+        self.assertEqual(g.viewWorldScales.tolist(), [2.5])
+        self.assertEqual(g.lineIdx.tolist(), [0, 0, 2])
+        self.assertEqual(g.lineEnds.tolist(), [[0, 1, 0], [1, 1, 0], [0, 1, 0]])
+        self.assertEqual(g.clipIdx.tolist(), [0, 2])
+        self.assertEqual(g.clipLocations[:, 2].tolist(), [1, 3])
+
+        empty = geometryarrays.getViewpointGeometry([])
+        self.assertEqual(empty.lineStarts.shape, (0, 3))
+
+
+    def testConversionAndNormalization(self):
+
+        self.geometry.convertUnits(1000)
+        self.assertEqual(self.geometry.lineEnds[1].tolist(), [1000, 1000, 0])
+        # directions are not converted
+        self.assertEqual(self.geometry.clipDirections[0].tolist(), [0, 0, 1])
+
+        normalized = geometryarrays.normalize([[0, 0, -2], [3, 4, 0], [0, 0, 0]])
+        self.assertEqual(normalized.tolist(), [[0, 0, -1], [0.6, 0.8, 0],
+            [0, 0, 0]])
+
+
+    def testRotation(self):
+
+        rotations = self.geometry.pCameraRotations()
+        self.assertEqual(rotations.shape, (2, 3, 3))
+        # the camera looks along -z with y up
+        self.assertTrue(np.allclose(rotations[0][:, 2], [0, 0, -1]))
+        self.assertTrue(np.allclose(rotations[0][:, 1], [0, 1, 0]))
+        self.assertTrue(np.allclose(rotations[0][:, 0], [-1, 0, 0]))
+
+        # columns are orthonormal
+        for matrix in rotations:
+            self.assertTrue(np.allclose(matrix.T @ matrix, np.eye(3)))
+
+        rotated = geometryarrays.rotate([[1, 0, 0], [0, 0, 1]], rotations)
+        self.assertTrue(np.allclose(rotated, [[-1, 0, 0], [0, 0, -1]]))
+        rotated = geometryarrays.rotate([[1, 0, 0]], rotations[0])
+        self.assertTrue(np.allclose(rotated, [[-1, 0, 0]]))
+
+
+    def testMissingPoints(self):
+
+        line = Line(Point(0, 0, 0), None)
+        lineVp = viewpoint.Viewpoint(UUID(int=4), lines=[line])
+        geometry = geometryarrays.getViewpointGeometry([lineVp])
+        self.assertTrue(np.isnan(geometry.lineEnds).all())
+
+
+class WithoutNumpyTests(unittest.TestCase):
+
+    def testFallback(self):
+
+        numpy = geometryarrays.np
+        geometryarrays.np = None
+        try:
+            self.assertFalse(geometryarrays.isAvailable())
+            self.assertIsNone(geometryarrays.getViewpointGeometry([]))
+            self.assertIsNone(geometryarrays.normalize([[1, 0, 0]]))
+        finally:
+            geometryarrays.np = numpy
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import unittest
+
+from uuid import UUID
+
+sys.path.insert(0, "../")
+import bcfplugin
+import rdwr.ifcguid as ifcguid
+
+
+def referenceCompress(value: int):
+
+    """ Straightforward implementation of the compression, one digit after
+    the other. """
+
+    digits = list()
+    for i in range(ifcguid.IFC_GUID_LENGTH):
+        digits.append(ifcguid.IFC_GUID_CHARS[value % 64])
+        value //= 64
+    return "".join(reversed(digits))
+
+
+class IfcGuidTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.uuids = [ UUID(int=0), UUID(int=(1 << 128) - 1),
+                UUID("3f2504e0-4f89-11d3-9a0c-0305e82c3301") ] + \
+                [ UUID(int=(0x9e3779b97f4a7c15 * i) % (1 << 128))
+                    for i in range(1, 200) ]
+
+
+    def testConversion(self):
+
+        self.assertEqual(ifcguid.fromUuid(UUID(int=0)), "0" * 22)
+        self.assertEqual(ifcguid.fromUuid(UUID(int=(1 << 128) - 1)),
+                "3" + "$" * 21)
+        for uuid in self.uuids:
+            guid = referenceCompress(uuid.int)
+            self.assertEqual(ifcguid.fromUuid(uuid), guid)
+            self.assertEqual(ifcguid.compress(uuid.int), guid)
+            self.assertEqual(ifcguid.toUuid(guid), uuid)
+            self.assertEqual(ifcguid.expand(guid), uuid.int)
+
+
+    def testBatchConversion(self):
+
+        guids = [ referenceCompress(uuid.int) for uuid in self.uuids ]
+        data = ifcguid.expandAll(guids)
+        self.assertEqual(data, b"".join(uuid.bytes for uuid in self.uuids))
+        self.assertEqual(ifcguid.compressAll(data), guids)
+        self.assertEqual(ifcguid.expandAll([]), b"")
+        self.assertEqual(ifcguid.compressAll(b""), [])
+
+
+    def testValidation(self):
+
+        self.assertTrue(ifcguid.isIfcGuid("0Ehr7iLh1E5fk4E1VrCZ3k"))
+        for guid in ["", "0Ehr7iLh1E5fk4E1VrCZ3", "4Ehr7iLh1E5fk4E1VrCZ3k",
+                "0Ehr7iLh1E5fk4E1VrCZ+k", "0Ehr7iLh1E5fk4E1VrCZ=k",
+                "0Ehr7iLh1E5fk4E1VrCZäk", None, 12]:
+            self.assertFalse(ifcguid.isIfcGuid(guid), guid)
+        with self.assertRaises(ValueError):
+            ifcguid.expandAll(["0Ehr7iLh1E5fk4E1VrCZ3k", "invalid"])
+
+        self.assertEqual(ifcguid.toKey("invalid"), "invalid")
+        self.assertIsNone(ifcguid.toKey(None))
+        self.assertEqual(ifcguid.toKey(UUID(int=5)), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
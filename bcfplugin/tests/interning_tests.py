@@ -0,0 +1,102 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import unittest
+
+from uuid import UUID
+from datetime import datetime, timezone
+
+sys.path.insert(0, "../")
+import bcfplugin
+import rdwr.reader as reader
+import rdwr.markup as markup
+import rdwr.project as project
+from rdwr.viewpoint import ComponentList
+
+
+def fresh(value):
+
+    """ Returns a copy of `value` that is a distinct object, like the strings
+    returned by the XML parser. """
+
+    return "".join(list(value))
+
+
+def topicDict(guid):
+
+    return {"@Guid": str(UUID(int=guid)),
+            "Title": fresh("title"),
+            "CreationDate": "2019-08-01T00:00:00Z",
+            "CreationAuthor": fresh("a@b.c"),
+            "@TopicStatus": fresh("Open"),
+            "@TopicType": fresh("Issue"),
+            "Priority": fresh("Normal"),
+            "AssignedTo": fresh("d@e.f"),
+            "Stage": fresh("Design"),
+            "Labels": [ fresh("Architecture") ]}
+
+
+class InterningTests(unittest.TestCase):
+
+    def testReaderInternsRepeatedValues(self):
+
+        first = reader.buildTopic(topicDict(1))
+        second = reader.buildTopic(topicDict(2))
+        for name in ["_author", "_status", "_type", "_priority", "_assignee",
+                "_stage"]:
+            self.assertIs(getattr(first, name).value,
+                    getattr(second, name).value, name)
+        self.assertIs(first.labels[0].value, second.labels[0].value)
+        # free text is not interned
+        self.assertIsNot(first._title.value, second._title.value)
+
+        commentDict = lambda guid: {"@Guid": str(UUID(int=guid)),
+                "Date": "2019-08-01T00:00:00Z", "Author": fresh("a@b.c"),
+                "Comment": fresh("text")}
+        comment = reader.buildComment(commentDict(3))
+        self.assertIs(comment._author.value, first._author.value)
+
+
+    def testComponentListsShareValues(self):
+
+        first = ComponentList()
+        second = ComponentList()
+        first.appendValues("0Ehr7iLh1E5fk4E1VrCZ3k", fresh("System"),
+                fresh("tool"))
+        second.appendValues("1Ehr7iLh1E5fk4E1VrCZ3k", fresh("System"),
+                fresh("tool"))
+        self.assertIs(first[0].originatingSystem, second[0].originatingSystem)
+        self.assertIs(first[0].authoringtoolId, second[0].authoringtoolId)
+
+
+    def testInternValues(self):
+
+        date = datetime(2019, 8, 2, tzinfo=timezone.utc)
+        first = markup.Comment(UUID(int=1), date, fresh("a@b.c"), "text")
+        second = markup.Comment(UUID(int=2), date, fresh("a@b.c"), "text")
+        self.assertIsNot(first._author.value, second._author.value)
+
+        project.internValues(first)
+        project.internValues(second)
+        self.assertIs(first._author.value, second._author.value)
+        self.assertEqual(first._author.value, "a@b.c")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import os
+import sys
+import copy
+import unittest
+
+from uuid import UUID
+from datetime import datetime, timezone
+
+sys.path.insert(0, "../")
+import rdwr.merge as merge
+import rdwr.topic as topic
+import rdwr.markup as markup
+import rdwr.project as project
+from bcfplugin.session import Session
+
+
+def createTopic(guid, title, modDate=None):
+
+    return topic.Topic(UUID(int=guid), title,
+            datetime(2019, 8, 1, tzinfo=timezone.utc), "a@b.c",
+            modDate=modDate)
+
+
+def createComment(guid, text, modDate=None):
+
+    return markup.Comment(UUID(int=guid),
+            datetime(2019, 8, 2, tzinfo=timezone.utc), "a@b.c", text,
+            modDate=modDate)
+
+
+def createProject(*markups):
+
+    p = project.Project(UUID(int=1), "Merge test")
+    for m in markups:
+        m.containingObject = p
+        p.topicList.append(m)
+    return p
+
+
+class MergeProjectsTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.base = createProject(
+                markup.Markup(createTopic(10, "first"),
+                    comments=[createComment(100, "hello")]),
+                markup.Markup(createTopic(20, "second")))
+        self.ours = copy.deepcopy(self.base)
+        self.theirs = copy.deepcopy(self.base)
+
+
+    def testIdenticalProjects(self):
+
+        result = merge.mergeProjects(self.ours, self.theirs, self.base)
+        self.assertEqual(len(result.project.topicList), 2)
+        self.assertEqual(result.stats["identical"], 2)
+        self.assertEqual(result.conflicts, [])
+
+
+    def testOneSidedChanges(self):
+
+        self.ours.topicList[0].topic.title = "first, renamed"
+        self.theirs.topicList.append(markup.Markup(createTopic(30, "third")))
+        result = merge.mergeProjects(self.ours, self.theirs, self.base)
+
+        titles = sorted(m.topic.title for m in result.project.topicList)
+        self.assertEqual(titles, ["first, renamed", "second", "third"])
+        self.assertEqual(result.topicSources[UUID(int=10)], merge.OURS)
+        self.assertEqual(result.topicSources[UUID(int=30)], merge.THEIRS)
+        self.assertEqual(result.conflicts, [])
+
+
+    def testDeletionIsMerged(self):
+
+        del self.theirs.topicList[1]
+        result = merge.mergeProjects(self.ours, self.theirs, self.base)
+        self.assertEqual([ m.topic.xmlId for m in result.project.topicList ],
+                [UUID(int=10)])
+        self.assertEqual(result.stats["removed"], 1)
+
+
+    def testCommentsOfBothSidesAreMerged(self):
+
+        self.ours.topicList[0].comments.append(createComment(101, "ours"))
+        self.theirs.topicList[0].comments.append(createComment(102, "theirs"))
+        result = merge.mergeProjects(self.ours, self.theirs, self.base)
+
+        merged = [ m for m in result.project.topicList
+                if m.topic.xmlId == UUID(int=10) ][0]
+        self.assertEqual([ c.comment for c in merged.comments ],
+                ["hello", "ours", "theirs"])
+        self.assertIn(UUID(int=10), result.mergedTopics)
+        self.assertEqual(result.conflicts, [])
+
+
+    def testConflictTakesNewerSide(self):
+
+        newer = datetime(2019, 9, 1, tzinfo=timezone.utc)
+        older = datetime(2019, 8, 15, tzinfo=timezone.utc)
+        ourComment = self.ours.topicList[0].comments[0]
+        ourComment.comment = "ours"
+        ourComment.modDate = older
+        theirComment = self.theirs.topicList[0].comments[0]
+        theirComment.comment = "theirs"
+        theirComment.modDate = newer
+        result = merge.mergeProjects(self.ours, self.theirs, self.base)
+
+        merged = [ m for m in result.project.topicList
+                if m.topic.xmlId == UUID(int=10) ][0]
+        self.assertEqual(merged.comments[0].comment, "theirs")
+        self.assertEqual(len(result.conflicts), 1)
+        self.assertEqual(result.conflicts[0].resolution, merge.THEIRS)
+        self.assertEqual(result.conflicts[0].elementId, UUID(int=100))
+
+
+
+class ReadArchiveTests(unittest.TestCase):
+
+    def testCopiesAreDeleted(self):
+
+        bcfFile = "../../bcf-examples/bcfexmple_docref.bcf"
+        with Session() as session:
+            (first, firstDir) = merge.readArchive(bcfFile)
+            entries = set(os.listdir(session.tmpDir))
+            (second, secondDir) = merge.readArchive(bcfFile)
+
+            self.assertIsNotNone(first)
+            self.assertIsNotNone(second)
+            self.assertNotEqual(firstDir, secondDir)
+            self.assertTrue(os.path.isdir(secondDir))
+            # only the extraction directory of the copy was added
+            self.assertEqual(set(os.listdir(session.tmpDir)) - entries,
+                    {os.path.basename(secondDir)})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import copy
+import unittest
+
+from uuid import UUID
+from datetime import datetime, timezone
+
+sys.path.insert(0, "../")
+import bcfplugin
+import rdwr.topic as topic
+import rdwr.markup as markup
+import rdwr.project as project
+
+
+def createMarkup(guid, comments=[]):
+
+    t = topic.Topic(UUID(int=guid), "topic {}".format(guid),
+            datetime(2019, 8, 1, tzinfo=timezone.utc), "a@b.c")
+    c = [ markup.Comment(UUID(int=guid * 10 + i),
+            datetime(2019, 8, 2, tzinfo=timezone.utc), "a@b.c", text)
+            for (i, text) in enumerate(comments) ]
+    return markup.Markup(t, comments=c)
+
+
+class ProjectIndexTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.project = project.Project(UUID(int=1), "Index test")
+        self.markup = createMarkup(1, ["a", "b"])
+        self.markup.containingObject = self.project
+        self.project.topicList.append(self.markup)
+
+
+    def testAttachRegistersSubtree(self):
+
+        comment = self.markup.comments[1]
+        self.assertIn(comment.id, self.project._objectIndex)
+        self.assertIs(self.project.searchObject(comment), comment)
+        self.assertIs(self.project.searchObject(self.markup.topic._title),
+                self.markup.topic._title)
+
+
+    def testDeleteUnregistersSubtree(self):
+
+        comment = self.markup.comments[0]
+        self.project.deleteObject(self.markup)
+        self.assertNotIn(comment.id, self.project._objectIndex)
+        self.assertNotIn(self.markup.id, self.project._objectIndex)
+        self.assertIsNone(self.project.searchObject(comment))
+
+
+    def testReparent(self):
+
+        other = project.Project(UUID(int=2), "Other")
+        comment = self.markup.comments[0]
+        self.markup.containingObject = other
+        self.assertNotIn(comment.id, self.project._objectIndex)
+        self.assertIs(other.searchObject(comment), comment)
+
+
+    def testDeepcopy(self):
+
+        cpy = copy.deepcopy(self.project)
+        comment = self.markup.comments[1]
+        found = cpy.searchObject(comment)
+        self.assertIsNot(found, comment)
+        self.assertIs(found, cpy.topicList[0].comments[1])
+        # the original project is not affected by the copy
+        self.assertIs(self.project.searchObject(comment), comment)
+
+
+    def testFallbackForUnattachedObjects(self):
+
+        """ Objects appended without setting `containingObject` are still
+        found by the depth first search """
+
+        m = createMarkup(2, ["c"])
+        self.project.topicList.append(m)
+        self.assertIs(self.project.searchObject(m.comments[0]), m.comments[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import copy
+import unittest
+
+from uuid import UUID
+from datetime import datetime, timezone
+
+sys.path.insert(0, "../")
+import bcfplugin
+import rdwr.topic as topic
+import rdwr.markup as markup
+import rdwr.project as project
+from bcfplugin.rdwr.readonly import ReadOnlyView, unwrap
+
+
+def createMarkup(guid):
+
+    t = topic.Topic(UUID(int=guid), "topic {}".format(guid),
+            datetime(2019, 8, 1, tzinfo=timezone.utc), "a@b.c",
+            labels=["a", "b"])
+    c = markup.Comment(UUID(int=guid * 10),
+            datetime(2019, 8, 2, tzinfo=timezone.utc), "a@b.c", "text")
+    m = markup.Markup(t, comments=[c])
+    t.containingObject = m
+    c.containingObject = m
+    return m
+
+
+class ReadOnlyViewTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.markup = createMarkup(1)
+        self.view = ReadOnlyView(self.markup)
+
+
+    def testReadThrough(self):
+
+        self.assertTrue(isinstance(self.view, markup.Markup))
+        self.assertEqual(self.view.topic.title, "topic 1")
+        self.assertEqual([ l.value for l in self.view.topic.labels ],
+                ["a", "b"])
+        self.assertEqual(len(self.view.comments), 1)
+        self.assertIs(unwrap(self.view.comments[0]), self.markup.comments[0])
+        self.assertEqual(self.view.comments[0], self.markup.comments[0])
+
+        # changes of the model are visible without fetching a new view
+        self.markup.topic.title = "renamed"
+        self.assertEqual(self.view.topic.title, "renamed")
+
+
+    def testWritesAreRejected(self):
+
+        with self.assertRaises(AttributeError):
+            self.view.topic.title = "changed"
+        with self.assertRaises(AttributeError):
+            self.view.comments.append(None)
+        with self.assertRaises(AttributeError):
+            self.view.topic.labels.append("c")
+        with self.assertRaises(TypeError):
+            self.view.comments[0] = None
+        self.assertEqual(self.markup.topic.title, "topic 1")
+        self.assertEqual(len(self.markup.topic.labels), 2)
+
+
+    def testDetach(self):
+
+        cpy = self.view.topic.detach()
+        cpy.title = "changed"
+        self.assertEqual(self.markup.topic.title, "topic 1")
+        self.assertEqual(copy.deepcopy(self.view.topic).id,
+                self.markup.topic.id)
+
+
+    def testProjectAcceptsViews(self):
+
+        p = project.Project(UUID(int=1), "View test")
+        self.markup.containingObject = p
+        p.topicList.append(self.markup)
+        self.assertIs(p.searchObject(self.view.comments[0]),
+                self.markup.comments[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
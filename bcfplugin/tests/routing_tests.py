@@ -0,0 +1,121 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import copy
+import pickle
+import unittest
+
+from uuid import UUID
+from datetime import datetime, timezone
+
+sys.path.insert(0, "../")
+import bcfplugin
+import rdwr.topic as topic
+import rdwr.markup as markup
+import rdwr.project as project
+import rdwr.writer as writer
+
+
+def createMarkup(guid):
+
+    t = topic.Topic(UUID(int=guid), "topic {}".format(guid),
+            datetime(2019, 8, 1, tzinfo=timezone.utc), "a@b.c")
+    c = markup.Comment(UUID(int=guid * 10),
+            datetime(2019, 8, 2, tzinfo=timezone.utc), "a@b.c", "text")
+    return markup.Markup(t, comments=[c])
+
+
+class RoutingTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.project = project.Project(UUID(int=1), "Routing test")
+        self.markup = createMarkup(1)
+        self.markup.containingObject = self.project
+        self.project.topicList.append(self.markup)
+
+
+    def testRoutingOfMarkupElement(self):
+
+        comment = self.markup.comments[0]
+        text = comment._comment
+        self.assertEqual(writer.getFileOfElement(text), writer.markupFileName)
+        self.assertEqual(writer.getTopicDir(text), str(UUID(int=1)))
+        self.assertEqual(writer.getUniqueIdOfListElementInHierarchy(text),
+                UUID(int=10))
+        # a list element is not its own list ancestor
+        self.assertIsNone(writer.getUniqueIdOfListElementInHierarchy(comment))
+        self.assertEqual(writer.getFileOfElement(self.project._name),
+                writer.projectFileName)
+        self.assertIsNone(writer.getTopicDir(self.project._name))
+
+
+    def testRoutingIsCached(self):
+
+        text = self.markup.comments[0]._comment
+        self.assertIs(writer.getRouting(text), writer.getRouting(text))
+
+
+    def testReparentInvalidatesRouting(self):
+
+        comment = self.markup.comments[0]
+        text = comment._comment
+        self.assertEqual(writer.getTopicDir(text), str(UUID(int=1)))
+
+        other = createMarkup(2)
+        comment.containingObject = other
+        self.assertEqual(writer.getTopicDir(text), str(UUID(int=2)))
+
+
+    def testRoutingIsStoredOnTheNode(self):
+
+        comment = self.markup.comments[0]
+        text = comment._comment
+        routing = writer.getRouting(text)
+        self.assertIs(text._routing, routing)
+        # the routings of the ancestors are derived on the way
+        self.assertIs(comment._routing.markup, self.markup)
+
+        # reparenting elsewhere keeps the routing
+        other = createMarkup(2)
+        other.containingObject = self.project
+        self.assertIs(writer.getRouting(text), routing)
+
+        # copies do not take the routing over
+        self.assertIsNone(copy.deepcopy(comment)._routing)
+        self.assertIsNone(pickle.loads(pickle.dumps(self.project))
+                .topicList[0].comments[0]._comment._routing)
+
+
+    def testReparentOfAncestorClearsSubtree(self):
+
+        text = self.markup.comments[0]._comment
+        self.markup.topic.labels.append("label")
+        writer.getRouting(self.markup.topic.labels[0])
+        writer.getRouting(text)
+
+        other = project.Project(UUID(int=2), "Other")
+        self.markup.containingObject = other
+        self.assertIsNone(text._routing)
+        self.assertIsNone(self.markup.topic.labels[0]._routing)
+        self.assertEqual(writer.getFileOfElement(text), writer.markupFileName)
+
+
+if __name__ == "__main__":
+    unittest.main()
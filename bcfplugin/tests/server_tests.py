@@ -0,0 +1,201 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import shutil
+import tempfile
+import unittest
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, "../")
+import bcfplugin
+import bcfplugin.server as server
+import bcfplugin.programmaticInterface as pI
+from bcfplugin.session import Session, activate, deactivate
+
+
+class ServerTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpDir = tempfile.mkdtemp()
+        bcfFile = os.path.join(self.tmpDir, "snapshots.bcf")
+        shutil.copyfile("../../bcf-examples/bcfexmple_snapshots.bcf", bcfFile)
+
+        self.session = Session()
+        token = activate(self.session)
+        try:
+            self.assertEqual(pI.openProject(bcfFile),
+                    pI.OperationResults.SUCCESS)
+        finally:
+            deactivate(token)
+
+        self.server = server.BcfApiServer(self.session, workers=4)
+        self.server.start()
+        project = self.session.project
+        self.markup = project.topicList[0]
+        self.projectUrl = "/bcf/2.1/projects/{}".format(project.xmlId)
+        self.topicUrl = "{}/topics/{}".format(self.projectUrl,
+                self.markup.topic.xmlId)
+        self.connection = http.client.HTTPConnection("127.0.0.1",
+                self.server.port, timeout=10)
+
+
+    def tearDown(self):
+
+        self.connection.close()
+        self.server.stop()
+        self.session.close()
+        shutil.rmtree(self.tmpDir)
+
+
+    def get(self, path, headers = {}, connection = None):
+
+        connection = connection or self.connection
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        return (response, response.read())
+
+
+    def testRoutes(self):
+
+        (response, body) = self.get("/bcf/versions")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(body)["versions"][0]["version_id"], "2.1")
+
+        (response, body) = self.get("/bcf/2.1/projects")
+        self.assertEqual(json.loads(body)[0]["project_id"],
+                str(self.session.project.xmlId))
+
+        (response, body) = self.get(self.projectUrl + "/topics")
+        self.assertEqual([ t["guid"] for t in json.loads(body) ],
+                [ str(self.markup.topic.xmlId) ])
+        (response, body) = self.get(self.projectUrl + "/topics?$skip=1")
+        self.assertEqual(json.loads(body), [])
+
+        (response, body) = self.get(self.topicUrl + "/comments")
+        self.assertEqual([ c["comment"] for c in json.loads(body) ],
+                [ c.comment for c in self.markup.comments ])
+
+        vpRef = self.markup.viewpoints[0]
+        vpUrl = "{}/viewpoints/{}".format(self.topicUrl, vpRef.xmlId)
+        (response, body) = self.get(vpUrl)
+        self.assertEqual(json.loads(body)["guid"], str(vpRef.xmlId))
+        (response, body) = self.get(vpUrl + "/snapshot")
+        self.assertEqual(response.getheader("Content-Type"), "image/png")
+        with open(os.path.join(self.session.bcfDir,
+            str(self.markup.topic.xmlId), str(vpRef.snapshot)), "rb") as f:
+            self.assertEqual(body, f.read())
+
+        (response, body) = self.get(self.projectUrl + "/topics/"
+                "00000000-0000-0000-0000-000000000000")
+        self.assertEqual(response.status, 404)
+        self.assertIn("message", json.loads(body))
+
+
+    def testEtagAndGzip(self):
+
+        (response, body) = self.get(self.topicUrl)
+        etag = response.getheader("ETag")
+        self.assertIsNotNone(etag)
+        (response, body) = self.get(self.topicUrl, { "If-None-Match": etag })
+        self.assertEqual(response.status, 304)
+        self.assertEqual(body, b"")
+
+        vpUrl = "{}/viewpoints/{}".format(self.topicUrl,
+                self.markup.viewpoints[0].xmlId)
+        (plain, plainBody) = self.get(vpUrl + "/snapshot")
+        (response, body) = self.get(vpUrl + "/snapshot",
+                { "Accept-Encoding": "gzip" })
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(gzip.decompress(body), plainBody)
+        self.assertNotEqual(response.getheader("ETag"),
+                plain.getheader("ETag"))
+        (response, body) = self.get(vpUrl + "/snapshot", { "If-None-Match":
+            plain.getheader("ETag"), "Accept-Encoding": "gzip" })
+        self.assertEqual(response.status, 304)
+
+        # a changed topic gets a new ETag
+        self.markup.topic.title = "changed"
+        (response, body) = self.get(self.topicUrl, { "If-None-Match": etag })
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(body)["title"], "changed")
+
+
+    def testIdleConnectionsDoNotBlockThePool(self):
+
+        """ More idle kept alive connections than threads must not stall new
+        requests """
+
+        idle = [ http.client.HTTPConnection("127.0.0.1", self.server.port,
+            timeout=10) for i in range(self.server.workers + 2) ]
+        try:
+            for connection in idle:
+                (response, body) = self.get(self.topicUrl,
+                        connection=connection)
+                self.assertEqual(response.status, 200)
+
+            start = time.perf_counter()
+            (response, body) = self.get(self.topicUrl)
+            self.assertEqual(response.status, 200)
+            self.assertLess(time.perf_counter() - start,
+                    server.BcfApiHandler.keepAliveTimeout)
+        finally:
+            for connection in idle:
+                connection.close()
+
+
+    def testRequestsPerSecond(self):
+
+        clients = 4
+        requests = 100
+        # a few thousand requests per second are reached on a single core,
+        # still above 600 if the core is shared with several busy processes.
+        # A request that waits for a poll interval or a new worker thread
+        # brings the rate well below this bound.
+        minRate = 200
+
+        def client(i):
+            connection = http.client.HTTPConnection("127.0.0.1",
+                    self.server.port, timeout=10)
+            try:
+                for j in range(requests):
+                    (response, body) = self.get(self.topicUrl,
+                            connection=connection)
+                    self.assertEqual(response.status, 200)
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as pool:
+            list(pool.map(client, range(clients)))
+        elapsed = time.perf_counter() - start
+
+        rate = clients * requests / elapsed
+        sys.stderr.write("\n{:.0f} requests per second ({} clients)"\
+                " ".format(rate, clients))
+        self.assertGreater(rate, minRate)
+
+
+if __name__ == "__main__":
+    unittest.main()
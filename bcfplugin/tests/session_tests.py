@@ -0,0 +1,177 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, "../")
+import bcfplugin
+import bcfplugin.util as util
+import bcfplugin.programmaticInterface as pI
+from bcfplugin.session import Session, getSession
+
+
+class SessionTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpDir = tempfile.mkdtemp()
+        self.files = list()
+        for name in ("snapshots", "docref"):
+            path = os.path.join(self.tmpDir, "{}.bcf".format(name))
+            shutil.copyfile("../../bcf-examples/bcfexmple_{}.bcf".format(name),
+                    path)
+            self.files.append(path)
+
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmpDir)
+
+
+    def testSessionsAreIndependent(self):
+
+        default = getSession()
+        with Session() as first:
+            self.assertIs(getSession(), first)
+            pI.openProject(self.files[0])
+            firstDir = util.getBcfDir()
+            with Session() as second:
+                pI.openProject(self.files[1])
+                self.assertIs(pI.curProject, second.project)
+                self.assertNotEqual(util.getBcfDir(), firstDir)
+                util.setDirty(True)
+                secondTmp = util.getSystemTmp()
+
+            self.assertFalse(os.path.exists(secondTmp))
+            self.assertIs(pI.curProject, first.project)
+            self.assertEqual(pI.curBcfFile, self.files[0])
+            self.assertFalse(util.getDirtyBit())
+            self.assertTrue(os.path.isdir(firstDir))
+
+        self.assertIs(getSession(), default)
+        self.assertIsNone(first.project)
+
+
+    def testConcurrentSessions(self):
+
+        results = dict()
+
+        def work(path):
+            with Session():
+                pI.openProject(path)
+                topic = pI.getTopics()[0][1]
+                pI.addComment(topic, "comment in {}".format(path), "a@b.c")
+                outFile = path + ".out"
+                pI.saveProject(outFile)
+                results[path] = (len(getSession().projectUpdates),
+                        len(pI.getComments(topic)), os.path.exists(outFile))
+                pI.closeProject()
+
+        threads = [ threading.Thread(target=work, args=(path,))
+                for path in self.files ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(set(results.keys()), set(self.files))
+        for (updates, comments, saved) in results.values():
+            self.assertEqual(updates, 0)
+            self.assertTrue(comments > 0)
+            self.assertTrue(saved)
+
+
+    def testStateIsKeptInMemory(self):
+
+        with Session():
+            util.setDirty(True)
+            util.setAuthor("a@b.c")
+            self.assertTrue(util.getDirtyBit())
+            self.assertEqual(util.getAuthor(), "a@b.c")
+            self.assertEqual(os.listdir(util.getSystemTmp()), [])
+
+            util.deleteTmp()
+            self.assertFalse(util.getDirtyBit())
+            self.assertTrue(util.isAuthorSet())
+
+
+    def testPersistentState(self):
+
+        with Session(persistent=True):
+            tmpDir = util.getSystemTmp()
+            util.setDirty(True)
+            util.setAuthor("a@b.c")
+            # keep the directory, as if the process crashed
+            getSession().ownedDirs.clear()
+
+        with Session(persistent=True) as resumed:
+            util.storeTmpPath(tmpDir)
+            resumed.ownedDirs.append(tmpDir)
+            self.assertTrue(util.getDirtyBit())
+            self.assertEqual(util.getAuthor(), "a@b.c")
+        self.assertFalse(os.path.exists(tmpDir))
+
+
+    def testDeleteStaleSessions(self):
+
+        # pids are never this large, the process is taken as dead
+        dead = tempfile.mkdtemp(prefix="{}99999999_".format(util.PREFIX))
+        orphan = tempfile.mkdtemp(prefix="{}{}_".format(util.PREFIX,
+            os.getpid()))
+        with Session():
+            live = util.getSystemTmp()
+            deleted = util.deleteStaleSessions()
+            self.assertTrue(os.path.isdir(live))
+
+        self.assertIn(dead, deleted)
+        self.assertIn(orphan, deleted)
+        self.assertFalse(os.path.exists(dead))
+        self.assertFalse(os.path.exists(orphan))
+
+
+    def testRecoverCrashedSession(self):
+
+        # persistent session of a process that crashed
+        crashed = tempfile.mkdtemp(prefix="{}99999999_".format(util.PREFIX))
+        for (name, content) in ((util.PERSISTENT_FILE, ""),
+                (util.DIRTY_FILE, "True"), (util.AUTHOR_FILE, "a@b.c")):
+            with open(os.path.join(crashed, name), "w") as f:
+                f.write(content)
+
+        self.assertNotIn(crashed, util.deleteStaleSessions())
+        self.assertTrue(os.path.isdir(crashed))
+
+        with Session(persistent=True) as session:
+            pI.openProject(self.files[0])
+            self.assertTrue(session.isOpen())
+            self.assertTrue(util.getDirtyBit())
+            self.assertEqual(util.getAuthor(), "a@b.c")
+            self.assertFalse(os.path.exists(crashed))
+            self.assertEqual(util.getSessionPid(
+                os.path.basename(session.tmpDir)), os.getpid())
+            recovered = session.tmpDir
+        self.assertFalse(os.path.exists(recovered))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import os
+import sys
+import shutil
+import struct
+import tempfile
+import unittest
+
+sys.path.insert(0, "../")
+import bcfplugin
+import util
+import rdwr.reader as reader
+import rdwr.snapshot as snapshot
+
+
+class SnapshotTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpDir = tempfile.mkdtemp()
+        self.bcfFile = os.path.join(self.tmpDir, "snapshot.bcf")
+        shutil.copyfile("../../bcf-examples/bcfexmple_snapshots.bcf",
+                self.bcfFile)
+        self.snapshotFile = os.path.join(self.tmpDir, "session.snap")
+        self.project = reader.readBcfFile(self.bcfFile)
+
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmpDir)
+        util.deleteTmp()
+
+
+    def testRoundTrip(self):
+
+        markup = self.project.topicList[0]
+        markup.topic.title = "unsaved title"
+        with open(os.path.join(util.getBcfDir(), "unsaved.txt"), "w") as f:
+            f.write("unsaved")
+        util.setDirty(True)
+        self.assertTrue(snapshot.writeSnapshot(self.project, self.bcfFile,
+            self.snapshotFile))
+
+        util.deleteTmp()
+        restored = snapshot.readSnapshot(self.snapshotFile, self.bcfFile)
+        self.assertIsNotNone(restored)
+        self.assertEqual(restored, self.project)
+        self.assertEqual(restored.topicList[0].topic.title, "unsaved title")
+        self.assertTrue(util.getDirtyBit())
+        with open(os.path.join(util.getBcfDir(), "unsaved.txt"), "r") as f:
+            self.assertEqual(f.read(), "unsaved")
+
+        # the restored project is wired up like a freshly read one
+        comment = restored.topicList[0].comments[0]
+        self.assertIs(restored.searchObject(comment), comment)
+        self.assertIs(comment.containingObject, restored.topicList[0])
+
+
+    def testChangedArchiveIsRejected(self):
+
+        snapshot.writeSnapshot(self.project, self.bcfFile, self.snapshotFile)
+        shutil.copyfile("search_tests/Issues-Example.bcf", self.bcfFile)
+        self.assertIsNone(snapshot.readSnapshot(self.snapshotFile,
+            self.bcfFile))
+
+
+    def testCorruptSnapshotIsRejected(self):
+
+        snapshot.writeSnapshot(self.project, self.bcfFile, self.snapshotFile)
+        with open(self.snapshotFile, "r+b") as f:
+            f.seek(snapshot.SNAPSHOT_HEADER.size + 4)
+            f.write(b"\xff\xff\xff\xff")
+        self.assertIsNone(snapshot.readSnapshot(self.snapshotFile,
+            self.bcfFile))
+
+
+    def testOtherVersionIsRejected(self):
+
+        snapshot.writeSnapshot(self.project, self.bcfFile, self.snapshotFile)
+        with open(self.snapshotFile, "r+b") as f:
+            f.seek(len(snapshot.SNAPSHOT_MAGIC))
+            f.write(struct.pack("<H", snapshot.SNAPSHOT_VERSION + 1))
+        self.assertIsNone(snapshot.readSnapshot(self.snapshotFile,
+            self.bcfFile))
+
+
+    def testMissingSnapshot(self):
+
+        self.assertIsNone(snapshot.readSnapshot(self.snapshotFile,
+            self.bcfFile))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import os
+import sys
+import shutil
+import zipfile
+import datetime
+import tempfile
+import unittest
+from uuid import uuid4
+
+sys.path.insert(0, "../")
+import bcfplugin
+import bcfplugin.util as util
+import bcfplugin.rdwr.reader as reader
+import bcfplugin.rdwr.sqlitestore as sqlitestore
+from bcfplugin.rdwr.markup import Comment
+
+
+class SqliteStoreTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpDir = tempfile.mkdtemp()
+        self.bcfFile = os.path.join(self.tmpDir, "docref2.bcf")
+        shutil.copyfile("../../bcf-examples/bcfexmple_docref2.bcf",
+                self.bcfFile)
+        self.store = sqlitestore.openStore(self.bcfFile,
+                os.path.join(self.tmpDir, "store.sqlite"))
+
+
+    def tearDown(self):
+
+        self.store.close()
+        shutil.rmtree(self.tmpDir)
+        util.deleteTmp()
+
+
+    def testQuery(self):
+
+        project = reader.readBcfFile(self.bcfFile)
+        topicIndex = project.getTopicIndex()
+        self.assertEqual(self.store.getTopicCount(), len(project.topicList))
+
+        queries = [ dict(), dict(status="Active"), dict(status=["Active",
+            "Closed"], orderBy="title", descending=True), dict(orderBy="date"),
+            dict(orderBy="dueDate", limit=1), dict(offset=1),
+            dict(type="unknown") ]
+        for query in queries:
+            expected = [ t.xmlId for t in topicIndex.query(**query) ]
+            self.assertEqual([ t.xmlId for t in self.store.query(**query) ],
+                    expected, query)
+        self.assertRaises(ValueError, self.store.query, orderBy="description")
+
+
+    def testLazyViewpoints(self):
+
+        project = reader.readBcfFile(self.bcfFile)
+        for markup in project.topicList:
+            guid = markup.topic.xmlId
+            vpRefs = self.store.getViewpointReferences(guid)
+            self.assertEqual([ v.xmlId for v in vpRefs ],
+                    [ v.xmlId for v in markup.viewpoints ])
+            for (vpRef, original) in zip(vpRefs, markup.viewpoints):
+                self.assertIsNone(vpRef.viewpoint)
+                self.assertEqual(self.store.getViewpoint(vpRef.xmlId),
+                        original.viewpoint)
+            self.assertEqual([ c.comment for c in
+                self.store.getComments(guid) ],
+                [ c.comment for c in markup.comments ])
+
+
+    def testSave(self):
+
+        unchanged = os.path.join(self.tmpDir, "unchanged.bcf")
+        self.store.save(unchanged)
+        with zipfile.ZipFile(self.bcfFile) as a, \
+                zipfile.ZipFile(unchanged) as b:
+            self.assertEqual({ i.filename: a.read(i) for i in a.infolist()
+                if not i.is_dir() }, { i.filename: b.read(i)
+                    for i in b.infolist() })
+
+        topic = self.store.query(orderBy="title")[0]
+        topic.status = "Closed"
+        topic.labels.append("checked")
+        self.assertTrue(self.store.updateTopic(topic))
+        date = datetime.datetime.now(datetime.timezone.utc)
+        self.assertTrue(self.store.addComment(topic.xmlId, Comment(uuid4(),
+            date, "a@b.c", "stored")))
+        self.assertTrue(self.store.dirty)
+        self.assertEqual([ t.xmlId for t in self.store.query(status="Closed",
+            labels="checked") ], [ topic.xmlId ])
+
+        changed = os.path.join(self.tmpDir, "changed.bcf")
+        self.store.save(changed)
+        project = reader.readBcfFile(changed)
+        markup = project.getTopicIndex().query(status="Closed")[0]\
+                .containingObject
+        self.assertEqual(markup.topic.xmlId, topic.xmlId)
+        self.assertIn("checked", [ l.value for l in markup.topic.labels ])
+        self.assertEqual(markup.comments[-1].comment, "stored")
+
+        self.assertTrue(self.store.deleteTopic(topic.xmlId))
+        self.assertFalse(self.store.deleteTopic(topic.xmlId))
+        self.assertIsNone(self.store.getTopic(topic.xmlId))
+
+
+if __name__ == "__main__":
+    unittest.main()
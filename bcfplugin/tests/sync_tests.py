@@ -0,0 +1,174 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import os
+import copy
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+from uuid import uuid4
+
+sys.path.insert(0, "../")
+import bcfplugin
+import bcfplugin.sync as sync
+import bcfplugin.standin as standin
+import bcfplugin.rdwr.reader as reader
+import bcfplugin.programmaticInterface as pI
+from bcfplugin.session import Session, activate, deactivate
+
+
+class SyncTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpDir = tempfile.mkdtemp()
+        self.server = standin.StandInServer(workers=4)
+        self.server.start()
+        self.remote = self.server.addProject(name="issues")
+        self.url = "http://127.0.0.1:{}/bcf".format(self.server.port)
+        self.sessions = list()
+
+
+    def tearDown(self):
+
+        for session in self.sessions:
+            session.close()
+        self.server.stop()
+        shutil.rmtree(self.tmpDir)
+
+
+    def openSession(self, name):
+
+        bcfFile = os.path.join(self.tmpDir, name + ".bcf")
+        shutil.copyfile("../../bcf-examples/bcfexmple_snapshots.bcf", bcfFile)
+        session = Session()
+        self.sessions.append(session)
+        token = activate(session)
+        try:
+            self.assertEqual(pI.openProject(bcfFile),
+                    pI.OperationResults.SUCCESS)
+        finally:
+            deactivate(token)
+        return session
+
+
+    def readBack(self, session):
+
+        """ Saves the project of `session` and reads it back """
+
+        bcfFile = os.path.join(self.tmpDir, "readback.bcf")
+        token = activate(session)
+        try:
+            pI.saveProject(bcfFile)
+        finally:
+            deactivate(token)
+        return reader.readBcfFile(bcfFile)
+
+
+    def testPushAndPull(self):
+
+        first = self.openSession("first")
+        second = self.openSession("second")
+        one = sync.SyncClient(self.url, self.remote.projectId, first)
+        two = sync.SyncClient(self.url, self.remote.projectId, second)
+        self.addCleanup(one.close)
+        self.addCleanup(two.close)
+
+        # the topic of the file is not on the server yet
+        self.assertEqual(one.sync(), (0, 1))
+        markup = first.project.topicList[0]
+        guid = str(markup.topic.xmlId)
+        self.assertEqual(list(self.remote.topics.keys()), [ guid ])
+        self.assertEqual(len(self.remote.comments[guid]),
+                len(markup.comments))
+        self.assertEqual(one.sync(), (0, 0))
+
+        # the second file has the same topic, the server's version is taken
+        self.assertEqual(two.sync()[1], 0)
+        self.assertEqual(str(second.project.topicList[0].topic.date),
+                str(markup.topic.date))
+
+        token = activate(first)
+        try:
+            self.assertEqual(pI.addComment(markup.topic, "synchronized",
+                "a@b.c"), pI.OperationResults.SUCCESS)
+            topic = copy.deepcopy(markup.topic)
+            topic.title = "moved"
+            self.assertEqual(pI.modifyElement(topic, "a@b.c"),
+                    pI.OperationResults.SUCCESS)
+        except AssertionError:
+            deactivate(token)
+            raise
+        deactivate(token)
+        self.assertEqual(one.push(), 1)
+        self.assertEqual(self.remote.topics[guid]["title"], "moved")
+
+        # only the changed topic and its new comment are fetched
+        count = self.server.requestCount
+        self.assertEqual(two.pull(), 1)
+        self.assertEqual(self.server.requestCount - count, 3)
+        otherMarkup = second.project.topicList[0]
+        self.assertEqual(otherMarkup.topic.title, "moved")
+        self.assertIn("synchronized", [ c.comment for c in
+            otherMarkup.comments ])
+
+        project = self.readBack(second)
+        written = [ m for m in project.topicList
+                if str(m.topic.xmlId) == guid ][0]
+        self.assertEqual(written.topic.title, "moved")
+        self.assertEqual(len(written.comments), len(markup.comments))
+        self.assertEqual(two.pull(), 0)
+
+
+    def testDeltaThroughput(self):
+
+        topics = 200
+        for i in range(topics):
+            guid = str(uuid4())
+            self.remote.topics[guid] = { "guid": guid,
+                    "title": "Topic {}".format(i),
+                    "creation_date": "2019-08-16T10:00:00+00:00",
+                    "creation_author": "a@b.c" }
+            comment = str(uuid4())
+            self.remote.comments[guid] = { comment: { "guid": comment,
+                "topic_guid": guid, "comment": "first", "author": "a@b.c",
+                "date": "2019-08-16T10:00:00+00:00" } }
+
+        session = self.openSession("throughput")
+        client = sync.SyncClient(self.url, self.remote.projectId, session,
+                workers=4)
+        self.addCleanup(client.close)
+
+        start = time.perf_counter()
+        self.assertEqual(client.pull(), topics)
+        elapsed = time.perf_counter() - start
+        sys.stderr.write("\n{:.0f} topics per second pulled"\
+                " ".format(topics / elapsed))
+        self.assertEqual(len(session.project.topicList), topics + 1)
+        self.assertEqual(client.watermark, "2019-08-16T10:00:00+00:00")
+
+        self.assertEqual(client.pull(), 0)
+        # the topics seen at the watermark are fetched again, but not applied
+        self.assertEqual(client.push(), 1)
+        self.assertEqual(len(self.remote.topics), topics + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
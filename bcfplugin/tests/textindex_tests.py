@@ -0,0 +1,165 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import time
+import threading
+import unittest
+
+from uuid import UUID
+from datetime import datetime, timezone
+
+sys.path.insert(0, "../")
+import bcfplugin
+import rdwr.topic as topic
+import rdwr.markup as markup
+import rdwr.project as project
+from bcfplugin.rdwr.textindex import tokenize
+
+
+words = ["wall", "window", "door", "slab", "column", "beam", "stair", "roof",
+        "duct", "pipe", "opening", "clash", "missing", "wrong", "height"]
+
+
+def createProject(count):
+
+    p = project.Project(UUID(int=1), "Project")
+    date = datetime(2019, 8, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        t = topic.Topic(UUID(int=i + 1), "{} {} {}".format(
+                words[i % len(words)], words[i * 7 % len(words)], i),
+                date, "a@b.c",
+                description="The {} is {}".format(words[i * 3 % len(words)],
+                    words[i * 5 % len(words)]))
+        c = markup.Comment(UUID(int=count + i + 1), date, "a@b.c",
+                "Please check the {} near level {}".format(
+                    words[i * 11 % len(words)], i % 10))
+        m = markup.Markup(t, comments=[c])
+        t.containingObject = m
+        c.containingObject = m
+        m.containingObject = p
+        p.topicList.append(m)
+    return p
+
+
+def documents(hits):
+    return [ document for (score, document) in hits ]
+
+
+class TextIndexTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.project = createProject(60)
+        self.index = self.project.getTextIndex()
+        self.topics = [ m.topic for m in self.project.topicList ]
+        self.comments = [ m.comments[0] for m in self.project.topicList ]
+
+
+    def testTokenize(self):
+
+        self.assertEqual(tokenize("Wall/Door: 2 CLASHES!"),
+                ["wall", "door", "2", "clashes"])
+        self.assertEqual(tokenize(None), [])
+
+
+    def testAllWordsMustMatch(self):
+
+        # topic 1 is titled "window roof 1"
+        hits = documents(self.index.search("window roof"))
+        expected = [ t for t in self.topics
+                if "window" in tokenize(t.title + " " + t.description) and
+                    "roof" in tokenize(t.title + " " + t.description) ]
+        self.assertTrue(len(expected) > 0)
+        self.assertEqual(set(map(id, hits)), set(map(id, expected)))
+
+
+    def testPrefix(self):
+
+        hits = documents(self.index.search("win"))
+        self.assertTrue(len(hits) > 0)
+        for hit in hits:
+            text = getattr(hit, "comment", None) or (hit.title + " " +
+                    hit.description)
+            self.assertIn("window", tokenize(text))
+
+        # comments are found as well
+        self.assertTrue(any(hit in self.comments
+            for hit in documents(self.index.search("near"))))
+
+
+    def testRanking(self):
+
+        """ Words in titles weigh more than words in descriptions, exact
+        matches more than prefix matches """
+
+        (first, second) = self.topics[:2]
+        first.title = "sprinklers"
+        first.description = "sprinkler"
+        second.title = "sprinkler"
+        second.description = "nothing"
+        hits = documents(self.index.search("sprinkler", limit=2))
+        self.assertEqual(hits, [second, first])
+
+
+    def testIncrementalUpdates(self):
+
+        t = self.topics[5]
+        c = self.comments[5]
+        self.assertEqual(self.index.search("zeppelin"), [])
+        t.title = "Zeppelin hangar"
+        c.comment = "zeppelins everywhere"
+        self.assertEqual(set(map(id, documents(self.index.search("zepp")))),
+                { id(t), id(c) })
+
+        self.project.deleteObject(c)
+        self.assertEqual(documents(self.index.search("zepp")), [t])
+
+        self.project.deleteObject(t.containingObject)
+        self.assertEqual(self.index.search("zeppelin"), [])
+        self.assertEqual(len(self.index), 118)
+
+
+    def testBackgroundRefresh(self):
+
+        p = createProject(2000)
+        index = p.getTextIndex()
+        thread = threading.Thread(target=index.refresh)
+        thread.start()
+        # searching while the index is filled waits for the thread
+        hits = index.search("beam", limit=10)
+        thread.join()
+        self.assertFalse(index.isStale())
+        self.assertEqual(len(hits), 10)
+
+
+    def testPerformance(self):
+
+        p = createProject(30000)
+        index = p.getTextIndex()
+        index.refresh()
+        start = time.perf_counter()
+        for i in range(20):
+            hits = index.search("window ro", limit=20)
+        elapsed = (time.perf_counter() - start) / 20
+        self.assertEqual(len(hits), 20)
+        self.assertLess(elapsed, 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import copy
+import time
+import pickle
+import unittest
+
+from uuid import UUID
+from datetime import datetime, timezone
+
+sys.path.insert(0, "../")
+import bcfplugin
+import rdwr.topic as topic
+import rdwr.markup as markup
+import rdwr.project as project
+
+
+def guid(i):
+    return UUID(int=i + 1)
+
+
+def addTopic(p, i, related):
+
+    t = topic.Topic(guid(i), "topic {}".format(i),
+            datetime(2019, 8, 1, tzinfo=timezone.utc), "a@b.c",
+            relatedTopics=[ guid(r) for r in related ])
+    m = markup.Markup(t)
+    t.containingObject = m
+    m.containingObject = p
+    p.topicList.append(m)
+    return t
+
+
+def createProject(relations):
+
+    """ Creates a project with one topic per entry of `relations`, a list of
+    the numbers of the topics each topic refers to """
+
+    p = project.Project(UUID(int=0), "Project")
+    for (i, related) in enumerate(relations):
+        addTopic(p, i, related)
+    return p
+
+
+def titles(topics):
+    return [ t.title for t in topics ]
+
+
+class TopicGraphTests(unittest.TestCase):
+
+    def setUp(self):
+
+        # 0 -> 1 -> 2 -> 0 is a cycle, 3 -> 4 a chain, 5 is alone and 6 refers
+        # to itself and to a topic that does not exist
+        self.project = createProject([[1], [2], [0], [4], [], [], [6, 99]])
+        self.graph = self.project.getTopicGraph()
+        self.topics = [ m.topic for m in self.project.topicList ]
+
+
+    def testLookup(self):
+
+        self.assertIs(self.graph.topic(guid(3)), self.topics[3])
+        self.assertIs(self.graph.topic(str(guid(3))), self.topics[3])
+        self.assertIsNone(self.graph.topic(guid(99)))
+        self.assertRaises(ValueError, self.graph.topic, "no guid")
+
+
+    def testRelations(self):
+
+        self.assertEqual(self.graph.related(guid(3)), [ self.topics[4] ])
+        self.assertEqual(self.graph.referencedBy(guid(4)), [ self.topics[3] ])
+        self.assertEqual(self.graph.related(guid(6)), [ self.topics[6] ])
+        self.assertEqual(titles(self.graph.transitive(guid(0))),
+                [ "topic 1", "topic 2", "topic 0" ])
+        self.assertEqual(self.graph.transitive(guid(0), maxDepth=1),
+                [ self.topics[1] ])
+        self.assertEqual(self.graph.transitive(guid(4)), [])
+
+
+    def testCyclesAndComponents(self):
+
+        self.assertEqual([ titles(c) for c in self.graph.cycles() ],
+                [ ["topic 0", "topic 1", "topic 2"], ["topic 6"] ])
+        self.assertTrue(self.graph.hasCycle(guid(1)))
+        self.assertFalse(self.graph.hasCycle(guid(3)))
+
+        self.assertEqual([ titles(c) for c in self.graph.components() ],
+                [ ["topic 0", "topic 1", "topic 2"], ["topic 3", "topic 4"],
+                    ["topic 5"], ["topic 6"] ])
+        self.assertEqual(self.graph.component(guid(4)),
+                [ self.topics[3], self.topics[4] ])
+
+
+    def testUpdates(self):
+
+        # a reference is added, the dangling one resolves once its topic
+        # exists
+        self.topics[5].relatedTopics.append(guid(3))
+        self.assertEqual(self.graph.referencedBy(guid(3)), [ self.topics[5] ])
+        new = addTopic(self.project, 99, [])
+        self.assertEqual(self.graph.related(guid(6)),
+                [ self.topics[6], new ])
+
+        # breaking the cycle
+        self.project.deleteObject(self.topics[2].relatedTopics[0])
+        self.assertFalse(self.graph.hasCycle(guid(0)))
+        self.project.deleteObject(self.topics[4].containingObject)
+        self.assertIsNone(self.graph.topic(guid(4)))
+        self.assertEqual(self.graph.related(guid(3)), [])
+
+
+    def testCopies(self):
+
+        """ Copies of the project build their own graph """
+
+        cpy = copy.deepcopy(self.project)
+        self.assertIsNone(cpy._topicGraph)
+        self.assertEqual(titles(cpy.getTopicGraph().transitive(guid(3))),
+                [ "topic 4" ])
+
+        restored = pickle.loads(pickle.dumps(self.project))
+        self.assertIsNone(restored._topicGraph)
+        self.assertEqual(len(restored.getTopicGraph().cycles()), 2)
+
+
+    def testPerformance(self):
+
+        # clusters of 50 topics, each referring to the following five
+        count = 30000
+        relations = [ [ j for j in range(i + 1, min(i + 6, count))
+            if j // 50 == i // 50 ] for i in range(count) ]
+        p = createProject(relations)
+        graph = p.getTopicGraph()
+        graph.refresh()
+
+        start = time.perf_counter()
+        for i in range(0, count, 300):
+            related = graph.transitive(guid(i))
+            self.assertEqual(len(graph.component(guid(i))), 50)
+        elapsed = (time.perf_counter() - start) / (count // 300)
+        self.assertLess(elapsed, 0.01)
+
+        start = time.perf_counter()
+        self.assertEqual(len(graph.components()), count // 50)
+        self.assertEqual(graph.cycles(), [])
+        self.assertLess(time.perf_counter() - start, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+Copyright (C) 2019 PODEST Patrick
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import copy
+import time
+import pickle
+import unittest
+
+from uuid import UUID
+from datetime import datetime, timezone
+
+sys.path.insert(0, "../")
+import bcfplugin
+import rdwr.topic as topic
+import rdwr.markup as markup
+import rdwr.project as project
+
+
+statuses = ["Open", "Closed", "In Progress"]
+assignees = ["a@b.c", "d@e.f", "g@h.i", "j@k.l"]
+
+
+def createProject(count):
+
+    p = project.Project(UUID(int=1), "Project")
+    for i in range(count):
+        t = topic.Topic(UUID(int=i + 1), "topic {}".format(i),
+                datetime(2019, 8, 1, tzinfo=timezone.utc), "a@b.c",
+                type="Issue" if i % 2 else "Request",
+                status=statuses[i % len(statuses)],
+                priority="High" if i % 5 == 0 else "Normal",
+                index=i if i % 7 else -1,
+                labels=["Architecture"] if i % 4 == 0 else ["Structure"],
+                dueDate=datetime(2019, 9, 1 + i % 28, tzinfo=timezone.utc),
+                assignee=assignees[i % len(assignees)])
+        m = markup.Markup(t)
+        t.containingObject = m
+        m.containingObject = p
+        p.topicList.append(m)
+    return p
+
+
+def titles(topics):
+    return [ t.title for t in topics ]
+
+
+class TopicIndexTests(unittest.TestCase):
+
+    def setUp(self):
+
+        self.project = createProject(50)
+        self.index = self.project.getTopicIndex()
+        self.topics = [ m.topic for m in self.project.topicList ]
+
+
+    def assertMatches(self, result, predicate):
+
+        expected = { id(t) for t in self.topics if predicate(t) }
+        self.assertEqual({ id(t) for t in result }, expected)
+
+
+    def testFilters(self):
+
+        self.assertMatches(self.index.query(status="Open"),
+                lambda t: t.status == "Open")
+        self.assertMatches(self.index.query(status=["Open", "Closed"],
+                    assignee="a@b.c"),
+                lambda t: t.status != "In Progress" and t.assignee == "a@b.c")
+        self.assertMatches(self.index.query(labels="Architecture",
+                    priority="High"),
+                lambda t: t.labels[0].value == "Architecture" and
+                    t.priority == "High")
+        self.assertEqual(self.index.query(status="Unknown"), [])
+
+
+    def testDueDateRange(self):
+
+        after = datetime(2019, 9, 5, tzinfo=timezone.utc)
+        before = datetime(2019, 9, 10, tzinfo=timezone.utc)
+        self.assertMatches(self.index.query(dueAfter=after, dueBefore=before),
+                lambda t: after <= t.dueDate < before)
+
+
+    def testOrder(self):
+
+        result = self.index.query()
+        # topics without an index are at the end, as in `getTopics()`
+        indices = [ t.index for t in result ]
+        valid = [ i for i in indices if i != -1 ]
+        self.assertEqual(valid, sorted(valid))
+        self.assertEqual(indices[len(valid):], [-1] * (50 - len(valid)))
+
+        result = self.index.query(orderBy="dueDate", descending=True, limit=5)
+        self.assertEqual(len(result), 5)
+        dueDates = [ t.dueDate for t in result ]
+        self.assertEqual(dueDates, sorted(dueDates, reverse=True))
+        self.assertEqual(dueDates[0], max(t.dueDate for t in self.topics))
+
+        self.assertRaises(ValueError, self.index.query, orderBy="colour")
+
+
+    def testValueChange(self):
+
+        t = self.topics[3]
+        t.status = "Resolved"
+        self.assertEqual(self.index.query(status="Resolved"), [t])
+        self.assertNotIn(t, self.index.query(status=statuses[3 % 3]))
+
+        t.labels.append("Heating")
+        self.assertEqual(self.index.query(labels=["Heating"]), [t])
+        self.project.deleteObject(t.labels[-1])
+        self.assertEqual(self.index.query(labels="Heating"), [])
+
+
+    def testAddAndRemoveTopics(self):
+
+        t = topic.Topic(UUID(int=1000), "new",
+                datetime(2019, 8, 1, tzinfo=timezone.utc), "a@b.c",
+                status="New")
+        m = markup.Markup(t)
+        t.containingObject = m
+        m.containingObject = self.project
+        self.project.topicList.append(m)
+        self.assertEqual(self.index.query(status="New"), [t])
+
+        old = self.topics[0]
+        self.project.deleteObject(old.containingObject)
+        self.assertNotIn(old, self.index.query())
+        self.assertEqual(len(self.index), 50)
+
+
+    def testCopies(self):
+
+        """ Copies of the project build their own index """
+
+        cpy = copy.deepcopy(self.project)
+        self.assertIsNone(cpy._topicIndex)
+        self.assertEqual(titles(cpy.getTopicIndex().query(status="Open")),
+                titles(self.index.query(status="Open")))
+
+        restored = pickle.loads(pickle.dumps(self.project))
+        self.assertIsNone(restored._topicIndex)
+        restored.topicList[0].topic.status = "Resolved"
+        self.assertEqual(len(restored.getTopicIndex().query(
+            status="Resolved")), 1)
+
+
+    def testPerformance(self):
+
+        p = createProject(30000)
+        index = p.getTopicIndex()
+        start = time.perf_counter()
+        for i in range(20):
+            result = index.query(status="Open", assignee="a@b.c",
+                    labels="Architecture", orderBy="dueDate", limit=50)
+        elapsed = (time.perf_counter() - start) / 20
+        self.assertEqual(len(result), 50)
+        self.assertLess(elapsed, 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -27,9 +27,16 @@ multiple places. Its main purpose, however is to store the paths of the
 temporary directory, the directory into which the current project was being
 extracted to, the file that serves as log file and the file in which the E-Mail
 of the author is stored.
+
+All of these, except for the log file, belong to the current session (see
+`bcfplugin.session`) and are held in memory. Every session has its own
+temporary directory, whose name starts with `PREFIX` and the id of the process
+that created it. Persistent sessions additionally store the dirty bit and the
+author in files in this directory.
 """
 
 import os
+import re
 import sys
 import urllib.request
 import tempfile
@@ -40,6 +47,10 @@ from urllib.error import URLError
 
 from PySide2.QtWidgets import QMessageBox, QApplication
 
+# `bcfplugin.session` is imported inside the functions using it. Importing it
+# here would run `bcfplugin/__init__.py`, which uses this module, before this
+# module is initialized if it is imported on its own.
+
 PREFIX = "bcfplugin_"
 """ Prefix for every created folder and file. """
 
@@ -53,11 +64,16 @@ MMPI = 25.4
 """ Millimeters per inch """
 
 AUTHOR_FILE = "author.txt"
-""" Name of the authors file, in which the email address will be stored once per
-session """
+""" Name of the authors file, in which persistent sessions store the email
+address of the author """
 
 DIRTY_FILE = "{}dirty.txt".format(PREFIX)
-""" Name of the file containing the dirty bit """
+""" Name of the file in which persistent sessions store the dirty bit """
+
+PERSISTENT_FILE = "{}persistent.txt".format(PREFIX)
+""" Name of the file marking the temporary directory of a persistent session.
+`deleteStaleSessions()` keeps these directories, so that `recoverSession()`
+can resume them after a crash """
 
 """ Specifies the name of the directory in which the schema files are stored """
 schemaDir = "schemas"
@@ -65,11 +81,6 @@ schemaDir = "schemas"
 """ Holds the paths of the schema files in the plugin directory. Gets set during runtime """
 schemaPaths = {} # during runtime this will be a map like __schemaUrls
 
-tmpFilePathsFileName = "{}tmp.txt".format(PREFIX)
-""" Holds the path to the file that contains just the path to the created
-temporary directory """
-
-
 class Schema(Enum):
 
     """ Enum defining the 5 schema types. """
@@ -166,15 +177,33 @@ def storeLine(file, text, lineno):
 
 def storeTmpPath(tmpPath):
 
-    """ Wrapper for `storeLine()` which stores `tmpPath` in line 1 of the
-    temporary paths file. """
+    """ Sets `tmpPath` as temporary directory of the current session.
 
-    global tmpFilePathsFileName
+    If the session is persistent, the dirty bit and author stored in `tmpPath`
+    are restored, so that a session can be resumed after a crash.
+    """
+
+    from bcfplugin.session import getSession
+    session = getSession()
+    session.tmpDir = tmpPath
+    if not session.persistent:
+        return
+
+    dirtyPath = os.path.join(tmpPath, DIRTY_FILE)
+    if os.path.exists(dirtyPath):
+        session.dirty = (readLine(dirtyPath, 1) == "True")
+    authorsPath = os.path.join(tmpPath, AUTHOR_FILE)
+    if os.path.exists(authorsPath):
+        session.author = readLine(authorsPath, 1)
 
-    # get platform specific temporary directory
-    fpath = getTmpFilePath(tmpFilePathsFileName)
 
-    storeLine(fpath, tmpPath, 1)
+def writeSessionFile(filename: str, content: str):
+
+    """ Writes `content` to `filename` in the temporary directory of the
+    current session """
+
+    with open(os.path.join(getSystemTmp(), filename), "w") as f:
+        f.write(content)
 
 
 def readLine(file, lineno):
@@ -196,70 +225,184 @@ def readLine(file, lineno):
 
 def getSystemTmp(createNew: bool = False):
 
-    """ Creates a temporary directory on first call or if `createNew` is set.
+    """ Returns the temporary directory of the current session.
 
-    On subsequent calls the temp dir that was created latest is returned
+    The directory is created on first call or if `createNew` is set. On
+    subsequent calls the temp dir that was created latest is returned.
     """
 
-    global tmpFilePathsFileName
     global PREFIX
 
-    tmpDir = ""
-    fpath = getTmpFilePath(tmpFilePathsFileName)
-    if not os.path.exists(fpath):
-        tmpDir = tempfile.mkdtemp(prefix=PREFIX)
-        storeLine(fpath, tmpDir, 1)
+    from bcfplugin.session import getSession
+    session = getSession()
+    if session.tmpDir is None or createNew:
+        prefix = "{}{}_".format(PREFIX, os.getpid())
+        session.tmpDir = tempfile.mkdtemp(prefix=prefix)
+        session.ownedDirs.append(session.tmpDir)
+        if session.persistent:
+            writeSessionFile(PERSISTENT_FILE, "")
 
-    else:
-        tmpDir = readLine(fpath, 1)
-
-    return tmpDir
+    return session.tmpDir
 
 
 def setBcfDir(dir):
 
-    """ Wrapper for `storeLine()` storing `dir` in the second line of the
-    temporary file paths file. """
+    """ Sets `dir` as the directory the BCF file of the current session got
+    extracted to. """
 
-    global tmpFilePathsFileName
+    from bcfplugin.session import getSession
+    getSession().bcfDir = dir
 
-    fpath = getTmpFilePath(tmpFilePathsFileName)
-    # fpath is assumed to already exist when this function is called the first
-    # time
 
-    storeLine(fpath, dir, 2)
+def getBcfDir():
 
+    """ Returns the directory in which the BCF file of the current session got
+    extracted to. """
 
-def getBcfDir():
+    from bcfplugin.session import getSession
+    return getSession().bcfDir
 
-    """ Wrapper for `readLine()`, returning the directory in which the BCF file
-    got extracted to. """
 
-    global tmpFilePathsFileName
+def deleteTmp():
 
-    fpath = getTmpFilePath(tmpFilePathsFileName)
-    bcfDir = readLine(fpath, 2)
+    """ Delete the temporary directories of the current session with all their
+    contents.
 
-    return bcfDir
+    Directories of other sessions are left alone, see `deleteStaleSessions()`.
+    """
 
+    from bcfplugin.session import getSession
+    getSession().deleteDirs()
 
-def deleteTmp():
 
-    """ Delete the temporary directory with all its contents """
+def getSessionPid(dirName: str):
+
+    """ Returns the id of the process that created the session directory
+    `dirName`, or None if `dirName` is no session directory. """
+
+    match = re.match(r"{}(\d+)_".format(re.escape(PREFIX)), dirName)
+    if match is None:
+        return None
+    return int(match.group(1))
+
+
+def isProcessAlive(pid: int):
+
+    """ Returns True if a process with the id `pid` is running """
+
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        # PROCESS_QUERY_LIMITED_INFORMATION
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            # ERROR_ACCESS_DENIED means the process exists
+            return kernel32.GetLastError() == 5
+        exitCode = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exitCode))
+        kernel32.CloseHandle(handle)
+        # STILL_ACTIVE
+        return exitCode.value == 259
+
+    try:
+        os.kill(pid, 0)
+    except (ProcessLookupError, OverflowError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def deleteStaleSessions():
+
+    """ Deletes the temporary directories of sessions that ended without
+    deleting them.
+
+    These are the directories of processes that are no longer running, and
+    the directories of this process that are not owned by a session anymore.
+    Directories of other running processes are left alone, even if they are
+    idle, and so are directories of persistent sessions of processes that are
+    no longer running, they are resumed by `recoverSession()`. Returns the
+    list of deleted directories.
+    """
 
     global PREFIX
 
+    from bcfplugin.session import getLiveDirs
     sysTmp = tempfile.gettempdir()
+    liveDirs = getLiveDirs()
+    deleted = list()
     for fname in os.listdir(sysTmp):
-        if fname.startswith(PREFIX):
-            fpath = os.path.join(sysTmp, fname)
-            if os.path.isdir(fpath):
-                shutil.rmtree(fpath)
-            elif os.path.isfile(fpath):
-                os.remove(fpath)
-            else:
-                # special file, like socket
-                pass
+        pid = getSessionPid(fname)
+        fpath = os.path.join(sysTmp, fname)
+        if pid is None or not os.path.isdir(fpath):
+            continue
+
+        if pid == os.getpid():
+            stale = os.path.normcase(os.path.abspath(fpath)) not in liveDirs
+        else:
+            stale = (not isProcessAlive(pid) and
+                    not os.path.exists(os.path.join(fpath, PERSISTENT_FILE)))
+
+        if stale:
+            shutil.rmtree(fpath, ignore_errors=True)
+            deleted.append(fpath)
+
+    return deleted
+
+
+def getRecoverableSessions():
+
+    """ Returns the temporary directories of persistent sessions whose process
+    is no longer running, the most recently modified first. """
+
+    global PREFIX
+
+    sysTmp = tempfile.gettempdir()
+    recoverable = list()
+    for fname in os.listdir(sysTmp):
+        pid = getSessionPid(fname)
+        fpath = os.path.join(sysTmp, fname)
+        if (pid is None or pid == os.getpid() or
+                not os.path.exists(os.path.join(fpath, PERSISTENT_FILE)) or
+                isProcessAlive(pid)):
+            continue
+        recoverable.append(fpath)
+
+    return sorted(recoverable, key=os.path.getmtime, reverse=True)
+
+
+def recoverSession():
+
+    """ Resumes the temporary directory of a persistent session that ended
+    with a crash in the current session.
+
+    The most recently modified directory returned by
+    `getRecoverableSessions()` is renamed to a directory of this process, so
+    that no other process recovers it too, and becomes the temporary directory
+    of the current session through `storeTmpPath()`, restoring its dirty bit
+    and author. Returns the path of the directory, or None if there was
+    nothing to recover.
+    """
+
+    global PREFIX
+
+    for path in getRecoverableSessions():
+        suffix = os.path.basename(path).split("_", 2)[-1]
+        newPath = os.path.join(os.path.dirname(path),
+                "{}{}_{}".format(PREFIX, os.getpid(), suffix))
+        try:
+            os.rename(path, newPath)
+        except OSError:
+            # recovered by another process in the meantime
+            continue
+
+        from bcfplugin.session import getSession
+        storeTmpPath(newPath)
+        getSession().ownedDirs.append(newPath)
+        return newPath
+
+    return None
 
 
 def getCurrentQScreen():
@@ -277,50 +420,37 @@ def getCurrentQScreen():
 
 def isAuthorSet():
 
-    """ Checks for author.txt file in temp directory.
+    """ Checks whether the author of the current session is set.
 
-    author.txt will be filled once per session with the email address of the
-    author. It is then used as value for the "ModifiedAuthor" fields in the data
-    model.
+    The author is set once per session to the email address of the user. It
+    is then used as value for the "ModifiedAuthor" fields in the data model.
     """
 
-    authorsPath = os.path.join(getSystemTmp(), AUTHOR_FILE)
-    if os.path.exists(authorsPath):
-        return True
-    return False
+    from bcfplugin.session import getSession
+    return getSession().author is not None
 
 
 def setAuthor(author: str):
 
-    """ Creates the authors file in the temporary directory with `author` as
-    content.
+    """ Sets `author` as author of the current session.
 
-    If the file already exists, then the file is just overwritten.
+    Persistent sessions also write it to `AUTHOR_FILE`.
     """
 
-    authorsPath = os.path.join(getSystemTmp(), AUTHOR_FILE)
-    with open(authorsPath, "w") as f:
-        f.write(author)
+    from bcfplugin.session import getSession
+    session = getSession()
+    session.author = author
+    if session.persistent:
+        writeSessionFile(AUTHOR_FILE, author)
 
 
 def getAuthor():
 
-    """ Reads the contents of AUTHORS_FILE and returns its contents.
-
-    If the file does not exist `None` is returned. This function assumes that
-    the file only contains one line, without a line break, containing the
-    author's email.
-    """
-
-    authorsPath = os.path.join(getSystemTmp(), AUTHOR_FILE)
-    if not os.path.exists(authorsPath):
-        return None
-
-    author = ""
-    with open(authorsPath, "r") as f:
-        author = f.read()
+    """ Returns the author of the current session, or `None` if it is not
+    set. """
 
-    return author
+    from bcfplugin.session import getSession
+    return getSession().author
 
 
 def retrieveWebFile(schema: Schema, storePath: str):
@@ -474,41 +604,34 @@ def doesFileExistInProject(file: str):
 
 def setDirty(bit: bool):
 
-    """ Sets the dirty bit in the `DIRTY_FILE` """
+    """ Sets the dirty bit of the current session.
+
+    Persistent sessions also write it to `DIRTY_FILE`, but only if it changed.
+    """
 
     global DIRTY_FILE
 
-    filepath = getTmpFilePath(DIRTY_FILE)
+    from bcfplugin.session import getSession
+    session = getSession()
+    bit = bool(bit)
+    if session.dirty == bit:
+        return
 
-    with open(filepath, "w") as f:
-        if bit:
-            f.write("True")
-        else:
-            f.write("False")
+    session.dirty = bit
+    if session.persistent:
+        writeSessionFile(DIRTY_FILE, str(bit))
 
 
 def getDirtyBit():
 
-    """ Returns the dirty bit as stored in the `DIRTY_FILE`.
+    """ Returns the dirty bit of the current session.
 
     Per default `False` is returned indicating that the current state is not
     dirty.
     """
 
-    global DIRTY_FILE
-
-    filepath = getTmpFilePath(DIRTY_FILE)
-    if not os.path.exists(filepath):
-        return False
-
-    bit = False
-    with open(filepath, "r") as f:
-        content = f.read()
-        if content == "True":
-            bit = True
-        else:
-            bit = False
-    return bit
+    from bcfplugin.session import getSession
+    return getSession().dirty
 
 
 def loggingReady():